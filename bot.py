@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 # v18e-tune2: G RSI74.55 + 60s조기탈출 + K gap제거 (2026-04-06)
-import os, time, math, requests, statistics, traceback, threading, csv, sys, json, random, copy, re, atexit, signal
+import os, time, math, bisect, struct, zlib, sqlite3, requests, statistics, traceback, threading, csv, sys, json, random, copy, re, atexit, signal, itertools, queue, asyncio
 from datetime import datetime, timedelta, timezone
 from collections import deque, OrderedDict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, Future, CancelledError
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager, nullcontext
 from config import *  # 전역 설정값 (config.py)
 # 🔧 FIX: _로 시작하는 config 변수는 import * 에서 제외됨 → 명시 import
 import config as _cfg
@@ -13,6 +15,8 @@ from urllib.parse import urlencode
 import uuid
 import hashlib
 import jwt
+# 📐 섀도우 route 통계 스케치 (같은 디렉터리, 표준 라이브러리만)
+from shadow_sketch import RingBuffer, QuantileSketch, FeatureHist, encode_stats, decode_stats
 
 # 🔧 WF 데이터 기반 전략 모듈 (bot.py에 인라인 통합)
 # strategy_v4 함수들은 아래 "# ============ strategy_v4 통합 ============" 섹션에 정의
@@ -350,10 +354,9 @@ def _collect_a_bypass_features(pre, m):
         features["vr5_1m"] = round(_v4_volume_ratio_5(c1), 2) if len(c1) >= 6 else None
     c5 = _get_c5_cached(m, 50)
     if c5 and len(c5) >= 35:
-        cls5 = [c["trade_price"] for c in c5]
-        _, _, hist = _v4_macd(cls5)
-        if hist is not None and cls5[-1] > 0:
-            features["macd_hist_5m_bps"] = round(hist / cls5[-1] * 10000, 2)
+        _, _, hist = _v4_macd_from_candles(c5)
+        if hist is not None and c5[-1]["trade_price"] > 0:
+            features["macd_hist_5m_bps"] = round(hist / c5[-1]["trade_price"] * 10000, 2)
         rsi5 = _v4_rsi_from_candles(c5, 14)
         if rsi5 is not None:
             features["rsi_5m"] = round(rsi5, 2)
@@ -414,12 +417,145 @@ _BOX_LOCK = threading.Lock()
 _BOX_LAST_EXIT = {}                    # 쿨다운 추적: { market: timestamp }
 _BOX_LAST_SCAN_TS = 0                  # 마지막 스캔 시각
 
+# =========================
+# 📈 메트릭 레지스트리 (스레드별 샤드 — 증가 경로 락 없음)
+# =========================
+# 기존: _pipeline_inc 가 호출마다 전역 _PIPELINE_COUNTERS_LOCK 획득 (마켓당 수십 회 × 스캐너/섀도우/모니터 스레드 경합)
+# 변경: 각 스레드는 자기 샤드 dict 에만 쓰고 (소유 스레드 단독 쓰기 → 락 불필요), 읽을 때만 전체 샤드 병합.
+#       종료된 스레드 샤드는 병합 시 retired 로 접어 넣음. /metrics (HealthHandler) 로 Prometheus 텍스트 노출.
+class MetricsRegistry:
+    """스레드별 샤드 카운터/히스토그램 + 콜백 게이지 (쓰기 = 자기 샤드, 읽기 = 병합 스냅샷)"""
+
+    MS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+    def __init__(self, defaults=None, buckets=MS_BUCKETS):
+        self._defaults = dict(defaults or {})
+        self.buckets = tuple(buckets)
+        self._tls = threading.local()
+        self._lock = threading.Lock()  # 샤드 등록/회수/병합 전용 (증가 경로에서는 안 잡음)
+        self._shards = []              # [(thread, counters, hists)]
+        self._retired_c = {}
+        self._retired_h = {}
+        self._gauges = {}              # name -> (fn, help)
+
+    def _shard(self):
+        c, h = {}, {}
+        with self._lock:
+            self._shards.append((threading.current_thread(), c, h))
+        self._tls.c = c
+        self._tls.h = h
+        return c, h
+
+    def inc(self, key, n=1):
+        try:
+            c = self._tls.c
+        except AttributeError:
+            c = self._shard()[0]
+        c[key] = c.get(key, 0) + n
+
+    def observe(self, family, name, value):
+        """히스토그램 관측 (family 별 버킷 카운트 + 합계)"""
+        try:
+            h = self._tls.h
+        except AttributeError:
+            h = self._shard()[1]
+        arr = h.get((family, name))
+        if arr is None:
+            arr = h[(family, name)] = [0] * (len(self.buckets) + 1) + [0.0]
+        arr[bisect.bisect_left(self.buckets, value)] += 1
+        arr[-1] += value
+
+    def gauge(self, name, fn, help_text=""):
+        self._gauges[name] = (fn, help_text)
+
+    @staticmethod
+    def _merge_h(dst, src):
+        for k, arr in src.items():
+            cur = dst.get(k)
+            if cur is None:
+                dst[k] = list(arr)
+            else:
+                for i, v in enumerate(arr):
+                    cur[i] += v
+
+    def _collect(self):
+        """(카운터, 히스토그램) 병합 — dict(...)/list(...) 복사는 GIL 하에서 원자적"""
+        with self._lock:
+            live = []
+            for t, c, h in self._shards:
+                if t.is_alive():
+                    live.append((t, c, h))
+                    continue
+                for k, v in c.items():   # 종료 스레드: 더 이상 쓰지 않음 → 안전하게 접기
+                    self._retired_c[k] = self._retired_c.get(k, 0) + v
+                self._merge_h(self._retired_h, h)
+            self._shards = live
+            counters = dict(self._defaults)
+            for k, v in self._retired_c.items():
+                counters[k] = counters.get(k, 0) + v
+            hists = {k: list(v) for k, v in self._retired_h.items()}
+            for _, c, h in live:
+                for k, v in dict(c).items():
+                    counters[k] = counters.get(k, 0) + v
+                self._merge_h(hists, {k: list(v) for k, v in dict(h).items()})
+        return counters, hists
+
+    def snapshot(self):
+        """전체 카운터 병합 dict (기존 dict(_PIPELINE_COUNTERS) 대체)"""
+        return self._collect()[0]
+
+    def value(self, key):
+        with self._lock:
+            n = self._defaults.get(key, 0) + self._retired_c.get(key, 0)
+            for _, c, _h in self._shards:
+                n += c.get(key, 0)
+        return n
+
+    @staticmethod
+    def _esc(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+    def prometheus(self, prefix="bot"):
+        """Prometheus text exposition (0.0.4)"""
+        counters, hists = self._collect()
+        out = [f"# HELP {prefix}_pipeline_total 파이프라인 카운터 (_pipeline_inc)",
+               f"# TYPE {prefix}_pipeline_total counter"]
+        for k in sorted(counters):
+            out.append(f'{prefix}_pipeline_total{{key="{self._esc(k)}"}} {counters[k]}')
+        fams = {}
+        for (fam, name), arr in hists.items():
+            fams.setdefault(fam, []).append((name, arr))
+        for fam in sorted(fams):
+            out.append(f"# TYPE {prefix}_{fam} histogram")
+            for name, arr in sorted(fams[fam]):
+                lbl = f'name="{self._esc(name)}"'
+                cum = 0
+                for le, cnt in zip(self.buckets, arr):
+                    cum += cnt
+                    out.append(f'{prefix}_{fam}_bucket{{{lbl},le="{le}"}} {cum}')
+                cum += arr[len(self.buckets)]
+                out.append(f'{prefix}_{fam}_bucket{{{lbl},le="+Inf"}} {cum}')
+                out.append(f"{prefix}_{fam}_sum{{{lbl}}} {arr[-1]:.3f}")
+                out.append(f"{prefix}_{fam}_count{{{lbl}}} {cum}")
+        for name in sorted(self._gauges):
+            fn, help_text = self._gauges[name]
+            try:
+                v = float(fn())
+            except Exception:
+                continue
+            if help_text:
+                out.append(f"# HELP {prefix}_{name} {help_text}")
+            out.append(f"# TYPE {prefix}_{name} gauge")
+            out.append(f"{prefix}_{name} {v:g}")
+        return "\n".join(out) + "\n"
+
+
 # =========================
 # 📊 라이브 파이프라인 계측 (Pipeline Instrumentation)
 # =========================
 # 스캔 사이클마다 누적, 10분마다 텔레그램+콘솔 리포트
-_PIPELINE_COUNTERS_LOCK = threading.Lock()
-_PIPELINE_COUNTERS = {
+# 📈 카운터 값은 _METRICS (스레드별 샤드) — 아래 dict 는 리포트가 0 으로 보는 기본 키 목록
+_PIPELINE_COUNTER_DEFAULTS = {
     "scan_markets": 0,          # 스캔한 마켓 수
     "c1_ok": 0,                 # 1m 캔들 수집 성공 마켓
     "detect_called": 0,         # detect_leader_stock 호출 수
@@ -521,6 +657,7 @@ _PIPELINE_COUNTERS = {
     "send_attempt": 0,         # 최종 진입 시도 수
     "send_success": 0,         # 진입 성공 수
 }
+_METRICS = MetricsRegistry(_PIPELINE_COUNTER_DEFAULTS)
 _PIPELINE_LAST_REPORT_TS = 0
 _PIPELINE_REPORT_INTERVAL = 600  # 10분
 _PIPELINE_START_TS = time.time()  # 누적 계측 시작 시각
@@ -536,6 +673,7 @@ _DEPLOY_TS_STR = time.strftime("%m/%d %H:%M", time.localtime(_PIPELINE_START_TS)
 # ======================================================================
 _PIPELINE_PREV_SNAPSHOT = {}          # 이전 리포트 시점 카운터 스냅샷 (delta 계산용)
 _PIPELINE_PREV_SNAPSHOT_TS = time.time()
+_PIPELINE_PREV_LOCK = threading.Lock()  # 렌더 스레드 / 동기 렌더(렌더러 없음) 사이 읽기·갱신 보호
 
 # 코인별 탈락 히트맵: {market: {reason: count}}
 _PIPELINE_COIN_HITS = {}
@@ -569,8 +707,10 @@ _PIPELINE_STAGE_LATENCIES = {
     "save_state":   deque(maxlen=200),
     "shadow_eval":  deque(maxlen=200),
     "tg_flush":     deque(maxlen=200),
-    "report_full":  deque(maxlen=200),  # _pipeline_report (10분 텔레그램)
+    "report_full":  deque(maxlen=200),  # _pipeline_report (10분 텔레그램 — 비동기 시 스냅샷+제출만)
     "report_mini":  deque(maxlen=200),  # _pipeline_mini_report (1분 콘솔)
+    "report_snapshot": deque(maxlen=200),  # 리포트용 섀도우 통계 스냅샷 (메인 루프 부담분)
+    "report_render":   deque(maxlen=200),  # ReportRenderer 스레드 렌더 시간
     "scan_fetch":   deque(maxlen=200),  # orderbook + candles 네트워크 fetch
     "scan_detect":  deque(maxlen=200),  # detect_leader_stock 루프 + 진입 판정
     # detect 루프 내부 세분화 (마켓별 누적 → 사이클 단위로 합산되어 측정)
@@ -582,6 +722,11 @@ _PIPELINE_STAGE_LATENCIES = {
     "dl_c1_fetch":       deque(maxlen=200),  # c1 lazy fetch (캐시 hit 시 거의 0)
     "dl_multitf_fetch":  deque(maxlen=200),  # c5/c15/c60 fetch
     "dl_v4_eval":        deque(maxlen=200),  # v4_evaluate_entry (v0 strategies 13개)
+    # 🧵 탐지 파이프라인 단계별 대기열 깊이 (값=사이클 내 최대 대기 마켓 수, ms 아님)
+    "pipe_q_precheck":   deque(maxlen=200),  # 워커 배정 대기
+    "pipe_q_data":       deque(maxlen=200),  # data 단계(c1/c5/c15/c60 fetch) 슬롯 대기
+    "pipe_q_eval":       deque(maxlen=200),  # eval 단계(v4_evaluate_entry) 슬롯 대기
+    "pipe_q_postcheck":  deque(maxlen=200),  # postcheck_6s 슬롯 대기
     # 참고: timeframe별 fetch는 _TAGGED_FETCH_HISTORY(call-site tag 기반)로 측정
     # → get_minutes_candles 함수 레벨 wrap + thread-local tag → 모든 호출 경로 추적
 }
@@ -641,7 +786,131 @@ def _fetch_tag(tag):
     return _FetchTagContext(tag)
 
 
-def _record_tagged_fetch(tf, elapsed_ms):
+# =========================
+# 🔥 스캔 사이클 프로파일러 (span 트리 → Chrome trace)
+# =========================
+# 집계값(_pipeline_record_stage 등)만으로는 "어느 마켓의 어느 단계가 느렸나"를 못 봄.
+# 사이클 동안 market → stage(data/eval/...) → net(c1/c5/tick)·check_fn span 을 스레드별로 기록,
+# 총 소요가 PROFILE_SLOW_CYCLE_MS 이상인 사이클만 Chrome trace JSON 으로 덤프.
+# 같은 스레드 안의 span 은 시간 포함관계로 뷰어에서 자동 중첩 (flame 형태).
+class CycleProfiler:
+    def __init__(self, enabled, slow_ms, out_dir, max_spans, max_files):
+        self.enabled = bool(enabled)
+        self.slow_ms = float(slow_ms)
+        self.out_dir = out_dir
+        self.max_spans = int(max_spans)
+        self.max_files = int(max_files)
+        self.active = False  # 사이클 기록 중 여부 (훅은 이 플래그만 보고 즉시 반환)
+        self._lock = threading.Lock()
+        self._events = []
+        self._threads = {}  # thread ident -> tid (trace 안에서 작은 정수)
+        self._t0 = 0.0
+        self._dropped = 0
+        self.stats = {"cycles": 0, "dumped": 0, "last_path": "", "last_ms": 0.0, "errors": 0}
+
+    def begin_cycle(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._events = []
+            self._threads = {}
+            self._dropped = 0
+            self._t0 = time.time()
+            self.active = True
+
+    def _tid(self):
+        """(self._lock 보유) 현재 스레드 → trace tid, 처음 보는 스레드는 이름 메타 이벤트 추가"""
+        ident = threading.get_ident()
+        tid = self._threads.get(ident)
+        if tid is None:
+            tid = self._threads[ident] = len(self._threads) + 1
+            self._events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                                 "args": {"name": threading.current_thread().name}})
+        return tid
+
+    def add(self, name, cat, start_s, dur_s, args=None):
+        """완료된 span 1개 기록 (시작 시각 epoch 초 + 길이 초) — 사후 기록용"""
+        if not self.active:
+            return
+        with self._lock:
+            if not self.active:
+                return
+            if len(self._events) >= self.max_spans:
+                self._dropped += 1
+                return
+            ev = {"name": name, "cat": cat, "ph": "X", "pid": 1, "tid": self._tid(),
+                  "ts": round((start_s - self._t0) * 1e6, 1), "dur": round(max(dur_s, 0.0) * 1e6, 1)}
+            if args:
+                ev["args"] = args
+            self._events.append(ev)
+
+    @contextmanager
+    def span(self, name, cat="stage", **args):
+        """with _PROFILER.span('data', 'stage', market=m): ... — 비활성 시 기록 없이 통과"""
+        if not self.active:
+            yield
+            return
+        t0 = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, cat, t0, time.time() - t0, args or None)
+
+    def end_cycle(self, total_ms, label="scan"):
+        """사이클 종료 — 임계 초과 시 trace 파일 덤프. 반환: 파일 경로 또는 None"""
+        if not self.active:
+            return None
+        with self._lock:
+            self.active = False
+            events, self._events = self._events, []
+            dropped = self._dropped
+            t0 = self._t0
+        self.stats["cycles"] += 1
+        if total_ms < self.slow_ms:
+            return None
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            stamp = datetime.fromtimestamp(t0).strftime("%Y%m%d_%H%M%S")
+            path = os.path.join(self.out_dir, f"{label}_{stamp}_{int(total_ms)}ms.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                           "otherData": {"label": label, "total_ms": round(total_ms, 1),
+                                         "start": datetime.fromtimestamp(t0).isoformat(),
+                                         "spans": len(events), "dropped": dropped}},
+                          f, separators=(",", ":"))
+            self.stats["dumped"] += 1
+            self.stats["last_path"] = path
+            self.stats["last_ms"] = total_ms
+            self._prune(label)
+            return path
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[PROFILER] trace 덤프 실패: {e}")
+            return None
+
+    def _prune(self, label):
+        """최신 max_files 개만 남기고 삭제 (파일명 타임스탬프 순)"""
+        try:
+            files = sorted(f for f in os.listdir(self.out_dir)
+                           if f.startswith(label + "_") and f.endswith(".json"))
+            for f in files[:-self.max_files]:
+                os.remove(os.path.join(self.out_dir, f))
+        except Exception:
+            pass
+
+    def status_str(self):
+        if not self.enabled:
+            return "profiler=off"
+        s = self.stats
+        return (f"profiler cycles={s['cycles']} dumped={s['dumped']}"
+                + (f" last={os.path.basename(s['last_path'])}" if s["last_path"] else ""))
+
+
+_PROFILER = CycleProfiler(PROFILE_ENABLED, PROFILE_SLOW_CYCLE_MS, PROFILE_TRACE_DIR,
+                          PROFILE_MAX_SPANS, PROFILE_MAX_FILES)
+
+
+def _record_tagged_fetch(tf, elapsed_ms, market=None):
     """get_minutes_candles 내부에서 호출 — 현재 thread-local tag + timeframe으로 누적"""
     if elapsed_ms < 0 or elapsed_ms > _PIPELINE_LATENCY_SANITY_CAP_MS:
         return
@@ -654,6 +923,9 @@ def _record_tagged_fetch(tf, elapsed_ms):
             _CYCLE_FETCH_BY_TAG[key] = cur
         cur[0] += elapsed_ms
         cur[1] += 1
+    if _PROFILER.active:
+        _PROFILER.add(key, "net", time.time() - elapsed_ms / 1000, elapsed_ms / 1000,
+                      {"market": market} if market else None)
 
 
 def _lazy_tick_inc(stage):
@@ -772,6 +1044,7 @@ def _pipeline_record_scan_latency(elapsed_ms):
         return
     with _PIPELINE_SCAN_LAT_LOCK:
         _PIPELINE_SCAN_LATENCIES.append(elapsed_ms)
+    _METRICS.observe("stage_ms", "scan_cycle", elapsed_ms)
 
 
 def _pipeline_record_stage(name, elapsed_ms):
@@ -782,6 +1055,8 @@ def _pipeline_record_stage(name, elapsed_ms):
         d = _PIPELINE_STAGE_LATENCIES.get(name)
         if d is not None:
             d.append(elapsed_ms)
+    if not name.startswith("pipe_q_"):  # pipe_q_* 는 대기 마켓 수 (ms 아님)
+        _METRICS.observe("stage_ms", name, elapsed_ms)
 
 
 def _latency_killswitch_check():
@@ -918,8 +1193,7 @@ def _pipeline_gauge_csv_write():
     gauge_path = os.path.join(os.getcwd(), "pipeline_gauge.csv")
     try:
         vs = _pipeline_value_summary()
-        with _PIPELINE_COUNTERS_LOCK:
-            c = dict(_PIPELINE_COUNTERS)
+        c = _METRICS.snapshot()
         write_header = not os.path.exists(gauge_path)
         with open(gauge_path, "a", newline="", encoding="utf-8") as f:
             w = csv.writer(f)
@@ -1817,12 +2091,12 @@ def _post_signal_flow_summary():
     observe_epoch 태그로 구버전 잔재 vs 현 배포 이벤트 구분 가능.
     """
     try:
-        with _PIPELINE_COUNTERS_LOCK:
-            enter = _PIPELINE_COUNTERS.get("post_signal_enter", 0)
-            blocked = _PIPELINE_COUNTERS.get("post_signal_blocked", 0)
-            passed = _PIPELINE_COUNTERS.get("post_signal_pass", 0)
-            errored = _PIPELINE_COUNTERS.get("post_signal_error", 0)
-            shadow_only = _PIPELINE_COUNTERS.get("post_signal_shadow_only", 0)
+        c = _METRICS.snapshot()
+        enter = c.get("post_signal_enter", 0)
+        blocked = c.get("post_signal_blocked", 0)
+        passed = c.get("post_signal_pass", 0)
+        errored = c.get("post_signal_error", 0)
+        shadow_only = c.get("post_signal_shadow_only", 0)
         with _GATE_FAIL_LOCK:
             d_enter = enter - _POST_FLOW_LAST_REPORT["enter"]
             d_blocked = blocked - _POST_FLOW_LAST_REPORT["blocked"]
@@ -1909,13 +2183,13 @@ def _pass_entry_funnel_summary():
     - send_attempt / send_success: 기존 카운터 (open_auto_position 진입/성공)
     """
     try:
-        with _PIPELINE_COUNTERS_LOCK:
-            keys_of_interest = [
-                "post_signal_pass", "send_attempt", "send_success",
-                "entry_skip_position", "entry_skip_max_positions",
-                "entry_skip_lock", "entry_skip_auto_off", "entry_skip_api_key",
-            ]
-            snap = {k: _PIPELINE_COUNTERS.get(k, 0) for k in keys_of_interest}
+        keys_of_interest = [
+            "post_signal_pass", "send_attempt", "send_success",
+            "entry_skip_position", "entry_skip_max_positions",
+            "entry_skip_lock", "entry_skip_auto_off", "entry_skip_api_key",
+        ]
+        c = _METRICS.snapshot()
+        snap = {k: c.get(k, 0) for k in keys_of_interest}
         delta = {k: snap[k] - _PASS_ENTRY_LAST_REPORT.get(k, 0) for k in snap}
         for k, v in snap.items():
             _PASS_ENTRY_LAST_REPORT[k] = v
@@ -1956,9 +2230,7 @@ def _shadow_route_flow_summary(top_n=10):
     - candidate 증가·opened 증가 : 정상
     """
     try:
-        with _PIPELINE_COUNTERS_LOCK:
-            keys = [k for k in _PIPELINE_COUNTERS.keys() if k.startswith("shadow_route_")]
-            snapshot = {k: _PIPELINE_COUNTERS.get(k, 0) for k in keys}
+        snapshot = {k: v for k, v in _METRICS.snapshot().items() if k.startswith("shadow_route_")}
         # route 별 candidate/opened 집계
         routes = {}  # route -> {candidate, opened, d_candidate, d_opened}
         for k, cnt in snapshot.items():
@@ -2076,8 +2348,8 @@ def _shadow_contamination_check():
     try:
         contam_routes = {"CLM_A_CLEAN_bp30", "CLM_A_x_A2_bp30"}
         lines = []
-        with _SHADOW_PERF_LOCK:
-            for key, s in _SHADOW_PERF_STATS.items():
+        with _shadow_view_lock():
+            for key, s in _shadow_perf_view().items():
                 route = s.get("route", "")
                 if route not in contam_routes:
                     continue
@@ -2190,12 +2462,12 @@ def _a2_audit_summary():
     """
     try:
         vr5_cap = 3.5  # _v0_check_climax_cs40_vr5cap 기본값 · 사전등록
-        with _PIPELINE_COUNTERS_LOCK:
-            reject_cnt = 0
-            for k, v in _PIPELINE_COUNTERS.items():
-                if "a2_vr5cap_fail" in k:
-                    reject_cnt += v
-            a2_cand = _PIPELINE_COUNTERS.get("shadow_route_CLM_A_x_A2_bp30_candidate", 0)
+        c = _METRICS.snapshot()
+        reject_cnt = 0
+        for k, v in c.items():
+            if "a2_vr5cap_fail" in k:
+                reject_cnt += v
+        a2_cand = c.get("shadow_route_CLM_A_x_A2_bp30_candidate", 0)
         # A2 shadow perf 로부터 vr5 분포 집계 · 결측군 편중 감사 (advisor 2)
         a2_route = "CLM_A_x_A2_bp30"
         a2_n = 0
@@ -2207,8 +2479,8 @@ def _a2_audit_summary():
         missing_by_hour = {}
         present_pnls = []
         missing_pnls = []
-        with _SHADOW_PERF_LOCK:
-            for key, s in _SHADOW_PERF_STATS.items():
+        with _shadow_view_lock():
+            for key, s in _shadow_perf_view().items():
                 if s.get("route") != a2_route:
                     continue
                 a2_n = s.get("signals", 0)
@@ -2297,8 +2569,8 @@ def _common_cohort_paired_summary():
             "A×A2": "CLM_A_x_A2_bp30",
         }
         route_trades = {}  # route_label → {signal_id → trade_dict}
-        with _SHADOW_PERF_LOCK:
-            for key, s in _SHADOW_PERF_STATS.items():
+        with _shadow_view_lock():
+            for key, s in _shadow_perf_view().items():
                 route = s.get("route", "")
                 for label, r in target_routes.items():
                     if route == r:
@@ -2514,8 +2786,8 @@ def _loss_prevention_diagnostics():
         except Exception:
             return ""
         lines = []
-        with _SHADOW_PERF_LOCK:
-            for key, s in _SHADOW_PERF_STATS.items():
+        with _shadow_view_lock():
+            for key, s in _shadow_perf_view().items():
                 route = s.get("route", "")
                 if route not in _prod:
                     continue
@@ -2611,8 +2883,9 @@ _EXEC_QUALITY_FIELDS = [
 
 def _log_exec_quality(market, route, is_live, signal_price, ob_units,
                       fill_price=0.0, fill_slip_pct=0.0,
-                      fill_delay_ms=0, seed_krw=0):
-    """호가창 깊이 + VWAP 슬리피지 시뮬레이션 로그 (시드 결정용)"""
+                      fill_delay_ms=0, seed_krw=0, ob_analytics=None):
+    """호가창 깊이 + VWAP 슬리피지 시뮬레이션 로그 (시드 결정용)
+    ob_analytics: 호출측이 이미 구축한 OrderbookAnalytics (없으면 ob_units로 구축)"""
     global _EXEC_QUALITY_INITIALIZED
     if not ob_units:
         return
@@ -2636,15 +2909,14 @@ def _log_exec_quality(market, route, is_live, signal_price, ob_units,
         "mid_price": round(mid, 2), "spread_pct": spread_pct,
         "ask1_krw": a1_krw, "bid1_krw": b1_krw,
     }
+    ana = ob_analytics or _ob_analytics(ob_units)
     for n in (3, 5, 10):
-        ask_cum = sum(u.get("ask_price", 0) * u.get("ask_size", 0) for u in ob_units[:n])
-        bid_cum = sum(u.get("bid_price", 0) * u.get("bid_size", 0) for u in ob_units[:n])
-        row[f"ask_cum{n}_krw"] = round(ask_cum)
-        row[f"bid_cum{n}_krw"] = round(bid_cum)
+        row[f"ask_cum{n}_krw"] = round(ana.top_krw(n, "buy"))
+        row[f"bid_cum{n}_krw"] = round(ana.top_krw(n, "sell"))
     for amt, label in [(500_000, "50w"), (1_000_000, "100w"), (3_000_000, "300w"),
                        (5_000_000, "500w"), (10_000_000, "1000w")]:
-        sb = _calc_vwap_slip(ob_units, amt, "buy")
-        ss = _calc_vwap_slip(ob_units, amt, "sell")
+        sb = ana.slip(amt, "buy")
+        ss = ana.slip(amt, "sell")
         row[f"slip_buy_{label}"] = round(sb, 4) if sb is not None else ""
         row[f"slip_sell_{label}"] = round(ss, 4) if ss is not None else ""
     with _EXEC_QUALITY_LOCK:
@@ -2765,8 +3037,10 @@ def _pipeline_inc(key, n=1, value=None, threshold=None, direction=None):
     """
     _eval_all = getattr(_BLOCKED_THREAD_LOCAL, '_eval_all_mode', False)
     if not _eval_all:
-        with _PIPELINE_COUNTERS_LOCK:
-            _PIPELINE_COUNTERS[key] = _PIPELINE_COUNTERS.get(key, 0) + n
+        _METRICS.inc(key, n)  # 📈 스레드 샤드 — 락 없음
+        _inc_log = getattr(_BLOCKED_THREAD_LOCAL, "inc_log", None)
+        if _inc_log is not None:  # 🧭 detector 실행 중 — 봉 메모 재사용 시 같은 퍼널 카운터 재생용
+            _inc_log.append((key, n))
         # POST_SIGNAL 4-state 마킹 (advisor 지적: outer except 정확 판정)
         # 예외 격리 — try/except 로 매매 흐름 차단 금지
         try:
@@ -2795,24 +3069,181 @@ def _pipeline_inc(key, n=1, value=None, threshold=None, direction=None):
     return not _eval_all
 
 
+# =========================
+# 🧾 리포트 렌더 워커 (스냅샷 → 백그라운드 렌더)
+# =========================
+# 기존: _pipeline_report(compact + research — _v4_shadow_report_lines / _survival_analysis / threshold sweep)가
+#       메인 루프에서 _SHADOW_PERF_LOCK 을 잡은 채 루트별 trade_records 전체 순회 → 그동안 스캔 정지 + 섀도우 청산 대기.
+# 변경: 메인 루프는 카운터 스냅샷(_METRICS.snapshot) + 섀도우 통계 구조 복사만 (락 보유 = 복사 시간),
+#       렌더는 ReportRenderer 스레드가 스냅샷 위에서 수행. 리포트 함수들은 _shadow_*_view() 로 읽음
+#       → 렌더 스레드면 스냅샷(락 없음), 그 외 스레드(텔레그램 명령 등)는 기존대로 라이브 + 락.
+_REPORT_VIEW = threading.local()
+_NULL_CTX = nullcontext()
+
+
+def _shadow_perf_view():
+    v = getattr(_REPORT_VIEW, "snap", None)
+    return v["perf"] if v is not None else _SHADOW_PERF_STATS
+
+
+def _shadow_blocked_view():
+    v = getattr(_REPORT_VIEW, "snap", None)
+    return v["blocked"] if v is not None else _SHADOW_BLOCKED_STATS
+
+
+def _shadow_view_lock():
+    """스냅샷 읽기면 락 불필요, 라이브 읽기면 _SHADOW_PERF_LOCK"""
+    return _NULL_CTX if getattr(_REPORT_VIEW, "snap", None) is not None else _SHADOW_PERF_LOCK
+
+
+def _shadow_route_agg_view(key):
+    """route 윈도우 집계 — 렌더 스레드면 스냅샷 복사본, 그 외는 라이브 (_shadow_view_lock 보유 상태에서 호출)"""
+    v = getattr(_REPORT_VIEW, "snap", None)
+    if v is None:
+        return _shadow_route_agg(key)
+    agg = v["route_agg"].get(key)
+    return agg if agg is not None else _RouteAgg()
+
+
+def _shadow_blocked_agg_view(key):
+    """blocked fail_values 히스토그램 — 렌더 스레드면 스냅샷 복사본, 그 외는 라이브 (_shadow_view_lock 보유 상태에서 호출)"""
+    v = getattr(_REPORT_VIEW, "snap", None)
+    if v is None:
+        return _shadow_blocked_agg(key)
+    h = v["blocked_agg"].get(key)
+    return h if h is not None else FeatureHist()
+
+
+def _copy_route_stats(src):
+    """route별 통계 dict 구조 복사 — 리듀서(_shadow_apply_*)가 제자리 변경하는 깊이(2단)까지만.
+    trade_records / fail_values 의 원소 dict 는 append 후 불변 → 참조 공유"""
+    out = {}
+    for key, s in src.items():
+        d = {}
+        for f, v in s.items():
+            if type(v) is list:
+                v = v[:]
+            elif isinstance(v, (RingBuffer, QuantileSketch)):
+                v = v.copy()
+            elif type(v) is dict:
+                v = v.copy()
+                if f == "coin_wl":  # {coin: [wins, losses]} — 값 리스트 제자리 증가
+                    v = {k: x[:] for k, x in v.items()}
+            d[f] = v
+        out[key] = d
+    return out
+
+
+def _report_snapshot():
+    """렌더용 섀도우 통계 스냅샷 (메인 루프가 지불하는 유일한 비용)"""
+    t0 = time.time()
+    with _SHADOW_PERF_LOCK:
+        snap = {"perf": _copy_route_stats(_SHADOW_PERF_STATS),
+                "blocked": _copy_route_stats(_SHADOW_BLOCKED_STATS),
+                # 윈도우 집계도 복사 → 렌더 스레드는 _SHADOW_PERF_LOCK 을 전혀 잡지 않음
+                "route_agg": {k: _shadow_route_agg(k).copy() for k in _SHADOW_PERF_STATS},
+                "blocked_agg": {k: _shadow_blocked_agg(k).copy() for k in _SHADOW_BLOCKED_STATS}}
+    _pipeline_record_stage("report_snapshot", (time.time() - t0) * 1000)
+    return snap
+
+
+class ReportRenderer:
+    """🧾 리포트 렌더 워커 — 스냅샷 1건씩 렌더. 렌더 중 들어온 요청은 최신 1건만 보류 (밀린 리포트 누적 없음)"""
+
+    def __init__(self):
+        self._cv = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._thread = None
+        self.stats = {"submitted": 0, "rendered": 0, "coalesced": 0, "errors": 0,
+                      "last_ms": 0.0, "max_ms": 0.0}
+
+    def start(self):
+        with self._cv:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="ReportRenderer")
+                self._thread.start()
+
+    def submit(self, fn, snap, *args):
+        with self._cv:
+            if self._pending is not None:
+                self.stats["coalesced"] += 1
+            self._pending = (fn, snap, args)
+            self.stats["submitted"] += 1
+            self._cv.notify()
+        if self._thread is None:
+            self.start()
+
+    def busy(self):
+        with self._cv:
+            return self._busy or self._pending is not None
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while self._pending is None:
+                    self._cv.wait()
+                fn, snap, args = self._pending
+                self._pending = None
+                self._busy = True
+            t0 = time.time()
+            _REPORT_VIEW.snap = snap
+            try:
+                fn(*args)
+                self.stats["rendered"] += 1
+            except Exception:
+                self.stats["errors"] += 1
+                print(f"[REPORT_RENDER_ERR] {traceback.format_exc()}")
+            finally:
+                _REPORT_VIEW.snap = None
+                ms = (time.time() - t0) * 1000
+                self.stats["last_ms"] = ms
+                self.stats["max_ms"] = max(self.stats["max_ms"], ms)
+                _pipeline_record_stage("report_render", ms)
+                with self._cv:
+                    self._busy = False
+
+    def status_str(self):
+        s = self.stats
+        return (f"report(r={s['rendered']}/{s['submitted']} co={s['coalesced']} err={s['errors']} "
+                f"last={s['last_ms']:.0f}ms max={s['max_ms']:.0f}ms{' busy' if self.busy() else ''})")
+
+
+_REPORT_RENDERER = ReportRenderer() if REPORT_ASYNC_ENABLED else None
+
+
+def _report_status_str():
+    return _REPORT_RENDERER.status_str() if _REPORT_RENDERER is not None else "report=sync"
+
+
 def _pipeline_report(force=False):
-    """10분마다 파이프라인 카운터 리포트 전송 (확장판: delta, 전환율, 값분포, 니어미스, Top-N)"""
-    global _PIPELINE_LAST_REPORT_TS, _PIPELINE_PREV_SNAPSHOT, _PIPELINE_PREV_SNAPSHOT_TS
+    """10분마다 파이프라인 카운터 리포트 전송 — 메인 루프는 스냅샷만, 렌더/전송은 ReportRenderer"""
+    global _PIPELINE_LAST_REPORT_TS
     now = time.time()
     if not force and (now - _PIPELINE_LAST_REPORT_TS) < _PIPELINE_REPORT_INTERVAL:
         return
     _PIPELINE_LAST_REPORT_TS = now
-    with _PIPELINE_COUNTERS_LOCK:
-        c = dict(_PIPELINE_COUNTERS)
+    c = _METRICS.snapshot()
+    if _REPORT_RENDERER is None:
+        return _pipeline_report_render(now, c)
+    _REPORT_RENDERER.submit(_pipeline_report_render, _report_snapshot(), now, c)
+
+
+def _pipeline_report_render(now, c):
+    """파이프라인 카운터 리포트 렌더 + 전송 (확장판: delta, 전환율, 값분포, 니어미스, Top-N)
+    now / c: 요청 시점 시각 + 카운터 스냅샷"""
+    global _PIPELINE_PREV_SNAPSHOT, _PIPELINE_PREV_SNAPSHOT_TS
     elapsed_min = (now - _PIPELINE_START_TS) / 60
     # v15: 첫 리포트에 데이터가 전혀 없으면 "수집 중" 한 줄만 보내고 스킵
     if c.get("scan_markets", 0) == 0 and c.get("detect_called", 0) == 0:
-        tg_send("📊 파이프라인 계측: 데이터 수집 중... (다음 리포트부터 표시)")
+        tg_send("📊 파이프라인 계측: 데이터 수집 중... (다음 리포트부터 표시)", priority=TG_PRIO_REPORT)
         return
-    delta_min = (now - _PIPELINE_PREV_SNAPSHOT_TS) / 60 if _PIPELINE_PREV_SNAPSHOT else elapsed_min
+    with _PIPELINE_PREV_LOCK:
+        prev, prev_ts = _PIPELINE_PREV_SNAPSHOT, _PIPELINE_PREV_SNAPSHOT_TS
+    delta_min = (now - prev_ts) / 60 if prev else elapsed_min
 
     # delta 계산 (이번 구간 변화량)
-    prev = _PIPELINE_PREV_SNAPSHOT or {}
+    prev = prev or {}
     def d(key):
         return c.get(key, 0) - prev.get(key, 0)
     def pct(num, denom):
@@ -2901,10 +3332,10 @@ def _pipeline_report(force=False):
     elif _succ == 0 and _raw > 0:
         # POST accounting 로 정확 표현 (오판 유발 방지)
         try:
-            _pe = _PIPELINE_COUNTERS.get("post_signal_enter", 0)
-            _pb = _PIPELINE_COUNTERS.get("post_signal_blocked", 0)
-            _pp = _PIPELINE_COUNTERS.get("post_signal_pass", 0)
-            _perr = _PIPELINE_COUNTERS.get("post_signal_error", 0)
+            _pe = c.get("post_signal_enter", 0)
+            _pb = c.get("post_signal_blocked", 0)
+            _pp = c.get("post_signal_pass", 0)
+            _perr = c.get("post_signal_error", 0)
             _pu = max(0, _pe - _pb - _pp - _perr)
             if _pu > 0:
                 _act.append(f"raw{_raw} POST미분류{_pu}")
@@ -3059,7 +3490,7 @@ def _pipeline_report(force=False):
                 _stage_rows.append(f"{_stage_short.get(_sn,_sn)}:{_s_p95:.0f}ms")
     # shadow VP 추적 수
     with _SHADOW_LOCK:
-        _shadow_active = len(_SHADOW_VIRTUAL_POSITIONS)
+        _shadow_active = _shadow_pos_count(_SHADOW_VP)
     # 1줄 debug 요약
     _dbg_parts = []
     if _scan_p95_s > 0:
@@ -3096,7 +3527,7 @@ def _pipeline_report(force=False):
         _pre_rows = []
         for _key, _label in [("pre_cut_spread", "sprd"), ("pre_cut_depth", "depth"),
                               ("pre_cut_sell_dominant", "sell"), ("pre_cut_coin_loss", "cd"),
-                              ("pre_cut_dead_market", "dead")]:
+                              ("pre_cut_dead_market", "dead"), ("pre_cut_screen", "scr")]:
             _v = c.get(_key, 0)
             if _v > 0:
                 _pre_rows.append(f"{_label}:{_v}")
@@ -3106,7 +3537,7 @@ def _pipeline_report(force=False):
     # ━━━━ compact 메시지 전송 (항상) ━━━━
     msg = "\n".join(lines)
     print(msg)
-    tg_send(msg)
+    tg_send(msg, priority=TG_PRIO_REPORT)
 
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     # RESEARCH 리포트 — 별도 메시지 (데이터 있을 때만)
@@ -3131,10 +3562,10 @@ def _pipeline_report(force=False):
             # POST_SIGNAL accounting 상태로 문구 분기 (오판 유발 방지)
             # unclassified > 0 이면 "gate탈락" 확정 아님, "POST 미분류" 로 표현
             try:
-                _post_enter = _PIPELINE_COUNTERS.get("post_signal_enter", 0)
-                _post_blocked = _PIPELINE_COUNTERS.get("post_signal_blocked", 0)
-                _post_pass = _PIPELINE_COUNTERS.get("post_signal_pass", 0)
-                _post_error = _PIPELINE_COUNTERS.get("post_signal_error", 0)
+                _post_enter = c.get("post_signal_enter", 0)
+                _post_blocked = c.get("post_signal_blocked", 0)
+                _post_pass = c.get("post_signal_pass", 0)
+                _post_error = c.get("post_signal_error", 0)
                 _post_unclass = max(0, _post_enter - _post_blocked - _post_pass - _post_error)
                 if _post_unclass > 0:
                     _rl.append(f"  ⚠ raw{_raw}건 POST 미분류 (unclassified={_post_unclass}) — gate 판독 불가")
@@ -3244,8 +3675,8 @@ def _pipeline_report(force=False):
         return f"{v/10000:,.0f}만" if v >= 10000 else f"{v:,.0f}"
     try:
         _ob_routes = {}
-        with _SHADOW_PERF_LOCK:
-            for _obk, _obs in _SHADOW_PERF_STATS.items():
+        with _shadow_view_lock():
+            for _obk, _obs in _shadow_perf_view().items():
                 _obr = _obs.get("route", "?")
                 if _obr not in (_PRODUCTION_ROUTES | _ACTIVE_RESEARCH):
                     continue
@@ -3336,8 +3767,29 @@ def _pipeline_report(force=False):
         _total = _h + _mi
         if _total > 0:
             _cc_parts.append(f"{_tf_key}:{_h/(_total)*100:.0f}%")
+    if c.get("candle_store_hit", 0) > 0:
+        _cc_parts.append(f"store:{c['candle_store_hit']}")
     if _cc_parts:
         _rl.append(f"🗂 cache: {' '.join(_cc_parts)}")
+    # 📡 스트림 응답 (네트워크 0회) 건수
+    _stream_parts = [f"{_sk}:{c.get(f'{_sk}_stream_hit', 0)}"
+                     for _sk in ("tick", "ob", "c1", "c5", "c15", "c60") if c.get(f"{_sk}_stream_hit", 0) > 0]
+    if _stream_parts or _MD_STREAM is not None:
+        _rl.append(f"📡 stream: {' '.join(_stream_parts) or '-'} | {_md_stream_status_str()}")
+    # 🛰️ 시세 허브 응답 (티커/오더북 REST 생략) 건수
+    if c.get("md_hub_hit", 0) > 0 or _MD_HUB is not None:
+        _rl.append(f"🛰️ hub: {c.get('md_hub_hit', 0)} | {_md_hub_status_str()}")
+    # ⏰ 봉 경계 프리페치 (캐시 hit 중 프리페치가 채운 항목 건수)
+    _pf_parts = [f"{_pk}:{c.get(f'{_pk}_prefetch_hit', 0)}"
+                 for _pk in ("c1", "c5", "c15", "c60") if c.get(f"{_pk}_prefetch_hit", 0) > 0]
+    if _pf_parts or _PREFETCHER is not None:
+        _rl.append(f"⏰ prefetch hit: {' '.join(_pf_parts) or '-'} | {_prefetch_status_str()}")
+    # 📈 증분 지표 상태 (memo=같은 봉 재사용 / step=진행봉 O(1) / rebuild=새 봉 prefix 재구성)
+    _ind_m = c.get("ind_state_memo", 0)
+    _ind_s = c.get("ind_state_step", 0)
+    _ind_r = c.get("ind_state_rebuild", 0)
+    if _ind_m + _ind_s + _ind_r > 0:
+        _rl.append(f"📈 ind: memo {_ind_m/(_ind_m+_ind_s+_ind_r)*100:.0f}% step={_ind_s} rebuild={_ind_r}")
 
     # tagged fetch breakdown (per-TF API call time)
     with _TAGGED_FETCH_LOCK:
@@ -3352,6 +3804,15 @@ def _pipeline_report(force=False):
                 _tf_parts.append(f"{_tfk}:{_avg_ms:.0f}ms/{_avg_calls:.1f}c")
     if _tf_parts:
         _rl.append(f"📡 fetch: {' '.join(_tf_parts)}")
+    # ⏳ 레이트리밋 대기 (stage/group별 — 히스토그램 구간 상한 근사, 평균 1ms 미만 생략)
+    _rlw_parts = []
+    for (_rlw_st, _rlw_gr), _rlw_h in sorted(_RATE_LIMITER.hist_snapshot().items()):
+        if _rlw_h["n"] >= 5 and _rlw_h["sum"] / _rlw_h["n"] >= 1:
+            _rlw_p50 = _RATE_LIMITER.hist_quantile(_rlw_h, 0.5)
+            _rlw_p95 = _RATE_LIMITER.hist_quantile(_rlw_h, 0.95)
+            _rlw_parts.append(f"{_rlw_st}/{_rlw_gr}:p50≤{_rlw_p50:.0f} p95≤{_rlw_p95:.0f}ms n{_rlw_h['n']}")
+    if _rlw_parts:
+        _rl.append(f"⏳ rl wait: {' '.join(_rlw_parts)}")
 
     # lazy-tick 적용 후 실측
     _lt_snap = list(_LAZY_TICK_HISTORY)
@@ -3375,12 +3836,23 @@ def _pipeline_report(force=False):
                 _di_parts.append(f"{_short}:avg{_ds_avg:.0f}/p95={_ds_p95:.0f}ms")
     if _di_parts:
         _rl.append(f"🔬 detect: {' '.join(_di_parts)}")
+    # 🧵 파이프라인 단계별 대기열 깊이 (사이클 최대 대기 마켓 수 avg/p95) + 예산 skip
+    _pq_parts = []
+    for _pqk in ("precheck", "data", "eval", "postcheck"):
+        _pq_list = stage_snapshot.get(f"pipe_q_{_pqk}", [])
+        if len(_pq_list) >= 3:
+            _pq_p95 = sorted(_pq_list)[min(int(len(_pq_list) * 0.95), len(_pq_list) - 1)]
+            _pq_parts.append(f"{_pqk}:avg{sum(_pq_list)/len(_pq_list):.1f}/p95={_pq_p95:.0f}")
+    if _pq_parts:
+        _rl.append(f"🧵 pipe q: {' '.join(_pq_parts)} | budget skip={c.get('pipe_budget_skip', 0)} "
+                   f"spent={c.get('pipe_budget_spent', 0)} timeout={c.get('pipe_timeout', 0)} "
+                   f"cancel={c.get('pipe_cancelled', 0)}")
 
     # pre-cut
     _pre_rows_full = []
     for _key, _label in [("pre_cut_spread", "sprd"), ("pre_cut_depth", "depth"),
                           ("pre_cut_sell_dominant", "sell"), ("pre_cut_coin_loss", "cd"),
-                          ("pre_cut_dead_market", "dead")]:
+                          ("pre_cut_dead_market", "dead"), ("pre_cut_screen", "scr")]:
         _v = c.get(_key, 0)
         if _v > 0:
             _pre_rows_full.append(f"{_label}:{_v}")
@@ -3434,11 +3906,12 @@ def _pipeline_report(force=False):
             _rl.insert(i, h)
         _research_msg = "\n".join(_rl)
         print(_research_msg)
-        tg_send(_research_msg)
+        tg_send(_research_msg, priority=TG_PRIO_REPORT)
 
     # 스냅샷 갱신 (다음 리포트의 delta 계산용)
-    _PIPELINE_PREV_SNAPSHOT = dict(c)
-    _PIPELINE_PREV_SNAPSHOT_TS = now
+    with _PIPELINE_PREV_LOCK:
+        _PIPELINE_PREV_SNAPSHOT = dict(c)
+        _PIPELINE_PREV_SNAPSHOT_TS = now
 
     # 📊 pipeline_gauge.csv 자동 기록
     try:
@@ -3446,9 +3919,9 @@ def _pipeline_report(force=False):
     except Exception:
         pass
 
-    # 섀도우 통계 저장 (누적 — 초기화하지 않음)
+    # 섀도우 통계 저장 (누적 — 초기화하지 않음, 📒 저널 모드는 압축 스레드에서)
     try:
-        _save_shadow_stats()
+        _save_shadow_stats(background=True)
     except Exception:
         pass
     _save_report_state()
@@ -3466,8 +3939,7 @@ def _pipeline_mini_report():
     if (now - _PIPELINE_MINI_LAST_TS) < _PIPELINE_MINI_INTERVAL:
         return
     _PIPELINE_MINI_LAST_TS = now
-    with _PIPELINE_COUNTERS_LOCK:
-        c = dict(_PIPELINE_COUNTERS)
+    c = _METRICS.snapshot()
     v4 = c.get("v4_called", 0)
     if v4 == 0:
         return  # 스캔 없으면 skip
@@ -3652,8 +4124,6 @@ def cleanup_stale_entry_locks(max_age_sec=300):
         print(f"[LOCK_CLEAN_ERR] {e}")
 
 
-from contextlib import contextmanager
-
 @contextmanager
 def entry_lock(market: str, ttl_sec: int = 300, reentrant: bool = False):
     """엔트리 락 컨텍스트 매니저 - 안전한 락 획득/해제
@@ -4268,48 +4738,341 @@ _load_signal_stats()
 # ============================================================
 # 💾 상태 영속화 (서버 재시작 시에도 TRADE_HISTORY, streak, 코인별 손실 누적 유지)
 # ============================================================
+# 📒 append-only 상태 저널 (WAL)
+# 기존: STATE_PERSIST_INTERVAL 마다 메인 루프에서 TRADE_HISTORY+포지션+streak+코인손실 전체 deepcopy → JSON 재작성,
+#       섀도우는 50건마다 _SHADOW_PERF_STATS(루트당 200개 배열) 전체 덤프.
+# 변경: 변경분만 바이너리 레코드로 append (수 μs) → 저널이 커지면 백그라운드 스레드가 기존 포맷 스냅샷으로 압축.
+#   레코드 = <payload 길이 u32><crc32 u32><seq u64> + JSON [kind, data]  (끝부분 잘린 레코드는 재생 시 버림)
+#   압축: 상태 락 안에서 스냅샷 bytes 캡처 + 저널 회전(.old) → 락 밖에서 .meta(스냅샷별 seq/crc) → 스냅샷 → .old 삭제
+#   재생: 스냅샷 crc 가 .meta 의 새 crc 와 같으면 그 seq 이후만, 아니면(압축 도중 종료) 이전 seq 이후 레코드 적용
+class StateJournal:
+    """append-only 바이너리 저널 + 스냅샷 압축 (스냅샷 파일 포맷은 호출자 소유)"""
+
+    _HDR = struct.Struct("<IIQ")
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        self.old_path = path + ".old"
+        self.meta_path = path + ".meta"
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.records = 0             # 현재 저널 파일 레코드 수 (압축 판정)
+        self.nbytes = 0
+        self._fp = None
+        self._base = {}              # 스냅샷 이름 -> 반영된 마지막 seq
+        self._loaded = None          # load() 결과 캐시 [(seq, kind, data)]
+        self._compacting = False
+        self.stats = {"appends": 0, "compactions": 0, "replayed": 0, "torn": 0, "errors": 0,
+                      "last_compact_ms": 0.0}
+
+    # ---- 읽기 ----
+    def _read_file(self, path):
+        """레코드 목록 + 마지막 정상 레코드 끝 오프셋 (잘린/손상 꼬리는 버림)"""
+        out, good = [], 0
+        try:
+            with open(path, "rb") as f:
+                buf = f.read()
+        except FileNotFoundError:
+            return out, 0
+        hs = self._HDR.size
+        pos = 0
+        while pos + hs <= len(buf):
+            ln, crc, seq = self._HDR.unpack_from(buf, pos)
+            body = buf[pos + hs:pos + hs + ln]
+            if len(body) < ln or zlib.crc32(body, zlib.crc32(struct.pack("<Q", seq))) != crc:
+                break
+            try:
+                kind, data = json.loads(body.decode("utf-8"))
+            except Exception:
+                break
+            out.append((seq, kind, data))
+            pos += hs + ln
+            good = pos
+        if good < len(buf):
+            self.stats["torn"] += 1
+            print(f"[JOURNAL] {self.name} {os.path.basename(path)} 손상/잘린 꼬리 {len(buf) - good}B 무시")
+        return out, good
+
+    def load(self, snapshots):
+        """snapshots: {이름: 스냅샷 경로} → 각 스냅샷 반영 seq 판정 + 저널 레코드 전체 (1회, 이후 캐시)"""
+        with self.lock:
+            if self._loaded is not None:
+                return self._loaded
+            meta = {}
+            try:
+                with open(self.meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f).get("files", {})
+            except Exception:
+                pass
+            for name, spath in snapshots.items():
+                ent = meta.get(name)
+                if not ent:
+                    self._base[name] = 0
+                    continue
+                try:
+                    with open(spath, "rb") as f:
+                        crc = zlib.crc32(f.read())
+                except FileNotFoundError:
+                    crc = None
+                self._base[name] = ent.get("seq", 0) if crc == ent.get("crc") else ent.get("prev_seq", 0)
+            old, _ = self._read_file(self.old_path)
+            cur, good = self._read_file(self.path)
+            if os.path.exists(self.path) and good < os.path.getsize(self.path):
+                with open(self.path, "r+b") as f:
+                    f.truncate(good)     # 이후 append 가 손상 꼬리 뒤에 붙지 않도록
+            recs = old + cur
+            self.seq = max([r[0] for r in recs] + [e.get("seq", 0) for e in meta.values()] + [0])
+            self.records = len(cur)
+            self.nbytes = good
+            self._loaded = recs
+            return recs
+
+    def base(self, name):
+        return self._base.get(name, 0)
+
+    def replay(self, name, kinds, apply):
+        """name 스냅샷 이후 레코드 중 kinds 만 apply(kind, data) — 반환: 적용 건수"""
+        recs = self._loaded or []
+        b = self.base(name)
+        n = 0
+        for seq, kind, data in recs:
+            if seq > b and kind in kinds:
+                apply(kind, data)
+                n += 1
+        self.stats["replayed"] += n
+        return n
+
+    # ---- 쓰기 ----
+    def append(self, kind, data):
+        body = json.dumps([kind, data], ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        with self.lock:
+            self.seq += 1
+            seq = self.seq
+            crc = zlib.crc32(body, zlib.crc32(struct.pack("<Q", seq)))
+            try:
+                if self._fp is None:
+                    self._fp = open(self.path, "ab")
+                self._fp.write(self._HDR.pack(len(body), crc, seq) + body)
+                self._fp.flush()
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[JOURNAL] {self.name} append 실패: {e}")
+                return seq
+            self.records += 1
+            self.nbytes += self._HDR.size + len(body)
+            self.stats["appends"] += 1
+        return seq
+
+    def needs_compact(self):
+        return (not self._compacting and
+                (self.records >= JOURNAL_COMPACT_RECORDS or self.nbytes >= JOURNAL_COMPACT_BYTES))
+
+    def rotate(self):
+        """현재 저널 → .old (호출자가 상태 락 보유 중 — 스냅샷 캡처와 같은 시점). 반환: 스냅샷 seq"""
+        with self.lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+            if os.path.exists(self.path):
+                if os.path.exists(self.old_path):
+                    # 이전 압축이 .old 삭제 전에 끊김 → 이어 붙여 순서 유지
+                    with open(self.path, "rb") as src, open(self.old_path, "ab") as dst:
+                        dst.write(src.read())
+                    os.remove(self.path)
+                else:
+                    os.replace(self.path, self.old_path)
+            self.records = 0
+            self.nbytes = 0
+            return self.seq
+
+    def _write_atomic(self, path, data):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def write_snapshot(self, seq, blobs):
+        """blobs: {이름: (경로, bytes)} → .meta → 스냅샷들 → .old 삭제"""
+        files = {name: {"seq": seq, "crc": zlib.crc32(data), "prev_seq": self._base.get(name, 0)}
+                 for name, (_, data) in blobs.items()}
+        self._write_atomic(self.meta_path, json.dumps({"files": files}).encode("utf-8"))
+        for name, (path, data) in blobs.items():
+            self._write_atomic(path, data)
+            self._base[name] = seq
+        try:
+            os.remove(self.old_path)
+        except FileNotFoundError:
+            pass
+
+    def compact(self, capture, background=True):
+        """capture() → (seq, blobs) : 상태 락 안에서 스냅샷 bytes 생성 + rotate() 호출.
+        background=True 면 캡처/파일 쓰기 모두 압축 스레드에서 (호출 스레드는 즉시 반환)"""
+        with self.lock:
+            if self._compacting:
+                return False
+            self._compacting = True
+
+        def _run():
+            t0 = time.time()
+            try:
+                seq, blobs = capture()
+                self.write_snapshot(seq, blobs)
+                self.stats["compactions"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[JOURNAL] {self.name} 압축 실패: {e}")
+            finally:
+                self.stats["last_compact_ms"] = (time.time() - t0) * 1000
+                self._compacting = False
+
+        if background:
+            threading.Thread(target=_run, daemon=True, name=f"{self.name}Compact").start()
+        else:
+            _run()
+        return True
+
+    def status_str(self):
+        s = self.stats
+        return (f"{self.name}(rec={self.records} {self.nbytes // 1024}KB seq={self.seq} "
+                f"compact={s['compactions']}/{s['last_compact_ms']:.0f}ms err={s['errors']})")
+
+
 _LAST_STATE_PERSIST_TS = 0
+_STATE_PERSIST_LOCK = threading.Lock()
+_STATE_MIRROR = None  # 📒 저널에 기록된 상태 (스냅샷 = 이 mirror 덤프 — 라이브 상태와 diff 해 변경분만 append)
+_STATE_JOURNAL_KINDS = ("trade", "closs", "streak", "pos", "pos_del")
+_STATE_JOURNAL = StateJournal(STATE_JOURNAL_PATH, "state_journal") if STATE_JOURNAL_ENABLED else None
+
+
+def _collect_bot_state():
+    """현재 봇 상태 → 영속화 dict (trade_history / coin_loss_history / streaks / open_positions)"""
+    # TRADE_HISTORY 수집
+    trade_hist = list(TRADE_HISTORY)
+
+    # 코인별 손실 기록 수집
+    with _COIN_LOSS_LOCK:
+        coin_loss = {m: list(v) for m, v in _COIN_LOSS_HISTORY.items()}
+
+    # streak 수집
+    with _STREAK_LOCK:
+        streaks = {"lose": _lose_streak, "win": _win_streak,
+                   "suspend_until": _ENTRY_SUSPEND_UNTIL,
+                   "strat_lose": dict(_STRAT_LOSE_STREAK),
+                   "strat_suspend": dict(_STRAT_SUSPEND_UNTIL)}
+
+    # OPEN_POSITIONS 수집 (재시작 시 유령포지션 복구용)
+    with _POSITION_LOCK:
+        positions = {}
+        for m, p in OPEN_POSITIONS.items():
+            if p.get("state") == "open":
+                positions[m] = {
+                    k: v for k, v in p.items()
+                    if isinstance(v, (str, int, float, bool, type(None)))
+                }
+
+    return {
+        "trade_history": trade_hist,
+        "coin_loss_history": coin_loss,
+        "streaks": streaks,
+        "open_positions": positions,
+    }
+
+
+def _state_mirror_empty():
+    return {"trade_history": [], "coin_loss_history": {}, "streaks": {}, "open_positions": {}}
+
+
+def _state_apply(mir, kind, data):
+    """저널 레코드 1건 → mirror 반영 (재생/append 공용 의미)"""
+    if kind == "trade":
+        mir["trade_history"].append(data)
+        del mir["trade_history"][:-TRADE_HISTORY.maxlen]
+    elif kind == "closs":
+        m, v = data
+        if v is None:
+            mir["coin_loss_history"].pop(m, None)
+        else:
+            mir["coin_loss_history"][m] = v
+    elif kind == "streak":
+        mir["streaks"] = data
+    elif kind == "pos":
+        m, chg, rm = data
+        p = mir["open_positions"].setdefault(m, {})
+        p.update(chg)
+        for k in rm:
+            p.pop(k, None)
+    elif kind == "pos_del":
+        mir["open_positions"].pop(data, None)
+
+
+def _state_journal_flush(state):
+    """라이브 상태 vs mirror diff → 변경분 레코드 append (전체 직렬화 없음)"""
+    global _STATE_MIRROR
+    j = _STATE_JOURNAL
+    with _STATE_PERSIST_LOCK:
+        if _STATE_MIRROR is None:
+            _STATE_MIRROR = _state_mirror_empty()
+        mir = _STATE_MIRROR
+        # 거래: 같은 dict 객체 공유 → id 로 신규분만
+        seen = {id(t) for t in mir["trade_history"]}
+        for t in state["trade_history"]:
+            if id(t) not in seen:
+                j.append("trade", t)
+                _state_apply(mir, "trade", t)
+        cl = mir["coin_loss_history"]
+        for m, v in state["coin_loss_history"].items():
+            if cl.get(m) != v:
+                j.append("closs", [m, v])
+                cl[m] = v
+        for m in [m for m in cl if m not in state["coin_loss_history"]]:
+            j.append("closs", [m, None])
+            del cl[m]
+        if state["streaks"] != mir["streaks"]:
+            j.append("streak", state["streaks"])
+            mir["streaks"] = state["streaks"]
+        ps = mir["open_positions"]
+        for m, p in state["open_positions"].items():
+            old = ps.get(m)
+            if old is None:
+                chg, rm = p, []
+            else:
+                chg = {k: v for k, v in p.items() if k not in old or old[k] != v}
+                rm = [k for k in old if k not in p]
+                if not chg and not rm:
+                    continue
+            j.append("pos", [m, chg, rm])
+            ps[m] = dict(p)
+        for m in [m for m in ps if m not in state["open_positions"]]:
+            j.append("pos_del", m)
+            del ps[m]
+
+
+def _state_capture():
+    """압축 스레드 — mirror 스냅샷 bytes + 저널 회전 (같은 락 안: 스냅샷 seq 정합)"""
+    with _STATE_PERSIST_LOCK:
+        mir = _STATE_MIRROR or _state_mirror_empty()
+        payload = json.dumps(dict(mir, saved_at=time.time()), ensure_ascii=False).encode("utf-8")
+        seq = _STATE_JOURNAL.rotate()
+    return seq, {"state": (STATE_PERSIST_PATH, payload)}
 
 
 def _save_bot_state(force=False):
-    """봇 상태를 JSON 파일에 저장 (주기적 호출, force=True면 쿨다운 무시)"""
+    """봇 상태 저장 (주기적 호출, force=True면 쿨다운 무시)
+    📒 저널 활성 시 변경분만 append, 저널이 커지면 백그라운드 스냅샷 압축"""
     global _LAST_STATE_PERSIST_TS
     now = time.time()
     if not force and now - _LAST_STATE_PERSIST_TS < STATE_PERSIST_INTERVAL:
         return
     _LAST_STATE_PERSIST_TS = now
     try:
-        # TRADE_HISTORY 수집
-        trade_hist = list(TRADE_HISTORY)
-
-        # 코인별 손실 기록 수집
-        with _COIN_LOSS_LOCK:
-            coin_loss = copy.deepcopy(_COIN_LOSS_HISTORY)
-
-        # streak 수집
-        with _STREAK_LOCK:
-            streaks = {"lose": _lose_streak, "win": _win_streak,
-                       "suspend_until": _ENTRY_SUSPEND_UNTIL,
-                       "strat_lose": dict(_STRAT_LOSE_STREAK),
-                       "strat_suspend": dict(_STRAT_SUSPEND_UNTIL)}
-
-        # OPEN_POSITIONS 수집 (재시작 시 유령포지션 복구용)
-        with _POSITION_LOCK:
-            positions = {}
-            for m, p in OPEN_POSITIONS.items():
-                if p.get("state") == "open":
-                    positions[m] = {
-                        k: v for k, v in p.items()
-                        if isinstance(v, (str, int, float, bool, type(None)))
-                    }
-
-        state = {
-            "saved_at": now,
-            "trade_history": trade_hist,
-            "coin_loss_history": coin_loss,
-            "streaks": streaks,
-            "open_positions": positions,
-        }
+        state = _collect_bot_state()
+        if _STATE_JOURNAL is not None:
+            _state_journal_flush(state)
+            if _STATE_JOURNAL.needs_compact():
+                _STATE_JOURNAL.compact(_state_capture)
+            return
+        state["saved_at"] = now
         tmp_path = STATE_PERSIST_PATH + ".tmp"
         with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(state, f, ensure_ascii=False)
@@ -4318,8 +5081,21 @@ def _save_bot_state(force=False):
         print(f"[STATE_PERSIST] 저장 실패: {e}")
 
 
+def _journal_status_str():
+    js = [j for j in (_STATE_JOURNAL, _SHADOW_JOURNAL) if j is not None]
+    if not js:
+        return "journal=disabled"
+    return " ".join(j.status_str() for j in js)
+
+
+_BOT_STARTED = False  # main() 에서 상태 로드 후 True — 임포트만 한 프로세스(리서치/테스트)는 종료 저장·저널 생성 안 함
+
+
 def _shutdown_save_all():
-    """종료 시 모든 통계 강제 저장 (데이터 유실 방지)"""
+    """종료 시 모든 통계 강제 저장 (데이터 유실 방지)
+    🔧 봇 시작(상태 로드) 전이면 건너뜀 — 빈 상태로 기존 파일을 덮어쓰거나 저널/스냅샷을 만들지 않도록"""
+    if not _BOT_STARTED:
+        return
     print("[SHUTDOWN] 종료 감지 — 통계 강제 저장 중...")
     try:
         _save_bot_state(force=True)
@@ -4355,18 +5131,37 @@ signal.signal(signal.SIGINT, _signal_handler)
 
 def _load_bot_state():
     """봇 시작 시 저장된 상태 복원"""
-    global _lose_streak, _win_streak, _ENTRY_SUSPEND_UNTIL
+    global _lose_streak, _win_streak, _ENTRY_SUSPEND_UNTIL, _STATE_MIRROR
     try:
-        if not os.path.exists(STATE_PERSIST_PATH):
+        recs = _STATE_JOURNAL.load({"state": STATE_PERSIST_PATH}) if _STATE_JOURNAL is not None else []
+        if not os.path.exists(STATE_PERSIST_PATH) and not recs:
             print("[STATE_PERSIST] 저장된 상태 없음 — 초기 상태로 시작")
             return
-        with open(STATE_PERSIST_PATH, "r", encoding="utf-8") as f:
-            state = json.load(f)
+        state = {}
+        if os.path.exists(STATE_PERSIST_PATH):
+            with open(STATE_PERSIST_PATH, "r", encoding="utf-8") as f:
+                state = json.load(f)
 
         saved_at = state.get("saved_at", 0)
         age_min = (time.time() - saved_at) / 60
         print(f"[STATE_PERSIST] 상태 파일 발견 (저장 시점: {age_min:.1f}분 전)")
 
+        # 📒 스냅샷 이후 저널 레코드 재생 → mirror (이후 변경분 diff 기준)
+        if _STATE_JOURNAL is not None:
+            mir = _state_mirror_empty()
+            for k in mir:
+                if state.get(k):
+                    mir[k] = state[k]
+            mir["open_positions"] = {m: dict(p) for m, p in mir["open_positions"].items()}
+            n = _STATE_JOURNAL.replay("state", _STATE_JOURNAL_KINDS, lambda k, d: _state_apply(mir, k, d))
+            with _STATE_PERSIST_LOCK:
+                _STATE_MIRROR = mir
+            state = dict(state, **mir)
+            state["open_positions"] = {m: dict(p) for m, p in mir["open_positions"].items()}
+            if n:
+                print(f"[STATE_PERSIST] 저널 재생: {n}건 (스냅샷 이후 변경분)")
+                _STATE_JOURNAL.compact(_state_capture)
+
         # TRADE_HISTORY 복원
         hist = state.get("trade_history", [])
         if hist:
@@ -4540,15 +5335,19 @@ def _make_auth_headers(query: dict = None):
 
 def upbit_private_get(path, params=None, timeout=7):
     """🔧 FIX C1: 429/500 재시도 추가 (최대 3회, 지수 백오프)"""
-    url = f"https://api.upbit.com{path}"
+    url = f"{UPBIT_REST_URL}{path}"
     _max_retries = 3
+    _group = _endpoint_group(url, "GET")
     for _attempt in range(_max_retries + 1):
         headers = _make_auth_headers(params or {})
-        _throttle()
+        _throttle(_group, priority=True)  # 주문/잔고 우선 레인
         try:
             with _SESSION_REFRESH_LOCK:
                 sess = SESSION  # 🔧 FIX: 락으로 보호 (세션 리프레시 레이스 방지)
             r = sess.get(url, headers=headers, params=params, timeout=timeout)
+            _RATE_LIMITER.note_remaining(_group, r.headers.get("Remaining-Req"))
+            if r.status_code == 429:
+                _RATE_LIMITER.on_429(_group)
             if r.status_code in (429, 500, 502, 503) and _attempt < _max_retries:
                 _wait = 0.5 * (2 ** _attempt)  # 0.5s, 1s, 2s
                 print(f"[API_RETRY] GET {path} → {r.status_code}, {_wait:.1f}초 후 재시도 ({_attempt+1}/{_max_retries})")
@@ -4568,18 +5367,22 @@ def upbit_private_get(path, params=None, timeout=7):
 
 def upbit_private_post(path, body=None, timeout=7):
     """🔧 FIX C1: 429/500 재시도 추가 (최대 3회, 지수 백오프) — 매도 실패 = 돈 잃음 방지"""
-    url = f"https://api.upbit.com{path}"
+    url = f"{UPBIT_REST_URL}{path}"
     body = body or {}
     _max_retries = 3
     # 🔧 FIX: 주문 POST는 500/502/503 재시도 금지 (멱등성 없음 → 중복 주문 위험)
     _is_order = (path == "/v1/orders")
+    _group = _endpoint_group(url, "POST")
     for _attempt in range(_max_retries + 1):
         headers = _make_auth_headers(body)
-        _throttle()
+        _throttle(_group, priority=True)  # 주문/잔고 우선 레인
         try:
             with _SESSION_REFRESH_LOCK:
                 sess = SESSION  # 🔧 FIX: 락으로 보호 (세션 리프레시 레이스 방지)
             r = sess.post(url, headers=headers, json=body, timeout=timeout)
+            _RATE_LIMITER.note_remaining(_group, r.headers.get("Remaining-Req"))
+            if r.status_code == 429:
+                _RATE_LIMITER.on_429(_group)
             # 429: 항상 재시도 (rate limit = 미처리 보장)
             # 500/502/503: 주문이면 재시도 금지 (이미 처리됐을 수 있음)
             _retry_codes = (429,) if _is_order else (429, 500, 502, 503)
@@ -4589,7 +5392,14 @@ def upbit_private_post(path, body=None, timeout=7):
                 time.sleep(_wait)
                 continue
             r.raise_for_status()
-            return r.json()
+            res = r.json()
+            if _is_order and isinstance(res, dict) and res.get("uuid"):
+                # 📬 응답 즉시 체결 추적 등록 (스트림 done 이 대기 시작 전에 와도 보관)
+                try:
+                    order_future(res["uuid"], res.get("market") or body.get("market"))
+                except Exception as _oe:
+                    print(f"[ORDER_STREAM] 추적 등록 실패: {_oe}")
+            return res
         except (requests.exceptions.ConnectionError, requests.exceptions.HTTPError, ValueError) as e:
             # 🔧 FIX: HTTPError 추가 (400/401/403 등에서 크래시 방지)
             if _attempt < _max_retries:
@@ -4600,12 +5410,342 @@ def upbit_private_post(path, body=None, timeout=7):
             raise
 
 
+# =========================
+# 📬 주문 실행 엔진 (private 스트림 체결 추적 + REST 폴백)
+# =========================
+# 기존: 주문 후 get_order_result 가 0.25초마다 /v1/order 폴링, 청산 판정은 /v1/accounts 재조회(retries=2)
+#   → 진입/청산 순간에 private API 예산을 가장 많이 씀 (hybrid_buy 0.3초 폴링 + 매도 후 잔고 확인 반복).
+# 변경: myOrder/myAsset private 스트림 1개 유지
+#   - POST /v1/orders 응답 uuid 를 Future 로 등록 → 스트림 done/cancel 수신 즉시 완료 + 콜백
+#   - 대기 중 ORDER_REST_POLL_SEC(끊김 시 FAST) 간격 /v1/order 조회 병행 (메시지 유실/재연결 구간 대비)
+#   - 잔고: 최초 1회 /v1/accounts 시드 후 myAsset 으로 갱신. 해당 마켓 주문 이벤트가 잔고 갱신보다
+#     새로우면(자산 반영 전) None → 호출자가 REST 조회 (매도 직후 잔고 오판 방지)
+# 결과 dict 는 REST /v1/order 형태 (state/executed_volume/avg_price/paid_fee/trades) — 호출부 파싱 그대로.
+_ORDER_TERMINAL = ("done", "cancel")
+
+
+def _order_from_stream(d, trades):
+    """myOrder 메시지 → REST /v1/order 형태 dict (state 'trade' 는 미완료 'wait' 로 취급)"""
+    state = d.get("state")
+    return {
+        "uuid": d.get("uuid"),
+        "market": d.get("code"),
+        "side": "bid" if d.get("ask_bid") == "BID" else "ask",
+        "ord_type": d.get("order_type"),
+        "state": "wait" if state == "trade" else state,
+        "price": str(d.get("price") or 0),
+        "avg_price": str(d.get("avg_price") or 0),
+        "volume": str(d.get("volume") or 0),
+        "remaining_volume": str(d.get("remaining_volume") or 0),
+        "executed_volume": str(d.get("executed_volume") or 0),
+        "executed_funds": str(d.get("executed_funds") or 0),
+        "paid_fee": str(d.get("paid_fee") or 0),
+        "trades_count": d.get("trades_count", len(trades)),
+        "trades": list(trades),
+    }
+
+
+class OrderExecutionEngine:
+    """private myOrder/myAsset 스트림 — 주문 체결 Future/콜백 + 잔고 캐시 (None = REST 폴백)"""
+
+    def __init__(self, url):
+        self.url = url
+        self.lock = threading.Lock()
+        self._orders = OrderedDict()   # uuid -> 최신 주문 dict (등록 전 도착한 이벤트도 보관)
+        self._trades = {}              # uuid -> 스트림 체결 목록 (REST trades 형태)
+        self._futures = {}             # uuid -> (Future, 등록 시각)
+        self._order_evt_ts = {}        # market -> 마지막 주문 제출/이벤트 시각
+        self._assets = {}              # currency -> (balance, locked, 갱신 시각)
+        self._assets_seed_ts = 0.0     # /v1/accounts 시드 시각 (0 = 미시드 — 재연결 시 리셋)
+        self.connected = False
+        self.connected_ts = 0.0
+        self.stats = {"orders": 0, "assets": 0, "stream_fills": 0, "rest_fills": 0, "rest_polls": 0,
+                      "bal_hits": 0, "bal_miss": 0, "reconnects": 0, "errors": 0}
+        self._ws = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    # ---- 연결 관리 ----
+    def start(self):
+        with self.lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True, name="OrderStream")
+            self._thread.start()
+        print(f"[ORDER_STREAM] 시작: {self.url}")
+
+    def stop(self):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def is_live(self):
+        # private 스트림은 이벤트가 없으면 조용함 → 수신 시각이 아닌 연결 상태로 판정 (ping 으로 유지)
+        return self.connected
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                auth = _make_auth_headers()["Authorization"]   # nonce 1회용 → 연결마다 재발급
+                self._ws = websocket.WebSocketApp(
+                    self.url,
+                    header=[f"Authorization: {auth}"],
+                    on_open=self._on_open,
+                    on_message=self._on_message,
+                    on_error=self._on_error,
+                    on_close=self._on_close,
+                )
+                self._ws.run_forever(ping_interval=30, ping_timeout=10)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[ORDER_STREAM_ERR] {e}")
+            self.connected = False
+            if self._stop.is_set():
+                break
+            self.stats["reconnects"] += 1
+            time.sleep(ORDER_STREAM_RECONNECT_SEC)
+
+    def _on_open(self, ws):
+        with self.lock:
+            # 끊긴 구간 자산 변동 누락 → 다음 잔고 조회 시 REST 재시드
+            self._assets.clear()
+            self._assets_seed_ts = 0.0
+        ws.send(json.dumps([
+            {"ticket": f"bot-priv-{uuid.uuid4().hex[:12]}"},
+            {"type": "myOrder"},
+            {"type": "myAsset"},
+            {"format": "DEFAULT"},
+        ]))
+        self.connected = True
+        self.connected_ts = time.time()
+        print("[ORDER_STREAM] 연결됨 (myOrder/myAsset 구독)")
+
+    def _on_error(self, ws, err):
+        self.stats["errors"] += 1
+        print(f"[ORDER_STREAM_ERR] {err}")
+
+    def _on_close(self, ws, *args):
+        self.connected = False
+
+    def _on_message(self, ws, message):
+        try:
+            if isinstance(message, bytes):
+                message = message.decode("utf-8")
+            d = json.loads(message)
+        except Exception:
+            self.stats["errors"] += 1
+            return
+        typ = d.get("type") or d.get("ty")
+        if typ == "myOrder":
+            self._on_order(d)
+        elif typ == "myAsset":
+            self._on_asset(d)
+
+    # ---- 메시지 처리 ----
+    def _on_order(self, d):
+        u = d.get("uuid")
+        if not u:
+            return
+        now = time.time()
+        state = d.get("state")
+        self.stats["orders"] += 1
+        with self.lock:
+            m = d.get("code")
+            if m:
+                self._order_evt_ts[m] = now
+            trades = self._trades.setdefault(u, [])
+            if state == "trade":
+                # state=trade 메시지의 price/volume 은 해당 체결분 (주문 가격/수량 아님)
+                _p = float(d.get("price") or 0)
+                _v = float(d.get("volume") or 0)
+                trades.append({"market": m, "uuid": d.get("trade_uuid"), "side": "bid" if d.get("ask_bid") == "BID" else "ask",
+                               "price": str(_p), "volume": str(_v), "funds": str(_p * _v),
+                               "created_at": d.get("trade_timestamp")})
+            od = _order_from_stream(d, trades)
+            if state in _ORDER_TERMINAL:
+                # 구독 전 체결분이 빠졌으면 trades 비움 → 호출부가 executed_volume/avg_price 로 계산
+                _tv = sum(float(t["volume"]) for t in trades)
+                _ev = float(od["executed_volume"])
+                if abs(_tv - _ev) > max(1e-8, _ev * 1e-6):
+                    od["trades"] = []
+                self._trades.pop(u, None)
+            self._remember(u, od)
+        if state in _ORDER_TERMINAL:
+            self._resolve(u, od, "stream_fills")
+
+    def _on_asset(self, d):
+        now = time.time()
+        self.stats["assets"] += 1
+        with self.lock:
+            for a in d.get("assets") or []:
+                cur = a.get("currency")
+                if cur:
+                    self._assets[cur] = (float(a.get("balance") or 0), float(a.get("locked") or 0), now)
+
+    def _remember(self, u, od):
+        # lock 보유 상태에서 호출
+        self._orders[u] = od
+        self._orders.move_to_end(u)
+        while len(self._orders) > ORDER_TRACK_MAX:
+            old, _ = self._orders.popitem(last=False)
+            self._trades.pop(old, None)
+
+    def _resolve(self, u, od, stat_key):
+        with self.lock:
+            ent = self._futures.pop(u, None)
+            if ent is not None:
+                self.stats[stat_key] += 1
+        if ent is not None and not ent[0].done():
+            ent[0].set_result(od)
+
+    # ---- 주문 추적 ----
+    def track(self, u, market=None, on_done=None):
+        """주문 uuid → Future (완료 시 REST /v1/order 형태 dict). on_done(od) 은 완료 스레드에서 호출"""
+        self.start()
+        now = time.time()
+        stale = []
+        with self.lock:
+            if market:
+                self._order_evt_ts[market] = now   # 잔고 캐시: 이 시점 이후 myAsset 반영 전까지 REST
+            ent = self._futures.get(u)
+            if ent is None:
+                ent = self._futures[u] = (Future(), now)
+            for k, (f, ts) in list(self._futures.items()):
+                if now - ts > ORDER_TRACK_TTL_SEC:
+                    stale.append(self._futures.pop(k)[0])
+            known = self._orders.get(u)
+        for f in stale:
+            f.cancel()
+        fut = ent[0]
+        if on_done is not None:
+            def _cb(f):
+                if f.cancelled():
+                    return
+                try:
+                    on_done(f.result())
+                except Exception as e:
+                    print(f"[ORDER_STREAM] {u} 완료 콜백 오류: {e}")
+            fut.add_done_callback(_cb)
+        if known is not None and known.get("state") in _ORDER_TERMINAL:
+            self._resolve(u, known, "stream_fills")  # 등록 전에 스트림이 먼저 끝난 주문
+        return fut
+
+    def wait(self, u, timeout_sec):
+        """done/cancel 까지 대기 → 주문 dict (timeout 시 마지막으로 본 상태, 없으면 None)"""
+        fut = self.track(u)
+        deadline = time.time() + timeout_sec
+        next_poll = time.time() + (ORDER_REST_POLL_SEC if self.is_live() else 0.0)
+        last = None
+        while True:
+            now = time.time()
+            if now >= deadline:
+                break
+            try:
+                return fut.result(timeout=max(0.0, min(deadline, next_poll) - now))
+            except FutureTimeout:
+                pass
+            except CancelledError:
+                break
+            if time.time() < next_poll:
+                continue
+            self.stats["rest_polls"] += 1
+            try:
+                od = upbit_private_get("/v1/order", {"uuid": u})
+                last = od
+                if od and od.get("state") in _ORDER_TERMINAL:
+                    with self.lock:
+                        self._remember(u, od)
+                    self._resolve(u, od, "rest_fills")
+                    return od
+            except Exception:
+                last = None
+            next_poll = time.time() + (ORDER_REST_POLL_SEC if self.is_live() else ORDER_REST_POLL_FAST_SEC)
+        if fut.done() and not fut.cancelled():
+            return fut.result()
+        with self.lock:
+            return self._orders.get(u) or last
+
+    # ---- 잔고 ----
+    def balance(self, market):
+        """(balance, locked) or None (스트림 다운/미시드 실패/자산 반영 전 → REST 폴백)"""
+        if not self.is_live():
+            return None
+        cur = market.replace("KRW-", "")
+        with self.lock:
+            seeded = self._assets_seed_ts
+        if not seeded:
+            seed_ts = time.time()
+            accounts = get_account_info()
+            if not accounts:
+                return None
+            with self.lock:
+                for a in accounts:
+                    c = a.get("currency")
+                    if c and self._assets.get(c, (0, 0, 0.0))[2] < seed_ts:  # 시드 중 도착한 myAsset 우선
+                        self._assets[c] = (float(a.get("balance") or 0), float(a.get("locked") or 0), seed_ts)
+                self._assets_seed_ts = seed_ts
+        with self.lock:
+            evt = self._order_evt_ts.get(market, 0.0)
+            a = self._assets.get(cur)
+            if a is None:
+                ok = self._assets_seed_ts >= evt          # 목록에 없음 = 진짜 0 (시드 이후 주문 없을 때만)
+                res = (0.0, 0.0) if ok else None
+            else:
+                res = (a[0], a[1]) if a[2] >= evt else None
+            self.stats["bal_hits" if res is not None else "bal_miss"] += 1
+        return res
+
+    def status_str(self):
+        with self.lock:
+            s = dict(self.stats)
+            n = len(self._futures)
+        return (f"order_stream={'live' if self.is_live() else 'down'} pending={n} "
+                f"fills(stream/rest)={s['stream_fills']}/{s['rest_fills']} polls={s['rest_polls']} "
+                f"bal(hit/miss)={s['bal_hits']}/{s['bal_miss']} reconn={s['reconnects']}")
+
+
+_ORDER_ENGINE = OrderExecutionEngine(ORDER_STREAM_URL) if ORDER_STREAM_ENABLED else None
+
+
+def _order_engine():
+    """사용 가능한 주문 엔진 (비활성/websocket-client 미설치 시 None → 기존 REST 경로)"""
+    if _ORDER_ENGINE is None or websocket is None:
+        return None
+    return _ORDER_ENGINE
+
+
+def order_future(uuid_str, market=None, on_done=None):
+    """주문 체결 Future (엔진 비활성 시 None). 완료 값은 REST /v1/order 형태 dict"""
+    eng = _order_engine()
+    return eng.track(uuid_str, market, on_done) if eng else None
+
+
+def _order_engine_balance(market):
+    eng = _order_engine()
+    return eng.balance(market) if eng else None
+
+
+def _order_engine_status_str():
+    eng = _order_engine()
+    if eng is None:
+        return "order_stream=disabled"
+    return eng.status_str()
+
+
 def get_order_result(uuid_str, timeout_sec=10.0):
     """
     주문 uuid 로 최종 체결 결과 조회
     - done / cancel 상태가 되거나 timeout 될 때까지 polling
     🔧 FIX: wait에서 종료하면 체결 전에 끊김 → done/cancel만 종료
+    📬 주문 엔진 활성 시 private 스트림 체결 이벤트 대기 (REST 는 안전 조회만)
     """
+    eng = _order_engine()
+    if eng is not None:
+        return eng.wait(uuid_str, timeout_sec)
     deadline = time.time() + timeout_sec
     last = None
     while time.time() < deadline:
@@ -4677,16 +5817,20 @@ def place_market_buy(market, krw_amount):
 
 def upbit_private_delete(path, params=None, timeout=7):
     """업비트 DELETE API (주문 취소용) — 재시도 포함"""
-    url = f"https://api.upbit.com{path}"
+    url = f"{UPBIT_REST_URL}{path}"
     params = params or {}
     _max_retries = 3
+    _group = _endpoint_group(url, "DELETE")
     for _attempt in range(_max_retries + 1):
         headers = _make_auth_headers(params)
-        _throttle()
+        _throttle(_group, priority=True)  # 주문/잔고 우선 레인
         try:
             with _SESSION_REFRESH_LOCK:
                 sess = SESSION  # 🔧 FIX: 락으로 보호 (세션 리프레시 레이스 방지)
             r = sess.delete(url, headers=headers, params=params, timeout=timeout)
+            _RATE_LIMITER.note_remaining(_group, r.headers.get("Remaining-Req"))
+            if r.status_code == 429:
+                _RATE_LIMITER.on_429(_group)
             if r.status_code in (429, 500, 502, 503) and _attempt < _max_retries:
                 _wait = 0.5 * (2 ** _attempt)
                 print(f"[API_RETRY] DELETE {path} → {r.status_code}, {_wait:.1f}초 후 재시도 ({_attempt+1}/{_max_retries})")
@@ -4783,48 +5927,39 @@ def hybrid_buy(market, krw_amount, ob_data=None, timeout_sec=1.2):
         print(f"[HYBRID] {market} 지정가 예외: {e} → 시장가 폴백")
         return place_market_buy(market, krw_amount)
 
-    deadline = time.time() + timeout_sec
-    od = None
-    while time.time() < deadline:
-        time.sleep(0.3)
+    # 📬 체결 대기: 주문 엔진 활성 시 스트림 done 이벤트 즉시 반환 (기존 0.3초 /v1/order 폴링)
+    od = get_order_result(order_uuid, timeout_sec=timeout_sec)
+    if od and od.get("state", "") == "done":
+        print(f"[HYBRID] {market} 지정가 전량체결!")
+        # 실체결 audit log: ENTRY_FILLED 이벤트 append (조언자 스펙)
         try:
-            od = upbit_private_get("/v1/order", {"uuid": order_uuid})
-            state = od.get("state", "")
-            if state == "done":
-                print(f"[HYBRID] {market} 지정가 전량체결!")
-                # 실체결 audit log: ENTRY_FILLED 이벤트 append (조언자 스펙)
-                try:
-                    _executed_vol = float(od.get("executed_volume", 0) or 0)
-                    _executed_funds = float(od.get("executed_funds", 0) or 0)
-                    _paid_fee = float(od.get("paid_fee", 0) or 0)
-                    _avg_fill_price = (_executed_funds / _executed_vol) if _executed_vol > 0 else float(ask1_price)
-                    _live_trade_log_entry(
-                        market=market,
-                        order_price=float(ask1_price),
-                        filled_price=_avg_fill_price,
-                        filled_volume=_executed_vol,
-                        signal_price=float(ask1_price),
-                        entry_order_uuid=order_uuid,
-                        entry_fee_krw=round(_paid_fee, 4) if _paid_fee else None,
-                        route=None,  # 상위 caller가 알고 있음 (별도 개선 필요)
-                        risk_calc_krw=None,  # 상위에서 SIZE_BUMP 로직에 있음
-                        max_seed_krw=None,
-                    )
-                except Exception as _ltl_err:
-                    print(f"[LIVE_TRADE_LOG] entry hook 실패 {market}: {_ltl_err}")
-                return limit_res
-            if state == "cancel":
-                break
-        except Exception as _poll_e:
-            print(f"[HYBRID] {market} 주문조회 실패: {_poll_e}")
+            _executed_vol = float(od.get("executed_volume", 0) or 0)
+            _executed_funds = float(od.get("executed_funds", 0) or 0)
+            _paid_fee = float(od.get("paid_fee", 0) or 0)
+            _avg_fill_price = (_executed_funds / _executed_vol) if _executed_vol > 0 else float(ask1_price)
+            _live_trade_log_entry(
+                market=market,
+                order_price=float(ask1_price),
+                filled_price=_avg_fill_price,
+                filled_volume=_executed_vol,
+                signal_price=float(ask1_price),
+                entry_order_uuid=order_uuid,
+                entry_fee_krw=round(_paid_fee, 4) if _paid_fee else None,
+                route=None,  # 상위 caller가 알고 있음 (별도 개선 필요)
+                risk_calc_krw=None,  # 상위에서 SIZE_BUMP 로직에 있음
+                max_seed_krw=None,
+            )
+        except Exception as _ltl_err:
+            print(f"[LIVE_TRADE_LOG] entry hook 실패 {market}: {_ltl_err}")
+        return limit_res
 
     cancel_order(order_uuid)  # 🔧 FIX: 취소 먼저 → 체결량 확정 후 잔여 계산 (레이스 방지)
 
     # 🔧 FIX: 취소 후 최종 체결량 재조회 (취소 전 od는 stale → 과잉매수 위험)
     executed_vol = 0.0
     try:
-        # 🔧 FIX: upbit_private_get 직접 호출 (get_order 미존재 NameError 수정)
-        od_final = upbit_private_get("/v1/order", {"uuid": order_uuid})
+        # 📬 취소 확정(cancel/done)까지 대기 후 체결량 — 취소 직후 REST 조회는 wait 상태일 수 있음
+        od_final = get_order_result(order_uuid, timeout_sec=2.0)
         if od_final:
             executed_vol = float(od_final.get("executed_volume") or "0")
         elif od:
@@ -4915,6 +6050,9 @@ def place_market_sell(market, volume, price_hint=None):
 
 def get_actual_balance(market):
     """실제 매도 가능량 조회 (balance만, locked 제외)"""
+    _bl = _order_engine_balance(market)  # 📬 myAsset 캐시 (반영 전/스트림 다운 시 None → REST)
+    if _bl is not None:
+        return _bl[0]
     try:
         currency = market.replace("KRW-", "")
         accounts = get_account_info()
@@ -4933,6 +6071,9 @@ def get_balance_with_locked(market, retries=2):
     🔧 FIX: API 오류 시 재시도 (단발 조회로 0 오판 → 유령 오탐 방지)
     - retries: 재시도 횟수 (기본 2회 = 총 3회 시도)
     """
+    _bl = _order_engine_balance(market)  # 📬 myAsset 캐시 (반영 전/스트림 다운 시 None → REST)
+    if _bl is not None:
+        return _bl[0] + _bl[1]
     currency = market.replace("KRW-", "")
     last_err = None
     for attempt in range(retries + 1):
@@ -5654,10 +6795,9 @@ def open_auto_position(m, pre, dyn_stop, eff_sl_pct):
                 _sve2_ind["entry_spread_pct"] = round((_hi - _lo) / _cl * 100, 4)
         _sve2_c5 = _get_c5_cached(m, 50)
         if _sve2_c5 and len(_sve2_c5) >= 35:
-            _sve2_closes5 = [c["trade_price"] for c in _sve2_c5]
-            _, _, _sve2_hist = _v4_macd(_sve2_closes5)
-            if _sve2_hist is not None and _sve2_closes5[-1] > 0:
-                _sve2_ind["macd_hist_5m_bps"] = round(_sve2_hist / _sve2_closes5[-1] * 10000, 2)
+            _, _, _sve2_hist = _v4_macd_from_candles(_sve2_c5)
+            if _sve2_hist is not None and _sve2_c5[-1]["trade_price"] > 0:
+                _sve2_ind["macd_hist_5m_bps"] = round(_sve2_hist / _sve2_c5[-1]["trade_price"] * 10000, 2)
         _s2_score, _s2_decision, _s2_thr, _s2_feat = _sve2_compute_score(_sve2_ind)
         _pipeline_inc(f"sve2_{_s2_decision.lower()}")
         if _s2_decision == "SKIP":
@@ -5903,9 +7043,10 @@ def open_auto_position(m, pre, dyn_stop, eff_sl_pct):
         # 🔧 체결충격(impact) 기반 사이징 댐퍼
         # 상위 3호가 합계의 15% 초과 사용 시 과도 → 캡 (슬리피지 방지)
         try:
-            units = pre.get("ob", {}).get("raw", {}).get("orderbook_units", [])[:3]
-            top3_ask_krw = sum(float(u["ask_price"]) * float(u["ask_size"]) for u in units)
+            _ob_ana = _ob_analytics(pre.get("ob") or {})
+            top3_ask_krw = float(_ob_ana.top_krw(3, "buy"))
         except Exception:
+            _ob_ana = None
             top3_ask_krw = 0.0
 
         if top3_ask_krw > 0:
@@ -5932,9 +7073,8 @@ def open_auto_position(m, pre, dyn_stop, eff_sl_pct):
 
         # 유동성 기반 시드 캡 (호가 0.15% 밀림 이내 최대 금액)
         try:
-            _liq_units = pre.get("ob", {}).get("raw", {}).get("orderbook_units", [])
-            if _liq_units:
-                _liq_cap = _calc_liq_cap(_liq_units, max_slip_pct=0.15)
+            if _ob_ana is not None and _ob_ana.mid > 0:
+                _liq_cap = _ob_ana.size_at_slip(0.15, "buy")
                 if 0 < _liq_cap < krw_to_use:
                     print(f"[LIQ_CAP] {m} 유동성한도 {_liq_cap:,}원 (0.15%이내) < 주문 {krw_to_use:,}원 → 캡")
                     krw_to_use = _liq_cap
@@ -6221,7 +7361,8 @@ def open_auto_position(m, pre, dyn_stop, eff_sl_pct):
                 _log_exec_quality(m, _eq_route, True,
                                   signal_price, _eq_units,
                                   fill_price=avg_price, fill_slip_pct=slip_pct,
-                                  fill_delay_ms=_eq_delay, seed_krw=krw_to_use)
+                                  fill_delay_ms=_eq_delay, seed_krw=krw_to_use,
+                                  ob_analytics=_ob_analytics(_eq_ob))
         except Exception:
             pass
 
@@ -6286,7 +7427,8 @@ def open_auto_position(m, pre, dyn_stop, eff_sl_pct):
                 f"• 주문: {krw_to_use:,.0f}원 ({actual_pct:.1f}%) | 수량: {volume_filled:.6f}\n"
                 f"• 손절: {safe_stop_str}원 (SL {eff_sl_pct*100:.2f}%){_vwap_gap_str}\n"
                 f"• 신선도: tick {_entry_tick_age_sec:.1f}s | c1봉 {_entry_c1_candle_age_sec:.0f}s | 캐시 {_entry_c1_cache_age:.1f}s\n"
-                f"{link_for(m)}"
+                f"{link_for(m)}",
+                priority=TG_PRIO_TRADE
             )
 
         # 🔧 FIX: 최근 매수 시간 기록 + 유령감지 방지 (레이스컨디션 대비)
@@ -6595,7 +7737,8 @@ def add_auto_position(m, cur_price, reason=""):
         f"• 기존평단: {fmt6(entry_price_old)}원 → 신규평단: {fmt6(new_entry_price)}원\n"
         f"• 추가 체결가: {fmt6(avg_price_add)}원 (평단대비 {gain_from_old:+.2f}%)\n"
         f"• 추가 수량: {volume_filled:.6f} / 총 수량: {new_vol:.6f}\n"
-        f"{link_for(m)}"
+        f"{link_for(m)}",
+        priority=TG_PRIO_TRADE
     )
 
     return True, new_entry_price
@@ -6603,6 +7746,117 @@ def add_auto_position(m, cur_price, reason=""):
 # =========================
 # 🔥 자동 청산
 # =========================
+def _close_unfilled_gen(m, pos, reason, order_uuid, entry_price, cur_price, ret_pct):
+    """
+    청산 매도 미체결 → 잔고+locked=0 재확인 (지연 체결 대응)
+    - 30초 (15회 x 2초) 재확인 후 청산 락 해제, 이후 4분 후속 감시
+    - ⚡ 대기는 yield 2.0 (ExitEngine 타이머) — 워커 점유 없음
+    """
+    exit_price_used = cur_price
+    try:
+        # 🔧 PATCH: 최대 30초까지 잔고+locked=0 재확인 (지연 체결 대비)
+        for _retry in range(15):  # 15회 x 2초 = 30초
+            yield 2.0
+            actual_after = get_balance_with_locked(m)  # 🔧 locked 포함
+            if actual_after < 0:
+                continue  # 🔧 FIX: API 실패(-1)를 잔고 0으로 오판 방지
+            if actual_after <= 1e-12:
+                # 실잔고+locked 0 = 체결된 것으로 간주
+                with _POSITION_LOCK:
+                    OPEN_POSITIONS.pop(m, None)
+
+                # 🔧 FIX: 지연청산 시 실제 체결가 조회 시도 (학습 데이터 정확도 개선)
+                if order_uuid:
+                    try:
+                        od_delayed = get_order_result(order_uuid, timeout_sec=8.0)
+                        if od_delayed:
+                            delayed_avg = float(od_delayed.get("avg_price") or "0")
+                            if delayed_avg > 0:
+                                exit_price_used = delayed_avg
+                                ret_pct = (exit_price_used / entry_price - 1.0) * 100.0 if entry_price > 0 else 0.0
+                                print(f"[DELAYED] {m} 실제 체결가 조회 성공: {delayed_avg:.0f}원 → ret={ret_pct:+.2f}%")
+                    except Exception as _delayed_err:
+                        print(f"[DELAYED_PRICE_ERR] {m} 체결가 조회 실패 (추정값 사용): {_delayed_err}")
+
+                tg_send(f"🧹 <b>자동청산 완료(지연확인)</b> {m}\n• 주문응답 지연으로 잔고=0 확인 후 완료 처리\n• 사유: {reason}", priority=TG_PRIO_TRADE)
+                # 🔧 FIX: 지연청산에서도 record_trade 기록 (승률 기반 리스크 조정에 필수)
+                # 🔧 FIX: 수수료 반영한 순수익률 사용
+                net_ret_delayed = ret_pct - (FEE_RATE_ROUNDTRIP * 100.0)
+                try:
+                    record_trade(m, net_ret_delayed / 100.0, pos.get("signal_type", "기본"), signal_tag=pos.get("signal_tag", "기본"), predicted_group=pos.get("predicted_group"))  # 🔧 수수료 반영
+                except Exception as _e:
+                    print("[DELAYED_TRADE_RECORD_ERR]", _e)
+                # 🔧 FIX: AUTO_LEARN_ENABLED 무관하게 항상 호출 (배치 리포트 카운터)
+                try:
+                    hold_sec = time.time() - pos.get("entry_ts", time.time())
+                    mfe = pos.get("mfe_pct", 0.0)
+                    mae = pos.get("mae_pct", 0.0)
+                    update_trade_result(m, exit_price_used, net_ret_delayed/100.0 if entry_price else 0, hold_sec,
+                                        added=pos.get('added', False), exit_reason=reason,
+                                        mfe_pct=mfe, mae_pct=mae,
+                                        entry_ts=pos.get("entry_ts"),
+                                        pos_snapshot=dict(pos))
+                except Exception as _e:
+                    print("[DELAYED_CLOSE_LOG_ERR]", _e)
+                return True
+    finally:
+        # 🔧 FIX: 중복 청산 방지 락 해제 (close_auto_position 에서 넘겨받음)
+        with _POSITION_LOCK:
+            _CLOSING_MARKETS.discard(m)
+
+    # 30초 후에도 잔고 있으면 → 후속 감시
+    print(f"[AUTO] {m} 청산 미체결 → 후속 감시 시작")
+    tg_send(f"⚠️ <b>자동청산 미체결</b> {m}\n사유: 체결 지연 / 후속 감시 진행")
+    try:
+        _fup_exit_price = cur_price  # 🔧 FIX: 초기값은 주문 직전 cur_price
+        for _ in range(120):  # 추가 4분 감시 (120회 x 2초)
+            yield 2.0
+            _fup_bal = get_balance_with_locked(m)  # 🔧 locked 포함
+            if _fup_bal < 0:
+                continue  # 🔧 FIX: API 실패(-1)를 잔고 0으로 오판 방지
+            if _fup_bal <= 1e-12:
+                # 🔧 FIX: 실제 체결가 조회 (stale cur_price 사용 방지)
+                if order_uuid:
+                    try:
+                        _od_fup = get_order_result(order_uuid, timeout_sec=5.0)
+                        if _od_fup:
+                            _fup_avg = float(_od_fup.get("avg_price") or "0")
+                            if _fup_avg > 0:
+                                _fup_exit_price = _fup_avg
+                    except Exception:
+                        pass
+                with _POSITION_LOCK:
+                    OPEN_POSITIONS.pop(m, None)
+                tg_send(f"🧹 <b>자동청산 완료(후속확인)</b> {m}\n• 사유: {reason}", priority=TG_PRIO_TRADE)
+                # 🔧 FIX: 후속확인 청산에서도 record_trade + trade result 기록 (누락 방지)
+                try:
+                    _net_ret = (_fup_exit_price / entry_price - 1.0 - FEE_RATE_ROUNDTRIP) if entry_price > 0 else 0
+                    record_trade(m, _net_ret, pos.get("signal_type", "기본"), signal_tag=pos.get("signal_tag", "기본"), predicted_group=pos.get("predicted_group"))  # 🔧 FIX: 승률/연패 추적 누락 방지
+                except Exception:
+                    pass
+                # 🔧 FIX: AUTO_LEARN_ENABLED 무관하게 항상 호출 (배치 리포트 카운터)
+                try:
+                    _hold = time.time() - pos.get("entry_ts", time.time())
+                    _mfe = pos.get("mfe_pct", 0.0)
+                    _mae = pos.get("mae_pct", 0.0)
+                    update_trade_result(m, _fup_exit_price, _net_ret, _hold,
+                                        added=pos.get('added', False),
+                                        exit_reason=reason or "후속확인_청산",
+                                        mfe_pct=_mfe, mae_pct=_mae,
+                                        entry_ts=pos.get("entry_ts"),
+                                        pos_snapshot=dict(pos))
+                except Exception as _e:
+                    print(f"[FOLLOWUP_TRADE_LOG_ERR] {_e}")
+                return True
+        # 🔧 4분 후에도 미체결 → 경고 알림
+        tg_send(f"🚨 <b>{m} 청산 미완료</b>\n• 4분 후속감시 종료, 수동 확인 필요\n• 사유: {reason}")
+    except Exception as e:
+        print("[FOLLOWUP_ERR]", e)
+        # 🔧 FIX: 예외 발생해도 알람 발송
+        tg_send(f"🚨 <b>{m} 후속감시 오류</b>\n• 예외: {e}\n• 수동 확인 필요")
+    return False
+
+
 def close_auto_position(m, reason=""):
     """
     손절/청산 시 자동 매도 (찌꺼기 방지 포함)
@@ -6626,6 +7880,7 @@ def close_auto_position(m, reason=""):
             _CLOSING_MARKETS.discard(m)
             raise
 
+    _lock_handoff = False  # True = 미체결 재확인 제너레이터가 청산 락 해제 담당
     try:
         if not pos:
             print(f"[AUTO] OPEN_POSITIONS에 {m} 포지션 없음 → 청산 스킵 (reason={reason})")
@@ -6735,106 +7990,15 @@ def close_auto_position(m, reason=""):
 
             # 🔧 FIX #1: 미체결 시 잔고 재확인 후 처리 (지연 체결 대응 강화)
             if executed <= 0:
-                # 🔧 PATCH: 최대 30초까지 잔고+locked=0 재확인 (지연 체결 대비)
-                for _retry in range(15):  # 15회 x 2초 = 30초
-                    time.sleep(2.0)
-                    actual_after = get_balance_with_locked(m)  # 🔧 locked 포함
-                    if actual_after < 0:
-                        continue  # 🔧 FIX: API 실패(-1)를 잔고 0으로 오판 방지
-                    if actual_after <= 1e-12:
-                        # 실잔고+locked 0 = 체결된 것으로 간주
-                        with _POSITION_LOCK:
-                            OPEN_POSITIONS.pop(m, None)
-
-                        # 🔧 FIX: 지연청산 시 실제 체결가 조회 시도 (학습 데이터 정확도 개선)
-                        if order_uuid:
-                            try:
-                                od_delayed = get_order_result(order_uuid, timeout_sec=8.0)
-                                if od_delayed:
-                                    delayed_avg = float(od_delayed.get("avg_price") or "0")
-                                    if delayed_avg > 0:
-                                        exit_price_used = delayed_avg
-                                        ret_pct = (exit_price_used / entry_price - 1.0) * 100.0 if entry_price > 0 else 0.0
-                                        print(f"[DELAYED] {m} 실제 체결가 조회 성공: {delayed_avg:.0f}원 → ret={ret_pct:+.2f}%")
-                            except Exception as _delayed_err:
-                                print(f"[DELAYED_PRICE_ERR] {m} 체결가 조회 실패 (추정값 사용): {_delayed_err}")
-
-                        tg_send(f"🧹 <b>자동청산 완료(지연확인)</b> {m}\n• 주문응답 지연으로 잔고=0 확인 후 완료 처리\n• 사유: {reason}")
-                        # 🔧 FIX: 지연청산에서도 record_trade 기록 (승률 기반 리스크 조정에 필수)
-                        # 🔧 FIX: 수수료 반영한 순수익률 사용
-                        net_ret_delayed = ret_pct - (FEE_RATE_ROUNDTRIP * 100.0)
-                        try:
-                            record_trade(m, net_ret_delayed / 100.0, pos.get("signal_type", "기본"), signal_tag=pos.get("signal_tag", "기본"), predicted_group=pos.get("predicted_group"))  # 🔧 수수료 반영
-                        except Exception as _e:
-                            print("[DELAYED_TRADE_RECORD_ERR]", _e)
-                        # 🔧 FIX: AUTO_LEARN_ENABLED 무관하게 항상 호출 (배치 리포트 카운터)
-                        try:
-                            hold_sec = time.time() - pos.get("entry_ts", time.time())
-                            mfe = pos.get("mfe_pct", 0.0)
-                            mae = pos.get("mae_pct", 0.0)
-                            update_trade_result(m, exit_price_used, net_ret_delayed/100.0 if entry_price else 0, hold_sec,
-                                                added=pos.get('added', False), exit_reason=reason,
-                                                mfe_pct=mfe, mae_pct=mae,
-                                                entry_ts=pos.get("entry_ts"),
-                                                pos_snapshot=dict(pos))
-                        except Exception as _e:
-                            print("[DELAYED_CLOSE_LOG_ERR]", _e)
-                        return
-
-                # 30초 후에도 잔고 있으면 → 후속 워커로 추가 감시
-                print(f"[AUTO] {m} 청산 미체결 → 후속 감시 시작")
-                tg_send(f"⚠️ <b>자동청산 미체결</b> {m}\n사유: 체결 지연 / 후속 감시 진행")
-
-                def _followup_check():
-                    try:
-                        _fup_exit_price = cur_price  # 🔧 FIX: 초기값은 closure의 cur_price
-                        for _ in range(120):  # 추가 4분 감시 (120회 x 2초)
-                            time.sleep(2.0)
-                            _fup_bal = get_balance_with_locked(m)  # 🔧 locked 포함
-                            if _fup_bal < 0:
-                                continue  # 🔧 FIX: API 실패(-1)를 잔고 0으로 오판 방지
-                            if _fup_bal <= 1e-12:
-                                # 🔧 FIX: 실제 체결가 조회 (stale cur_price 사용 방지)
-                                if order_uuid:
-                                    try:
-                                        _od_fup = get_order_result(order_uuid, timeout_sec=5.0)
-                                        if _od_fup:
-                                            _fup_avg = float(_od_fup.get("avg_price") or "0")
-                                            if _fup_avg > 0:
-                                                _fup_exit_price = _fup_avg
-                                    except Exception:
-                                        pass
-                                with _POSITION_LOCK:
-                                    OPEN_POSITIONS.pop(m, None)
-                                tg_send(f"🧹 <b>자동청산 완료(후속확인)</b> {m}\n• 사유: {reason}")
-                                # 🔧 FIX: 후속확인 청산에서도 record_trade + trade result 기록 (누락 방지)
-                                try:
-                                    _net_ret = (_fup_exit_price / entry_price - 1.0 - FEE_RATE_ROUNDTRIP) if entry_price > 0 else 0
-                                    record_trade(m, _net_ret, pos.get("signal_type", "기본"), signal_tag=pos.get("signal_tag", "기본"), predicted_group=pos.get("predicted_group"))  # 🔧 FIX: 승률/연패 추적 누락 방지
-                                except Exception:
-                                    pass
-                                # 🔧 FIX: AUTO_LEARN_ENABLED 무관하게 항상 호출 (배치 리포트 카운터)
-                                try:
-                                    _hold = time.time() - pos.get("entry_ts", time.time())
-                                    _mfe = pos.get("mfe_pct", 0.0)
-                                    _mae = pos.get("mae_pct", 0.0)
-                                    update_trade_result(m, _fup_exit_price, _net_ret, _hold,
-                                                        added=pos.get('added', False),
-                                                        exit_reason=reason or "후속확인_청산",
-                                                        mfe_pct=_mfe, mae_pct=_mae,
-                                                        entry_ts=pos.get("entry_ts"),
-                                                        pos_snapshot=dict(pos))
-                                except Exception as _e:
-                                    print(f"[FOLLOWUP_TRADE_LOG_ERR] {_e}")
-                                return
-                        # 🔧 4분 후에도 미체결 → 경고 알림
-                        tg_send(f"🚨 <b>{m} 청산 미완료</b>\n• 4분 후속감시 종료, 수동 확인 필요\n• 사유: {reason}")
-                    except Exception as e:
-                        print("[FOLLOWUP_ERR]", e)
-                        # 🔧 FIX: 예외 발생해도 알람 발송
-                        tg_send(f"🚨 <b>{m} 후속감시 오류</b>\n• 예외: {e}\n• 수동 확인 필요")
-                threading.Thread(target=_followup_check, daemon=True).start()
-                return
+                # ⚡ 지연 체결 확인은 제너레이터로 넘김 (2초 타이머 yield) — 엔진 워커/호출 스레드 점유 없음
+                # 청산 락(_CLOSING_MARKETS)은 30초 재확인이 끝날 때 제너레이터가 해제
+                gen = _close_unfilled_gen(m, pos, reason, order_uuid, entry_price, cur_price, ret_pct)
+                if _EXIT_ENGINE is not None:
+                    _EXIT_ENGINE.submit(m, gen, 2.0)
+                else:
+                    threading.Thread(target=_exit_drive_inline, args=(gen, 2.0), daemon=True).start()
+                _lock_handoff = True
+                return
 
             # 🔧 FIX #1: 부분체결 시 잔여량으로 업데이트
             if executed < vol - 1e-10:
@@ -7012,7 +8176,8 @@ def close_auto_position(m, reason=""):
                 f"• 모드: {_pos_data.get('entry_mode', '?')} | 타입: {_pos_data.get('signal_type', '?')}\n"
                 f"• MFE시계열: {' → '.join(f'{k}초:+{v*100:.2f}%' for k, v in sorted(_pos_data.get('mfe_snapshots', {}).items(), key=lambda x: int(x[0])))}\n"
                 f"====================================\n"
-                f"{link_for(m)}"
+                f"{link_for(m)}",
+                priority=TG_PRIO_TRADE
             )
 
         except Exception as e:
@@ -7054,8 +8219,9 @@ def close_auto_position(m, reason=""):
             return
     finally:
         # 🔧 FIX: 중복 청산 방지 락 해제 (성공/실패 상관없이)
-        with _POSITION_LOCK:
-            _CLOSING_MARKETS.discard(m)
+        if not _lock_handoff:
+            with _POSITION_LOCK:
+                _CLOSING_MARKETS.discard(m)
 
 
 # 포지션 관리 — config.py에서 정의됨 (PARTIAL_PENDING_TIMEOUT, DUST_PREVENT_KRW)
@@ -7362,7 +8528,8 @@ def safe_partial_sell(m, sell_ratio=0.5, reason=""):
             f"• 청산금액: {est_exit_value:,.0f}원\n"
             f"• 수수료: {fee_total:,.0f}원 (매수 {est_entry_value * FEE_RATE_ONEWAY:,.0f} + 매도 {est_exit_value * FEE_RATE_ONEWAY:,.0f})\n"
             f"• 잔여수량: {remaining_volume:.6f}\n"
-            f"===================================="
+            f"====================================",
+            priority=TG_PRIO_TRADE
         )
 
         # 🔧 FIX: 전량청산 시 record_trade(net) + update_trade_result(net) 호출
@@ -7412,11 +8579,218 @@ def safe_partial_sell(m, sell_ratio=0.5, reason=""):
         return False, msg, 0.0
 
 
+# =========================
+# ⚡ 이벤트 구동 청산 엔진
+# =========================
+# 포지션 모니터(monitor_position / remonitor_until_close / box_monitor_position)는 제너레이터로 작성:
+#   yield        → 다음 체결(스트림) 또는 폴백 간격까지 대기 후 1스텝
+#   yield <초>   → 타이머 대기 (잔고 조회 실패 재시도 등)
+# 엔진 스레드 1개가 보유 마켓 체결 이벤트를 받아 해당 포지션 스텝을 워커에 배정 (포지션당 동시 1스텝).
+# 기존: 포지션마다 time.sleep(RECHECK_SEC) + REST 틱/티커 폴링 → 스캐너와 레이트 예산 경쟁, 손절 최대 3초 지연
+# 청산 동작은 그대로 close_auto_position / safe_partial_sell. 호출 스레드는 결과만 대기 (폴링 없음).
+class _ExitJob:
+    __slots__ = ("jid", "m", "gen", "fallback_sec", "due", "tick_mode", "tick_ts", "last_step",
+                 "running", "done", "result", "exc", "on_done")
+
+    def __init__(self, m, gen, fallback_sec, on_done=None):
+        self.jid = 0
+        self.m = m
+        self.gen = gen
+        self.fallback_sec = fallback_sec
+        self.on_done = on_done      # 완료 콜백 (submit 비블로킹 경로, 워커 스레드에서 호출)
+        self.due = time.time()      # 첫 스텝 즉시 (yield 전 초기화 구간 실행)
+        self.tick_mode = False
+        self.tick_ts = 0.0          # 대기 중 첫 체결 수신 시각 (0 = 없음)
+        self.last_step = 0.0
+        self.running = False
+        self.done = threading.Event()
+        self.result = None
+        self.exc = None
+
+
+class ExitEngine:
+    def __init__(self, workers=4, min_step_sec=0.5, name="exit_engine", prefix="exit"):
+        self.name = name
+        self.min_step_sec = min_step_sec
+        self._cond = threading.Condition()
+        self._jobs = {}             # id -> _ExitJob
+        self._by_market = {}        # market -> set(id)
+        self._seq = itertools.count(1)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=prefix)
+        self._local = threading.local()
+        self._thread = None
+        self.stats = {"steps": 0, "tick_steps": 0, "timer_steps": 0, "ticks": 0,
+                      "lag_ms_sum": 0.0, "lag_n": 0, "errors": 0}
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            _MD_TRADE_LISTENERS.append(self.on_trade)
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def on_trade(self, m, tick):
+        """스트림 스레드 — 보유 마켓 체결이면 해당 잡 깨우기"""
+        ids = self._by_market.get(m)
+        if not ids:
+            return
+        with self._cond:
+            now = time.time()
+            for jid in self._by_market.get(m, ()):
+                j = self._jobs.get(jid)
+                if j is not None and j.tick_mode and not j.tick_ts:
+                    j.tick_ts = now
+            self.stats["ticks"] += 1
+            self._cond.notify()
+
+    def submit(self, m, gen, fallback_sec, on_done=None):
+        """제너레이터 등록만 하고 즉시 반환 (완료 시 on_done(job) 호출, 결과는 job.result/job.exc)"""
+        self.start()
+        j = _ExitJob(m, gen, fallback_sec, on_done)
+        with self._cond:
+            j.jid = next(self._seq)
+            self._jobs[j.jid] = j
+            self._by_market.setdefault(m, set()).add(j.jid)
+            self._cond.notify()
+        return j
+
+    def run(self, m, gen, fallback_sec):
+        """제너레이터 완료까지 대기 후 반환값 반환 (예외는 호출자에게 재전파)"""
+        if getattr(self._local, "worker", False):
+            # 엔진 스텝 안에서 다시 블로킹 호출 → 워커 고갈 방지 위해 인라인 구동
+            return _exit_drive_inline(gen, fallback_sec)
+        j = self.submit(m, gen, fallback_sec)
+        j.done.wait()
+        if j.exc is not None:
+            raise j.exc
+        return j.result
+
+    def pending(self):
+        with self._cond:
+            return len(self._jobs)
+
+    def _finish(self, j):
+        with self._cond:
+            self._jobs.pop(j.jid, None)
+            ids = self._by_market.get(j.m)
+            if ids is not None:
+                ids.discard(j.jid)
+                if not ids:
+                    self._by_market.pop(j.m, None)
+        if j.on_done is not None:
+            try:
+                j.on_done(j)
+            except Exception as e:
+                print(f"[{self.name.upper()}] {j.m} 완료 콜백 오류: {e}")
+        j.done.set()
+
+    def _loop(self):
+        while True:
+            ready = []
+            with self._cond:
+                now = time.time()
+                next_wake = now + 1.0
+                for j in self._jobs.values():
+                    if j.running or j.done.is_set():
+                        continue
+                    due = j.due
+                    if j.tick_mode and j.tick_ts:
+                        due = min(due, j.last_step + self.min_step_sec)
+                    if now >= due:
+                        j.running = True
+                        ready.append(j)
+                    else:
+                        next_wake = min(next_wake, due)
+                if not ready:
+                    self._cond.wait(max(0.01, next_wake - now))
+                    continue
+            for j in ready:
+                self._pool.submit(self._step, j)
+
+    def _step(self, j):
+        self._local.worker = True
+        now = time.time()
+        by_tick = bool(j.tick_mode and j.tick_ts and now < j.due)
+        with self._cond:
+            if by_tick:
+                self.stats["tick_steps"] += 1
+                self.stats["lag_ms_sum"] += (now - j.tick_ts) * 1000
+                self.stats["lag_n"] += 1
+            else:
+                self.stats["timer_steps"] += 1
+            self.stats["steps"] += 1
+            j.tick_ts = 0.0
+        j.last_step = now
+        finished = False
+        try:
+            hint = next(j.gen)
+        except StopIteration as e:
+            j.result = e.value
+            finished = True
+        except BaseException as e:
+            self.stats["errors"] += 1
+            j.exc = e
+            finished = True
+        finally:
+            self._local.worker = False
+        if finished:
+            self._finish(j)
+            return
+        with self._cond:
+            now = time.time()
+            if hint is None:
+                j.tick_mode = True
+                j.due = now + j.fallback_sec
+            else:
+                j.tick_mode = False
+                j.tick_ts = 0.0
+                j.due = now + float(hint)
+            j.running = False
+            self._cond.notify()
+
+    def status_str(self):
+        with self._cond:
+            s = dict(self.stats)
+            n = len(self._jobs)
+        lag = s["lag_ms_sum"] / s["lag_n"] if s["lag_n"] else 0.0
+        return (f"{self.name} jobs={n} steps={s['steps']} (tick={s['tick_steps']}/timer={s['timer_steps']}) "
+                f"ticks={s['ticks']} lag={lag:.0f}ms err={s['errors']}")
+
+
+def _exit_drive_inline(gen, fallback_sec):
+    """엔진 비활성/중첩 호출 시 — 호출 스레드에서 기존 방식(sleep 폴링)으로 구동"""
+    while True:
+        try:
+            hint = next(gen)
+        except StopIteration as e:
+            return e.value
+        time.sleep(fallback_sec if hint is None else hint)
+
+
+_EXIT_ENGINE = ExitEngine(EXIT_ENGINE_WORKERS, EXIT_ENGINE_MIN_STEP_SEC) if EXIT_ENGINE_ENABLED else None
+
+
+def _exit_engine_run(m, gen, fallback_sec=RECHECK_SEC):
+    if _EXIT_ENGINE is None:
+        return _exit_drive_inline(gen, fallback_sec)
+    return _EXIT_ENGINE.run(m, gen, fallback_sec)
+
+
+def _exit_engine_status_str():
+    return _EXIT_ENGINE.status_str() if _EXIT_ENGINE is not None else "exit_engine=disabled"
+
+
 def remonitor_until_close(m, entry_price, pre, tight_mode=False):
     """
     끝알람 이후 자동청산 신호가 나올 때까지 반복 모니터링
     🔧 FIX: 장기 보유 타임아웃 추가 (부분청산 후 정체 방지)
+    ⚡ 청산 엔진에서 구동 (_remonitor_gen)
     """
+    return _exit_engine_run(m, _remonitor_gen(m, entry_price, pre, tight_mode))
+
+
+def _remonitor_gen(m, entry_price, pre, tight_mode=False):
     # 🐱 DCB 포지션은 자체 모니터가 관리 → 재모니터링 스킵
     with _POSITION_LOCK:
         if OPEN_POSITIONS.get(m, {}).get("strategy") == "dcb":
@@ -7502,7 +8876,7 @@ def remonitor_until_close(m, entry_price, pre, tight_mode=False):
         # 🔧 FIX: -1 = 조회 실패 → 포지션 삭제하지 않고 다음 사이클 대기
         if actual < 0:
             print(f"[REMONITOR] {m} 잔고 조회 실패 → 포지션 유지, 다음 사이클 대기")
-            time.sleep(5)
+            yield 5
             continue
         if actual <= 1e-12:
             # 🔧 FIX: 매수 직후 300초 내에는 잔고=0이어도 API 지연 가능 → 다음 사이클 대기
@@ -7510,7 +8884,7 @@ def remonitor_until_close(m, entry_price, pre, tight_mode=False):
                 buy_age_loop = time.time() - _RECENT_BUY_TS.get(m, 0)
             if buy_age_loop < 300:
                 print(f"[REMONITOR] {m} 잔고=0이지만 매수 {buy_age_loop:.0f}초 전 → API 지연 가능, 다음 사이클 대기")
-                time.sleep(5)
+                yield 5
                 continue
             print(f"[REMONITOR] {m} 실잔고+locked=0 → 유령 포지션 정리 후 루프 종료")
             # 🔧 FIX: 청산 알람 추가 (외부 정리 또는 체결 누락 감지)
@@ -7585,7 +8959,7 @@ def remonitor_until_close(m, entry_price, pre, tight_mode=False):
                         return True
 
         verdict, action, rationale, ret_pct, last_price, maxrun, maxdd = \
-            monitor_position(
+            yield from _monitor_position_gen(
                 m, entry_price, pre,
                 tight_mode=tight_mode,
                 horizon=CYCLE_SEC,
@@ -7698,7 +9072,7 @@ def remonitor_until_close(m, entry_price, pre, tight_mode=False):
         if not should_close:
             # 🔧 FIX: 인식 불가 verdict → tight loop 방지 (fallback sleep)
             print(f"[REMONITOR] {m} 미인식 verdict={verdict}, action={action} → 다음 사이클")
-            time.sleep(5)
+            yield 5
             continue
 
         if should_close:
@@ -7825,6 +9199,22 @@ BATCH_LOG_PATH = os.path.join(os.getcwd(), "batch_reports.csv")  # 배치 요약
 def _restore_batch_count() -> int:
     """봇 재시작 시 마지막 배치 리포트 이후 거래 수 복원"""
     try:
+        if _TRADE_STORE is not None:
+            if not os.path.exists(BATCH_LOG_PATH):
+                # 배치 리포트가 한 번도 없었으면 전체 청산 건수 카운트
+                count = _TRADE_STORE.count_closed()
+                restored = count % BATCH_REPORT_INTERVAL
+                print(f"[BATCH_REPORT] 카운터 복원: {restored}/{BATCH_REPORT_INTERVAL} (배치기록 없음, 전체 {count}건)")
+                return restored
+            last_batch_ts = ""
+            with open(BATCH_LOG_PATH, "r", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    last_batch_ts = row.get("ts", "")
+            if not last_batch_ts:
+                return 0  # CSV 경로와 같음 (배치 파일은 있는데 ts 행 없음)
+            count = _TRADE_STORE.count_closed(since_ts=last_batch_ts)
+            print(f"[BATCH_REPORT] 카운터 복원: {count}/{BATCH_REPORT_INTERVAL} (마지막 배치: {last_batch_ts})")
+            return count
         if not os.path.exists(BATCH_LOG_PATH) or not os.path.exists(TRADE_LOG_PATH):
             # 배치 리포트가 한 번도 없었으면 전체 청산 건수 카운트
             if os.path.exists(TRADE_LOG_PATH):
@@ -7861,8 +9251,6 @@ def _restore_batch_count() -> int:
         print(f"[BATCH_REPORT] 카운터 복원 실패: {e}")
         return 0
 
-_batch_report_count = _restore_batch_count()
-
 FEATURE_FIELDS = [
     "ts", "market", "entry_price", "exit_price",
     "buy_ratio", "spread", "turn", "imbalance", "volume_surge",
@@ -7885,11 +9273,187 @@ FEATURE_FIELDS = [
     "entry_rsi", "entry_vr5", "entry_buy_ratio", "entry_accel",
 ]
 
+
+# =========================
+# 🗃️ 거래 피처 저장소 (SQLite WAL)
+# =========================
+# 기존: 청산마다 trade_features.csv 전체 DictReader → 역순 탐색 → 임시파일 전체 재작성 (_trade_log_lock 점유),
+#       리포트/자동학습 5곳이 매번 pd.read_csv 전체.
+# 변경: 행 = 거래 1건. 진입 INSERT / 청산 UPDATE (market, closed, id) 인덱스 → 해당 행만.
+#       "최근 N건 청산" = (closed, id) 인덱스 역순 LIMIT N. 값은 CSV 와 같은 문자열로 보관 → DataFrame 타입 추론 동일.
+class TradeStore:
+    """trade_features 행 저장소 (스레드 안전 — 연결 1개 + 락)"""
+
+    def __init__(self, path, fields):
+        self.path = path
+        self.fields = list(fields)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        cols = ", ".join(f'"{f}" TEXT' for f in self.fields)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS trades (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                          f"closed INTEGER NOT NULL DEFAULT 0, {cols})")
+        # FEATURE_FIELDS 에 새 컬럼이 추가된 경우 스키마 확장
+        have = {r[1] for r in self.conn.execute("PRAGMA table_info(trades)")}
+        for f in self.fields:
+            if f not in have:
+                self.conn.execute(f'ALTER TABLE trades ADD COLUMN "{f}" TEXT')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS trades_open ON trades(market, closed, id)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS trades_closed ON trades(closed, id)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+        self._sel = ", ".join(f'"{f}"' for f in self.fields)
+        self.stats = {"inserts": 0, "updates": 0, "queries": 0}
+
+    @staticmethod
+    def _cell(v):
+        # csv.DictWriter 와 같은 문자열화 (None → "")
+        return "" if v is None else (v if isinstance(v, str) else str(v))
+
+    def _row(self, r):
+        return {f: ("" if v is None else v) for f, v in zip(self.fields, r)}
+
+    def insert(self, row):
+        vals = [self._cell(row.get(f, "")) for f in self.fields]
+        closed = 1 if row.get("result") in ("win", "lose") else 0
+        with self._lock:
+            cur = self.conn.execute(
+                f"INSERT INTO trades (closed, {self._sel}) VALUES (?, {', '.join('?' * len(vals))})",
+                [closed] + vals)
+            self.stats["inserts"] += 1
+            return cur.lastrowid
+
+    def open_row(self, market):
+        """마켓의 가장 최근 미청산 행 (id, dict) — 없으면 None"""
+        with self._lock:
+            r = self.conn.execute(
+                f"SELECT id, {self._sel} FROM trades WHERE market = ? AND closed = 0 "
+                f"AND (exit_price IS NULL OR exit_price = '') ORDER BY id DESC LIMIT 1", (market,)).fetchone()
+        return (r[0], self._row(r[1:])) if r else None
+
+    def update(self, rid, values):
+        upd = {f: self._cell(v) for f, v in values.items() if f in self.fields}
+        if not upd:
+            return
+        closed = 1 if upd.get("result") in ("win", "lose") else 0
+        with self._lock:
+            self.conn.execute(
+                f"UPDATE trades SET closed = ?, {', '.join(f'{chr(34)}{f}{chr(34)} = ?' for f in upd)} WHERE id = ?",
+                [closed] + list(upd.values()) + [rid])
+            self.stats["updates"] += 1
+
+    def closed_rows(self, last_n=None):
+        """청산 완료 행 (기록 순서, 오래된 → 최신). last_n 지정 시 최근 N건만"""
+        with self._lock:
+            self.stats["queries"] += 1
+            if last_n is None:
+                rs = self.conn.execute(f"SELECT {self._sel} FROM trades WHERE closed = 1 ORDER BY id").fetchall()
+            else:
+                rs = self.conn.execute(f"SELECT {self._sel} FROM trades WHERE closed = 1 ORDER BY id DESC LIMIT ?",
+                                       (int(last_n),)).fetchall()[::-1]
+        return [self._row(r) for r in rs]
+
+    def count_closed(self, since_ts=None):
+        with self._lock:
+            if since_ts is None:
+                return self.conn.execute("SELECT COUNT(*) FROM trades WHERE closed = 1").fetchone()[0]
+            return self.conn.execute("SELECT COUNT(*) FROM trades WHERE closed = 1 AND ts > ?",
+                                     (since_ts,)).fetchone()[0]
+
+    def has_rows(self):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM trades LIMIT 1").fetchone() is not None
+
+    def import_csv(self, csv_path):
+        """기존 trade_features.csv 1회 임포트 (행 순서 유지, 원본 파일은 그대로) → 임포트 행 수"""
+        with self._lock:
+            if self.conn.execute("SELECT v FROM meta WHERE k = 'csv_imported'").fetchone():
+                return 0
+        n = 0
+        if os.path.exists(csv_path):
+            with open(csv_path, "r", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+            with self._lock:
+                self.conn.execute("BEGIN")
+                try:
+                    for row in rows:
+                        vals = [self._cell(row.get(fld, "")) for fld in self.fields]
+                        self.conn.execute(
+                            f"INSERT INTO trades (closed, {self._sel}) VALUES (?, {', '.join('?' * len(vals))})",
+                            [1 if row.get("result") in ("win", "lose") else 0] + vals)
+                    self.conn.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('csv_imported', ?)",
+                                      (f"{csv_path} rows={len(rows)} at={time.strftime('%Y-%m-%d %H:%M:%S')}",))
+                    self.conn.execute("COMMIT")
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
+            n = len(rows)
+        else:
+            with self._lock:
+                self.conn.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('csv_imported', 'none')")
+        return n
+
+    def status_str(self):
+        s = self.stats
+        return f"trade_store(ins={s['inserts']} upd={s['updates']} q={s['queries']})"
+
+
+_TRADE_STORE = None  # main() 시작 시 _trade_store_init() — 임포트만으로 DB 파일 생성/CSV 임포트 안 함
+
+
+def _trade_store_init():
+    """거래 피처 저장소 열기 + 최초 1회 CSV 임포트 (봇 시작 시 1회)"""
+    global _TRADE_STORE
+    if not TRADE_STORE_ENABLED or _TRADE_STORE is not None:
+        return
+    try:
+        _TRADE_STORE = TradeStore(TRADE_STORE_PATH, FEATURE_FIELDS)
+        _ts_imported = _TRADE_STORE.import_csv(TRADE_LOG_PATH)
+        if _ts_imported:
+            print(f"[TRADE_STORE] {TRADE_LOG_PATH} → {TRADE_STORE_PATH} {_ts_imported}행 임포트")
+    except Exception as _ts_err:
+        print(f"[TRADE_STORE] 초기화 실패 → CSV 경로 유지: {_ts_err}")
+        _TRADE_STORE = None
+
+
+def _trade_log_exists():
+    if _TRADE_STORE is not None:
+        return _TRADE_STORE.has_rows()
+    return os.path.exists(TRADE_LOG_PATH)
+
+
+def _read_trade_log_df(last_n=None):
+    """거래 피처 DataFrame — 저장소면 청산 완료 행(최근 last_n건)만, 아니면 CSV 전체 (호출부 필터는 그대로 유효)"""
+    import pandas as pd
+    if _TRADE_STORE is None:
+        return pd.read_csv(TRADE_LOG_PATH)
+    import io
+    rows = _TRADE_STORE.closed_rows(last_n)
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=FEATURE_FIELDS)
+    w.writeheader()
+    w.writerows(rows)
+    buf.seek(0)
+    # CSV 와 같은 문자열 → read_csv 로 동일한 dtype 추론
+    return pd.read_csv(buf)
+
+
+_batch_report_count = 0  # main() 에서 _trade_store_init() 후 _restore_batch_count() 로 복원
+
 def log_trade_features(entry_data: dict, exit_data: dict = None):
     """
     거래 피처 로깅 (진입 시 호출, 청산 시 업데이트)
     """
     with _trade_log_lock:
+        if _TRADE_STORE is not None:
+            row = {k: entry_data.get(k, "") for k in FEATURE_FIELDS}
+            if exit_data:
+                row.update(exit_data)
+            try:
+                _TRADE_STORE.insert(row)
+            except Exception as e:
+                print(f"[TRADE_STORE] 기록 실패: {e}")
+            return
         new_file = not os.path.exists(TRADE_LOG_PATH)
         with open(TRADE_LOG_PATH, "a", newline="", encoding="utf-8") as f:
             w = csv.DictWriter(f, fieldnames=FEATURE_FIELDS)
@@ -7966,7 +9530,41 @@ def update_trade_result(market: str, exit_price: float, pnl_pct: float, hold_sec
     with _TRADE_LOSS_LOCK:
         last_trade_was_loss[market] = not is_win
 
-    if not csv_exists:
+    def _fill_exit(row):
+        row["exit_price"] = str(exit_price)
+        row["pnl_pct"] = f"{pnl_pct:.4f}"
+        row["result"] = "win" if is_win else "lose"
+        row["hold_sec"] = str(int(hold_sec))
+        # 🔍 리포트 상세: 추매여부 + 청산사유
+        row["added"] = "1" if added else "0"
+        row["exit_reason"] = exit_reason
+        # 🔧 MFE/MAE 기록 (익절/손절 튜닝용)
+        row["mfe_pct"] = f"{mfe_pct:.4f}"
+        row["mae_pct"] = f"{mae_pct:.4f}"
+        # 🔧 데이터수집: 포지션에서 튜닝 메트릭 가져와서 CSV에 기록
+        # 🔧 FIX: pos_snapshot 우선 사용 (close 후 OPEN_POSITIONS에서 이미 제거됨)
+        with _POSITION_LOCK:
+            _pos_for_csv = pos_snapshot if pos_snapshot else dict(OPEN_POSITIONS.get(market, {}))
+        row["mfe_sec"] = str(_pos_for_csv.get("mfe_sec", ""))
+        row["trail_dist"] = str(_pos_for_csv.get("trail_dist", ""))
+        row["trail_stop_pct"] = str(_pos_for_csv.get("trail_stop_pct", ""))
+        _mfe_f = float(row.get("mfe_pct", 0) or 0)
+        row["peak_drop"] = f"{_mfe_f - pnl_pct * 100:.4f}" if _mfe_f else ""
+        return row
+
+    if _TRADE_STORE is not None:
+        # 🗃️ 인덱스로 해당 마켓 최근 미청산 행만 UPDATE (파일 전체 재작성 없음)
+        with _trade_log_lock:
+            try:
+                _open = _TRADE_STORE.open_row(market)
+                if _open is None:
+                    print(f"[UPDATE_TRADE] {market} 미청산 기록 없음 (저장소 업데이트 스킵, 리포트는 계속)")
+                else:
+                    _rid, _row = _open
+                    _TRADE_STORE.update(_rid, _fill_exit(_row))
+            except Exception as e:
+                print(f"[TRADE_LOG_UPDATE_ERR] {e}")
+    elif not csv_exists:
         print(f"[UPDATE_TRADE] {TRADE_LOG_PATH} 파일 없음 (CSV 업데이트 스킵, 리포트는 계속)")
     else:
         with _trade_log_lock:
@@ -7979,26 +9577,7 @@ def update_trade_result(market: str, exit_price: float, pnl_pct: float, hold_sec
                 # 마지막 해당 마켓 찾아서 업데이트
                 for i in range(len(rows) - 1, -1, -1):
                     if rows[i]["market"] == market and not rows[i].get("exit_price"):
-                        rows[i]["exit_price"] = str(exit_price)
-                        rows[i]["pnl_pct"] = f"{pnl_pct:.4f}"
-                        rows[i]["result"] = "win" if is_win else "lose"
-                        rows[i]["hold_sec"] = str(int(hold_sec))
-                        # 🔍 리포트 상세: 추매여부 + 청산사유
-                        rows[i]["added"] = "1" if added else "0"
-                        rows[i]["exit_reason"] = exit_reason
-                        # 🔧 MFE/MAE 기록 (익절/손절 튜닝용)
-                        rows[i]["mfe_pct"] = f"{mfe_pct:.4f}"
-                        rows[i]["mae_pct"] = f"{mae_pct:.4f}"
-                        # 🔧 데이터수집: 포지션에서 튜닝 메트릭 가져와서 CSV에 기록
-                        # 🔧 FIX: pos_snapshot 우선 사용 (close 후 OPEN_POSITIONS에서 제거됨)
-                        # 🔧 FIX: pos_snapshot 우선 사용 (close 후 OPEN_POSITIONS에서 이미 제거됨)
-                        with _POSITION_LOCK:
-                            _pos_for_csv = pos_snapshot if pos_snapshot else dict(OPEN_POSITIONS.get(market, {}))
-                        rows[i]["mfe_sec"] = str(_pos_for_csv.get("mfe_sec", ""))
-                        rows[i]["trail_dist"] = str(_pos_for_csv.get("trail_dist", ""))
-                        rows[i]["trail_stop_pct"] = str(_pos_for_csv.get("trail_stop_pct", ""))
-                        _mfe_f = float(rows[i].get("mfe_pct", 0) or 0)
-                        rows[i]["peak_drop"] = f"{_mfe_f - pnl_pct * 100:.4f}" if _mfe_f else ""
+                        _fill_exit(rows[i])
                         break
 
                 # 🔧 FIX: 원자적 쓰기 (임시파일 → rename, 크래시 시 원본 보존)
@@ -8164,7 +9743,7 @@ def update_trade_result(market: str, exit_price: float, pnl_pct: float, hold_sec
             detail_report = get_recent_trades_detail(10)  # 최근 10건 상세
             combined = path_report + detail_report
             print(f"[PATH_REPORT] 리포트 발송 시도")
-            tg_send(combined)
+            tg_send(combined, priority=TG_PRIO_REPORT)
         except Exception as e:
             print(f"[PATH_REPORT_ERR] {e}")
 
@@ -8186,12 +9765,12 @@ def get_path_statistics(last_n: int = 100) -> str:
     """
     🔍 경로별 승률 통계 생성 (텔레그램 리포트용)
     """
-    if not os.path.exists(TRADE_LOG_PATH):
+    if not _trade_log_exists():
         return "📊 거래 기록 없음"
 
     try:
         import pandas as pd
-        df = pd.read_csv(TRADE_LOG_PATH)
+        df = _read_trade_log_df(last_n)
 
         # result 컬럼이 있고 값이 있는 행만 (청산 완료된 거래)
         if "result" not in df.columns:
@@ -8345,12 +9924,12 @@ def get_recent_trades_detail(last_n: int = 10) -> str:
     """
     🔍 최근 거래 상세 목록 (임계치 분석용)
     """
-    if not os.path.exists(TRADE_LOG_PATH):
+    if not _trade_log_exists():
         return ""
 
     try:
         import pandas as pd
-        df = pd.read_csv(TRADE_LOG_PATH)
+        df = _read_trade_log_df(last_n)
 
         if "result" not in df.columns:
             return ""
@@ -8508,23 +10087,23 @@ def send_batch_trade_report():
     📊 50건 배치 종합 리포트 — 텔레그램 발송 + CSV 기록
     핵심 성과 지표 + 진입경로/시간대/코인/청산사유/진입모드별 분석
     """
-    if not os.path.exists(TRADE_LOG_PATH):
-        tg_send("📊 배치 리포트: 거래 기록 없음")
+    if not _trade_log_exists():
+        tg_send("📊 배치 리포트: 거래 기록 없음", priority=TG_PRIO_REPORT)
         return
 
     try:
         import pandas as pd
         import numpy as np
-        df = pd.read_csv(TRADE_LOG_PATH)
+        df = _read_trade_log_df(BATCH_REPORT_INTERVAL)
 
         if "result" not in df.columns:
-            tg_send("📊 배치 리포트: 청산 기록 없음")
+            tg_send("📊 배치 리포트: 청산 기록 없음", priority=TG_PRIO_REPORT)
             return
 
         df = df[df["result"].isin(["win", "lose"])].tail(BATCH_REPORT_INTERVAL)
 
         if len(df) < BATCH_REPORT_INTERVAL:
-            tg_send(f"📊 배치 리포트: 데이터 부족 ({len(df)}/{BATCH_REPORT_INTERVAL}건)")
+            tg_send(f"📊 배치 리포트: 데이터 부족 ({len(df)}/{BATCH_REPORT_INTERVAL}건)", priority=TG_PRIO_REPORT)
             return
 
         total = len(df)
@@ -8796,7 +10375,7 @@ def send_batch_trade_report():
         lines.append(f"{'=' * 32}")
 
         report_text = "\n".join(lines)
-        tg_send(report_text)
+        tg_send(report_text, priority=TG_PRIO_REPORT)
         print(f"[BATCH_REPORT] 배치 리포트 발송 완료 ({total}건)")
 
         # ─── CSV 기록 ───
@@ -8835,7 +10414,7 @@ def send_batch_trade_report():
             print(f"[BATCH_REPORT_CSV_ERR] {e}")
 
     except ImportError:
-        tg_send("📊 배치 리포트: pandas 미설치")
+        tg_send("📊 배치 리포트: pandas 미설치", priority=TG_PRIO_REPORT)
     except Exception as e:
         print(f"[BATCH_REPORT_ERR] {e}")
         traceback.print_exc()
@@ -8852,13 +10431,13 @@ def analyze_and_update_weights():
     global GATE_SURGE_MAX, GATE_IMBALANCE_MIN, GATE_OVERHEAT_MAX, GATE_FRESH_AGE_MAX
     global GATE_VOL_MIN, GATE_VOL_VS_MA_MIN
 
-    if not os.path.exists(TRADE_LOG_PATH):
+    if not _trade_log_exists():
         print("[AUTO_LEARN] 거래 로그 없음")
         return None
 
     try:
         import pandas as pd
-        df = pd.read_csv(TRADE_LOG_PATH)
+        df = _read_trade_log_df()
 
         # 결과가 있는 것만
         df = df[df["result"].isin(["win", "lose"])]
@@ -9068,13 +10647,13 @@ def auto_learn_exit_params():
     """
     global DYN_SL_MIN, DYN_SL_MAX, TRAIL_DISTANCE_MIN_BASE, HARD_STOP_DD
 
-    if not os.path.exists(TRADE_LOG_PATH):
+    if not _trade_log_exists():
         print("[EXIT_LEARN] 거래 로그 없음")
         return None
 
     try:
         import pandas as pd
-        df = pd.read_csv(TRADE_LOG_PATH)
+        df = _read_trade_log_df()
 
         df = df[df["result"].isin(["win", "lose"])]
         if len(df) < AUTO_LEARN_MIN_TRADES:
@@ -9421,29 +11000,235 @@ def link_for(m):
     return f"https://upbit.com/exchange?code=CRIX.UPBIT.{m}"
 
 
-# 토큰버킷
-_BUCKET = {"tokens": 6.0, "last": time.time(), "cap": 6.0, "rate": 4.5}
+# =========================
+# 레이트리미터 (엔드포인트 그룹별 — 업비트 Remaining-Req 헤더 기반)
+# =========================
+# 기존: 전역 토큰버킷 1개(4.5/s, 429마다 -0.4 / 성공마다 +0.1) → 캔들 폭주가 place_market_sell까지 지연.
+# 변경:
+# - 업비트 그룹(candles/trades/ticker/orderbook/market/order/default)별 독립 버킷 (RATE_LIMIT_GROUPS)
+# - 응답 Remaining-Req sec 값이 권위값 → tokens = min(tokens, sec) (같은 IP의 다른 봇 소비분까지 반영)
+# - 429 → 해당 그룹만 RATE_LIMIT_429_PAUSE_SEC 정지 (다른 그룹 영향 없음, 전역 rate 하향 없음)
+# - 우선 레인(주문/잔고 private 호출): 같은 그룹의 일반 대기자보다 먼저 토큰 획득
+# - 대기시간 히스토그램: (stage, group)별 고정 구간 카운트 → 단계별 스로틀링 비용
 _req_lock = threading.Lock()
 REQ_STATS = {"ok": 0, "http429": 0, "http5xx": 0, "errors": 0, "conn_err": 0}
 _CONSEC_CONN_ERR = 0
 
 
-def _throttle():
-    while True:
-        with _req_lock:
+def _endpoint_group(url, method="GET"):
+    """URL → 업비트 레이트리밋 그룹"""
+    path = url.split("://", 1)[-1]
+    path = path[path.find("/"):] if "/" in path else "/"
+    if path.startswith("/v1/candles"):
+        return "candles"
+    if path.startswith("/v1/trades"):
+        return "trades"
+    if path.startswith("/v1/ticker"):
+        return "ticker"
+    if path.startswith("/v1/orderbook"):
+        return "orderbook"
+    if path.startswith("/v1/market"):
+        return "market"
+    if path.startswith("/v1/orders") and method == "POST":
+        return "order"
+    return "default"
+
+
+def _parse_remaining_req(value):
+    """'group=candles; min=599; sec=9' → ("candles", 9). 파싱 실패 시 (None, None)"""
+    if not value:
+        return None, None
+    group, sec = None, None
+    for part in value.split(";"):
+        k, _, v = part.strip().partition("=")
+        if k == "group":
+            group = v.strip()
+        elif k == "sec":
+            try:
+                sec = int(v)
+            except ValueError:
+                pass
+    return group, sec
+
+
+class EndpointRateLimiter:
+    """그룹별 토큰버킷 + Remaining-Req 동기화 + 우선 레인 + 대기시간 히스토그램"""
+
+    def __init__(self, groups, pause_429_sec=1.0, hist_bounds_ms=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)):
+        self._cond = threading.Condition()
+        self._groups = {}
+        for name, (rate, cap) in groups.items():
+            self._add_group(name, rate, cap)
+        self.pause_429_sec = pause_429_sec
+        self.hist_bounds = tuple(hist_bounds_ms)
+        self._hist = {}  # (stage, group) → {"b": [구간별 카운트], "n": 건수, "sum": 합계ms}
+        self._hist_lock = threading.Lock()
+
+    def _add_group(self, name, rate, cap):
+        rate = max(float(rate), 0.1)
+        cap = max(float(cap), 1.0)
+        self._groups[name] = {"rate": rate, "cap": cap, "tokens": cap, "last": time.time(),
+                              "pause_until": 0.0, "hp_waiting": 0, "hdr_sec": None, "n429": 0}
+
+    def _group(self, name):
+        g = self._groups.get(name)
+        if g is None:
+            base = self._groups.get("default")
+            self._add_group(name, base["rate"] if base else 5.0, base["cap"] if base else 5.0)
+            g = self._groups[name]
+        return g
+
+    def rate(self, name):
+        with self._cond:
+            return self._group(name)["rate"]
+
+    def _refill(self, g, now):
+        g["tokens"] = min(g["cap"], g["tokens"] + (now - g["last"]) * g["rate"])
+        g["last"] = now
+
+    def _try_take(self, g, priority, now):
+        """토큰 1개 획득 시도 (self._cond 보유). 반환: 0=획득 / 양수=대기 권장 초"""
+        self._refill(g, now)
+        if now < g["pause_until"]:
+            return g["pause_until"] - now
+        if not priority and g["hp_waiting"] > 0:
+            return 0.02  # 우선 레인 대기자 먼저
+        if g["tokens"] >= 1.0:
+            g["tokens"] -= 1.0
+            return 0.0
+        return (1.0 - g["tokens"]) / g["rate"]
+
+    def acquire(self, group, priority=False, stage=None):
+        """블로킹 획득 (스레드 호출부). 반환: 대기 ms"""
+        t0 = time.time()
+        with self._cond:
+            g = self._group(group)
+            if priority:
+                g["hp_waiting"] += 1
+            try:
+                while True:
+                    wait = self._try_take(g, priority, time.time())
+                    if wait <= 0:
+                        break
+                    self._cond.wait(timeout=min(max(wait, 0.005), 0.25))
+            finally:
+                if priority:
+                    g["hp_waiting"] -= 1
+        waited_ms = (time.time() - t0) * 1000
+        self.observe(stage, group, waited_ms)
+        return waited_ms
+
+    def try_acquire(self, group, priority=False):
+        """논블로킹 획득 (asyncio 호출부). 반환: 0=획득 / 양수=이만큼 자고 재시도"""
+        with self._cond:
+            return self._try_take(self._group(group), priority, time.time())
+
+    def note_remaining(self, group, header):
+        """응답 Remaining-Req 반영 — 서버 잔여(sec)가 로컬 토큰보다 적으면 맞춤"""
+        _hdr_group, sec = _parse_remaining_req(header)
+        if sec is None:
+            return
+        with self._cond:
+            g = self._group(group)
+            self._refill(g, time.time())
+            g["hdr_sec"] = sec
+            if sec < g["tokens"]:
+                g["tokens"] = float(sec)
+            if sec <= 0:
+                # 이번 1초 창 소진 → 창 끝까지 정지
+                g["pause_until"] = max(g["pause_until"], time.time() + 1.0)
+
+    def on_429(self, group):
+        with self._cond:
+            g = self._group(group)
+            g["tokens"] = 0.0
+            g["n429"] += 1
+            g["pause_until"] = max(g["pause_until"], time.time() + self.pause_429_sec)
+
+    def observe(self, stage, group, waited_ms):
+        key = (stage or "other", group)
+        idx = len(self.hist_bounds)
+        for i, b in enumerate(self.hist_bounds):
+            if waited_ms <= b:
+                idx = i
+                break
+        with self._hist_lock:
+            h = self._hist.get(key)
+            if h is None:
+                h = self._hist[key] = {"b": [0] * (len(self.hist_bounds) + 1), "n": 0, "sum": 0.0}
+            h["b"][idx] += 1
+            h["n"] += 1
+            h["sum"] += waited_ms
+        if waited_ms >= 1 and _PROFILER.active:
+            _PROFILER.add(f"rl_wait:{group}", "rate_limit", time.time() - waited_ms / 1000,
+                          waited_ms / 1000, {"stage": stage or "other"})
+
+    def hist_snapshot(self):
+        with self._hist_lock:
+            return {k: {"b": list(v["b"]), "n": v["n"], "sum": v["sum"]} for k, v in self._hist.items()}
+
+    def hist_quantile(self, h, q):
+        """히스토그램 구간 상한으로 분위수 근사 (ms, 마지막 구간은 inf)"""
+        if not h["n"]:
+            return 0.0
+        need = h["n"] * q
+        acc = 0
+        for i, cnt in enumerate(h["b"]):
+            acc += cnt
+            if acc >= need:
+                return float(self.hist_bounds[i]) if i < len(self.hist_bounds) else float("inf")
+        return float("inf")
+
+    def status_str(self):
+        with self._cond:
             now = time.time()
-            delta = now - _BUCKET["last"]
-            _BUCKET["last"] = now
-            rate = max(float(_BUCKET.get("rate", 0.0)), 0.1)
-            cap = max(float(_BUCKET.get("cap", 1.0)), 1.0)
-            tokens = min(cap, max(0.0, _BUCKET["tokens"] + delta * rate))
-            if tokens >= 1.0:
-                _BUCKET["tokens"] = tokens - 1.0
-                return
-            _BUCKET["tokens"] = tokens
-            need = 1.0 - tokens
-        base_wait = need / rate
-        time.sleep(min(1.2, max(0.05, base_wait)) * (1.0 + 0.2 * rnd()))
+            parts = []
+            for name, g in sorted(self._groups.items()):
+                self._refill(g, now)
+                flag = "⏸" if now < g["pause_until"] else ""
+                hdr = "" if g["hdr_sec"] is None else f"/h{g['hdr_sec']}"
+                parts.append(f"{name}:{g['tokens']:.0f}{hdr}{flag}")
+        return "rl[" + " ".join(parts) + "]"
+
+
+_RATE_LIMITER = EndpointRateLimiter(RATE_LIMIT_GROUPS, pause_429_sec=RATE_LIMIT_429_PAUSE_SEC,
+                                    hist_bounds_ms=RATE_WAIT_HIST_BOUNDS_MS)
+
+
+def _throttle(group="default", priority=False):
+    """요청 1건 송신 전 레이트리밋 대기 (그룹별). stage = 현재 fetch tag"""
+    _RATE_LIMITER.acquire(group, priority=priority, stage=getattr(_FETCH_TAG_LOCAL, "tag", None)
+                          or ("order" if priority else None))
+    with _req_lock:
+        _req_budget_take_locked()
+
+
+# 🧵 탐지 파이프라인 요청 예산 (사이클당) — _throttle / 비동기 클라이언트 송신 시 차감
+# 예산 = candles 그룹 rate × DETECT_PIPE_BUDGET_SEC. 병렬 워커가 레이트리밋을 넘겨
+# 호출당 지연만 늘리는 것(과거 병렬화 실패 원인) 방지 → 소진 시 data 단계 skip (다음 shard에서 재탐지)
+_REQ_BUDGET = {"left": None, "spent": 0}
+_REQ_BUDGET_LOCAL = threading.local()
+
+
+def _req_budget_reset(n):
+    """사이클 시작 시 예산 재설정 (None = 무제한). 반환: 직전 사이클 소비량"""
+    with _req_lock:
+        spent = _REQ_BUDGET["spent"]
+        _REQ_BUDGET["left"] = n
+        _REQ_BUDGET["spent"] = 0
+    return spent
+
+
+def _req_budget_take_locked():
+    """🧵 탐지 파이프라인 워커 요청은 사이클 예산에서 차감 (_req_lock 보유 상태에서 호출)"""
+    if _REQ_BUDGET["left"] is not None and getattr(_REQ_BUDGET_LOCAL, "on", False):
+        _REQ_BUDGET["left"] -= 1
+        _REQ_BUDGET["spent"] += 1
+
+
+def _req_budget_ok():
+    with _req_lock:
+        return _REQ_BUDGET["left"] is None or _REQ_BUDGET["left"] > 0
 
 
 _SESSION_REFRESH_LOCK = threading.Lock()
@@ -9465,24 +11250,232 @@ def _refresh_session():
         pass
 
 
+# =========================================================
+# 🌐 비동기 HTTP 클라이언트 (asyncio — 전용 이벤트루프 스레드)
+# =========================================================
+# - keep-alive 커넥션 풀 (aiohttp TCPConnector / 미설치 시 requests SESSION 풀을 executor로)
+# - 송신 페이싱은 _RATE_LIMITER(엔드포인트 그룹별, Remaining-Req 헤더 동기화) 논블로킹 획득 + asyncio.sleep
+#   → 잔여 0이면 해당 그룹만 대기 (다른 그룹 요청은 그대로 진행)
+# - 동일 GET(같은 URL + params) 동시 요청은 in-flight 1건으로 합침 (모니터 여러 개가 같은 ticks 조회 등)
+# - 재시도/백오프는 asyncio.sleep (루프 블로킹 없음)
+# 동기 호출부는 _ahttp_get_json()(= upbit_get 내부) 래퍼로 그대로 동작 → 점진 마이그레이션
+try:
+    import aiohttp  # 옵션 — 없으면 requests 세션 풀을 executor로 사용
+except Exception:
+    aiohttp = None
+
+
+class AsyncUpbitClient:
+    """asyncio 기반 업비트 공개 API 클라이언트 (루프는 데몬 스레드 1개)"""
+
+    def __init__(self, pool_size=20, keepalive_sec=30, coalesce=True):
+        self.pool_size = pool_size
+        self.keepalive_sec = keepalive_sec
+        self.coalesce = coalesce
+        self.loop = None
+        self._thread = None
+        self._session = None
+        self._start_lock = threading.Lock()
+        # 아래 상태는 루프 스레드에서만 접근 (락 불필요)
+        self._inflight = {}    # 요청키 → asyncio.Task
+        self._conn_err = 0
+        self.stats = {"req": 0, "coalesced": 0, "rl_wait": 0, "rl_wait_ms": 0.0}
+
+    # ---------- 수명 ----------
+    def start(self):
+        with self._start_lock:
+            if self.loop is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self.loop.run_forever, name="ahttp", daemon=True)
+            self._thread.start()
+            print(f"[AHTTP] 시작 (backend={'aiohttp' if aiohttp else 'requests'} pool={self.pool_size})")
+
+    def close(self):
+        """종료 시 aiohttp 세션 정리 (atexit)"""
+        if self.loop is None or self._session is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self.loop).result(timeout=2)
+        except Exception:
+            pass
+
+    async def _get_session(self):
+        if aiohttp is None:
+            return None
+        if self._session is None or self._session.closed:
+            conn = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=self.keepalive_sec,
+                                        ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=conn, headers={
+                "User-Agent": "UpbitSniper/3.2.7-hh+...+netRetry"})
+        return self._session
+
+    async def _reset_session(self):
+        old, self._session = self._session, None
+        if old is not None:
+            try:
+                await old.close()
+            except Exception:
+                pass
+        print("[AHTTP] session refreshed")
+
+    # ---------- 레이트리밋 ----------
+    async def _acquire(self, group, stage):
+        """_RATE_LIMITER 논블로킹 획득 반복 (루프 스레드 블로킹 없음)"""
+        t0 = time.time()
+        while True:
+            wait = _RATE_LIMITER.try_acquire(group)
+            if wait <= 0:
+                break
+            await asyncio.sleep(min(max(wait, 0.005), 0.25))
+        waited_ms = (time.time() - t0) * 1000
+        if waited_ms >= 1:
+            self.stats["rl_wait"] += 1
+            self.stats["rl_wait_ms"] += waited_ms
+        _RATE_LIMITER.observe(stage, group, waited_ms)
+
+    # ---------- 요청 ----------
+    async def _send(self, url, params, timeout):
+        """1회 송신 → (status, headers, 본문 bytes|None)"""
+        session = await self._get_session()
+        if session is not None:
+            async with session.get(url, params=params,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+                raw = await r.read() if r.status == 200 else None
+                return r.status, r.headers, raw
+        # aiohttp 미설치: requests 세션 풀 (executor 스레드)
+        with _SESSION_REFRESH_LOCK:
+            _s = SESSION
+        r = await self.loop.run_in_executor(None, lambda: _s.get(url, params=params, timeout=timeout))
+        return r.status_code, r.headers, (r.content if r.status_code == 200 else None)
+
+    async def _get_json_once(self, url, params, timeout, retries, stage=None):
+        """→ (본문 bytes, 파싱 결과) or None. 파싱 실패는 오류로 재시도"""
+        group = _endpoint_group(url)
+        for attempt in range(retries):
+            try:
+                await self._acquire(group, stage)
+                self.stats["req"] += 1
+                status, headers, raw = await self._send(url, params, timeout)
+                _RATE_LIMITER.note_remaining(group, headers.get("Remaining-Req"))
+                if status == 429:
+                    REQ_STATS["http429"] += 1
+                    _RATE_LIMITER.on_429(group)
+                    await asyncio.sleep(min(0.5 * (2 ** attempt), 4.0))
+                    continue
+                if 500 <= status < 600:
+                    REQ_STATS["http5xx"] += 1
+                    await asyncio.sleep(0.35 * (2 ** attempt))
+                    continue
+                if status != 200:
+                    REQ_STATS["errors"] += 1
+                    if attempt == retries - 1:
+                        return None
+                    await asyncio.sleep(0.2 * (2 ** attempt))
+                    continue
+                body = json.loads(raw)
+                REQ_STATS["ok"] += 1
+                self._conn_err = 0
+                return raw, body
+            except asyncio.TimeoutError:
+                if attempt == retries - 1:
+                    return None
+                await asyncio.sleep(0.35 * (2 ** attempt))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                REQ_STATS["errors"] += 1
+                _is_conn = (aiohttp is not None and isinstance(e, aiohttp.ClientConnectionError)) or \
+                           isinstance(e, requests.exceptions.ConnectionError)
+                if _is_conn:
+                    REQ_STATS["conn_err"] += 1
+                    self._conn_err += 1
+                    if self._conn_err >= 3:
+                        self._conn_err = 0
+                        if aiohttp is not None:
+                            await self._reset_session()
+                        else:
+                            _refresh_session()
+                if attempt == retries - 1:
+                    return None
+                await asyncio.sleep(0.4 * (2 ** attempt))
+        return None
+
+    async def get_json(self, url, params=None, timeout=7, retries=3, stage=None):
+        """GET → JSON (실패 시 None). 동일 요청 in-flight 시 응답 공유.
+        합류한 대기자는 본문 bytes 를 각자 재파싱 → 호출부가 결과를 제자리 수정해도 서로 영향 없음
+        (요청을 띄운 대기자만 원본 파싱 결과 사용)."""
+        if not self.coalesce:
+            res = await self._get_json_once(url, params, timeout, retries, stage)
+            return res[1] if res else None
+        key = url + "?" + urlencode(sorted((params or {}).items()), doseq=True)
+        task = self._inflight.get(key)
+        joined = task is not None
+        if joined:
+            self.stats["coalesced"] += 1
+        else:
+            task = self.loop.create_task(self._get_json_once(url, params, timeout, retries, stage))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, _k=key: self._inflight.pop(_k, None))
+        # shield: 대기자 1명이 취소돼도 공유 요청은 계속
+        res = await asyncio.shield(task)
+        if res is None:
+            return None
+        return json.loads(res[0]) if joined else res[1]
+
+    def get_json_sync(self, url, params=None, timeout=7, retries=3):
+        """동기 래퍼 — 기존 스레드 호출부용 (루프 스레드에서 호출 금지)"""
+        self.start()
+        # stage(fetch tag)는 호출 스레드의 thread-local → 여기서 캡처해 루프로 전달
+        stage = getattr(_FETCH_TAG_LOCAL, "tag", None)
+        fut = asyncio.run_coroutine_threadsafe(self.get_json(url, params, timeout, retries, stage), self.loop)
+        try:
+            return fut.result(timeout=timeout * max(retries, 1) + 10)
+        except Exception:
+            fut.cancel()
+            return None
+
+    def status_str(self):
+        s = self.stats
+        return (f"req={s['req']} coalesced={s['coalesced']} rl_wait={s['rl_wait']}"
+                f"({s['rl_wait_ms']/1000:.1f}s)")
+
+
+_AHTTP = AsyncUpbitClient(pool_size=AHTTP_POOL_SIZE, keepalive_sec=AHTTP_KEEPALIVE_SEC,
+                          coalesce=AHTTP_COALESCE)
+atexit.register(_AHTTP.close)
+
+
+def _ahttp_get_json(url, params=None, timeout=7, retries=3):
+    """upbit_get 비동기 경로 — 탐지 파이프라인 요청 예산도 여기서 차감"""
+    with _req_lock:
+        _req_budget_take_locked()
+    return _AHTTP.get_json_sync(url, params, timeout=timeout, retries=retries)
+
+
 def upbit_get(url, params=None, timeout=7, retries=3):
     global _CONSEC_CONN_ERR
+    # 🛰️ 시세 허브 공유메모리 우선 (티커/오더북, 요청 마켓 전부 신선할 때만)
+    _hub_js = _md_hub_lookup(url, params)
+    if _hub_js is not None:
+        return _hub_js
+    if AHTTP_ENABLED:
+        # 🌐 비동기 클라이언트 경로 (헤더 기반 페이싱 + 동일 GET 합치기)
+        return _ahttp_get_json(url, params, timeout=timeout, retries=retries)
     for attempt in range(retries):
         try:
-            _throttle()
+            _group = _endpoint_group(url)
+            _throttle(_group)
             # 🔧 FIX 7차: SESSION 참조를 락으로 보호하여 캐시 (교체 중 닫힌 세션 사용 방지)
             with _SESSION_REFRESH_LOCK:
                 _s = SESSION
             r = _s.get(url, params=params, timeout=timeout)
+            _RATE_LIMITER.note_remaining(_group, r.headers.get("Remaining-Req"))
             if r.status_code == 429:
                 REQ_STATS["http429"] += 1
-                # 지수적 백오프 + 버킷 속도 하향(보다 공격적으로)
-                backoff = min(1.2 * (2**attempt), 6.0)
-                time.sleep(backoff)
-                # 🔧 FIX H2: 락 보호 (멀티스레드 429 캐스케이드 방지)
-                with _req_lock:
-                    _BUCKET["rate"] = max(3.0, _BUCKET["rate"] - 0.4)
-                    _BUCKET["cap"] = max(4.0, _BUCKET["cap"] - 0.5)
+                # 해당 그룹만 정지 (전역 rate 하향 없음) + 지수적 백오프
+                _RATE_LIMITER.on_429(_group)
+                time.sleep(min(1.2 * (2**attempt), 6.0))
                 continue
             if 500 <= r.status_code < 600:
                 REQ_STATS["http5xx"] += 1
@@ -9492,11 +11485,6 @@ def upbit_get(url, params=None, timeout=7, retries=3):
             REQ_STATS["ok"] += 1
             with _SESSION_REFRESH_LOCK:
                 _CONSEC_CONN_ERR = 0
-            # ✅ 429 후 점진 회복 (장기 성능 저하 방지)
-            # 🔧 FIX H2: 락 보호 (멀티스레드 동시 수정 방지)
-            with _req_lock:
-                _BUCKET["rate"] = min(4.5, float(_BUCKET.get("rate", 3.0)) + 0.10)
-                _BUCKET["cap"]  = min(6.0, float(_BUCKET.get("cap", 4.0)) + 0.10)
             return r.json()
         except requests.exceptions.Timeout:
             if attempt == retries - 1: return None
@@ -9543,6 +11531,7 @@ def safe_upbit_get(url, params=None, timeout=6, retries=1, backoff=1.5):
 def req_summary():
     print(
         f"[REQ] ok:{REQ_STATS['ok']}  429:{REQ_STATS['http429']}  5xx:{REQ_STATS['http5xx']}  err:{REQ_STATS['errors']}"
+        + (f"  | ahttp {_AHTTP.status_str()}" if AHTTP_ENABLED else "")
     )
 
 
@@ -9669,10 +11658,16 @@ _C60_CACHE_TTL_MS = 300_000  # 300s
 def _get_c60_cached(m, count=30):
     """c60 캐시 조회 (TTL 300s). detect_leader 경로 전용.
     miss 시 get_minutes_candles(60, m, count) 호출 후 캐시."""
+    _sc = _md_stream_candles(m, 60, count)
+    if _sc is not None:
+        _pipeline_inc("c60_stream_hit")
+        return _sc
     hit = _C60_CACHE.get(m)
     _now_ms = int(time.time() * 1000)
     if hit and (_now_ms - hit.get("ts", 0) <= _C60_CACHE_TTL_MS) and hit.get("count", 0) >= count:
         _pipeline_inc("c60_cache_hit")
+        if hit.get("pf"):
+            _pipeline_inc("c60_prefetch_hit")  # ⏰ 봉 경계 프리페치가 채운 항목
         cached = hit["c"]
         # count가 더 많이 캐시된 경우 뒤쪽 count만 반환 (최신 캔들 포함)
         return cached[-count:] if len(cached) > count else cached
@@ -9692,10 +11687,16 @@ _C15_CACHE_TTL_MS = 90_000  # 90s (v18h-tune2: 60s→90s, hit 45%→60%+ 기대)
 
 def _get_c15_cached(m, count=50):
     """c15 캐시 조회 (TTL 60s). detect_leader 경로 전용."""
+    _sc = _md_stream_candles(m, 15, count)
+    if _sc is not None:
+        _pipeline_inc("c15_stream_hit")
+        return _sc
     hit = _C15_CACHE.get(m)
     _now_ms = int(time.time() * 1000)
     if hit and (_now_ms - hit.get("ts", 0) <= _C15_CACHE_TTL_MS) and hit.get("count", 0) >= count:
         _pipeline_inc("c15_cache_hit")
+        if hit.get("pf"):
+            _pipeline_inc("c15_prefetch_hit")  # ⏰ 봉 경계 프리페치가 채운 항목
         cached = hit["c"]
         return cached[-count:] if len(cached) > count else cached
     _pipeline_inc("c15_cache_miss")
@@ -9714,11 +11715,18 @@ _C1_CACHE_TTL_MS = 45_000  # 45s (v18g-tune2: 15s→45s, c1 hit 0%→개선 목
 
 
 def _get_c1_cached(m, count=30):
-    """c1 캐시 조회 (TTL 15s). main scan loop ThreadPool 경로 전용."""
+    """c1 캐시 조회 (TTL 15s). main scan loop ThreadPool 경로 전용.
+    📡 스트림 live + 백필 완료 시 체결 증분 1분봉 반환 (TTL 지연 없음, 네트워크 0회)."""
+    _sc1 = _md_stream_candles(m, 1, count)
+    if _sc1 is not None:
+        _pipeline_inc("c1_stream_hit")
+        return _sc1
     hit = _C1_CACHE.get(m)
     _now_ms = int(time.time() * 1000)
     if hit and (_now_ms - hit.get("ts", 0) <= _C1_CACHE_TTL_MS) and hit.get("count", 0) >= count:
         _pipeline_inc("c1_cache_hit")
+        if hit.get("pf"):
+            _pipeline_inc("c1_prefetch_hit")  # ⏰ 봉 경계 프리페치가 채운 항목
         cached = hit["c"]
         return cached[-count:] if len(cached) > count else cached
     _pipeline_inc("c1_cache_miss")
@@ -9738,10 +11746,16 @@ _C5_DETECT_CACHE_TTL_MS = 60_000  # 60s (v18h-tune2: 45s→60s, hit 40%→60%+ 
 
 def _get_c5_cached(m, count=50):
     """c5 캐시 조회 (TTL 45s, count-aware). detect_leader 경로 전용."""
+    _sc = _md_stream_candles(m, 5, count)
+    if _sc is not None:
+        _pipeline_inc("c5_stream_hit")
+        return _sc
     hit = _C5_DETECT_CACHE.get(m)
     _now_ms = int(time.time() * 1000)
     if hit and (_now_ms - hit.get("ts", 0) <= _C5_DETECT_CACHE_TTL_MS) and hit.get("count", 0) >= count:
         _pipeline_inc("c5_cache_hit")
+        if hit.get("pf"):
+            _pipeline_inc("c5_prefetch_hit")  # ⏰ 봉 경계 프리페치가 채운 항목
         cached = hit["c"]
         return cached[-count:] if len(cached) > count else cached
     _pipeline_inc("c5_cache_miss")
@@ -9751,6 +11765,199 @@ def _get_c5_cached(m, count=50):
     return c5
 
 
+# =========================
+# ⏰ 봉 경계 정렬 캔들 프리페치
+# =========================
+# 1/5/15/60분봉 마감 직후 TOP_N(+보유) 마켓 캔들을 백그라운드에서 갱신해 _C*_CACHE에 채움
+# → detect_leader_stock은 인라인 fetch 지연 없이 방금 마감된 봉을 포함한 캔들을 캐시 hit로 받음
+# 작업은 (unit, market) 키 dict로 중복 제거 — 다음 경계가 오면 같은 키를 덮어씀 (밀린 작업 누적 없음)
+# 처리 순서 (예정 시각, 마켓 순위, unit) → 상위 마켓부터 전 TF 갱신
+# 봉 안 갱신: 캐시 TTL 은 fetch 시각 기준 (c15 90s / 봉 900s) → 경계 1회만이면 봉 대부분 구간은 다시 인라인 fetch.
+#   TTL × PREFETCH_REFRESH_FRAC 간격으로 재프리페치 라운드 (진행 중 봉 갱신, 만료 전 도착) — 경계 라운드보다 후순위
+# 속도 = candles 그룹 rate × PREFETCH_RATE_SHARE 균등 간격 (나머지 토큰은 인라인 fetch 몫)
+# fetch는 'prefetch' tag → _record_tagged_fetch로 c{tf}_prefetch 집계
+_PREFETCH_UNITS = (1, 5, 15, 60)
+
+
+def _prefetch_cache_for(unit):
+    return {1: _C1_CACHE, 5: _C5_DETECT_CACHE, 15: _C15_CACHE, 60: _C60_CACHE}[unit]
+
+
+def _prefetch_ttl_sec(unit):
+    return {1: _C1_CACHE_TTL_MS, 5: _C5_DETECT_CACHE_TTL_MS, 15: _C15_CACHE_TTL_MS, 60: _C60_CACHE_TTL_MS}[unit] / 1000
+
+
+class CandlePrefetcher:
+    def __init__(self, units=_PREFETCH_UNITS, counts=None, settle_sec=1.5, rate_share=0.5, ttls=None,
+                 refresh_frac=0.8):
+        self.units = tuple(units)
+        self.counts = dict(counts or {})
+        self.settle_sec = settle_sec
+        self.rate_share = rate_share
+        # unit -> 봉 안 재프리페치 간격 (초) / 그 간격 뒤에도 유효하려면 허용되는 최대 나이 (TTL - 간격)
+        self.refresh = {}
+        for u, ttl in (ttls or {}).items():
+            every = ttl * refresh_frac
+            if 0 < every < u * 60:
+                self.refresh[u] = (every, ttl - every)
+        self._lock = threading.Lock()
+        self._markets = []
+        self._jobs = {}        # (unit, m) -> (예정 시각, rank, 경계 라운드 여부)
+        self._next_due = {}    # unit -> 다음 봉 경계 (epoch 초, settle 미포함)
+        self._next_refresh = {}  # unit -> 다음 봉 안 재프리페치 시각 (다음 경계 전까지만)
+        self._round = {}       # unit -> [boundary, 남은 작업 수]
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"fetch": 0, "refresh": 0, "skip_stream": 0, "skip_fresh": 0, "superseded": 0, "err": 0}
+        self.lag = {}          # unit -> 마지막 라운드 완료까지 걸린 시간 (경계 기준, 초)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="prefetch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def set_markets(self, markets):
+        with self._lock:
+            self._markets = list(dict.fromkeys(markets))
+
+    def _interval(self):
+        return 1.0 / max(0.1, _RATE_LIMITER.rate("candles") * self.rate_share)
+
+    def _enqueue_due(self, now):
+        with self._lock:
+            markets = list(self._markets)
+            for u in self.units:
+                step = u * 60
+                due = self._next_due.get(u)
+                warmup = due is None
+                if warmup:
+                    # 시작 직후: 현재 봉 기준으로 1회 워밍업 (lag 집계 제외)
+                    due = self._next_due[u] = (now // step) * step
+                if now >= due + self.settle_sec:
+                    stale = [k for k in self._jobs if k[0] == u]
+                    if stale:
+                        self.stats["superseded"] += len(stale)
+                    for rank, m in enumerate(markets):
+                        self._jobs[(u, m)] = (due, rank, True)
+                    if not warmup:
+                        self._round[u] = [due, len(markets)]
+                    self._next_due[u] = (now // step + 1) * step
+                    if u in self.refresh:
+                        self._next_refresh[u] = now + self.refresh[u][0]
+                    continue
+                ref = self._next_refresh.get(u)
+                if ref is None or now < ref:
+                    continue
+                if ref >= self._next_due[u]:
+                    self._next_refresh.pop(u, None)   # 다음 경계 라운드가 대신 갱신
+                    continue
+                # 봉 안 재프리페치 — 아직 대기 중인 작업(경계 라운드 포함)은 그대로 둠
+                for rank, m in enumerate(markets):
+                    self._jobs.setdefault((u, m), (ref, rank, False))
+                self._next_refresh[u] = ref + self.refresh[u][0]
+
+    def _pop_job(self):
+        with self._lock:
+            if not self._jobs:
+                return None
+            key = min(self._jobs, key=lambda k: (self._jobs[k][0], self._jobs[k][1], k[0]))
+            due, _, edge = self._jobs.pop(key)
+            return key[0], key[1], due, edge
+
+    def _job_done(self, unit, boundary):
+        with self._lock:
+            r = self._round.get(unit)
+            if r and r[0] == boundary:
+                r[1] -= 1
+                if r[1] <= 0:
+                    self.lag[unit] = time.time() - boundary
+                    self._round.pop(unit, None)
+
+    def _run_job(self, unit, m, due, edge=True):
+        """반환: 네트워크 fetch 수행 여부 (skip이면 간격 대기 없이 다음 작업).
+        edge: 경계 라운드 (due = 봉 경계) / 봉 안 재프리페치 (due = 예정 시각)"""
+        cache = _prefetch_cache_for(unit)
+        count = self.counts.get(unit, 30)
+        try:
+            if _md_stream_candles(m, unit, count) is not None:
+                self.stats["skip_stream"] += 1
+                return False
+            hit = cache.get(m)
+            # 경계: 경계 이후 인라인 fetch 로 이미 갱신됨 / 봉 안: 다음 재프리페치 시각까지 TTL 안 남음
+            fresh_ms = (due + self.settle_sec) * 1000 if edge else (due - self.refresh[unit][1]) * 1000
+            if hit and hit.get("ts", 0) >= fresh_ms and hit.get("count", 0) >= count:
+                self.stats["skip_fresh"] += 1
+                return False
+            _now_ms = int(time.time() * 1000)
+            with _fetch_tag("prefetch"):
+                c = get_minutes_candles(unit, m, count) or []
+            if c:
+                cache.set(m, {"ts": _now_ms, "c": c, "count": count, "pf": True})
+            self.stats["fetch"] += 1
+            if not edge:
+                self.stats["refresh"] += 1
+            return True
+        except Exception as e:
+            self.stats["err"] += 1
+            print(f"[PREFETCH] {m} c{unit} 실패: {e}")
+            return True
+        finally:
+            if edge:
+                self._job_done(unit, due)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._enqueue_due(time.time())
+            job = self._pop_job()
+            if job is None:
+                with self._lock:
+                    nxt = min(self._next_due.values()) + self.settle_sec if self._next_due else time.time() + 1.0
+                    if self._next_refresh:
+                        nxt = min(nxt, min(self._next_refresh.values()))
+                self._stop.wait(min(max(0.05, nxt - time.time()), 1.0))
+                continue
+            if self._run_job(*job):
+                self._stop.wait(self._interval())
+
+    def status_str(self):
+        with self._lock:
+            pending = len(self._jobs)
+            lag = " ".join(f"c{u}:{self.lag[u]:.1f}s" for u in self.units if u in self.lag)
+        s = self.stats
+        return (f"prefetch fetch={s['fetch']}(refresh={s['refresh']}) "
+                f"skip(stream/fresh)={s['skip_stream']}/{s['skip_fresh']} "
+                f"superseded={s['superseded']} err={s['err']} pending={pending}" + (f" lag[{lag}]" if lag else ""))
+
+
+_PREFETCHER = None
+
+
+def _prefetch_ensure(markets):
+    """프리페치 스레드 시작 또는 대상 유니버스 갱신 (메인 루프 매 사이클). 보유 포지션 우선."""
+    global _PREFETCHER
+    if not PREFETCH_ENABLED:
+        return
+    with _POSITION_LOCK:
+        held = [k for k in OPEN_POSITIONS.keys()]
+    if _PREFETCHER is None:
+        _PREFETCHER = CandlePrefetcher(_PREFETCH_UNITS, PREFETCH_COUNTS, PREFETCH_SETTLE_SEC, PREFETCH_RATE_SHARE,
+                                       {u: _prefetch_ttl_sec(u) for u in _PREFETCH_UNITS}, PREFETCH_REFRESH_FRAC)
+        _PREFETCHER.set_markets(held + list(markets))
+        _PREFETCHER.start()
+        return
+    _PREFETCHER.set_markets(held + list(markets))
+
+
+def _prefetch_status_str():
+    p = _PREFETCHER
+    if p is None:
+        return "prefetch=off" if PREFETCH_ENABLED else "prefetch=disabled"
+    return p.status_str()
+
+
 def _quick_multitf_skip(c1):
     """c1 기반 보수적 필터 — 명백히 신호 불가능한 종목만 제거.
     조건: 최근 5분 거래대금 < 10M KRW (분당 2M 미만)
@@ -9840,6 +12047,765 @@ def relax_knob():
     return min(1.5, f)
 
 
+# =========================
+# 📡 실시간 시세 스트림 (WebSocket)
+# =========================
+# 업비트 WebSocket trade/orderbook/ticker를 TOP_N 유니버스 전체에 구독하고 마켓별 상태를 메모리에 유지.
+# - get_recent_ticks / fetch_orderbook_cache / _get_c1_cached → 스트림 live + 백필 완료 시 네트워크 0회
+# - 연결 끊김/stale(MD_STREAM_STALE_SEC) → 각 접근자가 기존 REST 경로로 자동 폴백
+# - 재연결 시 백필 상태 리셋 (끊긴 구간 데이터 누락 → REST로 1회 재동기화)
+# 로컬 테스트: python ws_replay_server.py --synthetic → MD_STREAM_URL=ws://127.0.0.1:8765
+try:
+    import websocket  # websocket-client (옵션 — 없으면 스트림 비활성, REST 폴링 유지)
+except Exception:
+    websocket = None
+
+
+def _candle_start_ms(ts_ms, unit):
+    """체결 ts(ms) → 해당 분봉 시작 ts(ms)"""
+    bar_ms = unit * 60000
+    return (int(ts_ms) // bar_ms) * bar_ms
+
+
+def _candle_start_ms_from_candle(c):
+    """REST 캔들 dict → 봉 시작 ts(ms). candle_date_time_utc 파싱 (실패 시 -1)"""
+    try:
+        s = c.get("candle_date_time_utc", "")
+        return int(datetime.strptime(s[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp() * 1000)
+    except Exception:
+        return -1
+
+
+def _new_candle_from_tick(market, unit, start_ms, price, volume, ts_ms):
+    """체결 1건으로 새 분봉 생성 (REST /candles/minutes 응답과 동일 키)"""
+    _utc = datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc)
+    return {
+        "market": market,
+        "candle_date_time_utc": _utc.strftime("%Y-%m-%dT%H:%M:%S"),
+        "candle_date_time_kst": (_utc + timedelta(hours=9)).strftime("%Y-%m-%dT%H:%M:%S"),
+        "opening_price": price,
+        "high_price": price,
+        "low_price": price,
+        "trade_price": price,
+        "timestamp": ts_ms,
+        "candle_acc_trade_price": price * volume,
+        "candle_acc_trade_volume": volume,
+        "unit": unit,
+    }
+
+
+def _fold_tick_into_candles(state, unit, tick):
+    """체결 1건을 분봉 상태에 반영 (in-place).
+    state = {"bars": deque(maxlen) 오래된→최신 캔들, "last_start": 마지막 봉 시작ms, "seed_ts": 백필 마지막 체결ms}
+    - 같은 봉: 고/저/종/누적 갱신
+    - 새 봉: append (링버퍼 — maxlen 초과 시 가장 오래된 봉 자동 제거)
+    - 지연 도착(과거 봉) / 백필에 이미 포함된 체결: 무시
+    """
+    ts = tick_ts_ms(tick)
+    p = float(tick.get("trade_price", 0) or 0)
+    v = float(tick.get("trade_volume", 0) or 0)
+    if ts <= 0 or p <= 0 or ts <= state.get("seed_ts", 0):
+        return
+    bars = state["bars"]
+    start = _candle_start_ms(ts, unit)
+    if bars and start == state["last_start"]:
+        c = bars[-1]
+        if p > c["high_price"]:
+            c["high_price"] = p
+        if p < c["low_price"]:
+            c["low_price"] = p
+        c["trade_price"] = p
+        c["timestamp"] = ts
+        c["candle_acc_trade_price"] += p * v
+        c["candle_acc_trade_volume"] += v
+    elif start > state["last_start"]:
+        bars.append(_new_candle_from_tick(tick.get("market", ""), unit, start, p, v, ts))
+        state["last_start"] = start
+
+
+class CandleAggregator:
+    """체결 스트림 → 마켓×분봉(1/5/15/60m) 링버퍼 증분 캔들
+
+    - REST 백필은 (마켓, 분봉)별 최초 조회 시 또는 갭(재연결) 이후 1회만
+    - 이후 모든 체결을 각 분봉 링버퍼에 접어 넣음 → 조회 시 네트워크 0회, TTL 지연 없음
+    - get()은 REST /candles/minutes 응답(reversed)과 동일한 list-of-dict 반환 (오래된→최신)
+    """
+
+    def __init__(self, units=(1, 5, 15, 60), maxlen=200):
+        self.units = tuple(units)
+        self.maxlen = maxlen
+        self.lock = threading.Lock()
+        self.state = {}  # (market, unit) -> {"bars", "last_start", "seed_ts"}
+        self.stats = {"backfills": 0, "gaps": 0, "hits": 0}
+
+    def on_tick(self, tick):
+        m = tick.get("market")
+        with self.lock:
+            for u in self.units:
+                st = self.state.get((m, u))
+                if st is not None:
+                    _fold_tick_into_candles(st, u, tick)
+
+    def get(self, m, unit, count):
+        """백필 완료 + count개 이상 보유 시 캔들 리스트, 아니면 None (호출자 REST 폴백)"""
+        with self.lock:
+            st = self.state.get((m, unit))
+            if st is None:
+                return None
+            bars = st["bars"]
+            n = len(bars)
+            if n < count:
+                return None
+            self.stats["hits"] += 1
+            out = list(itertools.islice(bars, n - count, n))
+        # 마지막(진행 중) 봉만 복사 — 이전 봉은 확정되어 변경 없음
+        if out:
+            out[-1] = dict(out[-1])
+        return out
+
+    def backfill(self, m, unit, candles, recent_ticks_desc=None):
+        """REST 캔들(오래된→최신)로 링버퍼 초기화.
+        recent_ticks_desc: 스트림이 이미 받은 체결(최신순) — 백필 응답 이후분을 재적용해 누락 방지"""
+        if unit not in self.units or not candles:
+            return
+        with self.lock:
+            cur = self.state.get((m, unit))
+            # 더 긴 버퍼가 이미 살아있으면 유지 (짧은 count 조회로 덮어쓰기 방지)
+            if cur is not None and len(cur["bars"]) >= len(candles):
+                return
+            bars = deque((dict(c) for c in candles[-self.maxlen:]), maxlen=self.maxlen)
+            last_start = _candle_start_ms_from_candle(bars[-1])
+            if last_start < 0:
+                return
+            st = {"bars": bars, "last_start": last_start,
+                  "seed_ts": int(bars[-1].get("timestamp", 0) or 0)}
+            for t in reversed(recent_ticks_desc or []):
+                _fold_tick_into_candles(st, unit, t)
+            self.state[(m, unit)] = st
+            self.stats["backfills"] += 1
+
+    def invalidate(self, m=None):
+        """갭 발생 (재연결/구독 변경) → 백필 상태 폐기, 다음 조회 시 REST 재백필"""
+        with self.lock:
+            if m is None:
+                if self.state:
+                    self.stats["gaps"] += 1
+                self.state.clear()
+            else:
+                for u in self.units:
+                    self.state.pop((m, u), None)
+
+    def seeded_count(self):
+        with self.lock:
+            return len(self.state)
+
+
+# =========================
+# 🧮 컬럼형 틱 저장소 (ts / price / volume / side NumPy 배열)
+# =========================
+# 테이프 지표(micro_tape_stats_from_ticks, calc_consecutive_buys, calc_flow_acceleration,
+# inter_arrival_stats, price_band_std, _win_stats, buy_decay_flag)가 같은 틱 dict 리스트를
+# 각자 tick_ts_ms()로 재스캔하던 것을 → 시간순 정렬 배열 1벌 + searchsorted 윈도우 경계로 대체.
+# - TickColumns: 정렬된 컬럼 + 윈도우별 집계 memo (같은 틱 스냅샷에서 5/15/30초 등 여러 번 조회해도 1회 계산)
+# - TickList: 기존 틱 dict 리스트와 호환되는 list + .cols (스트림 스냅샷이면 링버퍼에서 바로, 아니면 최초 조회 시 1회 변환)
+# - _TickRing: 마켓별 고정 크기 링버퍼 (2배 버퍼 → 최근 c개가 항상 연속 구간)
+# numpy 미설치 시 .cols=None → 각 함수 기존 dict 경로
+try:
+    import numpy as np  # (옵션 — 없으면 dict 기반 계산 유지)
+except Exception:
+    np = None
+
+
+class TickColumns:
+    __slots__ = ("ts", "price", "vol", "bid", "krw", "_memo")
+
+    def __init__(self, ts, price, vol, bid):
+        self.ts = ts          # int64 ms, 오름차순
+        self.price = price
+        self.vol = vol
+        self.bid = bid        # bool (ask_bid == "BID")
+        self.krw = price * vol
+        self._memo = {}
+
+    @classmethod
+    def from_ticks(cls, ticks):
+        n = len(ticks)
+        ts = np.fromiter((tick_ts_ms(t) for t in ticks), dtype=np.int64, count=n)
+        price = np.fromiter((t.get("trade_price") or 0.0 for t in ticks), dtype=np.float64, count=n)
+        vol = np.fromiter((t.get("trade_volume") or 0.0 for t in ticks), dtype=np.float64, count=n)
+        bid = np.fromiter((t.get("ask_bid") == "BID" for t in ticks), dtype=bool, count=n)
+        return cls.sorted_from(ts, price, vol, bid)
+
+    @classmethod
+    def sorted_from(cls, ts, price, vol, bid):
+        if len(ts) > 1 and (np.diff(ts) < 0).any():
+            order = np.argsort(ts, kind="stable")
+            ts, price, vol, bid = ts[order], price[order], vol[order], bid[order]
+        return cls(ts, price, vol, bid)
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def newest(self):
+        return int(self.ts[-1]) if len(self.ts) else 0
+
+    def _start(self, sec):
+        return int(np.searchsorted(self.ts, self.newest - sec * 1000, side="left"))
+
+    def tape(self, sec):
+        """micro_tape_stats_from_ticks 동일 결과 (age만 호출 시각 기준 재계산)"""
+        key = ("tape", sec)
+        base = self._memo.get(key)
+        if base is None:
+            s = self._start(sec)
+            n = len(self.ts) - s
+            if n <= 0:
+                base = None
+            else:
+                newest = self.newest
+                krw = float(self.krw[s:].sum())
+                tick_span = max((newest - int(self.ts[s])) / 1000.0, 1.0)
+                duration = max(float(sec), tick_span)
+                base = {"krw": krw, "n": n, "buy_ratio": int(self.bid[s:].sum()) / n,
+                        "rate": n / duration, "krw_per_sec": krw / duration}
+            self._memo[key] = base
+        if base is None:
+            return {"krw": 0, "n": 0, "buy_ratio": 0, "age": 999, "rate": 0, "krw_per_sec": 0}
+        newest = self.newest
+        out = dict(base)
+        out["age"] = (int(time.time() * 1000) - newest) / 1000.0 if newest else 999
+        return out
+
+    def tape_windows(self, secs=(5, 15, 30)):
+        """여러 윈도우 테이프 지표를 한 번에 — {sec: micro_tape_stats}"""
+        return {sec: self.tape(sec) for sec in secs}
+
+    def consecutive_buys(self, sec):
+        b = self.bid[self._start(sec):]
+        if not len(b):
+            return 0
+        edges = np.concatenate(([-1], np.flatnonzero(~b), [len(b)]))
+        return int(np.diff(edges).max()) - 1
+
+    def inter_arrival(self, sec):
+        w = self.ts[self._start(sec):]
+        if len(w) < 4:
+            return {"cv": None, "count": len(w)}
+        gaps = np.diff(w) / 1000.0
+        mu = float(gaps.mean())
+        if mu <= 0:
+            return {"cv": None, "count": len(w)}
+        var = float(((gaps - mu) ** 2).mean())
+        return {"cv": (var ** 0.5) / mu, "count": len(w)}
+
+    def price_band_std(self, sec):
+        ps = self.price[self._start(sec):]
+        ps = ps[ps > 0]
+        if len(ps) < 3:
+            return None
+        mu = float(ps.mean())
+        var = float(((ps - mu) ** 2).mean())
+        return (var ** 0.5) / max(mu, 1)
+
+    def win_stats(self, start_s, end_s):
+        newest = self.newest
+        a = int(np.searchsorted(self.ts, newest - end_s * 1000, side="left"))
+        b = int(np.searchsorted(self.ts, newest - start_s * 1000, side="right"))
+        n = max(b - a, 0)
+        if n < 2:
+            return {"n": n, "buy_ratio": 0.0, "rate": 0.0, "krw_per_sec": 0.0}
+        tick_span = max((int(self.ts[b - 1]) - int(self.ts[a])) / 1000.0, 1.0)
+        dur = max(max(end_s - start_s, 1.0), tick_span)
+        return {"n": n, "buy_ratio": int(self.bid[a:b].sum()) / max(n, 1),
+                "rate": n / dur, "krw_per_sec": float(self.krw[a:b].sum()) / dur}
+
+
+class TickList(list):
+    """틱 dict 리스트 (최신순, 기존 코드 그대로 사용) + 컬럼 뷰 .cols"""
+    __slots__ = ("_cols",)
+
+    def __init__(self, ticks=(), cols=None):
+        super().__init__(ticks)
+        self._cols = cols
+
+    @property
+    def cols(self):
+        if self._cols is None and np is not None and len(self):
+            self._cols = TickColumns.from_ticks(self)
+        return self._cols
+
+
+def _tick_cols(ticks):
+    """TickList면 컬럼 뷰, 아니면 None (일반 list는 기존 dict 경로 — 1회성 변환 비용이 재스캔보다 큼)"""
+    if np is None or not ticks or not isinstance(ticks, TickList):
+        return None
+    return ticks.cols
+
+
+class _TickRing:
+    """마켓별 틱 컬럼 링버퍼 — 각 원소를 i, i+cap 두 곳에 기록해 최근 c개를 항상 연속 슬라이스로 조회"""
+    __slots__ = ("cap", "w", "ts", "price", "vol", "bid")
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.w = 0
+        self.ts = np.zeros(2 * cap, dtype=np.int64)
+        self.price = np.zeros(2 * cap, dtype=np.float64)
+        self.vol = np.zeros(2 * cap, dtype=np.float64)
+        self.bid = np.zeros(2 * cap, dtype=bool)
+
+    def append(self, t):
+        i = self.w % self.cap
+        ts, p, v, b = tick_ts_ms(t), t.get("trade_price") or 0.0, t.get("trade_volume") or 0.0, t.get("ask_bid") == "BID"
+        for j in (i, i + self.cap):
+            self.ts[j] = ts
+            self.price[j] = p
+            self.vol[j] = v
+            self.bid[j] = b
+        self.w += 1
+
+    def reset(self, ticks_desc):
+        self.w = 0
+        for t in reversed(ticks_desc[:self.cap]):
+            self.append(t)
+
+    def snapshot(self, c):
+        """최근 c개 → TickColumns (복사본 — 이후 append와 무관)"""
+        n = min(c, self.w, self.cap)
+        e = self.w if self.w <= self.cap else (self.w - 1) % self.cap + 1 + self.cap
+        sl = slice(e - n, e)
+        return TickColumns.sorted_from(self.ts[sl].copy(), self.price[sl].copy(),
+                                       self.vol[sl].copy(), self.bid[sl].copy())
+
+
+# 체결 수신 콜백 (market, tick) — 스트림 스레드에서 호출되므로 가볍게 (⚡ 청산 엔진 깨우기 등)
+_MD_TRADE_LISTENERS = []
+
+
+class MarketDataStream:
+    """업비트 WebSocket 시세 스트림 — 마켓별 인메모리 상태 (REST 응답과 동일 포맷으로 보관)
+
+    - ticks: 최신순 deque (REST /trades/ticks 형태)
+    - orderbooks: REST /orderbook 형태
+    - tickers: REST /ticker 형태
+    - candles: 체결로 접어 만든 1/5/15/60분봉 링버퍼 (CandleAggregator)
+    """
+
+    def __init__(self, url, tick_maxlen=500, candle_maxlen=200):
+        self.url = url
+        self.tick_maxlen = tick_maxlen
+        self.candle_maxlen = candle_maxlen
+        self.lock = threading.Lock()
+        self.codes = []
+        self.ticks = {}
+        self.tick_cols = {}       # 🧮 market -> _TickRing (ticks deque와 동일 내용, numpy 있을 때만)
+        self.tick_seeded = set()
+        self.orderbooks = {}
+        self.tickers = {}
+        self.candles = CandleAggregator(MD_STREAM_CANDLE_UNITS, candle_maxlen)
+        self.connected = False
+        self.connected_ts = 0.0
+        self.last_msg_ts = 0.0
+        self.stats = {"msgs": 0, "trade": 0, "orderbook": 0, "ticker": 0,
+                      "reconnects": 0, "errors": 0}
+        self._ws = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._capture_fp = None
+
+    # ---- 연결 관리 ----
+    def start(self, codes):
+        with self.lock:
+            self.codes = sorted(set(codes))
+        if MD_STREAM_CAPTURE_PATH:
+            try:
+                self._capture_fp = open(MD_STREAM_CAPTURE_PATH, "a", encoding="utf-8")
+            except Exception as e:
+                print(f"[MD_STREAM] 캡처 파일 열기 실패: {e}")
+        self._thread = threading.Thread(target=self._run, daemon=True, name="MDStream")
+        self._thread.start()
+        print(f"[MD_STREAM] 시작: {self.url} ({len(self.codes)}개 마켓)")
+
+    def update_codes(self, codes):
+        """구독 유니버스 변경 → 재연결로 재구독 (업비트는 요청 단위로 구독 교체)"""
+        new_codes = sorted(set(codes))
+        with self.lock:
+            if new_codes == self.codes:
+                return
+            self.codes = new_codes
+            ws = self._ws
+        print(f"[MD_STREAM] 구독 변경 → 재연결 ({len(new_codes)}개 마켓)")
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def stop(self):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def is_live(self):
+        return self.connected and (time.time() - self.last_msg_ts) <= MD_STREAM_STALE_SEC
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._ws = websocket.WebSocketApp(
+                    self.url,
+                    on_open=self._on_open,
+                    on_message=self._on_message,
+                    on_error=self._on_error,
+                    on_close=self._on_close,
+                )
+                self._ws.run_forever(ping_interval=30, ping_timeout=10)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[MD_STREAM_ERR] {e}")
+            self.connected = False
+            if self._stop.is_set():
+                break
+            self.stats["reconnects"] += 1
+            time.sleep(MD_STREAM_RECONNECT_SEC)
+
+    def _on_open(self, ws):
+        with self.lock:
+            codes = list(self.codes)
+            # 끊긴 구간 누락 → 백필 상태 리셋 (다음 조회 시 REST로 1회 재동기화)
+            self.tick_seeded.clear()
+            self.orderbooks.clear()
+        self.candles.invalidate()
+        req = [
+            {"ticket": f"bot-{uuid.uuid4().hex[:12]}"},
+            {"type": "trade", "codes": codes},
+            {"type": "orderbook", "codes": codes},
+            {"type": "ticker", "codes": codes},
+            {"format": "DEFAULT"},
+        ]
+        ws.send(json.dumps(req))
+        self.connected = True
+        self.connected_ts = time.time()
+        self.last_msg_ts = time.time()
+        print(f"[MD_STREAM] 연결됨 ({len(codes)}개 마켓 구독)")
+
+    def _on_error(self, ws, err):
+        self.stats["errors"] += 1
+        print(f"[MD_STREAM_ERR] {err}")
+
+    def _on_close(self, ws, *args):
+        self.connected = False
+
+    def _on_message(self, ws, message):
+        try:
+            if isinstance(message, bytes):
+                message = message.decode("utf-8")
+            d = json.loads(message)
+        except Exception:
+            self.stats["errors"] += 1
+            return
+        now = time.time()
+        self.last_msg_ts = now
+        self.stats["msgs"] += 1
+        if self._capture_fp is not None:
+            try:
+                self._capture_fp.write(json.dumps({"t": now, "msg": d}, ensure_ascii=False) + "\n")
+            except Exception:
+                pass
+        typ = d.get("type") or d.get("ty")
+        if typ == "trade":
+            self._on_trade(d)
+        elif typ == "orderbook":
+            self._on_orderbook(d)
+        elif typ == "ticker":
+            self._on_ticker(d)
+
+    # ---- 메시지 → REST 포맷 변환 ----
+    def _on_trade(self, d):
+        m = d.get("code")
+        if not m:
+            return
+        tick = {
+            "market": m,
+            "trade_date_utc": d.get("trade_date"),
+            "trade_time_utc": d.get("trade_time"),
+            "timestamp": d.get("trade_timestamp") or d.get("timestamp"),
+            "trade_price": d.get("trade_price", 0),
+            "trade_volume": d.get("trade_volume", 0),
+            "prev_closing_price": d.get("prev_closing_price"),
+            "change_price": d.get("change_price"),
+            "ask_bid": d.get("ask_bid"),
+            "sequential_id": d.get("sequential_id"),
+        }
+        self.stats["trade"] += 1
+        with self.lock:
+            dq = self.ticks.get(m)
+            if dq is None:
+                dq = deque(maxlen=self.tick_maxlen)
+                self.ticks[m] = dq
+            dq.appendleft(tick)
+            if np is not None:
+                ring = self.tick_cols.get(m)
+                if ring is None:
+                    ring = self.tick_cols[m] = _TickRing(self.tick_maxlen)
+                ring.append(tick)
+        self.candles.on_tick(tick)
+        for fn in _MD_TRADE_LISTENERS:
+            try:
+                fn(m, tick)
+            except Exception as e:
+                print(f"[MD_STREAM_ERR] trade listener: {e}")
+
+    def _on_orderbook(self, d):
+        m = d.get("code")
+        if not m:
+            return
+        ob = {
+            "market": m,
+            "timestamp": d.get("timestamp"),
+            "total_ask_size": d.get("total_ask_size"),
+            "total_bid_size": d.get("total_bid_size"),
+            "orderbook_units": d.get("orderbook_units") or [],
+        }
+        self.stats["orderbook"] += 1
+        with self.lock:
+            self.orderbooks[m] = ob
+
+    def _on_ticker(self, d):
+        m = d.get("code")
+        if not m:
+            return
+        tk = {k: v for k, v in d.items() if k not in ("type", "code", "stream_type")}
+        tk["market"] = m
+        self.stats["ticker"] += 1
+        with self.lock:
+            self.tickers[m] = tk
+
+    # ---- 조회 (None = 스트림으로 응답 불가 → 호출자가 REST 폴백) ----
+    def get_ticks(self, m, c=100):
+        with self.lock:
+            if m not in self.tick_seeded:
+                return None
+            dq = self.ticks.get(m)
+            if dq is None:
+                return TickList()
+            ring = self.tick_cols.get(m)
+            return TickList(itertools.islice(dq, c), ring.snapshot(c) if ring is not None else None)
+
+    def seed_ticks(self, m, ticks_desc):
+        """REST 틱(최신순)으로 백필 — 스트림 수신분과 sequential_id 기준 병합"""
+        if m not in self.codes or not self.connected:
+            return
+        with self.lock:
+            dq = self.ticks.get(m) or deque(maxlen=self.tick_maxlen)
+            merged = {}
+            for t in list(dq) + list(ticks_desc):
+                key = t.get("sequential_id") or (tick_ts_ms(t), t.get("trade_price"), t.get("trade_volume"))
+                merged.setdefault(key, t)
+            rows = sorted(merged.values(), key=tick_ts_ms, reverse=True)
+            self.ticks[m] = deque(rows[:self.tick_maxlen], maxlen=self.tick_maxlen)
+            if np is not None:
+                ring = self.tick_cols.get(m)
+                if ring is None:
+                    ring = self.tick_cols[m] = _TickRing(self.tick_maxlen)
+                ring.reset(rows)
+            self.tick_seeded.add(m)
+
+    def get_orderbook(self, m):
+        with self.lock:
+            return self.orderbooks.get(m)
+
+    def get_ticker(self, m):
+        with self.lock:
+            return self.tickers.get(m)
+
+    def get_candles(self, m, unit, count):
+        return self.candles.get(m, unit, count)
+
+    def backfill_candles(self, m, unit, candles):
+        """REST 캔들로 (마켓, 분봉) 링버퍼 백필 — 스트림 수신 체결 재적용 포함"""
+        if m not in self.codes or not self.connected:
+            return
+        with self.lock:
+            recent = list(self.ticks.get(m) or [])
+        self.candles.backfill(m, unit, candles, recent)
+
+    def status_str(self):
+        age = time.time() - self.last_msg_ts if self.last_msg_ts else -1
+        return (f"md_stream={'live' if self.is_live() else 'down'} codes={len(self.codes)} "
+                f"age={age:.1f}s msgs={self.stats['msgs']} reconn={self.stats['reconnects']} "
+                f"seeded(tick/candle)={len(self.tick_seeded)}/{self.candles.seeded_count()} "
+                f"backfill={self.candles.stats['backfills']} gap={self.candles.stats['gaps']}")
+
+
+_MD_STREAM = None
+_MD_STREAM_LOCK = threading.Lock()
+
+
+def _md_stream_ensure(markets):
+    """스트림 시작 또는 구독 유니버스 갱신 (메인 루프에서 매 사이클 호출 — 변경 없으면 no-op)
+    보유 포지션 + BTC(시장 필터)는 TOP_N 밖이어도 구독에 포함."""
+    global _MD_STREAM
+    if not MD_STREAM_ENABLED or websocket is None:
+        return
+    with _POSITION_LOCK:
+        held = [k for k in OPEN_POSITIONS.keys()]
+    codes = list(markets) + held + ["KRW-BTC"]
+    with _MD_STREAM_LOCK:
+        if _MD_STREAM is None:
+            _MD_STREAM = MarketDataStream(MD_STREAM_URL, MD_STREAM_TICK_MAXLEN, MD_STREAM_CANDLE_MAXLEN)
+            _MD_STREAM.start(codes)
+            return
+    _MD_STREAM.update_codes(codes)
+
+
+def _md_stream_live():
+    s = _MD_STREAM
+    return s if (s is not None and s.is_live()) else None
+
+
+def _md_stream_ticks(m, c):
+    s = _md_stream_live()
+    return s.get_ticks(m, c) if s else None
+
+
+def _md_stream_orderbook(m):
+    s = _md_stream_live()
+    return s.get_orderbook(m) if s else None
+
+
+def _md_stream_candles(m, unit, count):
+    s = _md_stream_live()
+    return s.get_candles(m, unit, count) if s else None
+
+
+def _md_stream_status_str():
+    s = _MD_STREAM
+    if s is None:
+        return "md_stream=off" if (MD_STREAM_ENABLED and websocket is not None) else "md_stream=disabled"
+    return s.status_str()
+
+
+# =========================
+# 🛰️ 시세 허브 (md_hub.py 공유메모리) — 티커/오더북 REST 대체
+# =========================
+# md_hub.py 가 거래소 연결 1개로 전체 KRW 티커/오더북/체결을 공유메모리에 게시 (모멘텀 스캐너와 공용).
+# upbit_get / safe_upbit_get 의 /v1/ticker, /v1/orderbook 요청은 요청 마켓 전부 허브에서 신선하면 네트워크 0회.
+# 허브 미기동/정지/마켓 누락 → None → 기존 REST 경로 그대로 (동작 변화 없음).
+try:
+    from md_hub_client import MdHubReader  # 같은 디렉터리 (multiprocessing.shared_memory)
+except Exception:
+    MdHubReader = None
+
+_MD_HUB = MdHubReader(MD_HUB_NAME, MD_HUB_MAX_AGE_SEC) if (MD_HUB_ENABLED and MdHubReader is not None) else None
+_MD_HUB_LOCK = threading.Lock()  # 리더 인덱스/통계는 스레드 안전하지 않음 → 짧게 직렬화 (읽기 자체는 수 μs)
+_MD_HUB_ALIVE = {"ts": 0.0, "ok": False}
+
+
+def _md_hub_live():
+    """허브 생존 여부 (1초 캐시 — 하트비트 끊기면 리더가 재매핑 시도)"""
+    if _MD_HUB is None:
+        return None
+    now = time.time()
+    if now - _MD_HUB_ALIVE["ts"] >= 1.0:
+        with _MD_HUB_LOCK:
+            _MD_HUB_ALIVE["ok"] = _MD_HUB.alive()
+        _MD_HUB_ALIVE["ts"] = now
+    return _MD_HUB if _MD_HUB_ALIVE["ok"] else None
+
+
+def _md_hub_lookup(url, params):
+    """/v1/ticker, /v1/orderbook 요청 → 허브 값으로 REST 응답 리스트 구성 (하나라도 없으면 None)"""
+    if _MD_HUB is None or not params or not isinstance(params, dict):
+        return None
+    _group = _endpoint_group(url)
+    if _group not in ("ticker", "orderbook") or set(params) != {"markets"}:
+        return None
+    hub = _md_hub_live()
+    if hub is None:
+        return None
+    mkts = [x.strip() for x in str(params["markets"]).split(",") if x.strip()]
+    if not mkts:
+        return None
+    with _MD_HUB_LOCK:
+        if _group == "ticker":
+            out = hub.tickers(mkts)
+        else:
+            out = []
+            for m in mkts:
+                ob = hub.orderbook(m)
+                if ob is None:
+                    return None
+                out.append(ob)
+    if out:
+        _pipeline_inc("md_hub_hit")
+    return out or None
+
+
+def _md_hub_status_str():
+    if _MD_HUB is None:
+        return "md_hub=disabled" if MD_HUB_ENABLED else "md_hub=off"
+    with _MD_HUB_LOCK:
+        return _MD_HUB.status_str()
+
+
+# =========================
+# 💾 로컬 캔들 저장소 (candle_store.py) — 마감봉 이력 재사용
+# =========================
+# REST 캔들 응답의 마감된 봉을 디스크(mmap)에 누적 → 다음 조회부터 마지막 마감봉 이후 봉만 REST 로 받고 이어붙임.
+# 커버리지 구간 안의 이력은 빠짐없음이 보장되므로 결과는 count 전체 REST 조회와 동일.
+# 이력 부족/커버리지 끊김/저장소 오류 → 기존 count 전체 조회.
+try:
+    from candle_store import CandleStore
+except Exception:
+    CandleStore = None
+
+_CANDLE_STORE = CandleStore(CANDLE_STORE_DIR) if (CANDLE_STORE_ENABLED and CandleStore is not None) else None
+
+
+def _candle_store_base(u, m, c):
+    """저장소 이력으로 채울 수 있으면 (이력 봉 리스트, REST 로 받을 최근 봉 수, 상장 시점까지 이력 여부),
+    아니면 ([], c, False). 최근 봉 수 = 마지막 커버리지 이후 봉 슬롯 수 (빈 분 포함 상한)
+    + 마지막 커버리지 봉 1개 재조회 (마감 유예 직후 기록돼 늦게 반영된 체결이 빠졌을 수 있음 → write 가 덮어씀)"""
+    if _CANDLE_STORE is None or c < CANDLE_STORE_MIN_COUNT:
+        return [], c, False
+    try:
+        cov = _CANDLE_STORE.coverage(m, u)
+        if not cov:
+            return [], c, False
+        a, b = cov[-1]
+        bar = u * 60000
+        slots = int((int(time.time() * 1000) // bar * bar - b) // bar) + 1
+        if slots < 2 or slots >= c:
+            return [], c, False
+        base = _CANDLE_STORE.read(m, u, start_ms=a, end_ms=b, count=c)
+        if len(base) < c - slots and a != 0:
+            return [], c, False
+        return base, slots, a == 0
+    except Exception as e:
+        print(f"[CANDLE_STORE] {m} m{u} 읽기 실패: {e}")
+        return [], c, False
+
+
+def _candle_store_put(u, m, js, n):
+    """REST 최신 페이지(최신순) → 마감봉 기록 + 커버리지 연장"""
+    try:
+        _CANDLE_STORE.write(m, u, js, history_start=len(js) < n)
+    except Exception as e:
+        print(f"[CANDLE_STORE] {m} m{u} 기록 실패: {e}")
+
+
+def _candle_store_status_str():
+    if _CANDLE_STORE is None:
+        return "candle_store=off"
+    return _CANDLE_STORE.status_str()
+
+
 # =========================
 # 데이터 수집/캐시
 # =========================
@@ -9853,6 +12819,22 @@ def get_top_krw_by_24h(n=TOP_N):
     with _MKTS_CACHE_LOCK:
         if _MKTS_CACHE["mkts"] and (now - _MKTS_CACHE["ts"] <= MKTS_CACHE_TTL):
             return list(_MKTS_CACHE["mkts"][:n])  # 🔧 FIX: 복사본 반환 (락 밖 변경 방지)
+    # 🛰️ 시세 허브가 전체 KRW 티커 보유 → market/all + 티커 배치 REST 생략
+    _hub = _md_hub_live()
+    if _hub is not None:
+        with _MD_HUB_LOCK:
+            _hub_ticks = _hub.tickers()
+        if _hub_ticks:
+            acc = [(t["market"], t["acc_trade_price_24h"]) for t in _hub_ticks
+                   if t["market"].startswith("KRW-") and t["acc_trade_price_24h"] > 0]
+            if acc:
+                _pipeline_inc("md_hub_hit")
+                acc.sort(key=lambda x: x[1], reverse=True)
+                mkts = [m for m, _ in acc]
+                with _MKTS_CACHE_LOCK:
+                    _MKTS_CACHE["mkts"] = mkts
+                    _MKTS_CACHE["ts"] = time.time()
+                return mkts[:n]
     # 캐시 미스 → API 호출 (락 밖에서 실행 — 블로킹 방지)
     _raw_mkts = upbit_get("https://api.upbit.com/v1/market/all")
     allm = [
@@ -9877,14 +12859,39 @@ def get_top_krw_by_24h(n=TOP_N):
 
 
 def get_minutes_candles(u, m, c):
+    # 📡 체결 증분 캔들 링버퍼 우선 (1/5/15/60m, 백필 완료 + count 충족 시 네트워크 0회)
+    _agg = _md_stream_candles(m, u, c)
+    if _agg is not None:
+        return _agg
+    # 💾 저장소에 이어지는 마감봉 이력 → 그 이후 봉만 REST 조회
+    _base, _n, _hist = _candle_store_base(u, m, c)
     _t_gmc = time.time()
     js = upbit_get(f"https://api.upbit.com/v1/candles/minutes/{u}", {
         "market": m,
-        "count": c
+        "count": _n
     },
                    timeout=3, retries=2)
-    _record_tagged_fetch(u, (time.time() - _t_gmc) * 1000)
-    return list(reversed(js)) if js else []
+    _record_tagged_fetch(u, (time.time() - _t_gmc) * 1000, m)
+    candles = list(reversed(js)) if js else []
+    if candles and _CANDLE_STORE is not None:
+        _candle_store_put(u, m, js, _n)
+        if _base:
+            _head = candles[0].get("candle_date_time_utc", "")
+            candles = [x for x in _base if x["candle_date_time_utc"] < _head] + candles
+            if len(candles) >= c or _hist:
+                candles = candles[-c:]
+                _pipeline_inc("candle_store_hit")
+            else:
+                # 최근 슬롯에 빈 분이 있어 이력 부족 → count 전체 조회 (커버리지 시작 직후 1회성)
+                js = upbit_get(f"https://api.upbit.com/v1/candles/minutes/{u}", {"market": m, "count": c},
+                               timeout=3, retries=2)
+                candles = list(reversed(js)) if js else []
+                if candles:
+                    _candle_store_put(u, m, js, c)
+    # 📡 최초/갭 이후 REST 결과로 링버퍼 백필 (이후 조회는 스트림 증분)
+    if candles and _MD_STREAM is not None:
+        _MD_STREAM.backfill_candles(m, u, candles)
+    return candles
 
 def tick_ts_ms(t):
     """틱 타임스탬프 추출 (ms 단위, timestamp/ts 키 통일 + 초→ms 방어)"""
@@ -9897,14 +12904,19 @@ def tick_ts_ms(t):
 
 
 def get_recent_ticks(m, c=100, allow_network=True):
+    # 📡 스트림 우선: live + 백필 완료 마켓은 네트워크 0회
+    _st = _md_stream_ticks(m, c)
+    if _st is not None:
+        _pipeline_inc("tick_stream_hit")
+        return _st
     _MAX_TICKS = 100  # 🔧 FIX: 항상 최대치로 요청, 캐시에 최대치 저장
     now_ms = int(time.time() * 1000)
     hit = _TICKS_CACHE.get(m)
     if hit and (now_ms - hit["ts"] <= _TICKS_TTL * 1000):
         _pipeline_inc("tick_cache_hit")
-        return hit["ticks"][:c]  # 🔧 요청 수만큼 slice 반환
+        return TickList(hit["ticks"][:c])  # 🔧 요청 수만큼 slice 반환 (🧮 컬럼 뷰는 최초 지표 조회 시 1회 변환)
     if not allow_network:
-        return hit["ticks"][:c] if hit else []
+        return TickList(hit["ticks"][:c] if hit else [])
     _pipeline_inc("tick_cache_miss")
 
     _t_tick = time.time()
@@ -9915,16 +12927,22 @@ def get_recent_ticks(m, c=100, allow_network=True):
     },
                         timeout=6)
     _tick_ms = (time.time() - _t_tick) * 1000
-    _record_tagged_fetch("tick", _tick_ms)
+    _record_tagged_fetch("tick", _tick_ms, m)
 
     if not js or not isinstance(js, list):
-        return hit["ticks"][:c] if hit else []
+        return TickList(hit["ticks"][:c] if hit else [])
     # 🔧 FIX: tick_ts_ms 통일 (timestamp/ts 키 혼재 + 초/ms 방어)
     js_sorted = sorted(js, key=tick_ts_ms, reverse=True)
     _TICKS_CACHE.set(m, {"ts": now_ms, "ticks": js_sorted})
-    return js_sorted[:c]  # 🔧 요청 수만큼 slice 반환
+    # 📡 스트림 백필 (이후 이 마켓은 스트림에서 응답)
+    if _MD_STREAM is not None:
+        _MD_STREAM.seed_ticks(m, js_sorted)
+    return TickList(js_sorted[:c])  # 🔧 요청 수만큼 slice 반환
 
 def micro_tape_stats_from_ticks(ticks, sec):
+    _tc = _tick_cols(ticks)
+    if _tc is not None:
+        return _tc.tape(sec)
     if not ticks:
         return {
             "krw": 0,
@@ -9991,6 +13009,14 @@ def micro_tape_stats_from_ticks(ticks, sec):
     }
 
 
+def tick_tape_windows(ticks, secs=(5, 15, 30)):
+    """여러 윈도우의 micro_tape_stats를 한 번에 — {sec: stats}. 🧮 TickList면 컬럼 1회 집계"""
+    _tc = _tick_cols(ticks)
+    if _tc is not None:
+        return _tc.tape_windows(secs)
+    return {sec: micro_tape_stats_from_ticks(ticks, sec) for sec in secs}
+
+
 def calc_consecutive_buys(ticks, sec=15):
     """
     체결강도: 최근 N초 내 연속 매수 체결 최대 횟수
@@ -9998,6 +13024,9 @@ def calc_consecutive_buys(ticks, sec=15):
     """
     if not ticks:
         return 0
+    _tc = _tick_cols(ticks)
+    if _tc is not None:
+        return _tc.consecutive_buys(sec)
     try:
         newest_ts = max(tick_ts_ms(t) for t in ticks)
         cutoff = newest_ts - sec * 1000
@@ -10038,8 +13067,8 @@ def calc_flow_acceleration(ticks):
     """
     if not ticks:
         return 1.0
-    t5s = micro_tape_stats_from_ticks(ticks, 5)
-    t15s = micro_tape_stats_from_ticks(ticks, 15)
+    _tw = tick_tape_windows(ticks, (5, 15))
+    t5s, t15s = _tw[5], _tw[15]
 
     # raw krw 비교: t5 구간이 t15의 1/3이면 비율 1.0이 기준
     krw_15 = t15s["krw"]
@@ -10164,6 +13193,9 @@ def _pct(a, b):
 def inter_arrival_stats(ticks, sec=30):
     """틱 도착간격 CV. 데이터 부족시 cv=None 반환 (센티넬 9.9 제거)"""
     if not ticks: return {"cv": None, "count": 0}
+    _tc = _tick_cols(ticks)
+    if _tc is not None:
+        return _tc.inter_arrival(sec)
     try:
         # 🔧 FIX: tick_ts_ms 헬퍼로 통일
         newest_ts = max(tick_ts_ms(t) for t in ticks)
@@ -10184,6 +13216,9 @@ def inter_arrival_stats(ticks, sec=30):
 def price_band_std(ticks, sec=30):
     """가격밴드 표준편차. 데이터 부족시 None 반환 (센티넬 9.9 제거)"""
     if not ticks: return None
+    _tc = _tick_cols(ticks)
+    if _tc is not None:
+        return _tc.price_band_std(sec)
     try:
         # 🔧 FIX: tick_ts_ms 헬퍼로 통일
         newest_ts = max(tick_ts_ms(t) for t in ticks)
@@ -10202,6 +13237,9 @@ def price_band_std(ticks, sec=30):
 def _win_stats(ticks, start_s, end_s):
     if not ticks:
         return {"n": 0, "buy_ratio": 0.0, "rate": 0.0, "krw_per_sec": 0.0}
+    _tc = _tick_cols(ticks)
+    if _tc is not None:
+        return _tc.win_stats(start_s, end_s)
     try:
         # 🔧 FIX: tick_ts_ms 헬퍼로 통일
         newest_ts = max(tick_ts_ms(t) for t in ticks)
@@ -10239,7 +13277,10 @@ def buy_decay_flag(ticks):
     - Window 2 (5~15초 전): 중간 상태
     - Window 3 (0~5초): 현재 상태
     → 3단계 연속 하락 패턴 감지 (단순 2-window 대비 정확도 향상)
+    🧮 일반 list면 1회 컬럼 변환 후 4개 윈도우를 같은 배열에서 조회
     """
+    if np is not None and ticks and not isinstance(ticks, TickList):
+        ticks = TickList(ticks)
     w1 = _win_stats(ticks, start_s=20, end_s=30)  # 초기
     w2 = _win_stats(ticks, start_s=5, end_s=15)   # 중간
     w3 = _win_stats(ticks, start_s=0, end_s=5)    # 현재
@@ -10501,6 +13542,10 @@ def _v4_atr_pct(candles, period=14):
     """ATR% = ATR / 현재가 × 100"""
     if len(candles) < period + 1:
         return 0.0
+    if period == _IND_PERIOD:
+        snap = _ind_snapshot(candles)
+        if snap is not None:
+            return snap["atr_pct"]
     trs = []
     for i in range(1, len(candles)):
         h = candles[i]["high_price"]
@@ -10515,21 +13560,285 @@ def _v4_atr_pct(candles, period=14):
     return (atr / price) * 100
 
 
-def _v4_is_bullish(candle):
-    """양봉 여부"""
-    return candle["trade_price"] > candle["opening_price"]
+def _v4_is_bullish(candle):
+    """양봉 여부"""
+    return candle["trade_price"] > candle["opening_price"]
+
+
+def _v4_rsi_from_candles(candles, period=14):
+    """캔들 리스트에서 RSI 계산 (증분 지표 상태 우선)"""
+    if period == _IND_PERIOD:
+        snap = _ind_snapshot(candles)
+        if snap is not None:
+            return snap["rsi"]
+    closes = [c["trade_price"] for c in candles]
+    return _v4_calc_rsi(closes, period)
+
+
+def _v4_ema_from_candles(candles, period):
+    """캔들 리스트에서 EMA 마지막 값 (증분 지표 상태 우선)"""
+    if period in _IND_EMA_PERIODS:
+        snap = _ind_snapshot(candles)
+        if snap is not None:
+            return snap["ema"][period]
+    closes = [c["trade_price"] for c in candles]
+    return _v4_ema(closes, period)
+
+
+# =========================
+# 📈 증분 지표 상태 (마켓×분봉별 — 매 호출 전체 재계산 제거)
+# =========================
+# _v4_* 지표는 "윈도우 첫 봉 시드" 방식 → 같은 캔들 윈도우면 결과가 같아야 함.
+# (market, unit, 윈도우 길이)별로 확정봉 prefix 상태(EMA/RSI 평균/MACD·시그널/ADX Wilder 합/TR)를 보관하고
+# 진행중 마지막 봉은 prefix에서 O(1) 1스텝만 적용:
+#   - 같은 봉 재호출 (유니버설 지표 → 라이브 레지스트리 → 섀도우 route): 메모 스냅샷 그대로
+#   - 마지막 봉 체결 갱신: prefix + 1스텝 (O(1))
+#   - 새 봉 시작(윈도우 1칸 이동): prefix 재구성 (봉당 1회)
+# 연산 순서까지 기존 _v4_calc_rsi/_v4_ema/_v4_macd/_v4_adx/_v4_atr_pct와 동일 → 값 비트 단위 일치.
+# 캔들에 market/unit 키가 없으면(일봉/가공 리스트) 기존 계산으로 폴백.
+_IND_PERIOD = 14
+_IND_EMA_PERIODS = (5, 10, 20)
+
+
+class IndicatorState:
+    """(market, unit, 윈도우 길이) 1개의 증분 지표 상태"""
+
+    def __init__(self):
+        self._prefix = (None, None)  # (prefix_key, prefix_state) — 튜플 1회 대입으로 교체 (락 불필요)
+        self._snap = (None, None)    # (live_key, snapshot)
+
+    @staticmethod
+    def _prefix_key(candles):
+        first, prev = candles[0], candles[-2]
+        return (len(candles), first.get("candle_date_time_utc"), prev.get("candle_date_time_utc"),
+                prev["trade_price"], prev["high_price"], prev["low_price"])
+
+    @staticmethod
+    def _build_prefix(candles):
+        """확정봉(candles[:-1]) 구간 상태 계산 — 봉당 1회"""
+        p = _IND_PERIOD
+        closes = [c["trade_price"] for c in candles[:-1]]
+        highs = [c["high_price"] for c in candles[:-1]]
+        lows = [c["low_price"] for c in candles[:-1]]
+        pre = {}
+        # EMA (시드 = 윈도우 첫 종가)
+        emas = {}
+        for per in _IND_EMA_PERIODS:
+            k = 2.0 / (per + 1)
+            e = closes[0]
+            for v in closes[1:]:
+                e = v * k + e * (1 - k)
+            emas[per] = e
+        pre["ema"] = emas
+        # RSI (Wilder) — 시드 구간이 prefix 안에 다 들어올 때만
+        gains = []
+        losses = []
+        for i in range(1, len(closes)):
+            diff = closes[i] - closes[i - 1]
+            gains.append(max(diff, 0))
+            losses.append(max(-diff, 0))
+        if len(gains) >= p:
+            avg_gain = sum(gains[:p]) / p
+            avg_loss = sum(losses[:p]) / p
+            for i in range(p, len(gains)):
+                avg_gain = (avg_gain * (p - 1) + gains[i]) / p
+                avg_loss = (avg_loss * (p - 1) + losses[i]) / p
+            pre["rsi"] = (avg_gain, avg_loss)
+        # MACD(12,26,9) — 시그널은 마지막 18개 macd 중 앞 17개까지 prefix
+        k_fast = 2.0 / (12 + 1)
+        k_slow = 2.0 / (26 + 1)
+        ef = closes[0]
+        es = closes[0]
+        macd_series = []
+        for v in closes[1:]:
+            ef = v * k_fast + ef * (1 - k_fast)
+            es = v * k_slow + es * (1 - k_slow)
+            macd_series.append(ef - es)
+        if len(macd_series) >= 17:
+            k_sig = 2.0 / (9 + 1)
+            win = macd_series[-17:]
+            sig = win[0]
+            for v in win[1:]:
+                sig = v * k_sig + sig * (1 - k_sig)
+            pre["macd"] = (ef, es, sig)
+        # TR / DM (ADX + ATR% 공용)
+        trs = []
+        pdms = []
+        mdms = []
+        for i in range(1, len(closes)):
+            h = highs[i]
+            l = lows[i]
+            c_prev = closes[i - 1]
+            trs.append(max(h - l, abs(h - c_prev), abs(l - c_prev)))
+            up = highs[i] - highs[i - 1]
+            dn = lows[i - 1] - lows[i]
+            pdms.append(up if up > dn and up > 0 else 0.0)
+            mdms.append(dn if dn > up and dn > 0 else 0.0)
+        if len(trs) >= p - 1:
+            pre["tr_tail"] = sum(trs[-(p - 1):])
+        if len(trs) >= p:
+            atr = sum(trs[:p])
+            pdm_sum = sum(pdms[:p])
+            mdm_sum = sum(mdms[:p])
+            dx_list = []
+            for i in range(p, len(trs)):
+                atr = atr - atr / p + trs[i]
+                pdm_sum = pdm_sum - pdm_sum / p + pdms[i]
+                mdm_sum = mdm_sum - mdm_sum / p + mdms[i]
+                if atr == 0:
+                    continue
+                plus_di = 100 * pdm_sum / atr
+                minus_di = 100 * mdm_sum / atr
+                di_sum = plus_di + minus_di
+                if di_sum == 0:
+                    continue
+                dx_list.append(100 * abs(plus_di - minus_di) / di_sum)
+            adx = None
+            if len(dx_list) >= p:
+                adx = sum(dx_list[:p]) / p
+                for dx in dx_list[p:]:
+                    adx = (adx * (p - 1) + dx) / p
+                dx_list = None
+            pre["adx"] = (atr, pdm_sum, mdm_sum, dx_list, adx)
+        return pre
+
+    @staticmethod
+    def _finalize(pre, candles):
+        """prefix + 진행중 마지막 봉 1스텝 → 지표 스냅샷 (O(1))"""
+        p = _IND_PERIOD
+        n = len(candles)
+        last = candles[-1]
+        prev = candles[-2]
+        v = last["trade_price"]
+        h = last["high_price"]
+        l = last["low_price"]
+        pc = prev["trade_price"]
+        snap = {"n": n}
+        # EMA
+        emas = {}
+        for per in _IND_EMA_PERIODS:
+            if n >= per:
+                k = 2.0 / (per + 1)
+                emas[per] = v * k + pre["ema"][per] * (1 - k)
+            else:
+                emas[per] = None
+        snap["ema"] = emas
+        # RSI
+        if "rsi" in pre:
+            avg_gain, avg_loss = pre["rsi"]
+            diff = v - pc
+            avg_gain = (avg_gain * (p - 1) + max(diff, 0)) / p
+            avg_loss = (avg_loss * (p - 1) + max(-diff, 0)) / p
+            snap["rsi"] = 100.0 if avg_loss == 0 else 100.0 - (100.0 / (1.0 + avg_gain / avg_loss))
+        elif n >= p + 1:
+            # 윈도우 = 시드 구간 그대로 (n == p+1) → 직접 계산
+            snap["rsi"] = _v4_calc_rsi([c["trade_price"] for c in candles], p)
+        else:
+            snap["rsi"] = None
+        # MACD
+        if n >= 26 + 9 and "macd" in pre:
+            ef, es, sig = pre["macd"]
+            k_fast = 2.0 / (12 + 1)
+            k_slow = 2.0 / (26 + 1)
+            k_sig = 2.0 / (9 + 1)
+            ef = v * k_fast + ef * (1 - k_fast)
+            es = v * k_slow + es * (1 - k_slow)
+            macd_val = ef - es
+            sig = macd_val * k_sig + sig * (1 - k_sig)
+            snap["macd"] = (macd_val, sig, macd_val - sig)
+        else:
+            snap["macd"] = (None, None, None)
+        # TR (ADX + ATR%)
+        tr = max(h - l, abs(h - pc), abs(l - pc))
+        if n >= p + 1 and "tr_tail" in pre:
+            atr_pct = (pre["tr_tail"] + tr) / p
+            snap["atr_pct"] = (atr_pct / v) * 100 if v > 0 else 0.0
+        else:
+            snap["atr_pct"] = 0.0
+        # ADX
+        snap["adx"] = None
+        if n >= p * 2 + 1 and "adx" in pre:
+            atr, pdm_sum, mdm_sum, dx_list, adx = pre["adx"]
+            up = h - prev["high_price"]
+            dn = prev["low_price"] - l
+            atr = atr - atr / p + tr
+            pdm_sum = pdm_sum - pdm_sum / p + (up if up > dn and up > 0 else 0.0)
+            mdm_sum = mdm_sum - mdm_sum / p + (dn if dn > up and dn > 0 else 0.0)
+            dx = None
+            if atr != 0:
+                plus_di = 100 * pdm_sum / atr
+                minus_di = 100 * mdm_sum / atr
+                di_sum = plus_di + minus_di
+                if di_sum != 0:
+                    dx = 100 * abs(plus_di - minus_di) / di_sum
+            if adx is not None:
+                snap["adx"] = (adx * (p - 1) + dx) / p if dx is not None else adx
+            else:
+                full = dx_list + ([dx] if dx is not None else [])
+                if len(full) >= p:
+                    snap["adx"] = sum(full[:p]) / p
+        return snap
+
+    def snapshot(self, candles):
+        last = candles[-1]
+        live_key = (last.get("candle_date_time_utc"), last["trade_price"], last["high_price"], last["low_price"])
+        pkey = self._prefix_key(candles)
+        s_pkey, s_snap = self._snap
+        if s_pkey == (pkey, live_key):
+            _pipeline_inc("ind_state_memo")
+            return s_snap
+        p_key, pre = self._prefix
+        if p_key != pkey:
+            pre = self._build_prefix(candles)
+            self._prefix = (pkey, pre)
+            _pipeline_inc("ind_state_rebuild")
+        else:
+            _pipeline_inc("ind_state_step")
+        snap = self._finalize(pre, candles)
+        self._snap = ((pkey, live_key), snap)
+        return snap
+
+
+_IND_STATES = LRUCache(maxsize=IND_STATE_MAX)
 
 
-def _v4_rsi_from_candles(candles, period=14):
-    """캔들 리스트에서 RSI 계산"""
-    closes = [c["trade_price"] for c in candles]
-    return _v4_calc_rsi(closes, period)
+def _ind_snapshot(candles):
+    """캔들 윈도우 → 공유 지표 스냅샷 dict (읽기 전용).
+    식별 불가(market/unit 키 없음)·비활성 시 None → 호출자가 기존 계산 사용"""
+    if not IND_STATE_ENABLED or not candles or len(candles) < 2:
+        return None
+    last = candles[-1]
+    mkt = last.get("market")
+    unit = last.get("unit")
+    if not mkt or not unit:
+        return None
+    key = (mkt, unit, len(candles))
+    st = _IND_STATES.get(key)
+    if st is None:
+        st = IndicatorState()
+        _IND_STATES.set(key, st)
+    try:
+        return st.snapshot(candles)
+    except (KeyError, TypeError, IndexError, ZeroDivisionError):
+        return None
 
 
-def _v4_ema_from_candles(candles, period):
-    """캔들 리스트에서 EMA 마지막 값"""
-    closes = [c["trade_price"] for c in candles]
-    return _v4_ema(closes, period)
+def _v4_macd_from_candles(candles):
+    """캔들 리스트에서 MACD(12,26,9) — (macd_line, signal_line, histogram)"""
+    snap = _ind_snapshot(candles)
+    if snap is not None:
+        return snap["macd"]
+    return _v4_macd([c["trade_price"] for c in candles])
+
+
+def _v4_adx_from_candles(candles, period=14):
+    """캔들 리스트에서 ADX"""
+    if period == _IND_PERIOD:
+        snap = _ind_snapshot(candles)
+        if snap is not None:
+            return snap["adx"]
+    return _v4_adx([c["high_price"] for c in candles], [c["low_price"] for c in candles],
+                   [c["trade_price"] for c in candles], period)
 
 
 # === 공통 지표 수집 (모든 전략 교차분석용) ===
@@ -10547,9 +13856,8 @@ def _collect_universal_indicators(c1, c5, c15, c30, c60, market=None):
         if rsi_5m is not None:
             ui["rsi_5m"] = round(rsi_5m, 2)
         if len(c5) >= 35:
-            closes_5m = [c["trade_price"] for c in c5]
-            macd_5m, sig_5m, hist_5m = _v4_macd(closes_5m)
-            price_5m = closes_5m[-1] if closes_5m[-1] > 0 else 1
+            macd_5m, sig_5m, hist_5m = _v4_macd_from_candles(c5)
+            price_5m = c5[-1]["trade_price"] if c5[-1]["trade_price"] > 0 else 1
             # MACD를 가격대비 bps(만분율)로 정규화 → 코인간 비교 가능
             if macd_5m is not None:
                 ui["macd_5m_bps"] = round(macd_5m / price_5m * 10000, 2)
@@ -10557,18 +13865,15 @@ def _collect_universal_indicators(c1, c5, c15, c30, c60, market=None):
                 ui["macd_hist_5m_bps"] = round(hist_5m / price_5m * 10000, 2)
     # --- 15m 지표 ---
     if c15 and len(c15) >= 30:
-        highs_15 = [c["high_price"] for c in c15]
-        lows_15 = [c["low_price"] for c in c15]
-        closes_15 = [c["trade_price"] for c in c15]
-        adx_15 = _v4_adx(highs_15, lows_15, closes_15, 14)
+        adx_15 = _v4_adx_from_candles(c15, 14)
         if adx_15 is not None:
             ui["adx_15"] = round(adx_15, 2)
         rsi_15m = _v4_rsi_from_candles(c15, 14)
         if rsi_15m is not None:
             ui["rsi_15m"] = round(rsi_15m, 2)
         if len(c15) >= 35:
-            macd_15, sig_15, hist_15 = _v4_macd(closes_15)
-            price_15 = closes_15[-1] if closes_15[-1] > 0 else 1
+            macd_15, sig_15, hist_15 = _v4_macd_from_candles(c15)
+            price_15 = c15[-1]["trade_price"] if c15[-1]["trade_price"] > 0 else 1
             # MACD를 가격대비 bps(만분율)로 정규화
             if macd_15 is not None:
                 ui["macd_15_bps"] = round(macd_15 / price_15 * 10000, 2)
@@ -10598,10 +13903,7 @@ def _collect_universal_indicators(c1, c5, c15, c30, c60, market=None):
             if ema5_60 is not None and ema10_60 is not None and ema20_60 is not None:
                 ui["ema_spread_60"] = round((ema5_60 - ema20_60) / max(ema20_60, 1) * 100, 4)
         if len(c60) >= 30:
-            highs_60 = [c["high_price"] for c in c60]
-            lows_60 = [c["low_price"] for c in c60]
-            closes_60 = [c["trade_price"] for c in c60]
-            adx_60 = _v4_adx(highs_60, lows_60, closes_60, 14)
+            adx_60 = _v4_adx_from_candles(c60, 14)
             if adx_60 is not None:
                 ui["adx_60"] = round(adx_60, 2)
         # 60m 3봉 모멘텀
@@ -10809,8 +14111,7 @@ def _v4_gate_filter(c15, c60):
     macd_golden = False
     macd_val = sig_val = None
     if c15 and len(c15) >= 35:
-        closes_15 = [c["trade_price"] for c in c15]
-        macd_val, sig_val, _ = _v4_macd(closes_15)
+        macd_val, sig_val, _ = _v4_macd_from_candles(c15)
         if macd_val is not None and sig_val is not None:
             macd_golden = (macd_val > sig_val)
 
@@ -10941,8 +14242,8 @@ def _report_consistency_check(compact_routes, research_routes):
     all_registry = prod | active_research
     all_reported = compact_routes | research_routes
     _routes_with_data = {}
-    with _SHADOW_PERF_LOCK:
-        for key, s in _SHADOW_PERF_STATS.items():
+    with _shadow_view_lock():
+        for key, s in _shadow_perf_view().items():
             r = s.get("route", "")
             n = s.get("signals", 0)
             if n >= 1:
@@ -10972,8 +14273,8 @@ def _report_consistency_check(compact_routes, research_routes):
     if extra:
         warns.append(f"[REPORT_WARN] registry 미등록 route 출력됨: {extra}")
     # ── C: ACTIONABLE coverage (중요 상태 무음 감지) ──
-    with _SHADOW_PERF_LOCK:
-        for key, s in _SHADOW_PERF_STATS.items():
+    with _shadow_view_lock():
+        for key, s in _shadow_perf_view().items():
             n = s.get("signals", 0)
             route = s.get("route", "?")
             if n < 20 or route not in prod:
@@ -11053,8 +14354,8 @@ def _build_actionable_summary():
         pass
     # 2) LIVE route 성과 경고 (pnl < -0.05% or cap < -15%)
     _seen_routes = set()
-    with _SHADOW_PERF_LOCK:
-        for key, s in _SHADOW_PERF_STATS.items():
+    with _shadow_view_lock():
+        for key, s in _shadow_perf_view().items():
             n = s.get("signals", 0)
             route = s.get("route", "?")
             if n < 20 or route not in prod or route in _seen_routes:
@@ -11069,8 +14370,8 @@ def _build_actionable_summary():
             elif cap < REPORT_ACT_CAP_WARN:
                 items.append(f"⚠ {route} cap{cap:.0f}% 비효율")
     # 3) 필터 재검토 필요
-    with _SHADOW_PERF_LOCK:
-        for bkey, bs in _SHADOW_BLOCKED_STATS.items():
+    with _shadow_view_lock():
+        for bkey, bs in _shadow_blocked_view().items():
             bn = bs.get("signals", 0)
             if bn < 10:
                 continue
@@ -11116,9 +14417,9 @@ def _build_state_change_alerts():
     current = {}
     prod, research = _get_route_sets()
     all_routes = prod | research
-    with _SHADOW_PERF_LOCK:
+    with _shadow_view_lock():
         _seen = set()
-        for key, s in _SHADOW_PERF_STATS.items():
+        for key, s in _shadow_perf_view().items():
             n = s.get("signals", 0)
             route = s.get("route", "?")
             if n < 5 or route in _seen or route not in all_routes:
@@ -12146,10 +15447,7 @@ def _v0_check_trend_strength(c1, c5, c15, c30, c60, gate_info=None):
     _pipeline_inc("adx_trend_enter")
     if not c15 or len(c15) < 30:
         return None
-    highs = [c["high_price"] for c in c15]
-    lows = [c["low_price"] for c in c15]
-    closes = [c["trade_price"] for c in c15]
-    adx_15 = _v4_adx(highs, lows, closes, 14)
+    adx_15 = _v4_adx_from_candles(c15, 14)
     # v18c: ADX 30→28.5로 풀기 (신규20건 45% 승률, 전체30%보다 좋음)
     if adx_15 is None or adx_15 < 28.5:
         if _pipeline_inc("adx_trend_15_fail", value=adx_15, threshold=28.5, direction="gte"): return None
@@ -12676,12 +15974,10 @@ def _v0_check_macd_cross(c1, c5, c15, c30, c60, gate_info=None):
     _pipeline_inc("macd_cross_enter")
     if not c5 or len(c5) < 35:
         return None
-    cls5 = [c["trade_price"] for c in c5]
-    _, _, hist = _v4_macd(cls5)
+    _, _, hist = _v4_macd_from_candles(c5)
     if hist is None:
         return None
-    prev_cls5 = [c["trade_price"] for c in c5[:-1]]
-    _, _, prev_hist = _v4_macd(prev_cls5)
+    _, _, prev_hist = _v4_macd_from_candles(c5[:-1])
     if prev_hist is None:
         return None
     if not (prev_hist < 0 and hist >= 0):
@@ -12737,8 +16033,11 @@ def _v0_check_tick_accum(c1, c5=None, c15=None, c30=None, c60=None, gate_info=No
 _COIN_BIAS = {}  # {market: (wins, losses, avg_pnl)} — SVE1 coin_wl에서 주기적 갱신
 
 def _update_coin_bias():
-    with _SHADOW_PERF_LOCK:
-        for key, s in _SHADOW_PERF_STATS.items():
+    """리포트 렌더 스레드에서 호출 — 새 dict 를 만들어 통째로 교체 (스캔 스레드는 교체 전/후 한쪽만 봄)"""
+    global _COIN_BIAS
+    bias = dict(_COIN_BIAS)
+    with _shadow_view_lock():
+        for key, s in _shadow_perf_view().items():
             if not key.startswith("SVE1:"):
                 continue
             cw = s.get("coin_wl", {})
@@ -12752,8 +16051,9 @@ def _update_coin_bias():
                 avg_pnl = 0
                 if coin in coin_pnls and coin_pnls[coin]:
                     avg_pnl = sum(coin_pnls[coin]) / len(coin_pnls[coin])
-                _COIN_BIAS[coin] = (w, l, avg_pnl)
+                bias[coin] = (w, l, avg_pnl)
             break
+    _COIN_BIAS = bias
 
 
 def _v0_check_quiet_cont(c1, c5=None, c15=None, c30=None, c60=None, gate_info=None):
@@ -12776,7 +16076,7 @@ def _v0_check_quiet_cont(c1, c5=None, c15=None, c30=None, c60=None, gate_info=No
     if vr5_cur < 1.3:
         if _pipeline_inc("quiet_cont_energy_vr5_fail", value=round(vr5_cur, 2), threshold=1.3, direction="gte"): return None
     closes_5m = [c["trade_price"] for c in c5]
-    _, _, hist_5m = _v4_macd(closes_5m)
+    _, _, hist_5m = _v4_macd_from_candles(c5)
     if hist_5m is None or hist_5m <= 0:
         if _pipeline_inc("quiet_cont_macd_neg"): return None
     price_5m = max(closes_5m[-1], 1)
@@ -12976,7 +16276,7 @@ def _v0_check_liquidity_trap(c1, c5=None, c15=None, c30=None, c60=None, gate_inf
             details.append(f"wick={upper_wick/rng:.2f}")
     if c5 and len(c5) >= 35:
         closes_5m = [c["trade_price"] for c in c5]
-        _, _, hist_5m = _v4_macd(closes_5m)
+        _, _, hist_5m = _v4_macd_from_candles(c5)
         if hist_5m is not None:
             macd_bps = hist_5m / max(closes_5m[-1], 1) * 10000
             if macd_bps >= 80:
@@ -13007,9 +16307,10 @@ def _v0_check_coin_personality(c1, c5=None, c15=None, c30=None, c60=None, gate_i
     market = None
     if gate_info and isinstance(gate_info, dict):
         market = gate_info.get("market")
-    if not market or market not in _COIN_BIAS:
+    bias = _COIN_BIAS.get(market) if market else None   # 참조 1회 (렌더 스레드가 dict 교체)
+    if bias is None:
         if _pipeline_inc("coin_pers_no_data"): return None
-    w, l, avg_pnl = _COIN_BIAS[market]
+    w, l, avg_pnl = bias
     total = w + l
     if total < 3:
         if _pipeline_inc("coin_pers_data_fail", value=total, threshold=3, direction="gte"): return None
@@ -13604,15 +16905,329 @@ _SHADOW_BLOCKED_POSITIONS = []
 _SHADOW_BLOCKED_DEDUP = {}  # { "route_market": last_entry_ts }
 _SHADOW_BLOCKED_STATS = {}
 _SHADOW_BLOCKED_TRADE_COUNT = 0
+# 📒 섀도우 결과 저널 (res/blk 레코드 → _shadow_apply_* 리듀서로 재생, 스냅샷 = 기존 JSON 2종)
+_SHADOW_JOURNAL = StateJournal(SHADOW_JOURNAL_PATH, "shadow_journal") if STATE_JOURNAL_ENABLED else None
+
+# 🧮 섀도우 포지션 북 (shadow_book.py — 구조화 NumPy 배열)
+# 기존: 위 dict 리스트 3개를 _SHADOW_LOCK 안에서 한 건씩 _shadow_sim_exit → 상한 30/50건, 티커 10마켓/요청.
+# 북 사용 시 포지션·청산 파라미터가 배열 행 → _shadow_evaluate_positions 가 전 행을 벡터 연산 1회로 전이,
+# 상한 SHADOW_BOOK_MAX_*_POS. 생성/조회는 아래 헬퍼 경유 (북 없으면 기존 리스트).
+# 🔧 _SHADOW_LOCK 보유 중 호출 (북 내부 락 없음)
+try:
+    from shadow_book import (ShadowBook, TickPath, KIND_VP as _SHADOW_VP, KIND_BLOCKED as _SHADOW_BLK,
+                             KIND_PENDING as _SHADOW_PEND)
+except Exception:
+    ShadowBook = TickPath = None
+    _SHADOW_VP, _SHADOW_BLK, _SHADOW_PEND = 0, 1, 2
+
+_SHADOW_BOOK = (ShadowBook(_SHADOW_PNL_SNAP_SECS, RECHECK_SEC, FEE_RATE + 0.001 + PROFIT_CHECKPOINT_MIN_ALPHA)
+                if (SHADOW_BOOK_ENABLED and ShadowBook is not None) else None)
+_SHADOW_POS_LISTS = {_SHADOW_VP: _SHADOW_VIRTUAL_POSITIONS, _SHADOW_BLK: _SHADOW_BLOCKED_POSITIONS,
+                     _SHADOW_PEND: _SHADOW_PENDING_SIGNALS}
+
+
+def _shadow_pos_count(kind):
+    if _SHADOW_BOOK is not None:
+        return _SHADOW_BOOK.count(kind)
+    return len(_SHADOW_POS_LISTS[kind])
+
+
+def _shadow_pos_cap(kind):
+    if kind == _SHADOW_VP:
+        return SHADOW_BOOK_MAX_VIRTUAL_POS if _SHADOW_BOOK is not None else SHADOW_MAX_VIRTUAL_POS
+    if kind == _SHADOW_BLK:
+        return SHADOW_BOOK_MAX_BLOCKED_POS if _SHADOW_BOOK is not None else SHADOW_MAX_BLOCKED_POS
+    return None
+
+
+def _shadow_add_position(kind, pos):
+    """가상포지션/차단 건/대기 시그널 등록 (상한 검사는 호출 측)"""
+    if _SHADOW_BOOK is None:
+        _SHADOW_POS_LISTS[kind].append(pos)
+        return True
+    try:
+        if kind == _SHADOW_PEND:
+            _SHADOW_BOOK.add_pending(pos)
+        else:
+            _SHADOW_BOOK.add_position(kind, pos)
+    except Exception as e:
+        print(f"[SHADOW_BOOK] {pos.get('route')} {pos.get('market')} 등록 실패: {e}")
+        return False
+    _shadow_tick_track(pos["market"])
+    return True
+
+
+# 🎯 섀도우 체결 경로 (체결 스트림 → 마켓별 직전 평가 이후 가격 경로)
+# 기존: 평가 사이클(수십 초)마다 티커 1점 → 구간 중 SL/트레일 히트·MFE/MAE 누락, 라이브 대비 청산 편향.
+# 인프로세스 시세 스트림 체결 콜백(_MD_TRADE_LISTENERS — 청산 엔진과 같은 스트림), 스트림이 구독하지 않는 마켓
+# (스트림은 TOP_N + 보유 + BTC 만 — 섀도우 마켓은 구독 변경 = 재연결이라 넣지 않음)·스트림 미가동 시 시세 허브 체결 링을
+# 마켓별 TickPath(지그재그 피벗 — 구간 고가/저가와 그 사이 되돌림, 시각 포함)로 접어 두고,
+# 평가 때 꺼내 북 step 에 전달 (추가 REST 없음).
+_SHADOW_TICK_PATHS = {}               # market -> TickPath (직전 평가 이후, ts = 초)
+_SHADOW_TICK_LOCK = threading.Lock()  # 스트림 스레드 ↔ 평가 (짧게)
+_SHADOW_TICK_MKTS = frozenset()       # 수집 대상 (북 마켓 — 스트림 스레드는 참조만, 교체는 _SHADOW_LOCK 하)
+_SHADOW_TICK_STATE = {"cursor": None, "last_drain": 0.0, "stream": 0, "hub": 0, "drains": 0}
+
+
+def _shadow_tick_track(market):
+    global _SHADOW_TICK_MKTS
+    if market not in _SHADOW_TICK_MKTS:
+        _SHADOW_TICK_MKTS = _SHADOW_TICK_MKTS | {market}
+
+
+def _shadow_tick_fold(m, p, ts):
+    tp = _SHADOW_TICK_PATHS.get(m)
+    if tp is None:
+        _SHADOW_TICK_PATHS[m] = TickPath(p, ts, SHADOW_TICK_PIVOT_PCT, SHADOW_TICK_MAX_PIVOTS)
+    else:
+        tp.add(p, ts)
+
+
+def _shadow_on_trade(m, tick):
+    """스트림 스레드 — 북 추적 마켓 체결만 경로에 반영"""
+    if m not in _SHADOW_TICK_MKTS:
+        return
+    p = tick.get("trade_price") or 0
+    if p <= 0:
+        return
+    ts = tick_ts_ms(tick) / 1000.0 or time.time()
+    with _SHADOW_TICK_LOCK:
+        _shadow_tick_fold(m, p, ts)
+        _SHADOW_TICK_STATE["stream"] += 1
+
+
+def _shadow_tick_drain(markets, now):
+    """직전 평가 이후 체결 경로 {market: TickPath} 후 구간 리셋.
+    인프로세스 스트림이 구독하지 않는 마켓(스트림 다운 시 전부)은 허브 체결 링(cursor 이후, 직전 평가 이후 체결만)을 접음."""
+    st = _SHADOW_TICK_STATE
+    stream = _md_stream_live()
+    covered = set(stream.codes) if stream is not None else ()
+    mk = {m for m in markets if m not in covered}
+    hub = _md_hub_live() if mk else None
+    if hub is None:
+        st["cursor"] = None  # 다음 허브 사용 시 현재 위치부터 (지난 구간 재생 방지)
+    else:
+        with _MD_HUB_LOCK:
+            rows, st["cursor"] = hub.trades_since(st["cursor"])
+        with _SHADOW_TICK_LOCK:
+            for r in rows:
+                ts = r["timestamp"] / 1000.0
+                if r["market"] in mk and ts >= st["last_drain"] and r["trade_price"] > 0:
+                    _shadow_tick_fold(r["market"], r["trade_price"], ts)
+                    st["hub"] += 1
+    with _SHADOW_TICK_LOCK:
+        paths = {m: _SHADOW_TICK_PATHS[m] for m in markets if m in _SHADOW_TICK_PATHS}
+        _SHADOW_TICK_PATHS.clear()
+        st["last_drain"] = now
+        st["drains"] += 1
+    return paths
+
+
+if _SHADOW_BOOK is not None and SHADOW_TICK_PATH_ENABLED:
+    _MD_TRADE_LISTENERS.append(_shadow_on_trade)
+
+
+def _shadow_book_status_str():
+    if _SHADOW_BOOK is None:
+        return "shadow_book=off"
+    with _SHADOW_LOCK:
+        s = _SHADOW_BOOK.status_str()
+    if SHADOW_TICK_PATH_ENABLED:
+        st = _SHADOW_TICK_STATE
+        s += f" ticks(stream/hub)={st['stream']}/{st['hub']} mkts={len(_SHADOW_TICK_MKTS)}"
+    return s
+
+
+# 📐 route 통계 증분 집계 (shadow_sketch)
+# 기존: pnls/mfes/hold_secs/sl_hit_secs 는 list.append + [-200:] 슬라이스 재할당, _survival_analysis / threshold sweep 은
+#       리포트마다 trade_records·fail_values 전체를 그룹 분리·정렬·재순회.
+# 변경: 최근 N개 값 = RingBuffer (통계 dict 안, 저장됨), 전체 분포 = QuantileSketch (pnl_q / mfe_q / hold_q),
+#       trade_records / fail_values 윈도우 = FeatureHist 집계 (아래 dict, 저장 안 함 — 로드 시 레코드로 재구성).
+#       레코드 추가/퇴출 때 증분 갱신 → 리포트 질의는 bin 단위 O(bins).
+_SHADOW_RING_FIELDS = (("pnls", 200), ("mfes", 200), ("hold_secs", 200), ("sl_hit_secs", 200))
+_SHADOW_QS_FIELDS = (("pnl_q", "pnls"), ("mfe_q", "mfes"), ("hold_q", "hold_secs"))
+_SHADOW_ROUTE_AGG = {}    # perf key → _RouteAgg (trade_records 윈도우)
+_SHADOW_BLOCKED_AGG = {}  # blocked key → FeatureHist (fail_values 윈도우: 차단 시점 값 × pnl)
+# survival 분석 진입 지표 (진입 시점 관측값만 — look-ahead 제외)
+_SURVIVAL_FEATURES = (
+    "tick_age", "vr5", "rsi_15m", "adx_15", "adx_60",
+    "entry_spread_pct", "entry_vol_krw_m", "gap_20bar",
+    "tick_rate_10s", "tick_rate_30s", "tick_buy_30s",
+    "tick_strength_30s", "tick_consec_buy", "tick_mom_10s",
+    "tick_mom_30s", "rsi_5m", "rsi_60m", "atr_pct",
+    "ema_spread_15", "ema_spread_60", "vr5_15m",
+    "macd_hist_5m_bps", "macd_hist_15_bps", "m3_60m",
+    "ob_spread_pct", "ob_ask1_krw", "ob_bid1_krw",
+    "ob_slip_sell_10000k",
+)
+_SURVIVAL_CURVE_KEYS = ("60", "120", "180", "240")
+
+
+def _shadow_hydrate(s):
+    """route 통계의 list / 압축형 → RingBuffer · QuantileSketch (로드 직후·리듀서 진입 시, 이미 변환됐으면 no-op).
+    분위수 스케치가 없던 기존 통계는 현재 링 내용으로 시작"""
+    for f, cap in _SHADOW_RING_FIELDS:
+        v = s.get(f)
+        if v is not None and not isinstance(v, RingBuffer):
+            s[f] = RingBuffer.from_json(v, cap)
+    for f, seed in _SHADOW_QS_FIELDS:
+        v = s.get(f)
+        if isinstance(v, QuantileSketch):
+            continue
+        if isinstance(v, dict):
+            s[f] = QuantileSketch.from_json(v)
+        else:
+            q = s[f] = QuantileSketch()
+            for x in s.get(seed, ()):
+                q.add(x)
+
+
+class _RouteAgg:
+    """route trade_records 윈도우 집계 — 레코드 추가(add)/퇴출(remove) 시 증분.
+    ind: sweep 대상 지표(_SWEEP_FILTER_TO_IND)별 FeatureHist
+    surv: dd_peak_60s 생존 그룹(A<0.3% / B<0.5% / C)별 n·승·pnl합·곡선합 + A/C 지표 FeatureHist (d-score, mae 분포)
+    부동소수 누적 오차는 퇴출 누적이 윈도우 크기에 닿을 때마다 rebuild 로 정리"""
+    __slots__ = ("ind", "surv", "n", "_evicted")
+
+    def __init__(self, records=()):
+        self.rebuild(records)
+
+    def rebuild(self, records):
+        self.ind = {}
+        self.surv = {g: {"n": 0, "wins": 0, "pnl": 0.0, "curve_s": {}, "curve_n": {}, "feat": {}}
+                     for g in ("A", "B", "C")}
+        self.n = 0
+        self._evicted = 0
+        for tr in records:
+            self.add(tr)
+
+    @staticmethod
+    def group_of(dd):
+        return "A" if dd < 0.003 else ("B" if dd < 0.005 else "C")
+
+    def add(self, tr, sign=1):
+        pnl = tr.get("pnl", 0)
+        inds = tr.get("inds") or {}
+        self.n += sign
+        for k in _SWEEP_IND_KEYS:
+            v = inds.get(k)
+            if v is not None:
+                h = self.ind.get(k)
+                if h is None:
+                    h = self.ind[k] = FeatureHist()
+                h.add(v, pnl, sign)
+        dd = inds.get("dd_peak_60s")
+        if dd is None:
+            return
+        g = self.surv[self.group_of(dd)]
+        g["n"] += sign
+        if pnl > 0:
+            g["wins"] += sign
+        g["pnl"] += sign * pnl
+        curve = tr.get("curve") or {}
+        for sk in _SURVIVAL_CURVE_KEYS:
+            cv = curve.get(sk)
+            if cv is not None:
+                g["curve_s"][sk] = g["curve_s"].get(sk, 0.0) + sign * cv
+                g["curve_n"][sk] = g["curve_n"].get(sk, 0) + sign
+        if g is self.surv["B"]:
+            return
+        feat = g["feat"]
+        for k in _SURVIVAL_FEATURES + ("mae_60s",):
+            v = inds.get(k)
+            if v is not None:
+                h = feat.get(k)
+                if h is None:
+                    h = feat[k] = FeatureHist()
+                h.add(v, pnl, sign)
+
+    def remove(self, tr):
+        self.add(tr, -1)
+        self._evicted += 1
+
+    def trim(self, records, cap):
+        """records 를 최근 cap 건으로 제자리 절단 + 퇴출분 제거 (퇴출 누적 ≥ cap 이면 재구성)"""
+        for tr in records[:-cap]:
+            self.remove(tr)
+        del records[:-cap]
+        if self._evicted >= cap:
+            self.rebuild(records)
+
+    def copy(self):
+        """리포트 스냅샷용 독립 복사 (FeatureHist / 그룹 합계 dict 까지)"""
+        a = _RouteAgg.__new__(_RouteAgg)
+        a.ind = {k: h.copy() for k, h in self.ind.items()}
+        a.surv = {name: {"n": g["n"], "wins": g["wins"], "pnl": g["pnl"],
+                         "curve_s": dict(g["curve_s"]), "curve_n": dict(g["curve_n"]),
+                         "feat": {k: h.copy() for k, h in g["feat"].items()}}
+                  for name, g in self.surv.items()}
+        a.n, a._evicted = self.n, self._evicted
+        return a
+
+    def survival_groups(self):
+        """_survival_analysis 그룹 요약 (기존 _grp_stats 와 같은 형식)"""
+        out = {}
+        for name, g in self.surv.items():
+            n = g["n"]
+            if n <= 0:
+                out[name] = {"n": 0, "wr": 0, "avg_pnl": 0, "curve": {}}
+                continue
+            curve = {sk: round(g["curve_s"][sk] / g["curve_n"][sk] * 100, 3)
+                     for sk in _SURVIVAL_CURVE_KEYS if g["curve_n"].get(sk, 0) > 0}
+            out[name] = {"n": n, "wr": round(g["wins"] / n * 100, 1),
+                         "avg_pnl": round(g["pnl"] / n * 100, 3), "curve": curve}
+        return out
+
+    def status_str(self):
+        return (f"n={self.n} ind={len(self.ind)} "
+                f"A/B/C={self.surv['A']['n']}/{self.surv['B']['n']}/{self.surv['C']['n']}")
+
+
+def _shadow_route_agg(key):
+    """perf key 집계 (없으면 현재 윈도우로 생성) — _SHADOW_PERF_LOCK 보유 상태에서 호출"""
+    agg = _SHADOW_ROUTE_AGG.get(key)
+    if agg is None:
+        s = _SHADOW_PERF_STATS.get(key) or {}
+        agg = _SHADOW_ROUTE_AGG[key] = _RouteAgg(s.get("trade_records") or ())
+    return agg
+
+
+def _shadow_blocked_agg(key):
+    """blocked key fail_values 히스토그램 (없으면 현재 윈도우로 생성) — _SHADOW_PERF_LOCK 보유 상태에서 호출"""
+    h = _SHADOW_BLOCKED_AGG.get(key)
+    if h is None:
+        h = _SHADOW_BLOCKED_AGG[key] = FeatureHist()
+        for fv in (_SHADOW_BLOCKED_STATS.get(key) or {}).get("fail_values") or ():
+            h.add(fv["v"], fv["pnl"])
+    return h
+
+
+def _shadow_rebuild_aggs():
+    """로드(마이그레이션·저널 재생·리셋) 후 링/스케치 수화 + 윈도우 집계 재구성 — _SHADOW_PERF_LOCK 보유 상태에서 호출"""
+    for s in _SHADOW_PERF_STATS.values():
+        _shadow_hydrate(s)
+    for s in _SHADOW_BLOCKED_STATS.values():
+        _shadow_hydrate(s)
+    _SHADOW_ROUTE_AGG.clear()
+    _SHADOW_BLOCKED_AGG.clear()
+    for key in _SHADOW_PERF_STATS:
+        _shadow_route_agg(key)
+    for key in _SHADOW_BLOCKED_STATS:
+        _shadow_blocked_agg(key)
 
 
 def _load_shadow_stats():
     """봇 시작 시 저장된 섀도우 성과 통계 로드"""
     global _SHADOW_PERF_STATS, _SHADOW_TRADE_COUNT
+    # 📒 저널: 스냅샷 이후 레코드 (스냅샷 없이 저널만 있어도 재생)
+    _jrecs = []
+    if _SHADOW_JOURNAL is not None:
+        _jrecs = _SHADOW_JOURNAL.load({"perf": SHADOW_STATS_PATH, "blocked": SHADOW_BLOCKED_STATS_PATH})
     try:
-        if os.path.exists(SHADOW_STATS_PATH):
-            with open(SHADOW_STATS_PATH, "r", encoding="utf-8") as f:
-                _SHADOW_PERF_STATS = json.load(f)
+        if os.path.exists(SHADOW_STATS_PATH) or _jrecs:
+            if os.path.exists(SHADOW_STATS_PATH):
+                with open(SHADOW_STATS_PATH, "r", encoding="utf-8") as f:
+                    _SHADOW_PERF_STATS = decode_stats(json.load(f))
             # 🔧 마이그레이션: 누락 필드 보완 (이전 버전 호환)
             for key, s in _SHADOW_PERF_STATS.items():
                 if "mfes" not in s:
@@ -13642,6 +17257,12 @@ def _load_shadow_stats():
                                ("pnl_curve_sum", {}), ("pnl_curve_cnt", {})):
                     if _f not in s:
                         s[_f] = _d
+            # 📒 스냅샷 이후 저널 레코드 재생 (아래 1회성 리셋보다 먼저 — 기존 단일 파일과 같은 의미)
+            if _jrecs:
+                with _SHADOW_PERF_LOCK:
+                    _n = _SHADOW_JOURNAL.replay("perf", ("res",), lambda k, d: _shadow_apply_result(d))
+                if _n:
+                    print(f"[SHADOW_STATS] 저널 재생: {_n}건")
             # v12 1회성 리셋: F/H/I에 W/L 임계치 필터 추가로 기존 데이터 무효
             # F: ema_spread_60>=1.0 (W1.36/L0.82, 1887건), H: macd_15_bps>=10 (W18.5/L1.3, 137건), I: macd_15_bps>=15 (W23.3/L6.8, 125건)
             _v12_marker = os.path.join(os.path.dirname(SHADOW_STATS_PATH), ".v12_filters_reset_done")
@@ -13996,12 +17617,35 @@ def _load_shadow_stats():
             print("[SHADOW_STATS] G3: G2 blocked 통계 정리 완료")
         except Exception:
             pass
+    # 📐 링/스케치 수화 + 윈도우 집계 재구성 (마이그레이션·리셋·정리 이후 최종 상태 기준)
+    with _SHADOW_PERF_LOCK:
+        _shadow_rebuild_aggs()
+    # 📒 재생한 레코드는 스냅샷으로 흡수 (다음 기동 재생량 최소화)
+    if _jrecs:
+        _save_shadow_stats(background=True)
 
 
-def _save_shadow_stats():
-    """섀도우 성과 통계 파일 저장 (일반 + 차단 건 동시 저장)"""
+def _shadow_capture():
+    """압축 스레드 — 일반/차단 통계 스냅샷 bytes + 저널 회전 (같은 락 안: 스냅샷 seq 정합)"""
+    with _SHADOW_PERF_LOCK:
+        perf = _copy_route_stats(_SHADOW_PERF_STATS)
+        blocked = _copy_route_stats(_SHADOW_BLOCKED_STATS)
+        seq = _SHADOW_JOURNAL.rotate()
+    # 📐 인코딩(링/스케치 압축 + 레코드 열 지향)·직렬화는 락 밖 — 락 보유 = 구조 복사 시간
+    perf = json.dumps(encode_stats(perf), ensure_ascii=False).encode("utf-8")
+    blocked = json.dumps(encode_stats(blocked), ensure_ascii=False).encode("utf-8")
+    return seq, {"perf": (SHADOW_STATS_PATH, perf), "blocked": (SHADOW_BLOCKED_STATS_PATH, blocked)}
+
+
+def _save_shadow_stats(background=False):
+    """섀도우 성과 통계 파일 저장 (일반 + 차단 건 동시 저장)
+    📒 저널 활성 시 = 스냅샷 압축 (background=True 면 호출 스레드는 직렬화 안 함)"""
+    if _SHADOW_JOURNAL is not None:
+        _SHADOW_JOURNAL.compact(_shadow_capture, background=background)
+        return
     with _SHADOW_PERF_LOCK:
-        payload = json.dumps(_SHADOW_PERF_STATS, ensure_ascii=False)
+        snap = _copy_route_stats(_SHADOW_PERF_STATS)
+    payload = json.dumps(encode_stats(snap), ensure_ascii=False)
     try:
         tmp = SHADOW_STATS_PATH + ".tmp"
         with open(tmp, "w", encoding="utf-8") as f:
@@ -14015,10 +17659,19 @@ def _save_shadow_stats():
 def _load_blocked_stats():
     """봇 시작 시 저장된 차단 건 가상 추적 통계 로드"""
     global _SHADOW_BLOCKED_STATS, _SHADOW_BLOCKED_TRADE_COUNT
+    _jrecs = []
+    if _SHADOW_JOURNAL is not None:
+        _jrecs = _SHADOW_JOURNAL.load({"perf": SHADOW_STATS_PATH, "blocked": SHADOW_BLOCKED_STATS_PATH})  # 캐시
     try:
-        if os.path.exists(SHADOW_BLOCKED_STATS_PATH):
-            with open(SHADOW_BLOCKED_STATS_PATH, "r", encoding="utf-8") as f:
-                _SHADOW_BLOCKED_STATS = json.load(f)
+        if os.path.exists(SHADOW_BLOCKED_STATS_PATH) or _jrecs:
+            if os.path.exists(SHADOW_BLOCKED_STATS_PATH):
+                with open(SHADOW_BLOCKED_STATS_PATH, "r", encoding="utf-8") as f:
+                    _SHADOW_BLOCKED_STATS = decode_stats(json.load(f))
+            if _jrecs:
+                with _SHADOW_PERF_LOCK:
+                    _n = _SHADOW_JOURNAL.replay("blocked", ("blk",), lambda k, d: _shadow_apply_blocked(d))
+                if _n:
+                    print(f"[BLOCKED_STATS] 저널 재생: {_n}건")
             _SHADOW_BLOCKED_TRADE_COUNT = sum(
                 s.get("signals", 0) for s in _SHADOW_BLOCKED_STATS.values())
             print(f"[BLOCKED_STATS] 로드 완료: {len(_SHADOW_BLOCKED_STATS)}개 필터, "
@@ -14064,7 +17717,7 @@ def _check_blocked_filter_alerts_on_load():
             parts.append(f"  ✅ 유효 필터: {valid_cnt}개 (정상 작동 중)")
         msg = "🔄 [재시작] 차단 필터 누적 판정:\n" + "\n".join(parts)
         try:
-            tg_send(msg)
+            tg_send(msg, priority=TG_PRIO_REPORT)
         except Exception as e:
             print(f"[BLOCKED_ALERT] 전송 실패: {e}")
         print(msg)
@@ -14072,8 +17725,12 @@ def _check_blocked_filter_alerts_on_load():
 
 def _save_blocked_stats():
     """차단 건 통계 파일 저장 (atomic write)"""
+    if _SHADOW_JOURNAL is not None:
+        _save_shadow_stats()  # 📒 스냅샷은 일반+차단 한 번에 (저널 seq 정합)
+        return
     with _SHADOW_PERF_LOCK:
-        payload = json.dumps(_SHADOW_BLOCKED_STATS, ensure_ascii=False)
+        snap = _copy_route_stats(_SHADOW_BLOCKED_STATS)
+    payload = json.dumps(encode_stats(snap), ensure_ascii=False)
     try:
         tmp = SHADOW_BLOCKED_STATS_PATH + ".tmp"
         with open(tmp, "w", encoding="utf-8") as f:
@@ -14088,69 +17745,91 @@ def _shadow_record_blocked_result(route, strat_name, market, pnl_pct, mfe_pct,
                                    mae=None, fail_value=None, fail_threshold=None,
                                    fail_direction=None):
     """차단 건 가상 추적 결과 기록 — 시나리오:필터별 W/L, PnL, MFE, MAE, 보유시간, 임계치값 누적"""
+    ev = {"route": route, "strat": strat_name, "market": market, "pnl": pnl_pct, "mfe": mfe_pct,
+          "reason": exit_reason, "hold": hold_sec, "by": blocked_by, "mae": mae,
+          "fv": fail_value, "ft": fail_threshold, "fd": fail_direction}
+    with _SHADOW_PERF_LOCK:
+        _should_save = _shadow_apply_blocked(ev)
+        if _SHADOW_JOURNAL is not None:
+            _SHADOW_JOURNAL.append("blk", ev)
+    if _SHADOW_JOURNAL is not None:
+        if _SHADOW_JOURNAL.needs_compact():
+            _save_shadow_stats(background=True)
+    elif _should_save:
+        _save_blocked_stats()
+
+
+def _shadow_apply_blocked(ev):
+    """차단 건 결과 이벤트 1건 → _SHADOW_BLOCKED_STATS 누적 (_SHADOW_PERF_LOCK 보유 상태에서 호출)"""
     global _SHADOW_BLOCKED_TRADE_COUNT
+    route, strat_name, blocked_by = ev["route"], ev["strat"], ev["by"]
+    pnl_pct, mfe_pct, exit_reason, hold_sec = ev["pnl"], ev["mfe"], ev["reason"], ev["hold"]
+    mae, fail_value, fail_threshold, fail_direction = ev.get("mae"), ev.get("fv"), ev.get("ft"), ev.get("fd")
     # v15: route 포함 → 시나리오별 분리 (같은 필터라도 시나리오마다 별도 통계)
     key = f"{route}:{blocked_by}" if blocked_by else f"{route}:{strat_name}"
     is_win = pnl_pct > 0
-    with _SHADOW_PERF_LOCK:
-        if key not in _SHADOW_BLOCKED_STATS:
-            if len(_SHADOW_BLOCKED_STATS) >= 200:
-                min_key = min(_SHADOW_BLOCKED_STATS, key=lambda k: _SHADOW_BLOCKED_STATS[k].get("signals", 0))
-                del _SHADOW_BLOCKED_STATS[min_key]
-            _SHADOW_BLOCKED_STATS[key] = {
-                "filter": blocked_by, "route": route, "strat": strat_name,
-                "signals": 0, "wins": 0, "losses": 0,
-                "total_pnl": 0.0, "pnls": [],
-                "mfes": [], "hold_secs": [],
-                "mae_sum": 0.0, "mae_cnt": 0,
-                "exit_reasons": {},
-                "fail_values": [],  # v16: 차단 시점 실제 지표 값
-                "fail_threshold": fail_threshold,
-                "fail_direction": fail_direction,
-            }
-        s = _SHADOW_BLOCKED_STATS[key]
-        # 마이그레이션: 기존 데이터에 누락 필드 보충
-        if "mfes" not in s:
-            s["mfes"] = []
-        if "hold_secs" not in s:
-            s["hold_secs"] = []
-        if "mae_sum" not in s:
-            s["mae_sum"] = 0.0
-        if "mae_cnt" not in s:
-            s["mae_cnt"] = 0
-        if "fail_values" not in s:
-            s["fail_values"] = []
-        if "fail_threshold" not in s and fail_threshold is not None:
-            s["fail_threshold"] = fail_threshold
-        if "fail_direction" not in s and fail_direction is not None:
-            s["fail_direction"] = fail_direction
-        s["signals"] += 1
-        if is_win:
-            s["wins"] += 1
-        else:
-            s["losses"] += 1
-        s["total_pnl"] = round(s["total_pnl"] + pnl_pct, 6)
-        s["pnls"].append(round(pnl_pct, 5))
-        if len(s["pnls"]) > 200:
-            s["pnls"] = s["pnls"][-200:]
-        s["mfes"].append(round(mfe_pct, 5))
-        if len(s["mfes"]) > 200:
-            s["mfes"] = s["mfes"][-200:]
-        s["hold_secs"].append(round(hold_sec, 1))
-        if len(s["hold_secs"]) > 200:
-            s["hold_secs"] = s["hold_secs"][-200:]
-        if mae is not None:
-            s["mae_sum"] = round(s["mae_sum"] + mae, 6)
-            s["mae_cnt"] += 1
-        if fail_value is not None:
-            s["fail_values"].append({"v": round(fail_value, 4), "pnl": round(pnl_pct, 5)})
-            if len(s["fail_values"]) > 200:
-                s["fail_values"] = s["fail_values"][-200:]
-        s["exit_reasons"][exit_reason] = s["exit_reasons"].get(exit_reason, 0) + 1
-        _SHADOW_BLOCKED_TRADE_COUNT += 1
-        _should_save = (_SHADOW_BLOCKED_TRADE_COUNT % SHADOW_STATS_SAVE_INTERVAL == 0)
-    if _should_save:
-        _save_blocked_stats()
+    if key not in _SHADOW_BLOCKED_STATS:
+        if len(_SHADOW_BLOCKED_STATS) >= 200:
+            min_key = min(_SHADOW_BLOCKED_STATS, key=lambda k: _SHADOW_BLOCKED_STATS[k].get("signals", 0))
+            del _SHADOW_BLOCKED_STATS[min_key]
+            _SHADOW_BLOCKED_AGG.pop(min_key, None)
+        _SHADOW_BLOCKED_AGG.pop(key, None)
+        _SHADOW_BLOCKED_STATS[key] = {
+            "filter": blocked_by, "route": route, "strat": strat_name,
+            "signals": 0, "wins": 0, "losses": 0,
+            "total_pnl": 0.0, "pnls": RingBuffer(200),
+            "mfes": RingBuffer(200), "hold_secs": RingBuffer(200),
+            "mae_sum": 0.0, "mae_cnt": 0,
+            "exit_reasons": {},
+            "fail_values": [],  # v16: 차단 시점 실제 지표 값
+            "fail_threshold": fail_threshold,
+            "fail_direction": fail_direction,
+        }
+    s = _SHADOW_BLOCKED_STATS[key]
+    # 마이그레이션: 기존 데이터에 누락 필드 보충
+    if "mfes" not in s:
+        s["mfes"] = []
+    if "hold_secs" not in s:
+        s["hold_secs"] = []
+    if "mae_sum" not in s:
+        s["mae_sum"] = 0.0
+    if "mae_cnt" not in s:
+        s["mae_cnt"] = 0
+    if "fail_values" not in s:
+        s["fail_values"] = []
+    if "fail_threshold" not in s and fail_threshold is not None:
+        s["fail_threshold"] = fail_threshold
+    if "fail_direction" not in s and fail_direction is not None:
+        s["fail_direction"] = fail_direction
+    _shadow_hydrate(s)
+    s["signals"] += 1
+    if is_win:
+        s["wins"] += 1
+    else:
+        s["losses"] += 1
+    s["total_pnl"] = round(s["total_pnl"] + pnl_pct, 6)
+    s["pnls"].append(round(pnl_pct, 5))
+    s["mfes"].append(round(mfe_pct, 5))
+    s["hold_secs"].append(round(hold_sec, 1))
+    s["pnl_q"].add(pnl_pct)
+    s["mfe_q"].add(mfe_pct)
+    s["hold_q"].add(hold_sec)
+    if mae is not None:
+        s["mae_sum"] = round(s["mae_sum"] + mae, 6)
+        s["mae_cnt"] += 1
+    if fail_value is not None:
+        # 📐 fail_values 윈도우(200) ↔ 히스토그램 동기 (추가 + 퇴출분 제거)
+        _fh = _shadow_blocked_agg(key)
+        _fv = {"v": round(fail_value, 4), "pnl": round(pnl_pct, 5)}
+        s["fail_values"].append(_fv)
+        _fh.add(_fv["v"], _fv["pnl"])
+        if len(s["fail_values"]) > 200:
+            for _old in s["fail_values"][:-200]:
+                _fh.remove(_old["v"], _old["pnl"])
+            del s["fail_values"][:-200]
+    s["exit_reasons"][exit_reason] = s["exit_reasons"].get(exit_reason, 0) + 1
+    _SHADOW_BLOCKED_TRADE_COUNT += 1
+    return _SHADOW_BLOCKED_TRADE_COUNT % SHADOW_STATS_SAVE_INTERVAL == 0
 
 
 def _calc_ind_avg(ind_list):
@@ -14196,8 +17875,8 @@ def _shadow_auto_analyze_indicators(min_samples=10, effect_threshold=0.8):
     """
     import math
     results = {}
-    with _SHADOW_PERF_LOCK:
-        for key, s in _SHADOW_PERF_STATS.items():
+    with _shadow_view_lock():
+        for key, s in _shadow_perf_view().items():
             w_avg = s.get("win_ind_avg", {})
             w_cnt = s.get("win_ind_cnt", {})
             w_m2 = s.get("win_ind_m2", {})
@@ -14258,152 +17937,169 @@ def _shadow_record_result(route, strat_name, market, pnl_pct, mfe_pct, exit_reas
                           indicators=None, mae=None, pnl_curve=None, signal_id=None):
     """섀도우 가상매매 결과를 누적 통계에 기록 (점진적 평균 + Welford 분산).
 
-    signal_id: COMMON_COHORT paired 매칭 키 · VP 에서 전달 · 없으면 매칭 불가."""
-    global _SHADOW_TRADE_COUNT
-    key = f"{route}:{strat_name}"
-    is_win = pnl_pct > 0
+    signal_id: COMMON_COHORT paired 매칭 키 · VP 에서 전달 · 없으면 매칭 불가.
+    📒 결과 이벤트를 저널에 append (재시작 시 같은 reducer 로 재생 — 시각/epoch 도 이벤트에 고정)"""
+    ev = {"route": route, "strat": strat_name, "market": market, "pnl": pnl_pct, "mfe": mfe_pct,
+          "reason": exit_reason, "hold": hold_sec, "ind": indicators, "mae": mae,
+          "curve": pnl_curve, "sid": signal_id,
+          "ts": time.time(), "epoch": _route_experiment_epoch(route)}
     with _SHADOW_PERF_LOCK:
-        if key not in _SHADOW_PERF_STATS:
-            _SHADOW_PERF_STATS[key] = {
-                "route": route, "strat": strat_name,
-                "signals": 0, "wins": 0, "losses": 0,
-                "total_pnl": 0.0, "pnls": [], "mfes": [],
-                "exit_reasons": {}, "hold_secs": [],
-                "coins": [],
-                "win_ind_avg": {}, "win_ind_cnt": {},
-                "loss_ind_avg": {}, "loss_ind_cnt": {},
-                "win_ind_m2": {}, "loss_ind_m2": {},
-                "mae_sum": 0.0, "mae_cnt": 0,
-                "pnl_curve_sum": {}, "pnl_curve_cnt": {},
-                "sl_hit_secs": [],           # v18d: SL 히트 시점 (초)
-                "coin_wl": {},               # v18d: 코인별 {coin: [wins, losses]}
-                "_v11_filters_reset": True,
-            }
-        s = _SHADOW_PERF_STATS[key]
-        # v11 이후: 구 마이그레이션 불필요 (전체 리셋 완료)
-        # 필드 보장만 수행
-        for _field, _default in (("win_ind_avg", {}), ("win_ind_cnt", {}),
-                                  ("loss_ind_avg", {}), ("loss_ind_cnt", {}),
-                                  ("win_ind_m2", {}), ("loss_ind_m2", {}),
-                                  ("mae_sum", 0.0), ("mae_cnt", 0),
-                                  ("pnl_curve_sum", {}), ("pnl_curve_cnt", {}),
-                                  ("sl_hit_secs", []), ("coin_wl", {})):
-            if _field not in s:
-                s[_field] = _default
-        s["signals"] += 1
-        if is_win:
-            s["wins"] += 1
-        else:
-            s["losses"] += 1
-        s["total_pnl"] = round(s["total_pnl"] + pnl_pct, 6)
-        s["pnls"].append(round(pnl_pct, 5))
-        if len(s["pnls"]) > 200:
-            s["pnls"] = s["pnls"][-200:]
-        s["mfes"].append(round(mfe_pct, 5))
-        if len(s["mfes"]) > 200:
-            s["mfes"] = s["mfes"][-200:]
-        # 청산 사유별 카운트
-        s["exit_reasons"][exit_reason] = s["exit_reasons"].get(exit_reason, 0) + 1
-        # 보유 시간
-        s["hold_secs"].append(round(hold_sec, 1))
-        if len(s["hold_secs"]) > 200:
-            s["hold_secs"] = s["hold_secs"][-200:]
-        # 코인 종류
-        coin = market.split("-")[-1] if "-" in market else market
-        if coin not in s["coins"]:
-            s["coins"].append(coin)
-            if len(s["coins"]) > 50:
-                s["coins"] = s["coins"][-50:]
-        # v18d: SL 히트 시점 기록
-        if exit_reason == "손절SL":
-            sl_secs = s.get("sl_hit_secs", [])
-            sl_secs.append(round(hold_sec, 1))
-            if len(sl_secs) > 200:
-                sl_secs = sl_secs[-200:]
-            s["sl_hit_secs"] = sl_secs
-        # v18d: 코인별 W/L 기록
-        coin_wl = s.get("coin_wl", {})
-        if coin not in coin_wl:
-            coin_wl[coin] = [0, 0]
-        if is_win:
-            coin_wl[coin][0] += 1
-        else:
-            coin_wl[coin][1] += 1
-        s["coin_wl"] = coin_wl
-        # 🔬 진입 지표값 승/패 점진적 평균 + Welford 분산 업데이트
-        if indicators:
-            if is_win:
-                avg_key, cnt_key, m2_key = "win_ind_avg", "win_ind_cnt", "win_ind_m2"
-            else:
-                avg_key, cnt_key, m2_key = "loss_ind_avg", "loss_ind_cnt", "loss_ind_m2"
-            avg = s.get(avg_key, {})
-            cnt = s.get(cnt_key, {})
-            m2 = s.get(m2_key, {})
-            for k, v in indicators.items():
-                if isinstance(v, (int, float)) and not (math.isnan(v) or math.isinf(v)):
-                    cnt[k] = cnt.get(k, 0) + 1
-                    cn = cnt[k]
-                    if cn == 1:
-                        avg[k] = round(v, 6)
-                        m2[k] = 0.0
-                    else:
-                        old_avg = avg[k]
-                        avg[k] = round(old_avg + (v - old_avg) / cn, 6)
-                        m2[k] = round(m2[k] + (v - old_avg) * (v - avg[k]), 6)
-            s[avg_key] = avg
-            s[cnt_key] = cnt
-            s[m2_key] = m2
-        # v18: per-trade 기록 저장 → 임계치 sweep 전체건 비교용
-        if indicators:
-            if "trade_records" not in s:
-                s["trade_records"] = []
-            _tr = {
-                "pnl": round(pnl_pct, 5),
-                "mfe": round(mfe_pct, 5),
-                "hold": round(hold_sec, 1),
-                "exit_reason": exit_reason,
-                # advisor 1 지적 (2026-08-04): PURITY epoch 분리에 필요한 timestamp/epoch 태그
-                # 이전엔 없어서 _in_epoch() 항상 False → 모든 trade 가 legacy 로 오분류
-                "exit_ts": time.time(),
-                # advisor 2 아키텍처 개선 (2026-08-08): route_epoch 는 배포 SHA 가 아니라
-                # per-route 실험 계약 버전. 배포 빈도가 실험 축적을 리셋하지 않도록 분리.
-                "route_epoch": _route_experiment_epoch(route),
-                # advisor 2 진단 (2026-08-06): COMMON_COHORT CONTROL_A_common=0 원인
-                # signal_id 없으면 _common_cohort_paired_summary 에서 arm 간 매칭 불가
-                "signal_id": signal_id,
-                "inds": {k: round(v, 4) for k, v in indicators.items() if isinstance(v, (int, float))}
-            }
-            # v18e: 개별 건 pnl_curve 저장 → 조기 탈출 분석용
-            if pnl_curve:
-                _tr["curve"] = {k: round(v, 5) for k, v in pnl_curve.items()}
-            s["trade_records"].append(_tr)
-            _tr_cap = 300 if route in ("SVE1", "GT", "LTRP", "CLM") else 50
-            if len(s["trade_records"]) > _tr_cap:
-                s["trade_records"] = s["trade_records"][-_tr_cap:]
-        # MAE 누적
-        if mae is not None:
-            s["mae_sum"] = round(s.get("mae_sum", 0.0) + mae, 6)
-            s["mae_cnt"] = s.get("mae_cnt", 0) + 1
-        # PnL 곡선 스냅샷 누적
-        if pnl_curve:
-            cs = s.get("pnl_curve_sum", {})
-            cc = s.get("pnl_curve_cnt", {})
-            for sec_key, pval in pnl_curve.items():
-                sk = str(sec_key)
-                cs[sk] = round(cs.get(sk, 0.0) + pval, 6)
-                cc[sk] = cc.get(sk, 0) + 1
-            s["pnl_curve_sum"] = cs
-            s["pnl_curve_cnt"] = cc
-        _SHADOW_TRADE_COUNT += 1
-        _should_save = (_SHADOW_TRADE_COUNT % SHADOW_STATS_SAVE_INTERVAL == 0)  # 🔧 FIX: 락 안에서 체크
+        _should_save = _shadow_apply_result(ev)
+        if _SHADOW_JOURNAL is not None:
+            _SHADOW_JOURNAL.append("res", ev)
 
     if route == "SVE1" and indicators:
         _sve2_update_rolling(indicators)
 
-    if _should_save:
+    if _SHADOW_JOURNAL is not None:
+        if _SHADOW_JOURNAL.needs_compact():
+            _save_shadow_stats(background=True)
+    elif _should_save:
         _save_shadow_stats()
 
 
+def _shadow_apply_result(ev):
+    """섀도우 결과 이벤트 1건 → _SHADOW_PERF_STATS 누적 (_SHADOW_PERF_LOCK 보유 상태에서 호출).
+    Returns: 주기 저장 시점 여부 (저널 비활성 시 사용)"""
+    global _SHADOW_TRADE_COUNT
+    route, strat_name, market = ev["route"], ev["strat"], ev["market"]
+    pnl_pct, mfe_pct, exit_reason, hold_sec = ev["pnl"], ev["mfe"], ev["reason"], ev["hold"]
+    indicators, mae, pnl_curve, signal_id = ev.get("ind"), ev.get("mae"), ev.get("curve"), ev.get("sid")
+    key = f"{route}:{strat_name}"
+    is_win = pnl_pct > 0
+    if key not in _SHADOW_PERF_STATS:
+        _SHADOW_PERF_STATS[key] = {
+            "route": route, "strat": strat_name,
+            "signals": 0, "wins": 0, "losses": 0,
+            "total_pnl": 0.0, "pnls": RingBuffer(200), "mfes": RingBuffer(200),
+            "exit_reasons": {}, "hold_secs": RingBuffer(200),
+            "coins": [],
+            "win_ind_avg": {}, "win_ind_cnt": {},
+            "loss_ind_avg": {}, "loss_ind_cnt": {},
+            "win_ind_m2": {}, "loss_ind_m2": {},
+            "mae_sum": 0.0, "mae_cnt": 0,
+            "pnl_curve_sum": {}, "pnl_curve_cnt": {},
+            "sl_hit_secs": RingBuffer(200),  # v18d: SL 히트 시점 (초)
+            "coin_wl": {},               # v18d: 코인별 {coin: [wins, losses]}
+            "_v11_filters_reset": True,
+        }
+    s = _SHADOW_PERF_STATS[key]
+    # v11 이후: 구 마이그레이션 불필요 (전체 리셋 완료)
+    # 필드 보장만 수행
+    for _field, _default in (("win_ind_avg", {}), ("win_ind_cnt", {}),
+                              ("loss_ind_avg", {}), ("loss_ind_cnt", {}),
+                              ("win_ind_m2", {}), ("loss_ind_m2", {}),
+                              ("mae_sum", 0.0), ("mae_cnt", 0),
+                              ("pnl_curve_sum", {}), ("pnl_curve_cnt", {}),
+                              ("sl_hit_secs", []), ("coin_wl", {})):
+        if _field not in s:
+            s[_field] = _default
+    _shadow_hydrate(s)
+    s["signals"] += 1
+    if is_win:
+        s["wins"] += 1
+    else:
+        s["losses"] += 1
+    s["total_pnl"] = round(s["total_pnl"] + pnl_pct, 6)
+    s["pnls"].append(round(pnl_pct, 5))
+    s["mfes"].append(round(mfe_pct, 5))
+    # 📐 전체 분포 (누적 분위수 — 링은 최근 200건만)
+    s["pnl_q"].add(pnl_pct)
+    s["mfe_q"].add(mfe_pct)
+    s["hold_q"].add(hold_sec)
+    # 청산 사유별 카운트
+    s["exit_reasons"][exit_reason] = s["exit_reasons"].get(exit_reason, 0) + 1
+    # 보유 시간
+    s["hold_secs"].append(round(hold_sec, 1))
+    # 코인 종류
+    coin = market.split("-")[-1] if "-" in market else market
+    if coin not in s["coins"]:
+        s["coins"].append(coin)
+        if len(s["coins"]) > 50:
+            s["coins"] = s["coins"][-50:]
+    # v18d: SL 히트 시점 기록
+    if exit_reason == "손절SL":
+        s["sl_hit_secs"].append(round(hold_sec, 1))
+    # v18d: 코인별 W/L 기록
+    coin_wl = s.get("coin_wl", {})
+    if coin not in coin_wl:
+        coin_wl[coin] = [0, 0]
+    if is_win:
+        coin_wl[coin][0] += 1
+    else:
+        coin_wl[coin][1] += 1
+    s["coin_wl"] = coin_wl
+    # 🔬 진입 지표값 승/패 점진적 평균 + Welford 분산 업데이트
+    if indicators:
+        if is_win:
+            avg_key, cnt_key, m2_key = "win_ind_avg", "win_ind_cnt", "win_ind_m2"
+        else:
+            avg_key, cnt_key, m2_key = "loss_ind_avg", "loss_ind_cnt", "loss_ind_m2"
+        avg = s.get(avg_key, {})
+        cnt = s.get(cnt_key, {})
+        m2 = s.get(m2_key, {})
+        for k, v in indicators.items():
+            if isinstance(v, (int, float)) and not (math.isnan(v) or math.isinf(v)):
+                cnt[k] = cnt.get(k, 0) + 1
+                cn = cnt[k]
+                if cn == 1:
+                    avg[k] = round(v, 6)
+                    m2[k] = 0.0
+                else:
+                    old_avg = avg[k]
+                    avg[k] = round(old_avg + (v - old_avg) / cn, 6)
+                    m2[k] = round(m2[k] + (v - old_avg) * (v - avg[k]), 6)
+        s[avg_key] = avg
+        s[cnt_key] = cnt
+        s[m2_key] = m2
+    # v18: per-trade 기록 저장 → 임계치 sweep 전체건 비교용
+    if indicators:
+        if "trade_records" not in s:
+            s["trade_records"] = []
+        _tr = {
+            "pnl": round(pnl_pct, 5),
+            "mfe": round(mfe_pct, 5),
+            "hold": round(hold_sec, 1),
+            "exit_reason": exit_reason,
+            # advisor 1 지적 (2026-08-04): PURITY epoch 분리에 필요한 timestamp/epoch 태그
+            # 이전엔 없어서 _in_epoch() 항상 False → 모든 trade 가 legacy 로 오분류
+            "exit_ts": ev["ts"],
+            # advisor 2 아키텍처 개선 (2026-08-08): route_epoch 는 배포 SHA 가 아니라
+            # per-route 실험 계약 버전. 배포 빈도가 실험 축적을 리셋하지 않도록 분리.
+            "route_epoch": ev["epoch"],
+            # advisor 2 진단 (2026-08-06): COMMON_COHORT CONTROL_A_common=0 원인
+            # signal_id 없으면 _common_cohort_paired_summary 에서 arm 간 매칭 불가
+            "signal_id": signal_id,
+            "inds": {k: round(v, 4) for k, v in indicators.items() if isinstance(v, (int, float))}
+        }
+        # v18e: 개별 건 pnl_curve 저장 → 조기 탈출 분석용
+        if pnl_curve:
+            _tr["curve"] = {k: round(v, 5) for k, v in pnl_curve.items()}
+        # 📐 윈도우 집계 동기 (추가 + 퇴출분 제거, 퇴출 누적이 윈도우 크기에 닿으면 재구성)
+        _agg = _shadow_route_agg(key)
+        s["trade_records"].append(_tr)
+        _agg.add(_tr)
+        _tr_cap = 300 if route in ("SVE1", "GT", "LTRP", "CLM") else 50
+        if len(s["trade_records"]) > _tr_cap:
+            _agg.trim(s["trade_records"], _tr_cap)
+    # MAE 누적
+    if mae is not None:
+        s["mae_sum"] = round(s.get("mae_sum", 0.0) + mae, 6)
+        s["mae_cnt"] = s.get("mae_cnt", 0) + 1
+    # PnL 곡선 스냅샷 누적
+    if pnl_curve:
+        cs = s.get("pnl_curve_sum", {})
+        cc = s.get("pnl_curve_cnt", {})
+        for sec_key, pval in pnl_curve.items():
+            sk = str(sec_key)
+            cs[sk] = round(cs.get(sk, 0.0) + pval, 6)
+            cc[sk] = cc.get(sk, 0) + 1
+        s["pnl_curve_sum"] = cs
+        s["pnl_curve_cnt"] = cc
+    _SHADOW_TRADE_COUNT += 1
+    return _SHADOW_TRADE_COUNT % SHADOW_STATS_SAVE_INTERVAL == 0
+
+
 def _shadow_sim_exit(vp, cur_price):
     """가상포지션에 실제 청산 로직(TRAIL) 시뮬레이션 적용.
     Returns: (closed: bool, exit_reason: str)
@@ -14615,30 +18311,83 @@ def _shadow_sim_exit(vp, cur_price):
     return False, ""
 
 
-def _shadow_evaluate_positions():
-    """섀도우 가상포지션에 청산 로직 적용 — 메인 루프 매 사이클 호출
-    일반 가상 포지션 + 차단 건 가상 추적 + 대기열(Pending Queue) 처리"""
-    now = time.time()
+def _shadow_pending_to_vp(ps, cur_price, dd_peak, elapsed, now):
+    """gate 통과 대기 시그널 → 가상포지션 dict (현재가로 진입)"""
+    ep = ps["exit_params"]
+    merged_ind = dict(ps.get("indicators", {}))
+    merged_ind["gate_dd_peak"] = round(dd_peak, 6)
+    merged_ind["gate_elapsed"] = round(elapsed, 1)
+    merged_ind["gate_signal_price"] = ps["signal_price"]
+    return {
+        "route": ps["route"], "strat": ps["strat"],
+        "market": ps["market"], "entry_price": cur_price,
+        "entry_ts": now, "best_price": cur_price,
+        "worst_price": cur_price,
+        "trail_armed": False, "trail_stop": 0.0,
+        "exit_params": ep, "bars": 0,
+        "indicators": merged_ind, "pnl_curve": {},
+        "_pullback_delay_sec": 0,
+        "_pullback_best_price": cur_price,
+        "_pullback_orig_price": cur_price,
+        # COMMON_COHORT paired 매칭 · gate 승격은 원신호 시점(ps.signal_ts) 기준
+        # (VP entry_ts 는 gate_sec 만큼 지연되어 arm 간 mismatch 발생 가능)
+        "signal_id": f"{ps['market']}:{int(ps['signal_ts'])}",
+    }
+
+
+def _shadow_close_ind(vp):
+    """청산 결과 지표 = 진입 지표 + MFE 도달 시점 / 초반 스냅샷 / AT 메타"""
+    _close_ind = dict(vp.get("indicators", {}))
+    if "_mfe_sec" in vp:
+        _close_ind["mfe_peak_sec"] = round(vp["_mfe_sec"], 0)
+    for _sk in ("mfe_30s", "dd_peak_30s", "mfe_60s", "dd_peak_60s", "mae_60s"):
+        if _sk in vp:
+            _close_ind[_sk] = vp[_sk]
+    _at_meta = vp.get("_at_meta")
+    if _at_meta:
+        _close_ind["at_ob_slip"] = _at_meta.get("ob_slip")
+        _close_ind["at_trail_pct"] = _at_meta.get("base_trail_pct")
+        _close_ind["at_tier"] = _at_meta.get("tier")
+        _close_ind["at_max_hold"] = _at_meta.get("max_hold")
+    return _close_ind
+
+
+def _shadow_step_book(now, price_map, path_map=None):
+    """북 경로 — 전 행 1회 벡터 전이 → 청산 행을 기존 결과 튜플 형식으로.
+    path_map: 직전 평가 이후 체결 경로 (있으면 구간 피벗 재생, 레벨 청산은 레벨가 체결)
+    gate 통과 대기 시그널은 VP 로 등록되어 다음 평가부터 추적 (기존 경로는 같은 사이클에 1회 평가)"""
+    closed_results = []
+    blocked_closed = []
     with _SHADOW_LOCK:
-        if not _SHADOW_VIRTUAL_POSITIONS and not _SHADOW_BLOCKED_POSITIONS and not _SHADOW_PENDING_SIGNALS:
-            return
-        all_vps = _SHADOW_VIRTUAL_POSITIONS + _SHADOW_BLOCKED_POSITIONS
-        pending_markets = [ps["market"] for ps in _SHADOW_PENDING_SIGNALS]
-        markets = list(set(vp["market"] for vp in all_vps) | set(pending_markets))
+        t0 = time.perf_counter()
+        closed, promoted = _SHADOW_BOOK.step(now, price_map, path_map)
+        for ps, cur_price, dd_peak, elapsed in promoted:
+            if _shadow_pos_count(_SHADOW_VP) < _shadow_pos_cap(_SHADOW_VP):
+                _shadow_add_position(_SHADOW_VP, _shadow_pending_to_vp(ps, cur_price, dd_peak, elapsed, now))
+        _ms = (time.perf_counter() - t0) * 1000
+        _SHADOW_BOOK.stats["last_ms"] = _ms
+        _SHADOW_BOOK.stats["max_ms"] = max(_SHADOW_BOOK.stats["max_ms"], _ms)
+    for vp, kind, reason, cur_price, exit_ts in closed:
+        entry_price = vp["entry_price"]
+        mfe = (vp["best_price"] - entry_price) / entry_price
+        mae = (vp["worst_price"] - entry_price) / entry_price
+        hold = exit_ts - vp["entry_ts"]   # 구간 피벗 청산은 피벗 시각 기준 (평가 시각 아님)
+        if reason == "가격없음":
+            # 기존 경로와 동일: 최고가 기준 PnL, 지표는 진입 지표만
+            closed_results.append((vp, round(mfe, 6), round(mfe, 6), round(mae, 6), reason, hold,
+                                   dict(vp.get("indicators", {})), vp.get("pnl_curve", {})))
+            continue
+        pnl = (cur_price - entry_price) / entry_price
+        if kind == _SHADOW_VP:
+            closed_results.append((vp, pnl, mfe, mae, reason, hold,
+                                   _shadow_close_ind(vp), vp.get("pnl_curve", {})))
+        else:
+            blocked_closed.append((vp, pnl, mfe, mae, reason, hold))
+    return closed_results, blocked_closed
 
-    # 시세 일괄 조회 (API 호출 절약)
-    price_map = {}
-    for i in range(0, len(markets), 10):
-        batch = markets[i:i+10]
-        try:
-            js = safe_upbit_get("https://api.upbit.com/v1/ticker",
-                                {"markets": ",".join(batch)}, retries=1)
-            if js:
-                for t in js:
-                    price_map[t["market"]] = t.get("trade_price", 0)
-        except Exception:
-            pass
 
+def _shadow_step_legacy(now, price_map):
+    """dict 리스트 경로 (북 비활성/numpy 미설치) — 대기열 → 가상포지션 → 차단 건 순차 _shadow_sim_exit"""
     # --- Pending Queue 처리: gate_delay_sec 경과 후 dd_peak 기반 승격/폐기 ---
     with _SHADOW_LOCK:
         pending_remaining = []
@@ -14665,27 +18414,8 @@ def _shadow_evaluate_positions():
             gate_max = ps["gate_dd_peak_max"]
             if dd_peak <= gate_max:
                 # 생존 확인 → VP 생성 (현재가로 진입)
-                ep = ps["exit_params"]
-                merged_ind = dict(ps.get("indicators", {}))
-                merged_ind["gate_dd_peak"] = round(dd_peak, 6)
-                merged_ind["gate_elapsed"] = round(elapsed, 1)
-                merged_ind["gate_signal_price"] = sig_price
                 if len(_SHADOW_VIRTUAL_POSITIONS) < SHADOW_MAX_VIRTUAL_POS:
-                    _SHADOW_VIRTUAL_POSITIONS.append({
-                        "route": ps["route"], "strat": ps["strat"],
-                        "market": ps["market"], "entry_price": cur_price,
-                        "entry_ts": now, "best_price": cur_price,
-                        "worst_price": cur_price,
-                        "trail_armed": False, "trail_stop": 0.0,
-                        "exit_params": ep, "bars": 0,
-                        "indicators": merged_ind, "pnl_curve": {},
-                        "_pullback_delay_sec": 0,
-                        "_pullback_best_price": cur_price,
-                        "_pullback_orig_price": cur_price,
-                        # COMMON_COHORT paired 매칭 · gate 승격은 원신호 시점(ps.signal_ts) 기준
-                        # (VP entry_ts 는 gate_sec 만큼 지연되어 arm 간 mismatch 발생 가능)
-                        "signal_id": f"{ps['market']}:{int(ps['signal_ts'])}",
-                    })
+                    _SHADOW_VIRTUAL_POSITIONS.append(_shadow_pending_to_vp(ps, cur_price, dd_peak, elapsed, now))
             # dd_peak > gate_max → 폐기 (로그 없이 drop)
         _SHADOW_PENDING_SIGNALS[:] = pending_remaining
 
@@ -14759,20 +18489,8 @@ def _shadow_evaluate_positions():
                 mfe = (vp["best_price"] - entry_price) / entry_price
                 mae = (vp.get("worst_price", entry_price) - entry_price) / entry_price
                 hold = now - vp["entry_ts"]
-                _close_ind = dict(vp.get("indicators", {}))
-                if "_mfe_sec" in vp:
-                    _close_ind["mfe_peak_sec"] = round(vp["_mfe_sec"], 0)
-                for _sk in ("mfe_30s", "dd_peak_30s", "mfe_60s", "dd_peak_60s", "mae_60s"):
-                    if _sk in vp:
-                        _close_ind[_sk] = vp[_sk]
-                _at_meta = vp.get("_at_meta")
-                if _at_meta:
-                    _close_ind["at_ob_slip"] = _at_meta.get("ob_slip")
-                    _close_ind["at_trail_pct"] = _at_meta.get("base_trail_pct")
-                    _close_ind["at_tier"] = _at_meta.get("tier")
-                    _close_ind["at_max_hold"] = _at_meta.get("max_hold")
                 closed_results.append((vp, pnl, mfe, mae, reason, hold,
-                                       _close_ind, vp.get("pnl_curve", {})))
+                                       _shadow_close_ind(vp), vp.get("pnl_curve", {})))
             else:
                 remaining.append(vp)
         _SHADOW_VIRTUAL_POSITIONS[:] = remaining
@@ -14810,6 +18528,50 @@ def _shadow_evaluate_positions():
             else:
                 blocked_remaining.append(vp)
         _SHADOW_BLOCKED_POSITIONS[:] = blocked_remaining
+    return closed_results, blocked_closed
+
+
+def _shadow_evaluate_positions():
+    """섀도우 가상포지션에 청산 로직 적용 — 메인 루프 매 사이클 호출
+    일반 가상 포지션 + 차단 건 가상 추적 + 대기열(Pending Queue) 처리"""
+    global _SHADOW_TICK_MKTS
+    now = time.time()
+    with _SHADOW_LOCK:
+        if _SHADOW_BOOK is not None:
+            markets = list(_SHADOW_BOOK.markets())
+            _SHADOW_TICK_MKTS = frozenset(markets)
+            if not markets:
+                return
+        else:
+            if not _SHADOW_VIRTUAL_POSITIONS and not _SHADOW_BLOCKED_POSITIONS and not _SHADOW_PENDING_SIGNALS:
+                return
+            all_vps = _SHADOW_VIRTUAL_POSITIONS + _SHADOW_BLOCKED_POSITIONS
+            pending_markets = [ps["market"] for ps in _SHADOW_PENDING_SIGNALS]
+            markets = list(set(vp["market"] for vp in all_vps) | set(pending_markets))
+
+    # 시세 일괄 조회 (API 호출 절약)
+    price_map = {}
+    for i in range(0, len(markets), SHADOW_TICKER_BATCH):
+        batch = markets[i:i+SHADOW_TICKER_BATCH]
+        try:
+            js = safe_upbit_get("https://api.upbit.com/v1/ticker",
+                                {"markets": ",".join(batch)}, retries=1)
+            if js:
+                for t in js:
+                    price_map[t["market"]] = t.get("trade_price", 0)
+        except Exception:
+            pass
+
+    if _SHADOW_BOOK is not None:
+        path_map = None
+        if SHADOW_TICK_PATH_ENABLED:
+            try:
+                path_map = _shadow_tick_drain(markets, now)
+            except Exception as e:
+                print(f"[SHADOW_TICK] 체결 경로 수집 실패: {e}")
+        closed_results, blocked_closed = _shadow_step_book(now, price_map, path_map)
+    else:
+        closed_results, blocked_closed = _shadow_step_legacy(now, price_map)
 
     # 청산 시점 호가창 스냅샷 → 슬리피지 추정
     if closed_results:
@@ -14827,8 +18589,9 @@ def _shadow_evaluate_positions():
                 if _eu:
                     _ci["ob_exit_bid1_krw"] = round(_eu[0].get("bid_price", 0) * _eu[0].get("bid_size", 0))
                     _ci["ob_exit_ask1_krw"] = round(_eu[0].get("ask_price", 0) * _eu[0].get("ask_size", 0))
+                    _eana = _ob_analytics(_eob)
                     for _amt in (100_000, 300_000, 500_000):
-                        _ss = _calc_vwap_slip(_eu, _amt, "sell")
+                        _ss = _eana.slip(_amt, "sell")
                         if _ss is not None:
                             _ci[f"ob_exit_slip_sell_{_amt // 1000}k"] = _ss
 
@@ -14863,7 +18626,330 @@ def _shadow_evaluate_positions():
             _SHADOW_PENDING_DEDUP.pop(k, None)
 
 
-def _v4_shadow_test_all_routes(market, c1, c5, c15, c30, c60, m3_info):
+# =========================
+# 🧭 전략 평가 그래프 (레지스트리 컴파일)
+# =========================
+# _STRATEGY_REGISTRY ~47 route 가 detector(check_fn) 10여 개를 공유 → route 가 아니라 detector 단위로 평가.
+# - 컴파일 (시작 시 1회 / reload_strategy_plan): shadow 순회 목록, priority 정렬된 LIVE 목록,
+#   route ind_filters → 중복 제거된 predicate 테이블 (같은 ("vr5", ">=", 3.0) 은 마켓당 1회 판정)
+# - 평가 (_StrategyEval): 마켓 1회 평가 동안 detector 결과를 shadow/LIVE 가 공유,
+#   봉 상태(각 TF 마지막 봉 시각/종가/고저/누적거래량)가 같으면 이전 스캔 결과 재사용
+# 🔧 LIVE 는 기존처럼 base check_fn 만 게이팅 (ind_filters 는 shadow 전용 — route_ind_filters_applied_to_live=false)
+_STRATEGY_GATE_INFO_CHECKS = {_v0_check_coin_personality}  # gate_info(market)를 읽음 → LIVE(None)/shadow 결과 분리
+_STRATEGY_VOLATILE_CHECKS = {_v0_check_time_momentum, _v0_check_coin_personality}  # 시각/코인통계 의존 → 봉 메모 제외
+_STRATEGY_PLAN = None
+_STRATEGY_PLAN_LOCK = threading.Lock()
+_STRATEGY_BAR_MEMO = LRUCache(maxsize=400)  # market -> (봉 fingerprint, {node_key: (sig, all_fails, 퍼널 카운터 증가분)})
+
+
+def _compile_strategy_plan():
+    preds = {}  # (key, op, th) -> predicate idx
+    routes = []  # (strat_name, strat, shadow check_fn, predicate idx tuple) — 레지스트리 순서
+    nodes = set()
+    for name, strat in _STRATEGY_REGISTRY.items():
+        fn = _SHADOW_CHECK_OVERRIDES.get(name, strat["check_fn"])
+        fidx = tuple(preds.setdefault((k, op, th), len(preds)) for k, op, th in (strat.get("ind_filters") or []))
+        routes.append((name, strat, fn, fidx))
+        nodes.add(fn)
+    live = [(name, strat) for name, strat in sorted(_STRATEGY_REGISTRY.items(), key=lambda x: x[1]["priority"])
+            if strat["enabled"]]
+    nodes.update(strat["check_fn"] for _, strat in live)
+    return {
+        "routes": routes,
+        "live": live,
+        "preds": list(preds),
+        "n_nodes": len(nodes),
+        "n_off": sum(1 for _, s, _, _ in routes if not s["enabled"] and not s.get("shadow_enabled", False)),
+        "n_shadow": sum(1 for _, s, _, _ in routes if not s["enabled"] and s.get("shadow_enabled", False)),
+    }
+
+
+def reload_strategy_plan():
+    """레지스트리 변경 후 호출 — 평가 계획 재컴파일 + 봉 메모 초기화"""
+    global _STRATEGY_PLAN
+    plan = _compile_strategy_plan()
+    with _STRATEGY_PLAN_LOCK:
+        _STRATEGY_PLAN = plan
+    _STRATEGY_BAR_MEMO.clear()
+    print(f"[STRATEGY_PLAN] routes={len(plan['routes'])} live={len(plan['live'])} "
+          f"detectors={plan['n_nodes']} predicates={len(plan['preds'])}")
+    return plan
+
+
+def _strategy_plan():
+    plan = _STRATEGY_PLAN
+    return plan if plan is not None else reload_strategy_plan()
+
+
+def _strategy_bar_fingerprint(*tfs):
+    """TF별 (길이, 첫 봉 시각, 마지막 봉 시각/종가/고가/저가/누적거래량) — detector 입력이 같은지 판별"""
+    fp = []
+    for c in tfs:
+        if not c:
+            fp.append(None)
+            continue
+        last = c[-1]
+        fp.append((len(c), c[0].get("candle_date_time_kst"), last.get("candle_date_time_kst"),
+                   last.get("trade_price"), last.get("high_price"), last.get("low_price"),
+                   last.get("candle_acc_trade_volume")))
+    return tuple(fp)
+
+
+class _StrategyEval:
+    """마켓 1회 평가 컨텍스트 — v4_evaluate_entry 가 만들고 shadow 평가 → LIVE 순회가 공유"""
+
+    def __init__(self, market, c1, c5, c15, c30, c60, gate_info):
+        self.plan = _strategy_plan()
+        self.market = market
+        self.candles = (c1, c5, c15, c30, c60)
+        self.gate_info = gate_info
+        self.fp = _strategy_bar_fingerprint(c1, c5, c15, c30, c60)
+        memo = _STRATEGY_BAR_MEMO.get(market) if market else None
+        self.memo = memo[1] if memo and memo[0] == self.fp else {}
+        self.res = {}
+        self.pred = {}  # predicate idx -> bool (universal_ind 값 기준만 캐시)
+        self.hits = {}
+        self.misses = {}
+        self.exec_ms = {}
+        self.exec_calls = {}
+        self.memo_hits = 0
+
+    def node(self, fn, live=False):
+        """detector 결과 (sig, all_fails) — 같은 평가 안에서는 1회만 실행"""
+        key = (fn, live) if fn in _STRATEGY_GATE_INFO_CHECKS else fn
+        name = getattr(fn, "__name__", str(fn))
+        r = self.res.get(key)
+        if r is None:
+            r = self.memo.get(key)
+            if r is not None:
+                self.memo_hits += 1
+                self.res[key] = r
+                # 봉 메모 재사용 = detector 미실행 → 실행 때 쌓였던 퍼널 카운터를 그대로 재생 (깔때기 분모 유지)
+                for _k, _n in r[2]:
+                    _METRICS.inc(_k, _n)
+        if r is not None:
+            self.hits[name] = self.hits.get(name, 0) + 1
+            return r[:2]
+        self.misses[name] = self.misses.get(name, 0) + 1
+        r = self._run(fn, name, None if live else self.gate_info)
+        self.res[key] = r
+        return r[:2]
+
+    def _run(self, fn, name, gate_info):
+        # 🔴 실제 호출 (부작용: _pipeline_inc, _BLOCKED_THREAD_LOCAL)
+        # ⏱️ 실행 시간 측정 (1차 호출 + eval_all 재호출 합산)
+        c1, c5, c15, c30, c60 = self.candles
+        _t_check = time.time()
+        # 차단 플래그 초기화 후 전략 호출
+        _BLOCKED_THREAD_LOCAL.last_fail = None
+        _BLOCKED_THREAD_LOCAL.last_fail_value = None
+        _BLOCKED_THREAD_LOCAL.last_fail_threshold = None
+        _BLOCKED_THREAD_LOCAL.last_fail_direction = None
+        incs = _BLOCKED_THREAD_LOCAL.inc_log = []
+        try:
+            sig = fn(c1, c5, c15, c30, c60, gate_info=gate_info)
+        except Exception:
+            sig = None
+        finally:
+            _BLOCKED_THREAD_LOCAL.inc_log = None
+        all_fails = []
+        if sig is None and getattr(_BLOCKED_THREAD_LOCAL, "last_fail", None):
+            # eval_all 모드로 재실행 → 모든 실패 필터 수집
+            _BLOCKED_THREAD_LOCAL.last_fail = None
+            _BLOCKED_THREAD_LOCAL.last_fail_value = None
+            _BLOCKED_THREAD_LOCAL.last_fail_threshold = None
+            _BLOCKED_THREAD_LOCAL.last_fail_direction = None
+            _BLOCKED_THREAD_LOCAL.all_fails = []
+            _BLOCKED_THREAD_LOCAL._eval_all_mode = True
+            try:
+                fn(c1, c5, c15, c30, c60, gate_info=gate_info)
+            except Exception:
+                pass
+            finally:
+                _BLOCKED_THREAD_LOCAL._eval_all_mode = False
+            all_fails = list(getattr(_BLOCKED_THREAD_LOCAL, "all_fails", []))
+        # ⏱️ 실행 시간 측정 종료 — sanity cap (>10초는 outlier)
+        _check_elapsed_ms = (time.time() - _t_check) * 1000
+        if 0 <= _check_elapsed_ms < 10000:
+            self.exec_ms[name] = self.exec_ms.get(name, 0.0) + _check_elapsed_ms
+            self.exec_calls[name] = self.exec_calls.get(name, 0) + 1
+            if _PROFILER.active:
+                _PROFILER.add(name, "check_fn", _t_check, _check_elapsed_ms / 1000, {"market": self.market})
+        return (sig, all_fails, tuple(incs))
+
+    def filters_pass(self, fidx, sig, universal_ind):
+        """route ind_filters (predicate idx) 판정 — universal_ind 값은 마켓당 1회, 없으면 route sig 지표로 대체"""
+        preds = self.plan["preds"]
+        for pi in fidx:
+            ok = self.pred.get(pi)
+            if ok is None:
+                k, op, th = preds[pi]
+                v = universal_ind.get(k)
+                cacheable = v is not None
+                if v is None:
+                    v = (sig.get("indicators", {}) if sig else {}).get(k)
+                ok = not (v is None or (op == "<=" and v > th) or (op == ">=" and v < th))
+                if cacheable:
+                    self.pred[pi] = ok
+            if not ok:
+                return False
+        return True
+
+    def flush(self):
+        """봉 메모 저장 + hit/miss/실행시간 글로벌 flush (lock 한 번씩)"""
+        if self.market:
+            keep = dict(self.memo)
+            keep.update((k, v) for k, v in self.res.items()
+                        if (k[0] if isinstance(k, tuple) else k) not in _STRATEGY_VOLATILE_CHECKS)
+            _STRATEGY_BAR_MEMO.set(self.market, (self.fp, keep))
+        if self.memo_hits:
+            _pipeline_inc("strategy_bar_memo_hit", self.memo_hits)
+        if self.hits or self.misses:
+            with _CHECK_FN_CACHE_LOCK:
+                for _k, _v in self.hits.items():
+                    _CHECK_FN_CACHE_HITS[_k] = _CHECK_FN_CACHE_HITS.get(_k, 0) + _v
+                for _k, _v in self.misses.items():
+                    _CHECK_FN_CACHE_MISSES[_k] = _CHECK_FN_CACHE_MISSES.get(_k, 0) + _v
+        if self.exec_calls:
+            with _CHECK_FN_EXEC_LOCK:
+                for _k, _v in self.exec_ms.items():
+                    _CHECK_FN_EXEC_TOTAL_MS[_k] = _CHECK_FN_EXEC_TOTAL_MS.get(_k, 0.0) + _v
+                for _k, _v in self.exec_calls.items():
+                    _CHECK_FN_EXEC_CALLS[_k] = _CHECK_FN_EXEC_CALLS.get(_k, 0) + _v
+
+
+# =========================
+# 🔎 크로스마켓 벡터 스크리너 (markets × bars)
+# =========================
+# shard 전체의 최근 SCREENER_BARS 개 1분봉을 (마켓 × 봉) 행렬로 모아 detector 필요조건을 벡터 판정.
+# 규칙은 detector 본문의 첫 관문과 같은 식 (research/clm_detector.detect_clm 과 동일한 CLM 정식화),
+# 임계치는 _SCREEN_EPS 만큼 느슨하게 → 부동소수 경계에서도 실제 발화 마켓을 버리지 않음 (보수적).
+# 데이터 소스는 detect_leader 가 쓰는 것과 같은 스트림/캐시 (없으면 판정 불가 → 통과).
+# 🔧 shadow 평가 사이클은 스크리너 우회 — 차단건(all_fails) 가상추적 표본 유지
+_SCREEN_EPS = 1e-9
+_SCREEN_STATS = {"runs": 0, "markets": 0, "pruned": 0, "no_data": 0, "bypass": 0, "ms_sum": 0.0}
+_SCREEN_LOCK = threading.Lock()
+
+
+def _screen_climax(f, cs_max):
+    eps = _SCREEN_EPS
+    return ((f["n"] >= 7) & (f["range"] > 0)
+            & (f["body_pct"] >= 0.3 - eps) & (f["body_pct"] <= 0.68 + eps)
+            & (f["wick_ratio"] >= 0.3 - eps) & (f["vr5"] >= 2.0 - eps)
+            & (f["close_strength"] <= cs_max + eps))
+
+
+# detector → (features → bool 배열) 필요조건. 여기 없는 detector 가 평가 대상이면 스크리너는 아무것도 제외 안 함.
+# (RSI/EMA 관문은 5m/15m 봉 기준 → 1분봉 행렬로는 판정 불가, 양봉/VR5 등 1분봉 관문만 사용)
+_SCREEN_RULES = {
+    _v0_check_climax: lambda f: _screen_climax(f, 0.50 if _ENABLE_CLOSE_STRENGTH_FILTER else np.inf),
+    _v0_check_climax_cs40: lambda f: _screen_climax(f, 0.40),
+    _v0_check_climax_cs40_vr5cap: lambda f: _screen_climax(f, 0.40),
+    _v0_check_broad_bullish: lambda f: (f["n"] >= 7) & f["bull"],
+    _v0_check_quiet_accel: lambda f: (f["n"] >= 7) & f["bull"] & (f["vr5"] >= 1.5 - _SCREEN_EPS),
+    _v0_check_range_expand: lambda f: (f["n"] >= 25) & f["bull"],
+}
+
+
+def _screen_c1_nofetch(m, count):
+    """detect_leader 와 같은 소스(스트림 → 신선한 _C1_CACHE)에서 네트워크 없이 c1 조회. 없으면 None"""
+    c1 = _md_stream_candles(m, 1, count)
+    if c1 is not None:
+        return c1
+    hit = _C1_CACHE.get(m)
+    if hit and (int(time.time() * 1000) - hit.get("ts", 0) <= _C1_CACHE_TTL_MS) and hit.get("count", 0) >= count:
+        cached = hit["c"]
+        return cached[-count:] if len(cached) > count else cached
+    return None
+
+
+def _screen_matrix(c1s, bars):
+    """c1 리스트들 → (M × bars) OHLCV 행렬 (부족분은 왼쪽 NaN 패딩) + 실제 봉 수"""
+    mat = np.full((5, len(c1s), bars), np.nan)
+    n = np.zeros(len(c1s), dtype=np.int64)
+    for i, c1 in enumerate(c1s):
+        rows = c1[-bars:]
+        k = len(rows)
+        n[i] = k
+        if not k:
+            continue
+        mat[:, i, bars - k:] = np.array(
+            [(c["opening_price"], c["high_price"], c["low_price"], c["trade_price"],
+              c.get("candle_acc_trade_price", 0)) for c in rows], dtype=np.float64).T
+    return mat, n
+
+
+def _screen_features(mat, n):
+    """마지막 봉 기준 body_pct / wick_ratio / close_strength / VR5 / 양봉 — 마켓 전체 한 번에"""
+    o, h, lo, c, v = mat[0][:, -1], mat[1][:, -1], mat[2][:, -1], mat[3][:, -1], mat[4]
+    rng = h - lo
+    with np.errstate(divide="ignore", invalid="ignore"):
+        body_pct = (c - o) / np.maximum(o, 1) * 100
+        safe = np.where(rng > 0, rng, np.nan)
+        wick_ratio = (h - c) / safe
+        close_strength = (c - lo) / safe
+        # _v4_volume_ratio_5 와 같은 합산 순서 (직전 5봉 좌→우 누적 / 5)
+        avg = ((((v[:, -6] + v[:, -5]) + v[:, -4]) + v[:, -3]) + v[:, -2]) / 5
+        vr5 = np.where((n >= 6) & (avg > 0), v[:, -1] / avg, 0.0)
+    return {"n": n, "range": np.nan_to_num(rng, nan=0.0), "body_pct": body_pct, "wick_ratio": wick_ratio,
+            "close_strength": close_strength, "vr5": np.nan_to_num(vr5, nan=0.0), "bull": c > o}
+
+
+def screen_shard(shard):
+    """shard → detect_leader_stock 을 돌릴 마켓 (원래 순서 유지). 판정 불가 마켓은 항상 포함"""
+    if not SCREENER_ENABLED or np is None or not shard:
+        return shard
+    plan = _strategy_plan()
+    if _shadow_scan_idx % _SHADOW_EVAL_INTERVAL == 0 and plan["n_shadow"]:
+        with _SCREEN_LOCK:
+            _SCREEN_STATS["bypass"] += 1
+        return shard
+    fns = {strat["check_fn"] for _, strat in plan["live"]}
+    fns.update(fn for _, strat, fn, _ in plan["routes"] if strat["enabled"])
+    if not fns or any(fn not in _SCREEN_RULES for fn in fns):
+        return shard
+    _t0 = time.time()
+    have, c1s, keep = [], [], []
+    for m in shard:
+        c1 = _screen_c1_nofetch(m, SCREENER_BARS)
+        if c1 is None:
+            keep.append(m)
+        else:
+            have.append(m)
+            c1s.append(c1)
+    if have:
+        f = _screen_features(*_screen_matrix(c1s, SCREENER_BARS))
+        fire = np.zeros(len(have), dtype=bool)
+        for fn in fns:
+            fire |= _SCREEN_RULES[fn](f)
+        keep.extend(m for m, ok in zip(have, fire) if ok)
+    keep_set = set(keep)
+    out = [m for m in shard if m in keep_set]
+    pruned = len(shard) - len(out)
+    with _SCREEN_LOCK:
+        _SCREEN_STATS["runs"] += 1
+        _SCREEN_STATS["markets"] += len(shard)
+        _SCREEN_STATS["pruned"] += pruned
+        _SCREEN_STATS["no_data"] += len(shard) - len(have)
+        _SCREEN_STATS["ms_sum"] += (time.time() - _t0) * 1000
+    if pruned:
+        # 퍼널 계수: 스크리너 제외분도 detect 단계 진입 + pre-cut 탈락으로 (detect_called 분모·pre-cut 합계 유지)
+        _pipeline_inc("detect_called", pruned)
+        _pipeline_inc("pre_cut_screen", pruned)
+    return out
+
+
+def _screen_status_str():
+    if not SCREENER_ENABLED or np is None:
+        return "screener=off"
+    with _SCREEN_LOCK:
+        s = dict(_SCREEN_STATS)
+    avg = s["ms_sum"] / s["runs"] if s["runs"] else 0.0
+    return (f"screener runs={s['runs']} pruned={s['pruned']}/{s['markets']} "
+            f"no_data={s['no_data']} bypass={s['bypass']} avg={avg:.1f}ms")
+
+
+def _v4_shadow_test_all_routes(market, c1, c5, c15, c30, c60, m3_info, ev=None):
     """섀도우 테스트: 비활성 전략에 시그널 발생 시 가상 포지션 등록.
     실매매 안 함 — 가상 진입 → 실제 청산 로직 시뮬레이션 → 승률/수익률 누적.
     v10: 공통 지표 수집 후 각 전략 고유 지표와 병합 (자기 지표 우선, 타 지표 추가)
@@ -14875,6 +18961,7 @@ def _v4_shadow_test_all_routes(market, c1, c5, c15, c30, c60, m3_info):
     - _pipeline_inc 부작용도 1회만 발생 → 카운터 정확도 개선 (이전 6× 부풀려짐)
     - _BLOCKED_THREAD_LOCAL 상태도 첫 호출에서만 수집
     - scan_detect 예상 감소: 65s → 20~30s
+    🧭 detector 결과는 ev(_StrategyEval)에 보관 → 이어지는 LIVE 순회가 재실행 없이 공유
     """
     results = {}
     now_ts = time.time()
@@ -14905,106 +18992,49 @@ def _v4_shadow_test_all_routes(market, c1, c5, c15, c30, c60, m3_info):
             universal_ind["ob_bid1_krw"] = round(_b1 * _b1s)
             universal_ind["ob_ask1_krw"] = round(_a1 * _a1s)
             universal_ind["ob_spread_pct"] = round((_a1 - _b1) / max((_a1 + _b1) / 2, 1) * 100, 4) if _a1 > 0 and _b1 > 0 else 0
+            _oa = _ob_analytics(_ob_data)
             for _n in (3, 5, 10):
-                _ac = sum(_eu.get("ask_price", 0) * _eu.get("ask_size", 0) for _eu in _ob_units[:_n])
-                _bc = sum(_eu.get("bid_price", 0) * _eu.get("bid_size", 0) for _eu in _ob_units[:_n])
-                universal_ind[f"ob_ask_cum{_n}_krw"] = round(_ac)
-                universal_ind[f"ob_bid_cum{_n}_krw"] = round(_bc)
+                universal_ind[f"ob_ask_cum{_n}_krw"] = round(_oa.top_krw(_n, "buy"))
+                universal_ind[f"ob_bid_cum{_n}_krw"] = round(_oa.top_krw(_n, "sell"))
             for _amt in (100_000, 300_000, 500_000, 1_000_000, 3_000_000, 5_000_000, 10_000_000):
                 _sk = _amt // 1000
-                _sb = _calc_vwap_slip(_ob_units, _amt, "buy")
-                _ss = _calc_vwap_slip(_ob_units, _amt, "sell")
+                _sb = _oa.slip(_amt, "buy")
+                _ss = _oa.slip(_amt, "sell")
                 if _sb is not None:
                     universal_ind[f"ob_slip_buy_{_sk}k"] = _sb
                 if _ss is not None:
                     universal_ind[f"ob_slip_sell_{_sk}k"] = _ss
 
-    # ⭐ Per-call check_fn 캐시 — 같은 함수는 1회만 호출하고 재사용
-    # 키: check_fn 객체 식별자 / 값: (sig, all_fails) 튜플
-    _check_fn_cache = {}
-    # hit/miss 로컬 집계 (함수 종료 시 글로벌로 flush → lock 한 번만)
-    _local_hits = {}
-    _local_misses = {}
-    # 실행 시간 로컬 집계 (cache miss 시 실제 실행 시간)
-    _local_exec_ms = {}
-    _local_exec_calls = {}
+    own_ev = ev is None
+    if own_ev:
+        ev = _StrategyEval(market, c1, c5, c15, c30, c60, m3_info)
+    plan = ev.plan
 
     _is_shadow_eval_cycle = (_shadow_scan_idx % _SHADOW_EVAL_INTERVAL == 0)
 
-    for strat_name, strat in _STRATEGY_REGISTRY.items():
+    # Shadow whitelisting: 2026-07-11 조언자 스펙
+    # - enabled=True: LIVE, 매 스캔 평가
+    # - enabled=False + shadow_enabled=True: 관심 shadow route (interval마다 평가)
+    # - enabled=False + shadow_enabled 없음/False: 완전 skip (계산 안 함)
+    # 이전에는 enabled=False여도 shadow로 계속 계산되어 scan 지연 폭발 (p95 100초).
+    # 관심 route 5~6개만 shadow_enabled=True로 명시하여 계산량 대폭 감소.
+    if plan["n_off"]:
+        _pipeline_inc("shadow_disabled_skip", plan["n_off"])
+    if plan["n_shadow"] and not _is_shadow_eval_cycle:
+        _pipeline_inc("shadow_interval_skip", plan["n_shadow"])
+
+    for strat_name, strat, check_fn, _fidx in plan["routes"]:
         route = strat.get("route", "?")
+        if not strat["enabled"] and (not strat.get("shadow_enabled", False) or not _is_shadow_eval_cycle):
+            continue
 
-        # Shadow whitelisting: 2026-07-11 조언자 스펙
-        # - enabled=True: LIVE, 매 스캔 평가
-        # - enabled=False + shadow_enabled=True: 관심 shadow route (interval마다 평가)
-        # - enabled=False + shadow_enabled 없음/False: 완전 skip (계산 안 함)
-        # 이전에는 enabled=False여도 shadow로 계속 계산되어 scan 지연 폭발 (p95 100초).
-        # 관심 route 5~6개만 shadow_enabled=True로 명시하여 계산량 대폭 감소.
-        if not strat["enabled"]:
-            if not strat.get("shadow_enabled", False):
-                _pipeline_inc("shadow_disabled_skip")
-                continue
-            if not _is_shadow_eval_cycle:
-                _pipeline_inc("shadow_interval_skip")
-                continue
-
-        check_fn = _SHADOW_CHECK_OVERRIDES.get(strat_name, strat["check_fn"])
-        _fn_name = getattr(check_fn, "__name__", str(check_fn))
-
-        # 🟢 캐시 조회 — 같은 check_fn 이미 호출됐으면 결과 재사용 (부작용 없음)
-        if check_fn in _check_fn_cache:
-            _local_hits[_fn_name] = _local_hits.get(_fn_name, 0) + 1
-            sig, all_fails = _check_fn_cache[check_fn]
-        else:
-            _local_misses[_fn_name] = _local_misses.get(_fn_name, 0) + 1
-            # 🔴 캐시 미스 — 실제 호출 (부작용: _pipeline_inc, _BLOCKED_THREAD_LOCAL)
-            # ⏱️ 실행 시간 측정 시작 (1차 호출 + eval_all 재호출 합산)
-            _t_check = time.time()
-            # 차단 플래그 초기화 후 전략 호출
-            _BLOCKED_THREAD_LOCAL.last_fail = None
-            _BLOCKED_THREAD_LOCAL.last_fail_value = None
-            _BLOCKED_THREAD_LOCAL.last_fail_threshold = None
-            _BLOCKED_THREAD_LOCAL.last_fail_direction = None
-            try:
-                sig = check_fn(c1, c5, c15, c30, c60, gate_info=m3_info)
-            except Exception:
-                sig = None
-            all_fails = []
-            if sig is None and getattr(_BLOCKED_THREAD_LOCAL, "last_fail", None):
-                # eval_all 모드로 재실행 → 모든 실패 필터 수집
-                _BLOCKED_THREAD_LOCAL.last_fail = None
-                _BLOCKED_THREAD_LOCAL.last_fail_value = None
-                _BLOCKED_THREAD_LOCAL.last_fail_threshold = None
-                _BLOCKED_THREAD_LOCAL.last_fail_direction = None
-                _BLOCKED_THREAD_LOCAL.all_fails = []
-                _BLOCKED_THREAD_LOCAL._eval_all_mode = True
-                try:
-                    check_fn(c1, c5, c15, c30, c60, gate_info=m3_info)
-                except Exception:
-                    pass
-                finally:
-                    _BLOCKED_THREAD_LOCAL._eval_all_mode = False
-                all_fails = list(getattr(_BLOCKED_THREAD_LOCAL, "all_fails", []))
-            # ⏱️ 실행 시간 측정 종료 — sanity cap (>10초는 outlier)
-            _check_elapsed_ms = (time.time() - _t_check) * 1000
-            if 0 <= _check_elapsed_ms < 10000:
-                _local_exec_ms[_fn_name] = _local_exec_ms.get(_fn_name, 0.0) + _check_elapsed_ms
-                _local_exec_calls[_fn_name] = _local_exec_calls.get(_fn_name, 0) + 1
-            # 캐시 저장 — 이후 같은 check_fn 호출 시 재사용
-            _check_fn_cache[check_fn] = (sig, all_fails)
+        # 🟢 detector 결과 공유 — 같은 check_fn 이미 평가됐으면 재사용 (부작용 없음)
+        sig, all_fails = ev.node(check_fn)
 
         hit = sig is not None
         # ind_filters: shadow variant별 indicator 기반 추가 필터 (예: tick_age ≤ 15)
-        _ind_filters = strat.get("ind_filters")
-        if hit and _ind_filters:
-            _sig_ind = sig.get("indicators", {}) if sig else {}
-            for _fk, _fop, _fth in _ind_filters:
-                _fv = universal_ind.get(_fk)
-                if _fv is None:
-                    _fv = _sig_ind.get(_fk)
-                if _fv is None or (_fop == "<=" and _fv > _fth) or (_fop == ">=" and _fv < _fth):
-                    hit = False
-                    break
+        if hit and _fidx:
+            hit = ev.filters_pass(_fidx, sig, universal_ind)
         results[route] = hit
 
         if entry_price <= 0:
@@ -15024,7 +19054,7 @@ def _v4_shadow_test_all_routes(market, c1, c5, c15, c30, c60, m3_info):
                     if now_ts - last_ps < SHADOW_DEDUP_CD_SEC:
                         continue
                     _SHADOW_PENDING_DEDUP[dedup_key] = now_ts
-                    _SHADOW_PENDING_SIGNALS.append({
+                    _shadow_add_position(_SHADOW_PEND, {
                         "route": route, "strat": strat_name,
                         "market": market, "signal_price": entry_price,
                         "signal_ts": now_ts, "best_price": entry_price,
@@ -15050,11 +19080,11 @@ def _v4_shadow_test_all_routes(market, c1, c5, c15, c30, c60, m3_info):
                 last_entry = _SHADOW_DEDUP.get(dedup_key, 0)
                 if now_ts - last_entry < SHADOW_DEDUP_CD_SEC:
                     continue
-                if len(_SHADOW_VIRTUAL_POSITIONS) >= SHADOW_MAX_VIRTUAL_POS:
+                if _shadow_pos_count(_SHADOW_VP) >= _shadow_pos_cap(_SHADOW_VP):
                     continue
                 _SHADOW_DEDUP[dedup_key] = now_ts
                 _pb_delay = 0
-                _SHADOW_VIRTUAL_POSITIONS.append({
+                _shadow_add_position(_SHADOW_VP, {
                     "route": route, "strat": strat_name,
                     "market": market, "entry_price": entry_price,
                     "entry_ts": now_ts, "best_price": entry_price,
@@ -15072,7 +19102,8 @@ def _v4_shadow_test_all_routes(market, c1, c5, c15, c30, c60, m3_info):
                 })
                 if _ob_units:
                     try:
-                        _log_exec_quality(market, route, False, entry_price, _ob_units)
+                        _log_exec_quality(market, route, False, entry_price, _ob_units,
+                                          ob_analytics=_ob_analytics(_ob_data))
                     except Exception:
                         pass
         elif all_fails:
@@ -15085,9 +19116,9 @@ def _v4_shadow_test_all_routes(market, c1, c5, c15, c30, c60, m3_info):
                     continue
                 _SHADOW_BLOCKED_DEDUP[dedup_key] = now_ts
                 for fail_info in all_fails:
-                    if len(_SHADOW_BLOCKED_POSITIONS) >= SHADOW_MAX_BLOCKED_POS:
+                    if _shadow_pos_count(_SHADOW_BLK) >= _shadow_pos_cap(_SHADOW_BLK):
                         break
-                    _SHADOW_BLOCKED_POSITIONS.append({
+                    _shadow_add_position(_SHADOW_BLK, {
                         "route": route, "strat": strat_name,
                         "market": market, "entry_price": entry_price,
                         "entry_ts": now_ts, "best_price": entry_price,
@@ -15100,72 +19131,42 @@ def _v4_shadow_test_all_routes(market, c1, c5, c15, c30, c60, m3_info):
                         "_fail_threshold": fail_info["threshold"],
                         "_fail_direction": fail_info["direction"],
                     })
-    # 캐시 hit/miss 로컬 집계 → 글로벌 flush (lock 한 번만)
-    if _local_hits or _local_misses:
-        with _CHECK_FN_CACHE_LOCK:
-            for _k, _v in _local_hits.items():
-                _CHECK_FN_CACHE_HITS[_k] = _CHECK_FN_CACHE_HITS.get(_k, 0) + _v
-            for _k, _v in _local_misses.items():
-                _CHECK_FN_CACHE_MISSES[_k] = _CHECK_FN_CACHE_MISSES.get(_k, 0) + _v
-    # check_fn 실행 시간 로컬 집계 → 글로벌 flush (lock 한 번만)
-    if _local_exec_calls:
-        with _CHECK_FN_EXEC_LOCK:
-            for _k, _v in _local_exec_ms.items():
-                _CHECK_FN_EXEC_TOTAL_MS[_k] = _CHECK_FN_EXEC_TOTAL_MS.get(_k, 0.0) + _v
-            for _k, _v in _local_exec_calls.items():
-                _CHECK_FN_EXEC_CALLS[_k] = _CHECK_FN_EXEC_CALLS.get(_k, 0) + _v
+    if own_ev:
+        ev.flush()
     return results
 
 
-def _threshold_sweep(fail_values_list, current_threshold, direction,
-                     trade_records=None, ind_key=None):
-    """v18: 차단건 브루트포스 탐색 + 통과건 합산 전체 비교.
+def _threshold_sweep(fail_hist, current_threshold, direction, pass_hist=None):
+    """v18: 차단건 임계치 탐색 + 통과건 합산 전체 비교.
+    📐 입력은 윈도우 히스토그램 (fail_hist = _shadow_blocked_agg_view(bkey), pass_hist = _shadow_route_agg_view(key).ind.get(ind_key))
+       → 후보 임계치 = 차단값 bin 대표값, 누적합 1회 순회 O(bins) (기존: 후보마다 차단건·통과건 전체 재순회)
     direction: 'gte'/'gt' → 값이 threshold 이상이면 통과 (하한)
                'lt'/'lte' → 값이 threshold 미만이면 통과 (상한)
     Returns: dict with best alternative threshold or None"""
-    if not fail_values_list or len(fail_values_list) < 5:
+    if fail_hist is None or fail_hist.n < 5:
         return None
-    fail_data = [fv for fv in fail_values_list if fv.get("v") is not None]
-    if len(fail_data) < 5:
-        return None
-
-    def _passes(v, th, d):
-        if d == "gte": return v >= th
-        if d == "gt": return v > th
-        if d == "lte": return v <= th
-        if d == "lt": return v < th
-        return False
-
-    # 통과건 데이터 준비
-    pass_data = []
-    if trade_records and ind_key:
-        for tr in trade_records:
-            v = tr.get("inds", {}).get(ind_key)
-            if v is not None:
-                pass_data.append({"v": v, "pnl": tr["pnl"]})
-
+    # 통과건 전체 합 (임계치 무관)
+    pass_n = pass_w = 0
+    pass_pnl = 0.0
+    if pass_hist is not None:
+        pass_n, pass_w, pass_pnl = pass_hist.n, pass_hist.mw[0], sum(b[2] for b in pass_hist.bins.values())
     best = None
-    candidates = sorted(set(fv["v"] for fv in fail_data),
-                        reverse=(direction in ("gte", "gt")))
-    for c in candidates:
-        # 차단건 중 새 임계치로 통과할 건
-        new_passed = [fv for fv in fail_data if _passes(fv["v"], c, direction)]
-        if len(new_passed) < 3:
+    strict = direction in ("gt", "lt")
+    prev = (0, 0, 0.0)
+    for c, cn, cw, cp in fail_hist.cumulative(direction):
+        # 차단건 중 새 임계치로 통과할 건 (gt/lt 는 후보 bin 자신 제외)
+        fail_n, fail_w, fail_p = prev if strict else (cn, cw, cp)
+        prev = (cn, cw, cp)
+        if fail_n < 3:
             continue
-        # 차단건만 기준
-        fail_n = len(new_passed)
-        fail_avg_pnl = sum(fv["pnl"] for fv in new_passed) / fail_n
-        fail_wr = sum(1 for fv in new_passed if fv["pnl"] > 0) / fail_n * 100
+        fail_avg_pnl = fail_p / fail_n
+        fail_wr = fail_w / fail_n * 100
         if fail_avg_pnl <= 0:
             continue
         # 전체건 합산 (통과건 + 새로 통과할 차단건)
-        total_n = len(pass_data) + fail_n
-        total_wins = (sum(1 for p in pass_data if p["pnl"] > 0)
-                      + sum(1 for fv in new_passed if fv["pnl"] > 0))
-        total_pnl = (sum(p["pnl"] for p in pass_data)
-                     + sum(fv["pnl"] for fv in new_passed))
-        total_wr = total_wins / total_n * 100 if total_n > 0 else 0
-        total_avg_pnl = total_pnl / total_n * 100 if total_n > 0 else 0
+        total_n = pass_n + fail_n
+        total_wr = (pass_w + fail_w) / total_n * 100 if total_n > 0 else 0
+        total_avg_pnl = (pass_pnl + fail_p) / total_n * 100 if total_n > 0 else 0
         if best is None or fail_avg_pnl > best["fail_avg_pnl"]:
             best = {
                 "new_th": round(c, 4),
@@ -15196,37 +19197,20 @@ _SWEEP_FILTER_TO_IND = {
     "reversal_15m_gap20_fail": "gap_20bar",
     # v18c: H gap20 제거, D 비활성화 → 매핑 불필요
 }
+_SWEEP_IND_KEYS = tuple(sorted(set(_SWEEP_FILTER_TO_IND.values())))  # 📐 _RouteAgg.ind 히스토그램 대상
 
 
-def _threshold_sweep_table(trade_records, fail_values_list, current_threshold, direction, ind_key):
-    """v18: 통과건(trade_records) + 차단건(fail_values) 합산 ±5% 전체 비교.
+def _threshold_sweep_table(pass_hist, fail_hist, current_threshold, direction):
+    """v18: 통과건 + 차단건 합산 ±5% 전체 비교.
+    📐 입력은 _threshold_sweep 과 같은 윈도우 히스토그램 — 스텝별 bin 합계 O(bins)
     - 조이기: 전체 W/L 승률 (통과건 중 더 조인 임계치 충족분만)
     - 풀기: 전체 W/L + 신규 추가건 W/L (차단건 중 새로 통과할 분)
     Returns: list of dicts or []"""
     if current_threshold == 0:
         return []
-    # 통과건에서 해당 인디케이터 값 + PnL 추출
-    pass_trades = []
-    for tr in (trade_records or []):
-        v = tr.get("inds", {}).get(ind_key)
-        if v is not None:
-            pass_trades.append({"v": v, "pnl": tr["pnl"], "src": "pass"})
-    # 차단건에서 값 + PnL 추출
-    fail_trades = []
-    for fv in (fail_values_list or []):
-        if fv.get("v") is not None:
-            fail_trades.append({"v": fv["v"], "pnl": fv["pnl"], "src": "fail"})
-    all_trades = pass_trades + fail_trades
-    if len(all_trades) < 5:
+    if (pass_hist.n if pass_hist is not None else 0) + (fail_hist.n if fail_hist is not None else 0) < 5:
         return []
 
-    def _passes(v, th, d):
-        if d == "gte": return v >= th
-        if d == "gt": return v > th
-        if d == "lte": return v <= th
-        if d == "lt": return v < th
-        return False
-
     # 풀기/조이기 방향 판별 (음수 임계치도 올바르게 처리)
     delta = abs(current_threshold) * 0.05
     if delta == 0:
@@ -15242,8 +19226,10 @@ def _threshold_sweep_table(trade_records, fail_values_list, current_threshold, d
     rows = []
     for th in steps:
         is_current = (th == round(current_threshold, 4))
-        matched = [t for t in all_trades if _passes(t["v"], th, direction)]
-        n = len(matched)
+        p_n, p_w, p_pnl = pass_hist.sweep(th, direction) if pass_hist is not None else (0, 0, 0.0)
+        # 신규 추가건 (차단→통과 전환분) — 풀기 방향에서만 의미
+        new_n, new_wins, new_pnl = fail_hist.sweep(th, direction) if fail_hist is not None else (0, 0, 0.0)
+        n = p_n + new_n
         if n == 0:
             rows.append({"th": th, "n": 0, "wins": 0, "losses": 0,
                          "wr": 0, "avg_pnl": 0, "is_current": is_current,
@@ -15251,17 +19237,13 @@ def _threshold_sweep_table(trade_records, fail_values_list, current_threshold, d
                          "new_n": 0, "new_wins": 0, "new_losses": 0,
                          "new_wr": 0, "new_avg_pnl": 0})
             continue
-        wins = sum(1 for t in matched if t["pnl"] > 0)
+        wins = p_w + new_wins
         losses = n - wins
         wr = wins / n * 100
-        avg_pnl = sum(t["pnl"] for t in matched) / n * 100
-        # 신규 추가건 (차단→통과 전환분) — 풀기 방향에서만 의미
-        new_trades = [t for t in matched if t["src"] == "fail"]
-        new_n = len(new_trades)
-        new_wins = sum(1 for t in new_trades if t["pnl"] > 0)
+        avg_pnl = (p_pnl + new_pnl) / n * 100
         new_losses = new_n - new_wins
         new_wr = new_wins / new_n * 100 if new_n > 0 else 0
-        new_avg_pnl = sum(t["pnl"] for t in new_trades) / new_n * 100 if new_n > 0 else 0
+        new_avg_pnl = new_pnl / new_n * 100 if new_n > 0 else 0
         rows.append({
             "th": th, "n": n, "wins": wins, "losses": losses,
             "wr": round(wr, 1), "avg_pnl": round(avg_pnl, 2),
@@ -15273,6 +19255,34 @@ def _threshold_sweep_table(trade_records, fail_values_list, current_threshold, d
     return rows
 
 
+def _blocked_sweep_lines(bkey, bs):
+    """🚫 필터검증 이상치 건 → 임계치 탐색 요약 줄 (_threshold_sweep 최적 대안 + _threshold_sweep_table ±5%).
+    차단값 = blocked fail_values 히스토그램, 통과값 = 같은 route:strat 의 _RouteAgg.ind (필터 → 지표 매핑 있을 때만).
+    _shadow_view_lock 보유 상태에서 호출 (렌더 스레드면 스냅샷 복사본)"""
+    th, direction = bs.get("fail_threshold"), bs.get("fail_direction")
+    if not isinstance(th, (int, float)) or direction not in ("gte", "gt", "lt", "lte"):
+        return []
+    fail_hist = _shadow_blocked_agg_view(bkey)
+    pass_hist = None
+    ind_key = _SWEEP_FILTER_TO_IND.get(bs.get("filter"))
+    pkey = f"{bs.get('route', '?')}:{bs.get('strat', '')}"
+    if ind_key and pkey in _shadow_perf_view():
+        pass_hist = _shadow_route_agg_view(pkey).ind.get(ind_key)
+    out = []
+    best = _threshold_sweep(fail_hist, th, direction, pass_hist)
+    if best:
+        out.append(f"    ↳ 임계치 {th}→{best['new_th']}: 신규통과 {best['fail_n']}건 wr{best['fail_wr']:.0f}%"
+                   f" {best['fail_avg_pnl']:+.2f}% | 전체 {best['total_n']}건 wr{best['total_wr']:.0f}%"
+                   f" {best['total_avg_pnl']:+.2f}%")
+    if pass_hist is not None:
+        rows = _threshold_sweep_table(pass_hist, fail_hist, th, direction)
+        if rows:
+            out.append("    ↳ ±5%: " + " / ".join(
+                f"{'풀기' if r['is_loosen'] else ('현재' if r['is_current'] else '조이기')}{r['th']}"
+                f" {r['n']}건 wr{r['wr']:.0f}% {r['avg_pnl']:+.2f}%" for r in rows))
+    return out
+
+
 def _v4_shadow_score_compact():
     """텔레그램 본문용 — top routes compact scoreboard
     색상: pnl 기준 (🟢양수+cap양호 / 🟡보류 / 🔴음수)
@@ -15281,10 +19291,10 @@ def _v4_shadow_score_compact():
     TOP_SCORE_SHOW = 3
     lines = []
     _PRODUCTION_ROUTES, _ACTIVE_RESEARCH = _get_route_sets()
-    with _SHADOW_PERF_LOCK:
-        if not _SHADOW_PERF_STATS:
+    with _shadow_view_lock():
+        if not _shadow_perf_view():
             return [], set()
-        sorted_stats = sorted(_SHADOW_PERF_STATS.items(),
+        sorted_stats = sorted(_shadow_perf_view().items(),
                               key=lambda x: (_ROUTE_REPORT_PRIORITY.get(x[1].get("route", "?"), 99),
                                              -x[1].get("signals", 0)))
         _seen_routes = set()
@@ -15348,8 +19358,8 @@ def export_trade_records(filepath="clm_trades.json"):
     import json as _json
     import os as _os
     records = []
-    with _SHADOW_PERF_LOCK:
-        for key, stats in _SHADOW_PERF_STATS.items():
+    with _shadow_view_lock():
+        for key, stats in _shadow_perf_view().items():
             route = stats.get("route", key.split(":")[0] if ":" in key else key)
             strat = stats.get("strat", key.split(":", 1)[1] if ":" in key else "")
             for tr in stats.get("trade_records", []):
@@ -15391,11 +19401,11 @@ def _v4_shadow_report_lines():
     _update_coin_bias()
     lines = []
     _research_reported = set()
-    with _SHADOW_PERF_LOCK:
-        if not _SHADOW_PERF_STATS:
+    with _shadow_view_lock():
+        if not _shadow_perf_view():
             return [], set()
         lines.append("📡 시나리오 성과 (shadow 기준):")
-        sorted_stats = sorted(_SHADOW_PERF_STATS.items(),
+        sorted_stats = sorted(_shadow_perf_view().items(),
                               key=lambda x: (_ROUTE_REPORT_PRIORITY.get(x[1].get("route", "?"), 99),
                                              -x[1].get("signals", 0)))
         _PRODUCTION_ROUTES, _ACTIVE_RESEARCH = _get_route_sets()
@@ -15830,8 +19840,8 @@ def _v4_shadow_report_lines():
             else:
                 continue
     # SVE2 score별 PnL (SVE1 trade_records에서 계산)
-    with _SHADOW_PERF_LOCK:
-        for _s2key, _s2s in _SHADOW_PERF_STATS.items():
+    with _shadow_view_lock():
+        for _s2key, _s2s in _shadow_perf_view().items():
             if not _s2key.startswith("SVE1:"):
                 continue
             _s2_trs = _s2s.get("trade_records", [])
@@ -15889,9 +19899,9 @@ def _v4_shadow_report_lines():
                 _pend_parts.append(f"{p[0]}({p[2]}전{_p_wins}승)")
             lines.append(f"  ⏳ 수집중: {', '.join(_pend_parts)}")
     # v21: 시나리오별 MFE/MAE/Hold/Continuation 상세 리포트 (n≥10인 전체 시나리오)
-    with _SHADOW_PERF_LOCK:
+    with _shadow_view_lock():
         _all_scenario_stats = []
-        for key, s in _SHADOW_PERF_STATS.items():
+        for key, s in _shadow_perf_view().items():
             n = s.get("signals", 0)
             if n < 10:
                 continue
@@ -15983,6 +19993,9 @@ def _v4_shadow_report_lines():
                 "pnl": avg_pnl, "mfe": avg_mfe, "mae": avg_mae,
                 "curve": curve, "cont": cont_flag,
                 "hold": avg_hold, "capture": capture,
+                # 📐 누적 분위수 (QuantileSketch — 링 200건 밖 전체 분포)
+                "pnl_q": s["pnl_q"].quantiles() if "pnl_q" in s else None,
+                "hold_p50": s["hold_q"].quantile(0.5) if "hold_q" in s else None,
                 "d_pairs": _d_pairs[:TOP_D_SCORE_DETAIL],
                 "buckets": _bucket_rows,
             })
@@ -16009,6 +20022,10 @@ def _v4_shadow_report_lines():
                 curve_str = " ".join(f"{k}s:{v:+.2f}%" for k, v in sorted(sc["curve"].items()))
                 if curve_str:
                     lines.append(f"    ⏱ {curve_str}")
+                if sc.get("pnl_q") and sc["pnl_q"][0] is not None:
+                    _q10, _q50, _q90 = sc["pnl_q"]
+                    _hold_str = f" | 보유p50 {sc['hold_p50']:.0f}s" if sc.get("hold_p50") is not None else ""
+                    lines.append(f"    📈 PnL p10/p50/p90 {_q10*100:+.2f}/{_q50*100:+.2f}/{_q90*100:+.2f}%{_hold_str}")
                 if sc.get("d_pairs") and sc["route"] in (_ACTIVE_RESEARCH | _PRODUCTION_ROUTES):
                     for _dd, ik, wv, wn, lv, ln, _dir in sc["d_pairs"]:
                         if "krw" in ik.lower() and abs(wv) >= 10000:
@@ -16054,9 +20071,9 @@ def _v4_shadow_report_lines():
     # ── PP r/m 버킷 비교 (CLM AT vs PP30 구간별 수익 효율) ──
     _pp_rm_routes = ["CLM", "CLM_PP20", "CLM_PP30", "CLM_PP40", "CLM_B60_PP30", "CLM_EC_A"]
     _pp_rm_bk = [(0.001, 0.003, "0.1~0.3%"), (0.003, 0.005, "0.3~0.5%"), (0.005, 0.01, "0.5~1%"), (0.01, 0.02, "1~2%"), (0.02, 99, "2%+")]
-    with _SHADOW_PERF_LOCK:
+    with _shadow_view_lock():
         _pp_rm_data = {}
-        for _prk, _prs in _SHADOW_PERF_STATS.items():
+        for _prk, _prs in _shadow_perf_view().items():
             _pr_route = _prs.get("route", "?")
             if _pr_route not in _pp_rm_routes:
                 continue
@@ -16084,9 +20101,9 @@ def _v4_shadow_report_lines():
     # ── PP exit reason breakdown (PP가 실제 몇 건 청산했는지 — AT vs PP 분담 진단) ──
     _pp_er_routes = ["CLM", "CLM_PP20", "CLM_PP30", "CLM_PP40", "CLM_B60_PP30", "CLM_EC_A"]
     _pp_er_keys = ("PP익절", "PP본절", "EC조기절단", "AT익절", "AT본절", "AT타임아웃", "타임아웃", "손절SL", "본절SL", "트레일익절", "트레일본절", "생존탈락")
-    with _SHADOW_PERF_LOCK:
+    with _shadow_view_lock():
         _pp_er_data = {}
-        for _ek, _es in _SHADOW_PERF_STATS.items():
+        for _ek, _es in _shadow_perf_view().items():
             _e_route = _es.get("route", "?")
             if _e_route not in _pp_er_routes:
                 continue
@@ -16124,8 +20141,8 @@ def _v4_shadow_report_lines():
         ("C: mfe60<0.15%+pnl60<0", lambda i, c: i.get("mfe_60s") is not None and c.get("60") is not None and i["mfe_60s"] < 0.0015 and c["60"] < 0),
         ("D: mfe30<0.05%+pnl30<0", lambda i, c: i.get("mfe_30s") is not None and c.get("30") is not None and i["mfe_30s"] < 0.0005 and c["30"] < 0),
     ]
-    with _SHADOW_PERF_LOCK:
-        for _ek, _es in _SHADOW_PERF_STATS.items():
+    with _shadow_view_lock():
+        for _ek, _es in _shadow_perf_view().items():
             if _es.get("route") != "CLM":
                 continue
             _ec_trs = _es.get("trade_records", [])
@@ -16241,7 +20258,7 @@ def _v4_shadow_report_lines():
                         lines.append(f"  └ 특징차이: {' | '.join(_feat_diffs[:4])}")
             # EC_A 실제 곡선 — 절단(EC조기절단) vs 비절단(자연 청산) 분리 비교
             # exit_reason 문자열로 분리 (향후 EC조기절단(30s) 등 추가 시 startswith 변경 필요)
-            for _eak, _eas in _SHADOW_PERF_STATS.items():
+            for _eak, _eas in _shadow_perf_view().items():
                 if _eas.get("route") != "CLM_EC_A":
                     continue
                 _ea_trs = _eas.get("trade_records", [])
@@ -16430,7 +20447,7 @@ def _v4_shadow_report_lines():
             break
     # 현재 추적 중인 가상포지션 수
     with _SHADOW_LOCK:
-        active = len(_SHADOW_VIRTUAL_POSITIONS)
+        active = _shadow_pos_count(_SHADOW_VP)
     if active > 0:
         lines.append(f"  ⏳ 추적 중: {active}건")
     # v19: 필터 자동 분석 — SVE1만
@@ -16456,14 +20473,15 @@ def _v4_shadow_report_lines():
     except Exception:
         pass
     # 🔍 차단 건 가상 추적 리포트 — 요약만 (⚠재검토 건만 상세)
-    with _SHADOW_PERF_LOCK:
-        if _SHADOW_BLOCKED_STATS:
+    with _shadow_view_lock():
+        if _shadow_blocked_view():
             sorted_blocked = sorted(
-                _SHADOW_BLOCKED_STATS.items(),
+                _shadow_blocked_view().items(),
                 key=lambda x: (-1 if x[1].get("wins", 0) / max(x[1].get("signals", 1), 1) >= 0.55 else 0,
                                -x[1].get("signals", 0)))
             _blocked_pending = 0
             _valid_cnt = 0
+            _review_n = 0
             _review_lines = []
             for bkey, bs in sorted_blocked:
                 bn = bs.get("signals", 0)
@@ -16483,23 +20501,27 @@ def _v4_shadow_report_lines():
                     _valid_cnt += 1
                 elif bwr >= 55:
                     # 진짜 이상치: base-rate (46%) 대비 +9%p 이상
+                    _review_n += 1
                     _review_lines.append(
                         f"  ⚠ {broute}:{bfilter} {bn}건 승률{bwr:.0f}% {bavg:+.2f}% (이상치)")
+                    # 📐 이상치 필터만 임계치 탐색 (차단값/통과값 히스토그램 O(bins))
+                    _review_lines.extend(_blocked_sweep_lines(bkey, bs))
                 else:
                     # 46-54% = base-rate 노이즈 밴드 (advisor: 모든 fail 군 공통 ~46%)
                     # A2 오독 방지: 47% 같은 값을 필터 신호로 해석 금지
+                    _review_n += 1
                     _review_lines.append(
                         f"  🔸 {broute}:{bfilter} {bn}건 승률{bwr:.0f}% {bavg:+.2f}% [효과 식별 불가]")
             _blk_summary = f"🚫 필터검증 (46-54%=효과 식별 불가 · 비매칭 fail군 · 이상치만 신호): ✅유효{_valid_cnt}개"
-            if _review_lines:
-                _blk_summary += f" ⚠재검토{len(_review_lines)}개"
+            if _review_n:
+                _blk_summary += f" ⚠재검토{_review_n}개"
             if _blocked_pending > 0:
                 _blk_summary += f" ⏳수집{_blocked_pending}개"
             lines.append(_blk_summary)
             for _rl in _review_lines:
                 lines.append(_rl)
     with _SHADOW_LOCK:
-        active_b = len(_SHADOW_BLOCKED_POSITIONS)
+        active_b = _shadow_pos_count(_SHADOW_BLK)
     if active_b > 0:
         lines.append(f"  ⏳ 차단건 추적 중: {active_b}건")
     return lines, _research_reported
@@ -16516,92 +20538,71 @@ def _route_mae_threshold(route):
 def _survival_analysis(routes=None, min_n=10):
     """dd_peak_60s 기반 survival quality 분석.
     A(dd<0.3%), B(0.3~0.5%), C(>0.5%) 그룹 분리 → PnL/feature d-score 산출.
+    📐 그룹 요약 / d-score / mae 분포는 _RouteAgg 증분 집계에서 (레코드 재순회 없음),
+       HI/LO 점수 검증만 규칙이 생긴 route 의 윈도우 레코드 1회 순회.
     Returns dict: {route: {groups, d_scores, scoring_rules}} or empty."""
     if routes is None:
         routes = {s["route"] for s in _STRATEGY_REGISTRY.values()}
-    _ENTRY_FEATURES = [
-        "tick_age", "vr5", "rsi_15m", "adx_15", "adx_60",
-        "entry_spread_pct", "entry_vol_krw_m", "gap_20bar",
-        "tick_rate_10s", "tick_rate_30s", "tick_buy_30s",
-        "tick_strength_30s", "tick_consec_buy", "tick_mom_10s",
-        "tick_mom_30s", "rsi_5m", "rsi_60m", "atr_pct",
-        "ema_spread_15", "ema_spread_60", "vr5_15m",
-        "macd_hist_5m_bps", "macd_hist_15_bps", "m3_60m",
-        "ob_spread_pct", "ob_ask1_krw", "ob_bid1_krw",
-        "ob_slip_sell_10000k",
-    ]
     results = {}
-    with _SHADOW_PERF_LOCK:
-        for key, s in _SHADOW_PERF_STATS.items():
+    with _shadow_view_lock():
+        for key, s in _shadow_perf_view().items():
             route = s.get("route", "?")
             if route not in routes:
                 continue
-            tr_list = s.get("trade_records", [])
-            trades_with_dd = [t for t in tr_list
-                              if t.get("inds", {}).get("dd_peak_60s") is not None]
-            if len(trades_with_dd) < min_n:
+            agg = _shadow_route_agg_view(key)
+            groups = agg.survival_groups()
+            n_dd = sum(g["n"] for g in groups.values())
+            if n_dd < min_n:
                 continue
-            grp_a, grp_b, grp_c = [], [], []
-            for t in trades_with_dd:
-                dd = t["inds"]["dd_peak_60s"]
-                if dd < 0.003:
-                    grp_a.append(t)
-                elif dd < 0.005:
-                    grp_b.append(t)
-                else:
-                    grp_c.append(t)
-            def _grp_stats(grp):
-                if not grp:
-                    return {"n": 0, "wr": 0, "avg_pnl": 0, "curve": {}}
-                n = len(grp)
-                wins = sum(1 for t in grp if t["pnl"] > 0)
-                avg = sum(t["pnl"] for t in grp) / n * 100
-                curve = {}
-                for sk in ("60", "120", "180", "240"):
-                    vals = [t["curve"][sk] for t in grp
-                            if t.get("curve", {}).get(sk) is not None]
-                    if vals:
-                        curve[sk] = round(sum(vals) / len(vals) * 100, 3)
-                return {"n": n, "wr": round(wins / n * 100, 1),
-                        "avg_pnl": round(avg, 3), "curve": curve}
-
-            groups = {"A": _grp_stats(grp_a), "B": _grp_stats(grp_b),
-                      "C": _grp_stats(grp_c)}
-
+            feat_a, feat_c = agg.surv["A"]["feat"], agg.surv["C"]["feat"]
             d_scores = []
-            for feat in _ENTRY_FEATURES:
-                a_vals = [t["inds"][feat] for t in grp_a
-                          if feat in t.get("inds", {})]
-                c_vals = [t["inds"][feat] for t in grp_c
-                          if feat in t.get("inds", {})]
-                if len(a_vals) < 5 or len(c_vals) < 5:
+            for feat in _SURVIVAL_FEATURES:
+                ha, hc = feat_a.get(feat), feat_c.get(feat)
+                a_n, a_mean, a_var = ha.moments() if ha is not None else (0, 0.0, 0.0)
+                c_n, c_mean, c_var = hc.moments() if hc is not None else (0, 0.0, 0.0)
+                if a_n < 5 or c_n < 5:
                     continue
-                a_mean = sum(a_vals) / len(a_vals)
-                c_mean = sum(c_vals) / len(c_vals)
-                a_var = sum((x - a_mean) ** 2 for x in a_vals) / len(a_vals)
-                c_var = sum((x - c_mean) ** 2 for x in c_vals) / len(c_vals)
                 pooled_std = max(((a_var + c_var) / 2) ** 0.5, 0.0001)
                 d = abs(a_mean - c_mean) / pooled_std
                 direction = "↓" if a_mean < c_mean else "↑"
                 d_scores.append({
                     "feat": feat, "d": round(d, 3),
                     "a_mean": round(a_mean, 4), "c_mean": round(c_mean, 4),
-                    "a_n": len(a_vals), "c_n": len(c_vals),
+                    "a_n": a_n, "c_n": c_n,
                     "direction": direction,
                 })
+            # mae_60s 분포 (route별 mae_threshold 적용)
+            _mae_thr = _route_mae_threshold(route)
+            mae_dist = {}
+            for grp_name, feat in (("A", feat_a), ("C", feat_c)):
+                h = feat.get("mae_60s")
+                n_m = h.n if h is not None else 0
+                if n_m >= 3:
+                    mae_dist[grp_name] = {
+                        "n": n_m,
+                        "within_03_pct": round(h.count_ge(-0.003) / n_m * 100, 1),
+                        "within_05_pct": round(h.count_ge(-0.005) / n_m * 100, 1),
+                        "within_threshold_pct": round(h.count_ge(-_mae_thr / 100) / n_m * 100, 1),
+                        "mae_threshold": _mae_thr,
+                        "p50": round(h.at_rank(n_m // 2) * 100, 3),
+                        "p80": round(h.at_rank(int(n_m * 0.8)) * 100, 3),
+                        "worst": round(h.at_rank(0) * 100, 3),
+                    }
             d_scores.sort(key=lambda x: x["d"], reverse=True)
 
             scoring = {}
             top3 = [ds for ds in d_scores if ds["d"] >= 0.3][:3]
-            if len(top3) >= 2 and len(trades_with_dd) >= 20:
+            if len(top3) >= 2 and n_dd >= 20:
                 rules = []
                 for ds in top3:
                     mid = (ds["a_mean"] + ds["c_mean"]) / 2
                     rules.append((ds["feat"], ds["direction"], round(mid, 4)))
                 hi_trades, lo_trades = [], []
-                for t in trades_with_dd:
-                    score = 0
+                for t in s.get("trade_records", []):
                     inds = t.get("inds", {})
+                    if inds.get("dd_peak_60s") is None:
+                        continue
+                    score = 0
                     for feat, op, th in rules:
                         v = inds.get(feat)
                         if v is None:
@@ -16626,28 +20627,6 @@ def _survival_analysis(routes=None, min_n=10):
                 }
                 with _SURVIVAL_SCORING_LOCK:
                     _SURVIVAL_SCORING_CACHE[route] = list(rules)
-            # mae_60s 분포 (route별 mae_threshold 적용)
-            _mae_thr = _route_mae_threshold(route)
-            mae_dist = {}
-            for grp_name, grp_list in [("A", grp_a), ("C", grp_c)]:
-                mae_vals = [t["inds"].get("mae_60s") for t in grp_list
-                            if t.get("inds", {}).get("mae_60s") is not None]
-                if len(mae_vals) >= 3:
-                    mae_sorted = sorted(mae_vals)
-                    n_m = len(mae_sorted)
-                    within_03 = sum(1 for v in mae_sorted if v >= -0.003)
-                    within_05 = sum(1 for v in mae_sorted if v >= -0.005)
-                    within_thr = sum(1 for v in mae_sorted if v >= -_mae_thr / 100)
-                    mae_dist[grp_name] = {
-                        "n": n_m,
-                        "within_03_pct": round(within_03 / n_m * 100, 1),
-                        "within_05_pct": round(within_05 / n_m * 100, 1),
-                        "within_threshold_pct": round(within_thr / n_m * 100, 1),
-                        "mae_threshold": _mae_thr,
-                        "p50": round(mae_sorted[n_m // 2] * 100, 3),
-                        "p80": round(mae_sorted[int(n_m * 0.8)] * 100, 3),
-                        "worst": round(mae_sorted[0] * 100, 3),
-                    }
             results[route] = {"groups": groups, "d_scores": d_scores,
                               "scoring": scoring, "mae_dist": mae_dist}
     return results
@@ -16807,20 +20786,29 @@ def v4_evaluate_entry(market, c5, c15, c30, c60, c1=None, ob_data=None):
     if not c1:
         return None
 
+    # 🧭 detector 결과는 shadow/LIVE 공유 (같은 check_fn 은 마켓당 1회)
+    _m3_info = {"market": market, "ob_data": ob_data}
+    ev = _StrategyEval(market, c1, c5, c15, c30, c60, _m3_info)
+    try:
+        return _v4_evaluate_live(market, ev, c1, c5, c15, c30, c60, _m3_info)
+    finally:
+        ev.flush()
+
+
+def _v4_evaluate_live(market, ev, c1, c5, c15, c30, c60, m3_info):
     # === v0: 섀도우 테스트 — 게이트 없이 전 시나리오 실행 ===
     try:
-        _v4_shadow_test_all_routes(market, c1, c5, c15, c30, c60, {"market": market, "ob_data": ob_data})
+        _v4_shadow_test_all_routes(market, c1, c5, c15, c30, c60, m3_info, ev=ev)
     except Exception as e:
         print(f"[SHADOW] 섀도우 테스트 오류: {e}")
 
-    # === 라이브 전략 순회 (priority 순, enabled만) ===
-    sorted_strategies = sorted(_STRATEGY_REGISTRY.items(), key=lambda x: x[1]["priority"])
-    for strat_name, strat in sorted_strategies:
+    # === 라이브 전략 순회 (priority 순, enabled만 — 컴파일 시 정렬) ===
+    for strat_name, strat in ev.plan["live"]:
         if not strat["enabled"]:
             continue
-        check_fn = strat["check_fn"]
-        sig = check_fn(c1, c5, c15, c30, c60, gate_info=None)
+        sig = ev.node(strat["check_fn"], live=True)[0]
         if sig:
+            sig = copy.deepcopy(sig)  # 공유 결과(shadow·봉 메모) 보호 — 아래 override 는 복사본에만
             # ⭐ strat 정보로 override (같은 check_fn을 공유하는 strategy 분리 보장)
             #   예: G와 GT가 _v0_check_momentum_rsi 공유 → check_fn 반환값은 항상 G용
             #       → strat_name/exit_params/route를 등록 키 기준으로 덮어써야 GT exit 적용됨
@@ -18337,7 +22325,12 @@ def box_monitor_position(m, entry_price, volume, box_info):
     📦 박스 포지션 모니터: 상단 익절 / 하단 손절 / 박스 이탈 감시
 
     기존 monitor_position과 독립 — 박스 전용 간단 로직
+    ⚡ 청산 엔진에서 구동 (_box_monitor_gen, 체결 없으면 1.5초 폴백)
     """
+    return _exit_engine_run(m, _box_monitor_gen(m, entry_price, volume, box_info), fallback_sec=1.5)
+
+
+def _box_monitor_gen(m, entry_price, volume, box_info):
     box_high = box_info["box_high"]
     box_low = box_info["box_low"]
     box_tp = box_info["box_tp"]
@@ -18360,7 +22353,7 @@ def box_monitor_position(m, entry_price, volume, box_info):
     realized_vol = 0.0        # 부분매도 체결 수량 누적
 
     while True:
-        time.sleep(1.5)
+        yield  # ⚡ 다음 체결 또는 1.5초 폴백
 
         try:
             c1 = _get_c1_cached(m, 3)
@@ -18430,7 +22423,8 @@ def box_monitor_position(m, entry_price, volume, box_info):
                     f"💰 <b>부분익절 70%</b> {m}\n"
                     f"• 현재가: {fmt6(cur_price)}원 ({_partial_gain:+.2f}%)\n"
                     f"• 나머지 30% 돌파 대기\n"
-                    f"{link_for(m)}"
+                    f"{link_for(m)}",
+                    priority=TG_PRIO_TRADE
                 )
             except Exception as pe:
                 print(f"[BOX_MON] 부분매도 실패: {pe}")
@@ -18461,7 +22455,7 @@ def box_monitor_position(m, entry_price, volume, box_info):
             sell_result = place_market_sell(m, remaining_vol)
         else:
             sell_result = {"uuid": ""}  # 이미 전량 부분매도됨
-        time.sleep(0.5)
+        yield 0.5  # ⚡ 체결 반영 대기 — 엔진 워커 점유 없이 타이머 대기
 
         # 매도가 조회 (Private API — get_order_result 사용)
         try:
@@ -18528,7 +22522,8 @@ def box_monitor_position(m, entry_price, volume, box_info):
             f"• 보유시간: {hold_sec:.0f}초\n"
             f"• 박스: {fmt6(box_low)}~{fmt6(box_high)} ({box_info.get('range_pct', 0)*100:.1f}%)\n"
             f"====================================\n"
-            f"{link_for(m)}"
+            f"{link_for(m)}",
+            priority=TG_PRIO_TRADE
         )
 
         print(f"[BOX_MON] 📦 {m} 매도 완료 | {sell_reason} | PnL net:{net_ret_pct:+.2f}% | {hold_sec:.0f}초")
@@ -18755,10 +22750,10 @@ def detect_leader_stock(m, obc, c1=None, tight_mode=False):
 
     # 3) 매도 우세 컷 (top-3 호가창 ask/total > 0.72)
     # v18h-tune3: 0.70 → 0.72 (GT는 초기 매도벽 상태에서 시작되므로 완화)
-    _pre_units = ob.get("raw", {}).get("orderbook_units", [])[:3]
-    if _pre_units:
-        _pre_askv = sum(u["ask_price"] * u["ask_size"] for u in _pre_units)
-        _pre_bidv = sum(u["bid_price"] * u["bid_size"] for u in _pre_units)
+    if ob.get("raw", {}).get("orderbook_units"):
+        _pre_ana = _ob_analytics(ob)
+        _pre_askv = _pre_ana.top_krw(3, "buy")
+        _pre_bidv = _pre_ana.top_krw(3, "sell")
         _pre_total = _pre_askv + _pre_bidv
         if _pre_total > 0 and (_pre_askv / _pre_total) > 0.72:
             _pipeline_inc("pre_cut_sell_dominant")
@@ -18779,9 +22774,14 @@ def detect_leader_stock(m, obc, c1=None, tight_mode=False):
     _dl_t_pre = time.time()
     _pipeline_record_stage("dl_precheck", (_dl_t_pre - _dl_t0) * 1000)
 
+    # 🧵 요청 예산 소진 → data 단계 진입 안 함 (다음 shard에서 재탐지)
+    if not _req_budget_ok():
+        _pipeline_inc("pipe_budget_skip")
+        return None
+
     # === v18g lazy c1 fetch: 위 사전차단 통과한 심볼만 c1 호출 ===
     if c1 is None:
-        with _fetch_tag('detect_leader'):
+        with _DETECT_STAGES["data"], _fetch_tag('detect_leader'):
             c1 = _get_c1_cached(m, 30)
     if not c1 or len(c1) < 3:
         return None
@@ -18889,8 +22889,8 @@ def detect_leader_stock(m, obc, c1=None, tight_mode=False):
         #   - _collect_universal_indicators body에서 c30 사용 0회
         #   - 100% dead fetch 확정 → 12.8s/cycle 절감
         # signature 호환성: _v4_shadow_test_all_routes(c30=...) 인자는 빈 list로 전달
-        _dl_t_mf0 = time.time()
-        with _fetch_tag('detect_leader'):
+        with _DETECT_STAGES["data"], _fetch_tag('detect_leader'):
+            _dl_t_mf0 = time.time()  # 슬롯 대기 제외 (대기는 pipe_q_data로 별도 계측)
             _c5  = _get_c5_cached(m, count=50)  # v18h: 전역 캐시 (TTL 45s)
             _c15 = _get_c15_cached(m, count=50)  # v18f Phase B: 전역 캐시 (TTL 60s)
             _c60 = _get_c60_cached(m, count=30)  # v18f: 전역 캐시 (TTL 300s)
@@ -18922,7 +22922,8 @@ def detect_leader_stock(m, obc, c1=None, tight_mode=False):
         # strategy_v4 통합 진입 판정 (c1 전달 — VR5/ATR% 계산용)
         _t_dv = time.time()
         _dl_t_v4 = time.time()
-        _v4_signal = v4_evaluate_entry(m, _c5, _c15, _c30, _c60, c1=c1, ob_data=ob)
+        with _DETECT_STAGES["eval"]:
+            _v4_signal = v4_evaluate_entry(m, _c5, _c15, _c30, _c60, c1=c1, ob_data=ob)
         _pipeline_record_stage("dl_v4_eval", (time.time() - _dl_t_v4) * 1000)
         _add_cycle_detect_v4_ms((time.time() - _t_dv) * 1000)
 
@@ -19020,8 +23021,8 @@ def detect_leader_stock(m, obc, c1=None, tight_mode=False):
     update_baseline_tps(m, ticks)
 
     # === 테이프 지표 ===
-    t15 = micro_tape_stats_from_ticks(ticks, 15)
-    t45 = micro_tape_stats_from_ticks(ticks, 45)
+    _tw = tick_tape_windows(ticks, (15, 45))
+    t15, t45 = _tw[15], _tw[45]
     twin = t15 if t15["krw_per_sec"] >= t45["krw_per_sec"] else t45
     turn = twin["krw"] / max(ob["depth_krw"], 1)
     turn_pct = turn * 100
@@ -19406,6 +23407,13 @@ def snapshot_row(m, entry_price, pre, c1, ob, t15, btc1m, btc5m,
 
 
 def postcheck_6s(m, pre):
+    """포스트체크 동기 실행 (호출 스레드에서 sleep 폴링). 반환: (ok, reason)"""
+    return _exit_drive_inline(_postcheck_gen(m, pre), 0.7)
+
+
+def _postcheck_gen(m, pre, tick_driven=False):
+    """포스트체크 제너레이터 — yield x = x초 후 재개, yield None = 후보 체결 수신 시 재개(폴백 0.7초).
+    tick_driven=False 면 기존 고정 간격(0.4/0.7초)만 사용. 반환: (ok, reason)"""
     # 🔥 점화 진입은 포스트체크 바이패스 (signal_tag에 "점화" 포함 시)
     is_ignition = "점화" in pre.get("signal_tag", "")
 
@@ -19433,10 +23441,10 @@ def postcheck_6s(m, pre):
         # - 캔들 중반(0.5~1.5%): 기존 0.3초 확인
         _ign_body = pre.get("candle_body_pct", 0)
         if _ign_body < 0.005:  # 캔들 초입 → 즉시 진입 (0.1초만)
-            time.sleep(0.1)
+            yield 0.1
             print(f"[IGN_FAST] {m} 캔들초입 body={_ign_body*100:.2f}% → 0.1초 퀵체크")
         else:
-            time.sleep(0.3)
+            yield 0.3
         _ign_ticks = get_recent_ticks(m, 50, allow_network=True)
         if _ign_ticks:
             _ign_curp = max(_ign_ticks, key=tick_ts_ms).get("trade_price", pre["price"])
@@ -19468,10 +23476,10 @@ def postcheck_6s(m, pre):
             # - 캔들 초입(body < 0.4%): 즉시 진입 (0.1초 최소 체크)
             # - 캔들 중반(0.4~1.0%): 0.3초 퀵체크
             if _sb_body < 0.004:  # 캔들 초입 → 빠른 진입
-                time.sleep(0.1)
+                yield 0.1
                 print(f"[SB_FAST] {m} 캔들초입 body={_sb_body*100:.2f}% → 0.1초 퀵체크")
             else:
-                time.sleep(0.3)  # 🔧 0.5→0.3초 단축
+                yield 0.3  # 🔧 0.5→0.3초 단축
             _sb_ticks = get_recent_ticks(m, 50, allow_network=True)
             if _sb_ticks:
                 _sb_curp = max(_sb_ticks, key=tick_ts_ms).get("trade_price", pre["price"])
@@ -19528,7 +23536,7 @@ def postcheck_6s(m, pre):
             ticks = get_recent_ticks(m, 100, allow_network=False)
 
         if not ticks:
-            time.sleep(0.45)
+            yield 0.45
             continue
 
         # acc에 최신 틱만 중복없이 축적
@@ -19553,7 +23561,7 @@ def postcheck_6s(m, pre):
         if base_price > 0:
             surge = (curp / base_price - 1.0)
             if surge >= MAX_SURGE:
-                t_surge = micro_tape_stats_from_ticks(list(acc), 10) if len(acc) >= 3 else {}
+                t_surge = micro_tape_stats_from_ticks(TickList(acc), 10) if len(acc) >= 3 else {}
                 momentum_ok = (
                     t_surge.get("buy_ratio", 0) >= 0.58
                     and t_surge.get("krw_per_sec", 0) >= 18000
@@ -19574,7 +23582,7 @@ def postcheck_6s(m, pre):
         # ✔ DD는 피크 대비 하락률(음수)로 체크
         dd = (curp / peak - 1.0)
 
-        acc_list = list(acc)
+        acc_list = TickList(acc)  # 🧮 t10/ia/pstd가 같은 컬럼 뷰 공유
         t10 = micro_tape_stats_from_ticks(acc_list, 10)
         ia = inter_arrival_stats(acc_list, 20)
         pstd = price_band_std(acc_list, 20)
@@ -19593,7 +23601,8 @@ def postcheck_6s(m, pre):
             ok_streak = 0
 
         # 🔧 조기진입: 슬립 축소 (0.6/1.0→0.4/0.7초, 루프 1회당 지연 감소)
-        time.sleep(0.4 if t10["rate"] >= 0.6 else 0.7)
+        # ⏳ 확인 큐: 새 체결 도착 시 재평가 (엔진 최소 스텝 간격, 체결 없으면 0.7초 폴백)
+        yield None if tick_driven else (0.4 if t10["rate"] >= 0.6 else 0.7)
 
     if not acc:
         return False, "POST_NO_TICKS"
@@ -19607,9 +23616,10 @@ def postcheck_6s(m, pre):
     else:
         dd2 = 0.0
 
-    t10 = micro_tape_stats_from_ticks(list(acc), 10)
-    ia = inter_arrival_stats(list(acc), 20)
-    pstd = price_band_std(list(acc), 20)
+    acc_list = TickList(acc)
+    t10 = micro_tape_stats_from_ticks(acc_list, 10)
+    ia = inter_arrival_stats(acc_list, 20)
+    pstd = price_band_std(acc_list, 20)
     pstd = pstd if pstd is not None else 0.0  # None 센티넬 처리
 
     # ★ 최종 판정도 가변 임계치로
@@ -19621,6 +23631,106 @@ def postcheck_6s(m, pre):
     if dd2 < -pc_max_dd: return False, f"DD_TOO_DEEP({dd2:.4f})"
     return True, "OK"
 
+# =========================
+# ⏳ 지연 postcheck 확인 큐
+# =========================
+# postcheck_6s 를 탐지 워커/메인 루프에서 블로킹 실행하지 않고 확인 엔진(ExitEngine 인스턴스)에 등록.
+# 후보 마켓 체결 수신 시 1스텝 재평가, 통과분은 _POSTCHECK_READY 로 → _detect_pipeline_run 이 수거해 커밋 루프로.
+# 🔧 recent_alerts 선마킹/실패 시 해제, POST 상태(entered/terminal) 복원은 인라인 경로와 동일.
+_POSTCHECK_ENGINE = (ExitEngine(POSTCHECK_QUEUE_WORKERS, POSTCHECK_MIN_STEP_SEC, name="postcheck_engine", prefix="pc")
+                     if POSTCHECK_QUEUE_ENABLED else None)
+_POSTCHECK_READY = queue.Queue()  # (m, pre, c1, post_state, 확인 완료 ts)
+_POSTCHECK_PENDING = {}  # market -> 등록 ts
+_POSTCHECK_LOCK = threading.Lock()
+_POSTCHECK_STATS = {"submitted": 0, "passed": 0, "failed": 0, "stale": 0, "errors": 0, "ms_sum": 0.0}
+
+
+def _postcheck_fail(m, pre, post_reason):
+    """postcheck 실패 공통 처리 (컷 로그 + 섀도우 기록 + recent_alerts 해제)"""
+    cut("POSTCHECK_DROP", f"{m} postcheck fail: {post_reason}")
+    _pipeline_inc("postcheck_block")
+    _shadow_log_write(now_kst_str(), m, pre.get("signal_tag", "?"), 1,
+                      f"postcheck:{post_reason}", 0)
+    # 🔧 FIX: postcheck 실패 시 recent_alerts 제거 (다음 스캔에서 재시도 가능)
+    with _POSITION_LOCK:
+        recent_alerts.pop(m, None)
+
+
+def _postcheck_pending(m=None):
+    with _POSTCHECK_LOCK:
+        return (m in _POSTCHECK_PENDING) if m is not None else len(_POSTCHECK_PENDING)
+
+
+def _postcheck_submit(m, pre, c1):
+    """후보 확인 등록 (비블로킹) — 결과는 완료 콜백에서 _POSTCHECK_READY 또는 실패 처리"""
+    pst = _post_state_current()
+    t_sub = time.time()
+    with _POSTCHECK_LOCK:
+        _POSTCHECK_PENDING[m] = t_sub
+        _POSTCHECK_STATS["submitted"] += 1
+
+    def _done(j):
+        _post_state_restore(pst)  # 엔진 워커 스레드 → 탐지 워커의 POST 상태 이어받기
+        elapsed = time.time() - t_sub
+        try:
+            if j.exc is not None:
+                raise j.exc
+            ok_post, post_reason = j.result
+            _PROFILER.add("postcheck", "postcheck", t_sub, elapsed, {"market": m, "reason": post_reason})
+            if ok_post:
+                _POSTCHECK_READY.put((m, pre, c1, _post_state_current(), time.time()))
+            else:
+                _postcheck_fail(m, pre, post_reason)
+            with _POSTCHECK_LOCK:
+                _POSTCHECK_STATS["passed" if ok_post else "failed"] += 1
+                _POSTCHECK_STATS["ms_sum"] += elapsed * 1000
+        except Exception as e:
+            with _POSTCHECK_LOCK:
+                _POSTCHECK_STATS["errors"] += 1
+            _symbol_scan_exception(m, e, lock_held=False)
+        finally:
+            with _POSTCHECK_LOCK:
+                _POSTCHECK_PENDING.pop(m, None)
+
+    _POSTCHECK_ENGINE.submit(m, _postcheck_gen(m, pre, tick_driven=True), 0.7, on_done=_done)
+
+
+def _postcheck_collect(timeout=0.0):
+    """확인 통과 후보 수거 → [(m, pre, c1, post_state)]. timeout>0 이면 첫 건을 그만큼 대기.
+    완료 후 POSTCHECK_READY_MAX_AGE_SEC 넘게 묵은 후보는 신선도 부족으로 폐기."""
+    out = []
+    try:
+        item = _POSTCHECK_READY.get(timeout=timeout) if timeout > 0 else _POSTCHECK_READY.get_nowait()
+    except queue.Empty:
+        return out
+    while True:
+        m, pre, c1, pst, ts_done = item
+        if time.time() - ts_done > POSTCHECK_READY_MAX_AGE_SEC:
+            with _POSTCHECK_LOCK:
+                # _done 에서 passed 로 센 건 → stale 로 옮김 (pass/fail/stale 합 = 완료 건수)
+                _POSTCHECK_STATS["passed"] -= 1
+                _POSTCHECK_STATS["stale"] += 1
+            _postcheck_fail(m, pre, f"STALE({time.time() - ts_done:.1f}s)")
+        else:
+            out.append((m, pre, c1, pst))
+        try:
+            item = _POSTCHECK_READY.get_nowait()
+        except queue.Empty:
+            return out
+
+
+def _postcheck_status_str():
+    if _POSTCHECK_ENGINE is None:
+        return "postcheck_q=off"
+    with _POSTCHECK_LOCK:
+        s = dict(_POSTCHECK_STATS)
+        n = len(_POSTCHECK_PENDING)
+    done = s["passed"] + s["failed"] + s["stale"]
+    avg = s["ms_sum"] / done if done else 0.0
+    return (f"postcheck_q pending={n} sub={s['submitted']} pass={s['passed']} fail={s['failed']} "
+            f"stale={s['stale']} err={s['errors']} avg={avg:.0f}ms")
+
+
 # =========================
 # 🎯 틱 기반 손절 헬퍼 함수
 # =========================
@@ -19964,6 +24074,16 @@ def monitor_position(m,
                      tight_mode=False,
                      horizon=None,
                      reentry=False):
+    """⚡ 청산 엔진에서 구동 (_monitor_position_gen) — 반환 형식 동일"""
+    return _exit_engine_run(m, _monitor_position_gen(m, entry_price, pre, tight_mode, horizon, reentry))
+
+
+def _monitor_position_gen(m,
+                          entry_price,
+                          pre,
+                          tight_mode=False,
+                          horizon=None,
+                          reentry=False):
     # 🔧 FIX: entry_price 유효성 검증 (Division by Zero 방지)
     if not entry_price or entry_price <= 0:
         print(f"[MONITOR_ERR] {m} entry_price 무효 ({entry_price}) → 모니터링 중단")
@@ -20009,6 +24129,8 @@ def monitor_position(m,
     # 손절 디바운스용
     stop_first_seen_ts = 0.0
     stop_hits = 0
+    # ⚡ 체결 구동 스텝은 RECHECK_SEC보다 촘촘 → 디바운스 히트는 RECHECK_SEC 간격 표본만 카운트
+    stop_hit_ts = 0.0
     # 🔧 수급확인 손절: 감량 후 관망모드 상태
     _sl_reduced = False          # 감량(50%) 매도 완료 여부
     _sl_reduced_ts = 0.0         # 감량 시각
@@ -20017,6 +24139,7 @@ def monitor_position(m,
     # 트레일 디바운스용
     trail_db_first_ts = 0.0
     trail_db_hits = 0
+    trail_db_hit_ts = 0.0
 
     trail_armed = False
     trail_stop = 0.0
@@ -20046,9 +24169,8 @@ def monitor_position(m,
         _ob_raw = pre.get("ob", {}).get("raw", {})
         if _ob_raw:
             try:
-                _ob_units = _ob_raw.get("orderbook_units", [])
-                if _ob_units:
-                    _at_feat_val = _calc_vwap_slip(_ob_units, 10_000_000, "sell")
+                if _ob_raw.get("orderbook_units"):
+                    _at_feat_val = _ob_analytics(pre["ob"]).slip(10_000_000, "sell")
             except Exception:
                 pass
         if _at_feat_val is None:
@@ -20151,7 +24273,7 @@ def monitor_position(m,
 
     try:
         while time.time() - start_ts <= horizon:  # 🔧 before1 복원 (MAX_RUNTIME→horizon)
-            time.sleep(RECHECK_SEC)
+            yield  # ⚡ 다음 체결 또는 RECHECK_SEC 폴백
 
             # 🔧 찌꺼기 방지: 부분청산→전량청산 전환 시 루프 조기 종료
             # 🔧 FIX: 잔고 확인 후 판단 (OPEN_POSITIONS 이탈만으로 청산 단정 → 유령포지션 원인)
@@ -20187,7 +24309,7 @@ def monitor_position(m,
             if not ticks or len(ticks) < 3:
                 consecutive_failures += 1
                 if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
-                    time.sleep(3)
+                    yield 3
                     ticks = get_recent_ticks(m, 100)
                     if not ticks:
                         verdict = "데이터 수신 실패"
@@ -20199,7 +24321,8 @@ def monitor_position(m,
             # 현재가 — 🔧 FIX: ticker API throttle (6초마다만 호출, 나머지는 ticks에서 추출)
             # 🔧 FIX: 함수 속성 대신 로컬 변수 사용 (스레드 간 race condition 방지)
             _ticker_age = time.time() - _local_ticker_ts
-            if _ticker_age >= 6:
+            # ⚡ 스트림 체결이 있으면 ticker REST 생략 (최신 체결가 = 현재가)
+            if _ticker_age >= 6 and _md_stream_ticks(m, 1) is None:
                 cur_js = safe_upbit_get("https://api.upbit.com/v1/ticker", {"markets": m})
                 if cur_js and len(cur_js) > 0:
                     curp = cur_js[0].get("trade_price", last_price)
@@ -20348,8 +24471,10 @@ def monitor_position(m,
                 if stop_first_seen_ts == 0.0:
                     stop_first_seen_ts = time.time()
                     stop_hits = 1
-                else:
+                    stop_hit_ts = stop_first_seen_ts
+                elif time.time() - stop_hit_ts >= RECHECK_SEC:
                     stop_hits += 1
+                    stop_hit_ts = time.time()
                 _sl_duration = time.time() - stop_first_seen_ts
                 # HARD_STOP: 급락(-1.5%)은 즉시 컷 (디바운스 미적용)
                 _is_hard_stop = cur_gain <= -(eff_sl_pct * 1.5)
@@ -20468,8 +24593,9 @@ def monitor_position(m,
                     if _sl_recovery < 0.5:  # SL선의 50% 이내로 회복 = 진짜 반등
                         stop_first_seen_ts = 0.0
                         stop_hits = 0
-                    else:
+                    elif time.time() - stop_hit_ts >= RECHECK_SEC:
                         stop_hits = max(0, stop_hits - 1)
+                        stop_hit_ts = time.time()
 
                 # 🔧 수급확인감량 후 관망 결과 처리
                 if _sl_reduced:
@@ -20763,8 +24889,10 @@ def monitor_position(m,
                 if trail_db_first_ts == 0.0:
                     trail_db_first_ts = time.time()
                     trail_db_hits = 1
-                else:
+                    trail_db_hit_ts = trail_db_first_ts
+                elif time.time() - trail_db_hit_ts >= RECHECK_SEC:
                     trail_db_hits += 1
+                    trail_db_hit_ts = time.time()
                 _trail_dur = time.time() - trail_db_first_ts
                 # 🔧 FIX: 트레일 디바운스를 trade_type별로 차등
                 # 기존: SL+2회 +5초 고정 → scalp에서 큰 수익 되돌림 허용
@@ -20796,9 +24924,10 @@ def monitor_position(m,
                     if _recovery_margin >= 0.002:  # 0.2% 이상 회복 = 진짜 반등
                         trail_db_first_ts = 0.0
                         trail_db_hits = 0
-                    else:
-                        # 미세 회복: 점진 감소 (노이즈 진동에 강건)
+                    elif time.time() - trail_db_hit_ts >= RECHECK_SEC:
+                        # 미세 회복: 점진 감소 (노이즈 진동에 강건) — ⚡ 히트와 같은 표본 간격
                         trail_db_hits = max(0, trail_db_hits - 1)
+                        trail_db_hit_ts = time.time()
 
 
             # === 🔥 심플 체크포인트 매도 로직 ===
@@ -21039,8 +25168,9 @@ def monitor_position(m,
                 tg_send_mid(f"⏰ {m} 시간만료 but 수익중 +{_final_gain*100:.2f}% → {_ext_horizon}초 연장 ({trade_type})")
                 _ext_start = time.time()
                 _ext_trail_hits = 0  # 🔧 FIX: 트레일 디바운스 (1틱 노이즈 방지)
+                _ext_trail_hit_ts = 0.0
                 while time.time() - _ext_start <= _ext_horizon:
-                    time.sleep(RECHECK_SEC)
+                    yield  # ⚡ 다음 체결 또는 RECHECK_SEC 폴백
                     # 포지션 존재 확인
                     with _POSITION_LOCK:
                         if m not in OPEN_POSITIONS:
@@ -21079,7 +25209,9 @@ def monitor_position(m,
 
                     # 트레일 체크 (🔧 FIX: 2회 디바운스 — 메인루프와 동일 패턴)
                     if curp < trail_stop:
-                        _ext_trail_hits += 1
+                        if time.time() - _ext_trail_hit_ts >= RECHECK_SEC:
+                            _ext_trail_hits += 1
+                            _ext_trail_hit_ts = time.time()
                         if _ext_trail_hits >= 2:
                             _ext_gain = (curp / entry_price - 1.0) if entry_price > 0 else 0
                             close_auto_position(m, f"연장트레일컷 +{_ext_gain*100:.2f}%")
@@ -21203,7 +25335,7 @@ def monitor_position(m,
         # ✅ 재모니터링 알림 비활성화 (불필요한 반복 메시지 방지)
         # (실제 로직은 유지하지만, 알림 발송만 차단)
         if AUTO_TRADE and m in OPEN_POSITIONS and not reentry and not _already_closed:
-            remonitor_until_close(m, entry_price, pre, tight_mode)
+            yield from _remonitor_gen(m, entry_price, pre, tight_mode)
 
         # 🔧 특단조치: probe 손절 후 재진입 로직 제거 (probe 폐지 → 불필요)
 
@@ -21260,24 +25392,39 @@ def _tg_split_message(text, max_len=4000):
     return final if final else [text[:max_len]]
 
 
-def tg_send(t, retry=3):
-    """텔레그램 메시지 전송 (429 rate-limit 처리 + 지수 백오프 + 실패큐)
-    🔧 FIX: _TG_SESSION 전용 세션 사용 (SESSION 리프레시 시 청산알림 유실 방지)
-    🔧 FIX: 4096자 초과 메시지 자동 분할 (Telegram API 제한)
-    """
+# 📮 우선순위 레인 (작을수록 먼저)
+TG_PRIO_TRADE = 0    # 매수/청산 체결, failsafe
+TG_PRIO_NORMAL = 1
+TG_PRIO_REPORT = 2   # 주기 리포트 — TG_BATCH_WINDOW_SEC 동안 모아 한 메시지로
+
+
+def tg_send(t, retry=3, priority=TG_PRIO_NORMAL):
+    """텔레그램 메시지 전송 — 📮 워커 큐에 넣고 즉시 반환 (호출 스레드 네트워크 대기 없음)
+    priority: TG_PRIO_TRADE > TG_PRIO_NORMAL > TG_PRIO_REPORT(묶음)
+    반환: 큐 등록 여부 (TG_ASYNC_ENABLED=0 이면 기존 동기 전송 결과)"""
     # TG_TOKEN 없거나 CHAT_IDS가 비어 있으면 콘솔에만 출력
     if not TG_TOKEN or not CHAT_IDS:
         print(t)
         return True
+    if _TG_NOTIFIER is None:
+        return _tg_send_sync(t, retry=retry)
+    return _TG_NOTIFIER.submit(t, retry, priority)
+
 
+def _tg_send_sync(t, retry=3):
+    """텔레그램 메시지 동기 전송 (429 rate-limit 처리 + 지수 백오프 + 실패큐)
+    🔧 FIX: _TG_SESSION 전용 세션 사용 (SESSION 리프레시 시 청산알림 유실 방지)
+    🔧 FIX: 4096자 초과 메시지 자동 분할 (Telegram API 제한)
+    📮 비동기 모드에서는 TelegramNotifier 워커 스레드에서만 호출
+    """
     # 🔧 FIX: Telegram 4096자 제한 → 초과 시 분할 전송 (잘림 방지)
     if len(t) > 4000:
         chunks = _tg_split_message(t, max_len=4000)
         ok_all = True
         for i, chunk in enumerate(chunks):
-            if i > 0:
-                time.sleep(0.3)  # rate-limit 방지
-            if not tg_send(chunk, retry=retry):
+            if i > 0 and _TG_RATE is None:
+                time.sleep(0.3)  # rate-limit 방지 (비동기 모드는 _TG_RATE 가 간격 보장)
+            if not _tg_send_sync(chunk, retry=retry):
                 ok_all = False
         return ok_all
 
@@ -21288,10 +25435,12 @@ def tg_send(t, retry=3):
         변경: 락 안에서 sess.post()까지 수행 → 세션 일관성 보장
         """
         global _TG_SESSION
+        if _TG_RATE is not None:
+            _TG_RATE.wait(payload["chat_id"])
         try:
             with _TG_SESSION_LOCK:
                 return _TG_SESSION.post(
-                    f"https://api.telegram.org/bot{TG_TOKEN}/sendMessage",
+                    f"{TG_API_URL}/bot{TG_TOKEN}/sendMessage",
                     json=payload, timeout=10,
                 )
         except Exception:
@@ -21300,7 +25449,7 @@ def tg_send(t, retry=3):
                 with _TG_SESSION_LOCK:
                     _TG_SESSION = _new_session()
                     return _TG_SESSION.post(
-                        f"https://api.telegram.org/bot{TG_TOKEN}/sendMessage",
+                        f"{TG_API_URL}/bot{TG_TOKEN}/sendMessage",
                         json=payload, timeout=10,
                     )
             except Exception as e2:
@@ -21334,7 +25483,10 @@ def tg_send(t, retry=3):
                     except Exception:
                         retry_after = 1
                     print(f"[TG][{cid}] 429 rate-limit → {retry_after}초 대기 (시도 {attempt+1}/{retry+1})")
-                    time.sleep(retry_after + 0.1)
+                    if _TG_RATE is not None:
+                        _TG_RATE.block(cid, retry_after + 0.1)  # 다음 _tg_post 가 대기 (다른 채팅은 계속 전송)
+                    else:
+                        time.sleep(retry_after + 0.1)
                     continue  # 백오프 sleep 건너뜀 (이미 대기함)
                 else:
                     # 디버깅용
@@ -21374,10 +25526,12 @@ def tg_send(t, retry=3):
                 else:
                     # 🔧 최종 실패 → 큐에 저장
                     _tg_fail_queue.append((time.time(), cid, t))
+                    _tg_fail_queue_save()
                     print(f"[TG][{cid}] 전송 실패 → 큐 저장 (큐 크기: {len(_tg_fail_queue)})")
             except Exception as e:
                 print(f"[TG][{cid}] final plain fallback failed: {e}")
                 _tg_fail_queue.append((time.time(), cid, t))
+                _tg_fail_queue_save()
     return ok_any
 
 
@@ -21386,17 +25540,56 @@ _tg_fail_queue = deque(maxlen=50)  # 최대 50개 보관
 _tg_flush_lock = threading.Lock()
 
 
+def _tg_fail_queue_save():
+    """📮 실패 큐 파일 보관 (재시작 후에도 재전송)"""
+    if not TG_ASYNC_ENABLED:
+        return
+    try:
+        tmp = TG_FAIL_QUEUE_PATH + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump([list(x) for x in list(_tg_fail_queue)], f, ensure_ascii=False)
+        os.replace(tmp, TG_FAIL_QUEUE_PATH)
+    except Exception as e:
+        print(f"[TG_FLUSH] 실패 큐 저장 실패: {e}")
+
+
+def _tg_fail_queue_load():
+    if not TG_ASYNC_ENABLED or not os.path.exists(TG_FAIL_QUEUE_PATH):
+        return
+    try:
+        with open(TG_FAIL_QUEUE_PATH, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        now = time.time()
+        for ts, cid, msg in rows:
+            if now - ts <= TG_FAIL_TTL_SEC:
+                _tg_fail_queue.append((ts, cid, msg))
+        if _tg_fail_queue:
+            print(f"[TG_FLUSH] 실패 큐 복원: {len(_tg_fail_queue)}건")
+    except Exception as e:
+        print(f"[TG_FLUSH] 실패 큐 로드 실패: {e}")
+
+
 def tg_flush_failed():
-    """실패한 메시지 재전송 시도 (메인 루프에서 주기적 호출)"""
+    """실패한 메시지 재전송 시도 (메인 루프에서 주기적 호출)
+    📮 비동기 모드: 워커가 TG_FAIL_RETRY_SEC 마다 직접 재전송 → 여기선 대기 없이 반환"""
+    if _TG_NOTIFIER is not None:
+        _TG_NOTIFIER.start()
+        return
+    _tg_flush_failed_sync()
+
+
+def _tg_flush_failed_sync():
     if not _tg_fail_queue:
         return
     with _tg_flush_lock:
         retried = 0
+        changed = False
         while _tg_fail_queue and retried < 5:  # 한 번에 최대 5개
             ts, cid, msg = _tg_fail_queue[0]
             # 10분 이상 된 메시지는 버림
-            if time.time() - ts > 600:
+            if time.time() - ts > TG_FAIL_TTL_SEC:
                 _tg_fail_queue.popleft()
+                changed = True
                 continue
             try:
                 payload = {
@@ -21404,24 +25597,208 @@ def tg_flush_failed():
                     "text": f"[지연] {re.sub(r'<[^>]+>', '', msg)}",
                     "disable_web_page_preview": True,
                 }
+                if _TG_RATE is not None:
+                    _TG_RATE.wait(cid)
                 # 🔧 FIX: 세션 사용도 락 안에서 (use-after-release 방지)
                 with _TG_SESSION_LOCK:
                     r = _TG_SESSION.post(
-                        f"https://api.telegram.org/bot{TG_TOKEN}/sendMessage",
+                        f"{TG_API_URL}/bot{TG_TOKEN}/sendMessage",
                         json=payload,
                         timeout=8,
                     )
                 if r.status_code == 200 and r.json().get("ok"):
                     _tg_fail_queue.popleft()
+                    changed = True
                     retried += 1
                     print(f"[TG_FLUSH] 재전송 성공 ({retried}건)")
                 elif r.status_code == 429:
                     break  # rate-limit면 다음 기회에
                 else:
                     _tg_fail_queue.popleft()  # 복구 불가 오류면 버림
+                    changed = True
             except Exception:
                 break  # 네트워크 오류면 다음 기회에
-            time.sleep(0.3)
+            if _TG_RATE is None:
+                time.sleep(0.3)
+        if changed:
+            _tg_fail_queue_save()
+
+
+class _TgRateLimiter:
+    """채팅별 최소 간격 + 전체 초당 상한 + 429 retry_after 차단 (전송 스레드가 sleep)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chat_next = {}       # chat_id -> 다음 전송 가능 시각
+        self._sent = deque()       # 최근 1초 전송 시각 (전체 상한)
+        self.waited_sec = 0.0
+
+    def block(self, cid, sec):
+        with self._lock:
+            self._chat_next[cid] = max(self._chat_next.get(cid, 0.0), time.time() + sec)
+
+    def wait(self, cid):
+        while True:
+            with self._lock:
+                now = time.time()
+                while self._sent and now - self._sent[0] >= 1.0:
+                    self._sent.popleft()
+                due = self._chat_next.get(cid, 0.0)
+                if len(self._sent) >= TG_GLOBAL_PER_SEC:
+                    due = max(due, self._sent[0] + 1.0)
+                if due <= now:
+                    self._sent.append(now)
+                    self._chat_next[cid] = now + TG_CHAT_MIN_INTERVAL_SEC
+                    return
+            self.waited_sec += due - now
+            time.sleep(due - now)
+
+
+class TelegramNotifier:
+    """📮 텔레그램 전송 워커 — 레인별 큐 + 리포트 묶음 + 실패 큐 재전송
+    호출 스레드는 submit() 으로 넣고 즉시 반환, 네트워크/백오프/레이트리밋 대기는 워커 스레드만."""
+
+    def __init__(self):
+        self._cv = threading.Condition()
+        self._lanes = {TG_PRIO_TRADE: deque(), TG_PRIO_NORMAL: deque(), TG_PRIO_REPORT: deque()}
+        self._thread = None
+        self._stopping = False
+        self._busy = False
+        self._inflight = None      # 전송 중 메시지 (종료 drain 시간 초과 → 실패 큐로)
+        self._next_flush = time.time() + TG_FAIL_RETRY_SEC
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "batched": 0, "dropped": 0,
+                      "max_wait_ms": 0.0}
+
+    def start(self):
+        with self._cv:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="TgNotifier")
+                self._thread.start()
+
+    def submit(self, text, retry=3, priority=TG_PRIO_NORMAL):
+        if priority not in self._lanes:
+            priority = TG_PRIO_NORMAL
+        if self._stopping:
+            return _tg_send_sync(text, retry=retry)  # drain 이후 (atexit 등) → 동기 전송
+        with self._cv:
+            if priority != TG_PRIO_TRADE:
+                # normal/report 레인 상한 — 오래된 리포트부터 버림 (trade 레인은 버리지 않음)
+                if len(self._lanes[TG_PRIO_NORMAL]) + len(self._lanes[TG_PRIO_REPORT]) >= TG_QUEUE_MAX:
+                    victim = self._lanes[TG_PRIO_REPORT] or self._lanes[TG_PRIO_NORMAL]
+                    victim.popleft()
+                    self.stats["dropped"] += 1
+            self._lanes[priority].append((time.time(), text, retry))
+            self.stats["queued"] += 1
+            self._cv.notify()
+        if self._thread is None:
+            self.start()
+        return True
+
+    def pending(self):
+        with self._cv:
+            return sum(len(q) for q in self._lanes.values()) + (1 if self._busy else 0)
+
+    def _pop(self, now):
+        """다음 전송 단위 (enq_ts, text, retry) 또는 (None, 대기 초) — _cv 보유 상태에서 호출"""
+        for p in (TG_PRIO_TRADE, TG_PRIO_NORMAL):
+            if self._lanes[p]:
+                return self._lanes[p].popleft(), 0
+        rep = self._lanes[TG_PRIO_REPORT]
+        if not rep:
+            return None, None
+        remain = rep[0][0] + TG_BATCH_WINDOW_SEC - now
+        if remain > 0 and not self._stopping:
+            return None, remain
+        ts, text, retry = rep.popleft()
+        n = len(text)
+        while rep and n + 2 + len(rep[0][1]) <= TG_BATCH_MAX_CHARS:
+            text = text + "\n\n" + rep.popleft()[1]
+            n = len(text)
+            self.stats["batched"] += 1
+        return (ts, text, retry), 0
+
+    def _run(self):
+        while True:
+            item = None
+            with self._cv:
+                while True:
+                    now = time.time()
+                    item, wait = self._pop(now)
+                    if item is not None:
+                        break
+                    if self._stopping:
+                        return
+                    if _tg_fail_queue and now >= self._next_flush:
+                        break
+                    wait = min(wait if wait is not None else TG_FAIL_RETRY_SEC,
+                               max(0.05, self._next_flush - now))
+                    self._cv.wait(wait)
+                self._busy = True
+            try:
+                if item is None:
+                    self._next_flush = time.time() + TG_FAIL_RETRY_SEC
+                    _tg_flush_failed_sync()
+                else:
+                    ts, text, retry = item
+                    self._inflight = (ts, text)
+                    self.stats["max_wait_ms"] = max(self.stats["max_wait_ms"], (time.time() - ts) * 1000)
+                    ok = _tg_send_sync(text, retry=retry)
+                    self.stats["sent" if ok else "failed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"[TG_WORKER] 전송 오류: {e}")
+            finally:
+                with self._cv:
+                    self._busy = False
+                    self._inflight = None
+                    self._cv.notify_all()
+
+    def drain(self, timeout=TG_SHUTDOWN_DRAIN_SEC):
+        """종료 시: 리포트 묶음 대기 생략하고 큐 비우기 → 남은 건 실패 큐 파일로"""
+        deadline = time.time() + timeout
+        with self._cv:
+            self._stopping = True
+            self._cv.notify_all()
+            if self._thread is not None:
+                while (self._busy or any(self._lanes.values())) and time.time() < deadline:
+                    self._cv.wait(max(0.05, deadline - time.time()))
+            left = [(ts, text) for q in self._lanes.values() for ts, text, _ in q]
+            if self._inflight is not None:
+                left.insert(0, self._inflight)
+            for q in self._lanes.values():
+                q.clear()
+        if left:
+            for ts, text in left:
+                for cid in CHAT_IDS:
+                    _tg_fail_queue.append((ts, cid, text))
+            _tg_fail_queue_save()
+            print(f"[TG_WORKER] 종료 — 미전송 {len(left)}건 실패 큐로 보관")
+
+    def status_str(self):
+        s = self.stats
+        with self._cv:
+            q = "/".join(str(len(self._lanes[p])) for p in (TG_PRIO_TRADE, TG_PRIO_NORMAL, TG_PRIO_REPORT))
+        return (f"tg(q={q} sent={s['sent']} fail={s['failed']} batch={s['batched']} drop={s['dropped']} "
+                f"failq={len(_tg_fail_queue)} maxwait={s['max_wait_ms']:.0f}ms)")
+
+
+_TG_RATE = _TgRateLimiter() if TG_ASYNC_ENABLED else None
+_TG_NOTIFIER = TelegramNotifier() if TG_ASYNC_ENABLED else None
+_tg_fail_queue_load()
+
+
+def _tg_status_str():
+    if _TG_NOTIFIER is None:
+        return f"tg=sync failq={len(_tg_fail_queue)}"
+    return _TG_NOTIFIER.status_str()
+
+
+def _tg_shutdown():
+    if _TG_NOTIFIER is not None:
+        _TG_NOTIFIER.drain()
+
+
+atexit.register(_tg_shutdown)
 
 
 # =========================
@@ -21529,8 +25906,9 @@ def validate_config():
     if TICKS_BUY_RATIO < 0.5 or TICKS_BUY_RATIO > 1:
         errors.append(f"TICKS_BUY_RATIO={TICKS_BUY_RATIO} 범위 오류 (0.5~1)")
     if not TG_TOKEN or not CHAT_IDS: warnings.append("텔레그램 미설정 - 콘솔 출력만 사용")
-    if _BUCKET.get("rate", 0) <= 0: warnings.append("토큰버킷 rate<=0 → 0.1로 클램프")
-    if _BUCKET.get("cap", 0) <= 0: warnings.append("토큰버킷 cap<=0 → 1.0로 클램프")
+    for _rl_g, (_rl_rate, _rl_cap) in RATE_LIMIT_GROUPS.items():
+        if _rl_rate <= 0: warnings.append(f"레이트리밋 {_rl_g} rate<=0 → 0.1로 클램프")
+        if _rl_cap <= 0: warnings.append(f"레이트리밋 {_rl_g} cap<=0 → 1.0로 클램프")
     if warnings:
         print("[CONFIG_WARNING]")
         for w in warnings:
@@ -21550,6 +25928,14 @@ from http.server import HTTPServer, BaseHTTPRequestHandler
 
 bot_start_time = 0
 
+# 📈 /metrics 게이지 (스크레이프 시점 값)
+_METRICS.gauge("open_positions", lambda: len(OPEN_POSITIONS), "보유 포지션 수")
+_METRICS.gauge("threads", threading.active_count, "활성 스레드 수")
+_METRICS.gauge("uptime_seconds", lambda: time.time() - bot_start_time if bot_start_time else 0)
+_METRICS.gauge("shadow_routes", lambda: len(_SHADOW_PERF_STATS), "섀도우 통계 루트 수")
+_METRICS.gauge("tg_pending", lambda: _TG_NOTIFIER.pending() if _TG_NOTIFIER is not None else 0, "텔레그램 전송 대기")
+_METRICS.gauge("tg_fail_queue", lambda: len(_tg_fail_queue), "텔레그램 실패 큐")
+
 
 class HealthHandler(BaseHTTPRequestHandler):
 
@@ -21557,6 +25943,15 @@ class HealthHandler(BaseHTTPRequestHandler):
         pass
 
     def do_GET(self):
+        if self.path == "/metrics":
+            # 📈 Prometheus text exposition — 리포트를 텔레그램 텍스트 대신 스크레이프로
+            body = _METRICS.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
         if self.path == "/health":
             status = {
                 "status":
@@ -21576,6 +25971,20 @@ class HealthHandler(BaseHTTPRequestHandler):
                 "cache_size":
                 len(_TICKS_CACHE.cache)
                 if hasattr(_TICKS_CACHE, 'cache') else 0,
+                "md_stream":
+                _md_stream_status_str(),
+                "md_hub":
+                _md_hub_status_str(),
+                "candle_store":
+                _candle_store_status_str(),
+                "trade_store":
+                (_TRADE_STORE.status_str() if _TRADE_STORE is not None else "off"),
+                "report":
+                _report_status_str(),
+                "prefetch":
+                _prefetch_status_str(),
+                "shadow_book":
+                _shadow_book_status_str(),
                 "config": {
                     "top_n": TOP_N,
                     "scan_interval": SCAN_INTERVAL,
@@ -21627,8 +26036,12 @@ def start_watchdogs():
                 _shadow_trades = sum(s.get("signals", 0) for s in _SHADOW_PERF_STATS.values())
                 _threads = threading.active_count()
                 print(f"[HB] {now_kst_str()} open={len(OPEN_POSITIONS)} "
-                      f"rate={_BUCKET.get('rate', 0):.2f} cap={_BUCKET.get('cap', 0):.2f} "
-                      f"RSS={_rss_mb}MB threads={_threads} shadow={_shadow_keys}routes/{_shadow_trades}trades")
+                      f"{_RATE_LIMITER.status_str()} "
+                      f"RSS={_rss_mb}MB threads={_threads} shadow={_shadow_keys}routes/{_shadow_trades}trades "
+                      f"{_md_stream_status_str()} {_exit_engine_status_str()} {_postcheck_status_str()} "
+                      f"{_screen_status_str()} {_order_engine_status_str()} {_journal_status_str()} "
+                      f"{_tg_status_str()} {_md_hub_status_str()}"
+                      + (f" {_PROFILER.status_str()}" if _PROFILER.enabled else ""))
 
                 # === 모니터 watchdog: 포지션 있는데 모니터 죽은 경우 failsafe ===
                 with _POSITION_LOCK:
@@ -21651,7 +26064,7 @@ def start_watchdogs():
                     tg_send(f"🚨 <b>WATCHDOG FAILSAFE</b> {mk}\n"
                             f"• 모니터 스레드 죽음 감지\n"
                             f"• 포지션 age: {pos_age:.0f}초\n"
-                            f"• 즉시 시장가 청산 시도")
+                            f"• 즉시 시장가 청산 시도", priority=TG_PRIO_TRADE)
                     try:
                         close_auto_position(mk, f"watchdog_failsafe|monitor_dead|age={pos_age:.0f}s")
                     except Exception as wde:
@@ -21684,88 +26097,194 @@ def start_watchdogs():
     print("🐕 워치독 시작됨 (헬스비트 5분, 세션리프레시 10분, 락청소 10분)")
 
 
+# ===== 오더북 분석 (누적 배열 1회 구축 → 슬리피지/유동성 쿼리 O(log L)) =====
+# 기존: _calc_vwap_slip 호출마다 호가 전체 순회, _calc_liq_cap은 그걸 30회 이진탐색 반복.
+#   진입 1건당 shadow 피처(7금액×2방향) + 체결품질 로그 + 유동성캡으로 같은 스냅샷을 수십 번 재순회.
+# 변경: 스냅샷당 한 번 방향별 (가격, 누적 KRW, 누적 수량, 레벨 전량 소진 시 슬리피지) 배열 구축 →
+#   - slip(금액): 누적 KRW bisect → 걸친 레벨 부분 소진분만 계산 (_calc_vwap_slip과 동일 의미/반올림)
+#   - size_at_slip(한도%): 레벨별 소진 슬리피지 bisect → 걸친 레벨 안에서 닫힌 해 (이진탐색 오차 없음)
+#   - depth_within_bps(bps): mid 대비 bps 이내 호가 총액
+#   - top_krw(n): 상위 n호가 총액 (raw 호가 기준 — 기존 sum(u[:n]) 과 동일)
+class OrderbookAnalytics:
+    """오더북 스냅샷 1개의 누적 배열 + 슬리피지/유동성 쿼리"""
+
+    __slots__ = ("mid", "_lv", "_top")
+
+    def __init__(self, ob_units):
+        self.mid = 0.0
+        self._lv = {}
+        self._top = {}
+        if not ob_units:
+            return
+        b1 = ob_units[0].get("bid_price", 0)
+        a1 = ob_units[0].get("ask_price", 0)
+        if b1 > 0 and a1 > 0:
+            self.mid = (b1 + a1) / 2
+        for side, pk, sk in (("buy", "ask_price", "ask_size"), ("sell", "bid_price", "bid_size")):
+            prices, cum_krw, cum_qty, full_slip = [], [], [], []
+            top = [0.0]
+            k = q = 0.0
+            for u in ob_units:
+                price = u.get(pk, 0)
+                size = u.get(sk, 0)
+                top.append(top[-1] + price * size)
+                if price <= 0 or size <= 0:
+                    continue
+                level_krw = price * size
+                k += level_krw
+                q += level_krw / price
+                prices.append(price)
+                cum_krw.append(k)
+                cum_qty.append(q)
+                if self.mid > 0:
+                    full_slip.append(self._slip_of(k / q, side))
+            self._lv[side] = (prices, cum_krw, cum_qty, full_slip)
+            self._top[side] = top
+
+    def _slip_of(self, vwap, side):
+        mid = self.mid
+        return (vwap - mid) / mid * 100 if side == "buy" else (mid - vwap) / mid * 100
+
+    def slip(self, krw_amount, side="buy"):
+        """시장가 krw_amount 체결 시 mid 대비 VWAP 슬리피지 % (양수=불리) or None"""
+        if self.mid <= 0 or krw_amount <= 0:
+            return None
+        prices, cum_krw, cum_qty, _ = self._lv.get(side, ((), (), (), ()))
+        if not prices:
+            return None
+        i = bisect.bisect_left(cum_krw, krw_amount)
+        if i >= len(prices):
+            cost, qty = cum_krw[-1], cum_qty[-1]   # 호가 부족 → 전량 소진분만 (기존과 동일)
+        else:
+            pk = cum_krw[i - 1] if i else 0.0
+            pq = cum_qty[i - 1] if i else 0.0
+            cost, qty = krw_amount, pq + (krw_amount - pk) / prices[i]
+        if qty <= 0:
+            return None
+        return round(self._slip_of(cost / qty, side), 4)
+
+    def size_at_slip(self, max_slip_pct, side="buy"):
+        """슬리피지 max_slip_pct 이내로 체결 가능한 최대 KRW (int)"""
+        if self.mid <= 0:
+            return 0
+        prices, cum_krw, cum_qty, full_slip = self._lv.get(side, ((), (), (), ()))
+        if not prices:
+            return 0
+        lim = max_slip_pct + 0.00005  # slip()의 소수 4자리 반올림과 같은 경계 (round(s, 4) <= max)
+        j = bisect.bisect_right(full_slip, lim)
+        if j >= len(prices):
+            return int(cum_krw[-1])
+        # j 레벨 안에서 r원 추가 소진: (K + r) / (Q + r/p) = V  →  r = (V·Q − K) / (1 − V/p)
+        mid = self.mid
+        v = mid * (1 + lim / 100) if side == "buy" else mid * (1 - lim / 100)
+        pk = cum_krw[j - 1] if j else 0.0
+        pq = cum_qty[j - 1] if j else 0.0
+        p = prices[j]
+        denom = 1 - v / p
+        r = (v * pq - pk) / denom if denom else cum_krw[j] - pk
+        level_krw = cum_krw[j] - pk
+        return int(pk + min(max(r, 0.0), level_krw))
+
+    def depth_within_bps(self, bps, side="buy"):
+        """mid 대비 bps 이내 가격대 호가 총액 (buy=매도호가, sell=매수호가)"""
+        if self.mid <= 0:
+            return 0.0
+        prices, cum_krw, _, _ = self._lv.get(side, ((), (), (), ()))
+        if not prices:
+            return 0.0
+        if side == "buy":
+            i = bisect.bisect_right(prices, self.mid * (1 + bps / 10000))
+        else:
+            lim = self.mid * (1 - bps / 10000)
+            i = len(prices) - bisect.bisect_left(prices[::-1], lim)
+        return cum_krw[i - 1] if i else 0.0
+
+    def top_krw(self, n, side="buy"):
+        """상위 n호가 총액 (buy=매도호가, sell=매수호가)"""
+        top = self._top.get(side)
+        if not top:
+            return 0.0
+        return top[min(max(int(n), 0), len(top) - 1)]
+
+
+def _ob_analytics(ob):
+    """오더북 캐시 엔트리(dict, raw 포함) 또는 units 리스트 → OrderbookAnalytics.
+    캐시 엔트리는 최초 1회 구축 후 엔트리에 메모 (스캔/진입/shadow가 같은 스냅샷 공유)."""
+    if isinstance(ob, dict):
+        ana = ob.get("_ana")
+        if ana is None:
+            raw = ob.get("raw")
+            ana = OrderbookAnalytics(raw.get("orderbook_units", []) if isinstance(raw, dict) else [])
+            ob["_ana"] = ana
+        return ana
+    return OrderbookAnalytics(ob or [])
+
+
 # ===== 오더북 VWAP 슬리피지 계산 =====
 def _calc_vwap_slip(ob_units, krw_amount, side="buy"):
     """시장가 주문 시 예상 VWAP 슬리피지 계산.
-    Returns slip_pct (mid 대비 %, 양수=불리) or None."""
+    Returns slip_pct (mid 대비 %, 양수=불리) or None.
+    (같은 스냅샷 반복 조회는 _ob_analytics(...).slip 사용)"""
     if not ob_units or krw_amount <= 0:
         return None
-    b1 = ob_units[0].get("bid_price", 0)
-    a1 = ob_units[0].get("ask_price", 0)
-    if b1 <= 0 or a1 <= 0:
-        return None
-    mid = (b1 + a1) / 2
-    remaining = krw_amount
-    total_qty = 0.0
-    total_cost = 0.0
-    for u in ob_units:
-        price = u.get("ask_price" if side == "buy" else "bid_price", 0)
-        size = u.get("ask_size" if side == "buy" else "bid_size", 0)
-        if price <= 0 or size <= 0:
-            continue
-        level_krw = price * size
-        consume = min(remaining, level_krw)
-        total_cost += consume
-        total_qty += consume / price
-        remaining -= consume
-        if remaining <= 0:
-            break
-    if total_qty <= 0:
-        return None
-    vwap = total_cost / total_qty
-    slip = (vwap - mid) / mid * 100 if side == "buy" else (mid - vwap) / mid * 100
-    return round(slip, 4)
+    return _ob_analytics(ob_units).slip(krw_amount, side)
 
 
 def _calc_liq_cap(ob_units, max_slip_pct=0.15):
     """호가창에서 max_slip_pct 이내로 체결 가능한 최대 KRW 금액.
-    이진탐색으로 slip 한도 내 최대 주문금액 산출."""
+    🔧 누적 배열 닫힌 해 (기존 30회 이진탐색 + 1만원 허용오차 제거)"""
     if not ob_units:
         return 0
-    total_ask_krw = sum(u.get("ask_price", 0) * u.get("ask_size", 0) for u in ob_units)
-    if total_ask_krw <= 0:
-        return 0
-    lo, hi = 0, int(total_ask_krw)
-    for _ in range(30):
-        mid_amt = (lo + hi) // 2
-        if mid_amt <= 0:
-            break
-        slip = _calc_vwap_slip(ob_units, mid_amt, "buy")
-        if slip is None:
-            hi = mid_amt
-            continue
-        if slip <= max_slip_pct:
-            lo = mid_amt
-        else:
-            hi = mid_amt
-        if hi - lo <= 10000:
-            break
-    return lo
+    return _ob_analytics(ob_units).size_at_slip(max_slip_pct, "buy")
 
 
 # ===== 오더북 캐시 =====
+def _orderbook_cache_entry(ob):
+    """REST/스트림 오더북(raw) → 스캔용 요약 dict
+    (누적 배열은 여기서 1회 구축 → precheck/사이징/shadow 피처가 _ob_analytics로 공유)"""
+    units = ob["orderbook_units"]
+    ask, bid = units[0]["ask_price"], units[0]["bid_price"]
+    spread = (ask - bid) / max((ask + bid) / 2, 1) * 100
+    ana = OrderbookAnalytics(units)
+    # 🔧 FIX: best_ask_krw 포함 (detect_leader_stock→stage1_gate에서 참조)
+    best_ask_krw = ana.top_krw(1, "buy")
+    return {
+        "spread": spread,
+        "depth_krw": ana.top_krw(3, "buy") + ana.top_krw(3, "sell"),
+        "best_ask_krw": best_ask_krw,
+        "raw": ob,
+        "_ana": ana,
+    }
+
+
 def fetch_orderbook_cache(mkts):
     cache = {}
-    for i in range(0, len(mkts), 15):
+    # 📡 스트림 보유 오더북 우선 — 없는 마켓만 REST 배치 조회
+    rest_mkts = []
+    for m in mkts:
+        sob = _md_stream_orderbook(m)
+        if not sob and _md_hub_live() is not None:
+            with _MD_HUB_LOCK:
+                sob = _MD_HUB.orderbook(m)
+            if sob:
+                _pipeline_inc("md_hub_hit")
+        if sob:
+            try:
+                cache[m] = _orderbook_cache_entry(sob)
+                continue
+            except Exception:
+                pass
+        rest_mkts.append(m)
+    if len(rest_mkts) < len(mkts):
+        _pipeline_inc("ob_stream_hit", len(mkts) - len(rest_mkts))
+    for i in range(0, len(rest_mkts), 15):
         js = safe_upbit_get("https://api.upbit.com/v1/orderbook",
-            {"markets": ",".join(mkts[i:i + 15])},
+            {"markets": ",".join(rest_mkts[i:i + 15])},
             timeout=6)
         if not js: continue
         for ob in js:
             try:
-                units = ob["orderbook_units"][:3]
-                ask, bid = units[0]["ask_price"], units[0]["bid_price"]
-                spread = (ask - bid) / max((ask + bid) / 2, 1) * 100
-                askv = sum(u["ask_price"] * u["ask_size"] for u in units)
-                bidv = sum(u["bid_price"] * u["bid_size"] for u in units)
-                # 🔧 FIX: best_ask_krw 포함 (detect_leader_stock→stage1_gate에서 참조)
-                best_ask_krw = units[0]["ask_price"] * units[0]["ask_size"]
-                cache[ob["market"]] = {
-                    "spread": spread,
-                    "depth_krw": askv + bidv,
-                    "best_ask_krw": best_ask_krw,
-                    "raw": ob
-                }
+                cache[ob["market"]] = _orderbook_cache_entry(ob)
             except Exception as _ob_err:
                 # 🔧 FIX H4: 오더북 파싱 실패 로깅 (silent 무시 → 누락 데이터 가시성 확보)
                 _ob_market = ob.get("market", "?") if isinstance(ob, dict) else "?"
@@ -21773,6 +26292,297 @@ def fetch_orderbook_cache(mkts):
     return cache
 
 
+# =========================
+# 🧵 마켓별 탐지 파이프라인 (precheck → data → eval → postcheck)
+# =========================
+# 기존: for m in shard 순차 → 느린 마켓 1개([SLOW_FETCH] 10초 경로)가 사이클 전체를 지연.
+# 변경: 마켓마다 워커 1개가 단계를 흘러가고, 단계별 동시성은 _StageGate(세마포어)로 상한.
+#   - precheck: detect_leader_stock 사전차단 (워커 풀 DETECT_PIPE_WORKERS)
+#   - data:     c1/c5/c15/c60 fetch (DETECT_PIPE_DATA_CONC — 레이트리밋 고려) + 사이클 요청 예산
+#   - eval:     v4_evaluate_entry (DETECT_PIPE_EVAL_CONC — CPU/GIL)
+#   - postcheck: postcheck_6s (DETECT_PIPE_POST_CONC — 6초 대기가 다른 마켓 탐지를 막지 않음)
+#     ⏳ POSTCHECK_QUEUE_ENABLED 시 워커도 점유 안 함 — 확인 엔진에 등록만 하고 다음 마켓으로
+# 직렬 구간은 메인 스레드의 진입 게이트 → 파일락 → OPEN_POSITIONS 커밋 → 매수뿐 (완료 순서대로 소비).
+class _StageGate:
+    """파이프라인 단계 동시성 상한 + 대기열 깊이 계측 (with 문)"""
+
+    def __init__(self, name, limit):
+        self.name = name
+        self._sem = threading.BoundedSemaphore(max(1, int(limit)))
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.peak = 0
+        self._prof = threading.local()  # 🔥 프로파일러: 스레드별 (진입 요청 시각, 슬롯 획득 시각)
+
+    def enqueue(self):
+        with self._lock:
+            self.waiting += 1
+            if self.waiting > self.peak:
+                self.peak = self.waiting
+
+    def dequeue(self):
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+
+    def __enter__(self):
+        _t0 = time.time()
+        if not self._sem.acquire(blocking=False):
+            # 슬롯 없음 → 대기열 진입 (깊이 계측은 실제로 기다린 경우만)
+            self.enqueue()
+            self._sem.acquire()
+            self.dequeue()
+        if _PROFILER.active:
+            self._prof.t = (_t0, time.time())
+        return self
+
+    def __exit__(self, *exc):
+        self._sem.release()
+        _pt = getattr(self._prof, "t", None)
+        if _pt is not None:
+            self._prof.t = None
+            _t0, _t_acq = _pt
+            _wait = _t_acq - _t0
+            if _wait >= 0.001:
+                _PROFILER.add(f"queue:{self.name}", "queue", _t0, _wait)
+            _PROFILER.add(self.name, "stage", _t0, time.time() - _t0, {"wait_ms": round(_wait * 1000, 1)})
+        return False
+
+    def take_peak(self):
+        """사이클 최대 대기 수 반환 후 현재 대기 수로 리셋"""
+        with self._lock:
+            peak, self.peak = self.peak, self.waiting
+        return peak
+
+
+_DETECT_STAGES = {
+    "precheck": _StageGate("precheck", DETECT_PIPE_WORKERS),
+    "data": _StageGate("data", DETECT_PIPE_DATA_CONC),
+    "eval": _StageGate("eval", DETECT_PIPE_EVAL_CONC),
+    "postcheck": _StageGate("postcheck", DETECT_PIPE_POST_CONC),
+}
+_DETECT_POOL = None  # 첫 사용 시 생성 (재사용)
+
+
+def _post_state_restore(state):
+    """워커 스레드의 POST 상태(entered, terminal)를 현재 스레드로 복원 (outer except 판정용)"""
+    _POST_STATE.entered, _POST_STATE.terminal = state
+
+
+def _symbol_scan_exception(m, e, lock_held):
+    """심볼별 예외 처리: POST 상태 분류 + 락/펜딩 정리 (메인 커밋 루프·파이프라인 워커 공용)"""
+    print(f"[SYMBOL_ERR][{m}] {e}")
+    traceback.print_exc()
+    # advisor 지적 (HIGH): outer except 이 pre-enter/post-terminal 예외까지
+    # error++ 하면 enter < blocked+pass+error MISMATCH 발생.
+    # thread-local _POST_STATE (entered, terminal) 로 3-way 분기:
+    #   ① entered=False  → pre-enter 예외 (enter 미증가 상태)
+    #   ② entered=True, terminal=None → 정상 mid-POST 예외 → error++ 정확
+    #   ③ terminal 이미 설정 → post-terminal downstream 예외 → 이중계상 방지
+    try:
+        _entered, _terminal = _post_state_current()
+        if not _entered:
+            # 케이스 ①: enter 이전 예외 (v4 signal fetch 등)
+            _post_signal_track_unclassified(
+                "pre_enter_exception",
+                market=m, stage=f"pre_enter:{type(e).__name__}",
+            )
+        elif _terminal is None:
+            # 케이스 ②: enter++ 후 terminal 이전 예외 — 정확한 error 상태
+            _pipeline_inc("post_signal_error")
+            _post_signal_track_unclassified(
+                "classification_exception",
+                market=m, stage=f"symbol_scan:{type(e).__name__}",
+            )
+        else:
+            # 케이스 ③: {blocked,pass,error} 확정 이후 downstream 예외
+            # 이중계상 방지 (예: pass 후 open_auto_position/postcheck_6s 예외)
+            _post_signal_track_unclassified(
+                "post_terminal_exception",
+                market=m,
+                stage=f"{_terminal}_downstream:{type(e).__name__}",
+            )
+    except Exception:
+        pass
+    # 🔧 FIX: 락 획득한 경우에만 해제 (미획득 시 모니터 스레드 락 삭제 방지)
+    if lock_held:
+        _release_entry_lock(m)
+    with _POSITION_LOCK:
+        if OPEN_POSITIONS.get(m, {}).get("state") == "pending":
+            OPEN_POSITIONS.pop(m, None)
+
+
+def _pipe_cancelled(cancel):
+    """사이클 토큰 확인 — 파이프라인이 타임아웃/조기 종료된 뒤 남은 워커는 게시(마킹/확인 등록/후보) 없이 종료"""
+    if cancel is not None and cancel.is_set():
+        _pipeline_inc("pipe_cancelled")
+        return True
+    return False
+
+
+def _detect_pipe_market(m, obc, tight_mode, cancel=None):
+    """마켓 1개를 precheck → data → eval → postcheck 로 처리.
+    반환: postcheck 통과 후보 (m, pre, c1, post_state) / 그 외 None
+    ⏳ 확인 큐 활성 시 postcheck 는 등록만 하고 None (통과분은 _postcheck_collect 로 수거)
+    cancel: 사이클 토큰 (threading.Event) — set 이면 precheck 이후 단계 경계에서 중단
+      (POST_SIGNAL 분류는 detect_leader_stock 안에서 끝나므로 enter = blocked + pass + error 유지)"""
+    try:
+        # POST_SIGNAL 상태 리셋 (advisor 지적: outer except 오계상 방지)
+        # _pipeline_inc 가 자동으로 entered/terminal 마킹, outer except 에서 판정
+        _post_state_reset()
+        # v18g lazy c1: detect_leader 내부에서 사전차단 통과 시에만 c1 fetch
+        _pipeline_inc("detect_called")
+        _pipeline_record_market_scan(m)
+        _t_dl = time.time()
+        with _PROFILER.span("detect_leader_stock", "fn"):
+            pre = detect_leader_stock(m, obc, c1=None, tight_mode=tight_mode)
+        _add_cycle_detect_leader_ms((time.time() - _t_dl) * 1000)
+        if not pre or _pipe_cancelled(cancel):
+            return None
+
+        # 후보 심볼 — downstream에서 c1 필요. 위 detect_leader에서 캐시됐으므로
+        # 여기 호출은 캐시 hit (TTL 15s 이내).
+        c1 = _get_c1_cached(m, 30)
+        if not c1:
+            return None
+
+        # ⭕ 동그라미 워치리스트 등록 (점화 감지 시)
+        # 즉시 진입과 별개로, 눌림→리클레임→재돌파 패턴 감시 시작
+        if CIRCLE_ENTRY_ENABLED and pre.get("ign_ok"):
+            try:
+                circle_register(m, pre, c1)
+            except Exception as _cr_err:
+                print(f"[CIRCLE_REG_ERR] {m}: {_cr_err}")
+
+        # === 🔧 WF데이터: 진입 모드는 strategy_v4에서 결정 ===
+        # A그룹(거래량3배) → confirm, B그룹(눌림반전/EMA정배열) → confirm (GATE 필수)
+        _v4_group = pre.get("v4_logic_group", "A")
+        _v4_filters = pre.get("v4_filters_hit", [])
+
+        # v4 진입모드 그대로 유지 (detect_leader_stock에서 이미 설정)
+        print(f"[V4_ENTRY] {m} {pre.get('signal_tag', '?')} 그룹={_v4_group} "
+              f"모드={pre.get('entry_mode', 'confirm')} 필터={_v4_filters}")
+
+        # 🔧 FIX: postcheck 전 중복 체크 + 즉시 마킹 (6초 동안 다른 스캔 차단)
+        with _POSITION_LOCK:
+            if _pipe_cancelled(cancel):
+                return None
+            if m in OPEN_POSITIONS:
+                _pipeline_inc("position_block")
+                return None
+            # 🔧 FIX: recent_alerts도 락 안에서 체크 (10초 이내만 차단 - postcheck 동안만)
+            if m in recent_alerts and time.time() - recent_alerts[m] < 10:
+                _pipeline_inc("position_block")
+                return None
+            # ⏳ 확인 큐에 같은 마켓이 아직 있으면 차단 (recent_alerts 10초 만료 후 중복 등록 방지)
+            if _postcheck_pending(m):
+                _pipeline_inc("position_block")
+                return None
+            # 🔧 FIX: postcheck 전에 미리 마킹 (다른 스캔 차단)
+            recent_alerts[m] = time.time()
+
+        # === 6초 포스트체크 ===
+        if _POSTCHECK_ENGINE is not None:
+            _postcheck_submit(m, pre, c1)
+            return None
+        with _DETECT_STAGES["postcheck"]:
+            ok_post, post_reason = postcheck_6s(m, pre)
+        if not ok_post:
+            _postcheck_fail(m, pre, post_reason)
+            return None
+        if _pipe_cancelled(cancel):
+            return None
+        return (m, pre, c1, _post_state_current())
+    except Exception as e:
+        _symbol_scan_exception(m, e, lock_held=False)
+        return None
+
+
+def _detect_pipeline_run(shard, obc, tight_mode):
+    """shard 전체를 파이프라인에 투입하고 postcheck 통과 후보를 완료 순서대로 yield.
+    DETECT_PIPE_ENABLED=0 이면 기존과 같은 순차 처리.
+    ⏳ 확인 큐 통과 후보는 탐지 결과 사이사이 수거, shard 종료 후 남은 확인은 완료까지 대기 (상한 있음)."""
+    global _DETECT_POOL
+    _pipe_spent = _req_budget_reset(max(1, int(_RATE_LIMITER.rate("candles") * DETECT_PIPE_BUDGET_SEC)))
+    if _pipe_spent:
+        _pipeline_inc("pipe_budget_spent", _pipe_spent)
+    if not DETECT_PIPE_ENABLED or len(shard) <= 1:
+        for m in shard:
+            _REQ_BUDGET_LOCAL.on = True
+            try:
+                with _PROFILER.span(m, "market"):
+                    item = _detect_pipe_market(m, obc, tight_mode)
+            finally:
+                _REQ_BUDGET_LOCAL.on = False
+            if item:
+                yield item
+            yield from _postcheck_collect()
+        yield from _postcheck_wait(time.time() + DETECT_PIPE_TIMEOUT_SEC)
+        return
+
+    if _DETECT_POOL is None:
+        _DETECT_POOL = ThreadPoolExecutor(max_workers=DETECT_PIPE_WORKERS, thread_name_prefix="detect")
+    out = queue.Queue()
+    pre_gate = _DETECT_STAGES["precheck"]
+    cancel = threading.Event()  # 사이클 토큰 — 타임아웃/소비 측 조기 종료 시 set → 남은 워커 게시 없이 종료
+
+    def _job(m, t_submit):
+        pre_gate.dequeue()
+        if _pipe_cancelled(cancel):
+            return  # 아직 시작 못 한 마켓 — 스캔 자체를 건너뜀 (결과 큐는 이미 아무도 안 읽음)
+        if _PROFILER.active:
+            _PROFILER.add("queue:precheck", "queue", t_submit, time.time() - t_submit, {"market": m})
+        _REQ_BUDGET_LOCAL.on = True
+        item = None
+        try:
+            with _PROFILER.span(m, "market"):
+                item = _detect_pipe_market(m, obc, tight_mode, cancel)
+        finally:
+            _REQ_BUDGET_LOCAL.on = False
+            out.put(item)  # 마켓당 정확히 1건 (실패/미탐지 = None)
+
+    for m in shard:
+        pre_gate.enqueue()
+        _DETECT_POOL.submit(_job, m, time.time())
+    _deadline = time.time() + DETECT_PIPE_TIMEOUT_SEC
+    _left = len(shard)
+    try:
+        while _left > 0:
+            # ⏳ 확인 큐 통과 후보를 탐지 결과 대기 중에도 바로 커밋 (100ms 폴링)
+            yield from _postcheck_collect()
+            if time.time() >= _deadline:
+                # 남은 워커는 finally 의 토큰으로 중단 (진행 중 단계만 마치고 마킹/확인 등록/후보 게시 없음)
+                _pipeline_inc("pipe_timeout")
+                print(f"[PIPE_TIMEOUT] detect 파이프라인 {DETECT_PIPE_TIMEOUT_SEC}s 초과 → 잔여 마켓 {_left}개 취소")
+                return
+            try:
+                item = out.get(timeout=0.1 if _POSTCHECK_ENGINE is not None else max(0.1, _deadline - time.time()))
+            except queue.Empty:
+                continue
+            _left -= 1
+            if item:
+                yield item
+    finally:
+        cancel.set()  # 정상 종료 시엔 남은 워커 없음 / 소비 측 close() (GeneratorExit) 도 여기서 취소
+    yield from _postcheck_wait(_deadline)
+
+
+def _postcheck_wait(deadline):
+    """shard 탐지 종료 후 확인 중인 후보를 완료 순서대로 yield (확인 창 + 여유 2초 또는 deadline 까지).
+    시간 내 못 끝난 후보는 엔진에서 계속 확인되고 다음 사이클 수거."""
+    if _POSTCHECK_ENGINE is None:
+        return
+    _until = min(deadline, time.time() + POSTCHECK_WINDOW_SEC + 2.0)
+    while _postcheck_pending() and time.time() < _until:
+        yield from _postcheck_collect(timeout=0.1)
+    yield from _postcheck_collect()
+
+
+def _detect_pipeline_flush():
+    """사이클 종료 시 단계별 최대 대기열 깊이 기록"""
+    for name, gate in _DETECT_STAGES.items():
+        _pipeline_record_stage(f"pipe_q_{name}", gate.take_peak())
+
+
 # =========================
 # 메인
 # =========================
@@ -21782,7 +26592,11 @@ _cursor_lock = threading.Lock()  # 🔧 FIX: _cursor 레이스 컨디션 방지
 
 
 def main():
-    global _cursor, _shadow_scan_idx
+    global _cursor, _shadow_scan_idx, _BOT_STARTED, _batch_report_count
+
+    # 🗄️ 거래 피처 저장소 (SQLite) 열기 → 배치 리포트 카운터 복원
+    _trade_store_init()
+    _batch_report_count = _restore_batch_count()
 
     # 🧠 시작 시 학습된 가중치 & 매도 파라미터 로드
     if AUTO_LEARN_ENABLED:
@@ -21795,6 +26609,7 @@ def main():
     # 📡 섀도우 가상매매 누적 통계 로드
     _load_shadow_stats()
     _load_report_state()
+    _BOT_STARTED = True  # 이후 종료 시 상태 저장 (저널/스냅샷 파일은 이 시점 이후에만 생성)
     _sve2_warmup_from_trade_records()
     _s2_lens = {k: len(rp) for k, rp in _SVE2_ROLLING.items()}
     print(f"[SVE2] warmup 완료: {_s2_lens}")
@@ -21806,12 +26621,18 @@ def main():
 
     # PR1: LIVE 라우트 실효 설정 로그 (문서-런타임 정합 증명, 프로세스당 1회)
     _log_live_effective_config_once()
+    # 🧭 전략 레지스트리 → 평가 그래프 컴파일 (detector 공유 + predicate 테이블)
+    reload_strategy_plan()
 
     # 🔧 시작 시 유령 포지션 즉시 동기화
     global _LAST_ORPHAN_SYNC
     _LAST_ORPHAN_SYNC = 0  # 강제 리셋
     sync_orphan_positions()
 
+    # 📬 private 주문/잔고 스트림 (주문 체결 Future + myAsset 잔고 캐시, 끊김 시 REST 폴백)
+    if _order_engine() is not None:
+        _ORDER_ENGINE.start()
+
     # 🔧 FIX: ThreadPoolExecutor를 루프 밖에서 1회 생성 (매 루프 생성/소멸 오버헤드 제거)
     _candle_executor = ThreadPoolExecutor(max_workers=PARALLEL_WORKERS)
 
@@ -21871,7 +26692,8 @@ def main():
                     pos_count = len([p for p in OPEN_POSITIONS.values() if p.get("state") == "open"])
                 tg_send(
                     f"💓 봇 생존 확인 | {now_kst_str()}\n"
-                    f"📊 보유 {pos_count}개 | 큐 {len(_tg_fail_queue)}건"
+                    f"📊 보유 {pos_count}개 | 큐 {len(_tg_fail_queue)}건",
+                    priority=TG_PRIO_REPORT
                 )
 
             # BTC_guard 제거 — 항상 기본 모드로 실행
@@ -21940,7 +26762,7 @@ def main():
                             tg_send(f"🎯 <b>리테스트 진입</b> {wm} ⚡HALF\n"
                                     f"• 첫 급등 후 되돌림 → 재돌파 확인\n"
                                     f"• 현재가: {retest_pre['price']:,.0f}원\n"
-                                    f"• 모드: half (리스크 제한)")
+                                    f"• 모드: half (리스크 제한)", priority=TG_PRIO_TRADE)
                             try:
                                 open_auto_position(wm, retest_pre, dyn_stop, eff_sl_pct)
                             except Exception as e2:
@@ -22121,7 +26943,8 @@ def main():
                                 f"🧯 손절: {fmt6(dyn_stop_c)} (SL {eff_sl_pct_c*100:.2f}%)\n"
                                 f"📊 경로: 점화→{_c_candles}봉눌림→리클레임→재돌파\n"
                                 f"💰 모드: {CIRCLE_ENTRY_MODE} (리스크 제한)\n"
-                                f"{link_for(cm)}"
+                                f"{link_for(cm)}",
+                                priority=TG_PRIO_TRADE
                             )
                         else:
                             # ⚠️ 진입 실패 (예외 없이 return) → 워치리스트 유지, 쿨다운 적용
@@ -22287,7 +27110,8 @@ def main():
                                     f"• 신호가: {fmt6(_box_signal_price)}원 → 체결가: {fmt6(actual_entry_b)}원 ({_box_slip_pct:+.2f}%)\n"
                                     f"• 주문: {_box_krw_used:,.0f}원 | 수량: {actual_vol_b:.6f}\n"
                                     f"• 손절: {_box_sl_display}원 (SL {box_sl_pct*100:.2f}%) | 목표: {fmt6(_box_info['box_tp'])}원\n"
-                                    f"{link_for(bm)}"
+                                    f"{link_for(bm)}",
+                                    priority=TG_PRIO_TRADE
                                 )
 
                                 # 박스 전용 모니터 스레드
@@ -22365,13 +27189,18 @@ def main():
             _C5_CACHE.purge_older_than(max_age_sec=2.5)
             _C60_CACHE.purge_older_than(max_age_sec=300)  # v18f: TTL과 동일
             _C15_CACHE.purge_older_than(max_age_sec=90)   # v18h-tune2: 60s→90s
-            _C1_CACHE.purge_older_than(max_age_sec=15)    # v18g-tune: TTL과 동일 (4s→15s)
+            # 🔧 FIX: TTL(45s)과 동일하게 — 15s면 ⏰ 프리페치 항목이 사용 전 삭제됨
+            _C1_CACHE.purge_older_than(max_age_sec=_C1_CACHE_TTL_MS / 1000)
             _C5_DETECT_CACHE.purge_older_than(max_age_sec=60)  # v18h-tune2: 45s→60s
 
             mkts_all = get_top_krw_by_24h(TOP_N)
             if not mkts_all:
                 aligned_sleep(SCAN_INTERVAL)
                 continue
+            # 📡 실시간 시세 스트림 시작/구독 갱신 (유니버스 변경 시에만 재구독)
+            _md_stream_ensure(mkts_all)
+            # ⏰ 봉 경계 정렬 캔들 프리페치 대상 갱신
+            _prefetch_ensure(mkts_all)
 
             # 🔧 잔고 부족 시 스캔 스킵 (주문금액 부족 로그 폭주 방지)
             # 리스크계산+최소주문+임팩트캡 등으로 실제 필요 금액은 6000원보다 훨씬 높음
@@ -22400,6 +27229,7 @@ def main():
 
             _scan_cycle_start = time.time()
             _t_fetch = _scan_cycle_start  # scan_fetch 단계 시작 (네트워크 I/O)
+            _PROFILER.begin_cycle()  # 🔥 사이클 span 기록 시작 (느린 사이클만 덤프)
             _shadow_scan_idx += 1
 
             obc = fetch_orderbook_cache(shard)
@@ -22413,6 +27243,7 @@ def main():
 
             # scan_fetch 단계 종료 (orderbook fetch만 포함)
             _pipeline_record_stage("scan_fetch", (time.time() - _t_fetch) * 1000)
+            _PROFILER.add("scan_fetch", "cycle", _t_fetch, time.time() - _t_fetch, {"markets": len(shard)})
             _t_detect = time.time()  # scan_detect 단계 시작 (CPU 판정 루프)
 
             # 🔧 FIX: BTC 캔들 캐시 (shard 루프 밖에서 1회만 조회 → API 절약)
@@ -22420,67 +27251,13 @@ def main():
             _btc_c5_cache = None
 
             found = 0
-            for m in shard:
+            # 🧵 탐지는 파이프라인 워커에서 병렬, 여기서는 postcheck 통과 후보만 완료 순서대로 커밋 (직렬 구간)
+            # 🔎 벡터 스크리너: 어떤 route 도 발화 불가능한 마켓은 detect_leader 제외
+            _det_shard = screen_shard(shard)
+            for m, pre, c1, _pst in _detect_pipeline_run(_det_shard, obc, tight_mode):
               _lock_held = False  # 🔧 FIX: 락 획득 여부 추적 (미획득 상태에서 해제 방지)
               try:  # 🔧 심볼별 예외 격리 (한 심볼 에러가 전체 스캔 중단 방지)
-                # POST_SIGNAL 상태 리셋 (advisor 지적: outer except 오계상 방지)
-                # _pipeline_inc 가 자동으로 entered/terminal 마킹, outer except 에서 판정
-                _post_state_reset()
-                # v18g lazy c1: detect_leader 내부에서 사전차단 통과 시에만 c1 fetch
-                _pipeline_inc("detect_called")
-                _pipeline_record_market_scan(m)
-                _t_dl = time.time()
-                pre = detect_leader_stock(m, obc, c1=None, tight_mode=tight_mode)
-                _add_cycle_detect_leader_ms((time.time() - _t_dl) * 1000)
-                if not pre:
-                    continue
-
-                # 후보 심볼 — downstream에서 c1 필요. 위 detect_leader에서 캐시됐으므로
-                # 여기 호출은 캐시 hit (TTL 15s 이내).
-                c1 = _get_c1_cached(m, 30)
-                if not c1:
-                    continue
-
-                # ⭕ 동그라미 워치리스트 등록 (점화 감지 시)
-                # 즉시 진입과 별개로, 눌림→리클레임→재돌파 패턴 감시 시작
-                if CIRCLE_ENTRY_ENABLED and pre.get("ign_ok"):
-                    try:
-                        circle_register(m, pre, c1)
-                    except Exception as _cr_err:
-                        print(f"[CIRCLE_REG_ERR] {m}: {_cr_err}")
-
-                # === 🔧 WF데이터: 진입 모드는 strategy_v4에서 결정 ===
-                # A그룹(거래량3배) → confirm, B그룹(눌림반전/EMA정배열) → confirm (GATE 필수)
-                _v4_group = pre.get("v4_logic_group", "A")
-                _v4_filters = pre.get("v4_filters_hit", [])
-
-                # v4 진입모드 그대로 유지 (detect_leader_stock에서 이미 설정)
-                print(f"[V4_ENTRY] {m} {pre.get('signal_tag', '?')} 그룹={_v4_group} "
-                      f"모드={pre.get('entry_mode', 'confirm')} 필터={_v4_filters}")
-
-                # 🔧 FIX: postcheck 전 중복 체크 + 즉시 마킹 (6초 동안 다른 스캔 차단)
-                with _POSITION_LOCK:
-                    if m in OPEN_POSITIONS:
-                        _pipeline_inc("position_block")
-                        continue
-                    # 🔧 FIX: recent_alerts도 락 안에서 체크 (10초 이내만 차단 - postcheck 동안만)
-                    if m in recent_alerts and time.time() - recent_alerts[m] < 10:
-                        _pipeline_inc("position_block")
-                        continue
-                    # 🔧 FIX: postcheck 전에 미리 마킹 (다른 스캔 차단)
-                    recent_alerts[m] = time.time()
-
-                # === 6초 포스트체크 ===
-                ok_post, post_reason = postcheck_6s(m, pre)
-                if not ok_post:
-                    cut("POSTCHECK_DROP", f"{m} postcheck fail: {post_reason}")
-                    _pipeline_inc("postcheck_block")
-                    _shadow_log_write(now_kst_str(), m, pre.get("signal_tag", "?"), 1,
-                                      f"postcheck:{post_reason}", 0)
-                    # 🔧 FIX: postcheck 실패 시 recent_alerts 제거 (다음 스캔에서 재시도 가능)
-                    with _POSITION_LOCK:
-                        recent_alerts.pop(m, None)
-                    continue
+                _post_state_restore(_pst)
 
                 # 🔧 postcheck 통과 후 vwap_gap 추격 체크 (추격매수 제거)
                 _post_vwap_gap = pre.get("vwap_gap", 0)
@@ -22955,53 +27732,20 @@ def main():
 
               except Exception as e:
                 # 🔧 심볼별 예외 처리: 락/펜딩 정리 후 다음 심볼 진행
-                print(f"[SYMBOL_ERR][{m}] {e}")
-                traceback.print_exc()
-                # advisor 지적 (HIGH): outer except 이 pre-enter/post-terminal 예외까지
-                # error++ 하면 enter < blocked+pass+error MISMATCH 발생.
-                # thread-local _POST_STATE (entered, terminal) 로 3-way 분기:
-                #   ① entered=False  → pre-enter 예외 (enter 미증가 상태)
-                #   ② entered=True, terminal=None → 정상 mid-POST 예외 → error++ 정확
-                #   ③ terminal 이미 설정 → post-terminal downstream 예외 → 이중계상 방지
-                try:
-                    _entered, _terminal = _post_state_current()
-                    if not _entered:
-                        # 케이스 ①: enter 이전 예외 (v4 signal fetch 등)
-                        _post_signal_track_unclassified(
-                            "pre_enter_exception",
-                            market=m, stage=f"pre_enter:{type(e).__name__}",
-                        )
-                    elif _terminal is None:
-                        # 케이스 ②: enter++ 후 terminal 이전 예외 — 정확한 error 상태
-                        _pipeline_inc("post_signal_error")
-                        _post_signal_track_unclassified(
-                            "classification_exception",
-                            market=m, stage=f"symbol_scan:{type(e).__name__}",
-                        )
-                    else:
-                        # 케이스 ③: {blocked,pass,error} 확정 이후 downstream 예외
-                        # 이중계상 방지 (예: pass 후 open_auto_position/postcheck_6s 예외)
-                        _post_signal_track_unclassified(
-                            "post_terminal_exception",
-                            market=m,
-                            stage=f"{_terminal}_downstream:{type(e).__name__}",
-                        )
-                except Exception:
-                    pass
-                # 🔧 FIX: 락 획득한 경우에만 해제 (미획득 시 모니터 스레드 락 삭제 방지)
-                if _lock_held:
-                    _release_entry_lock(m)
-                with _POSITION_LOCK:
-                    if OPEN_POSITIONS.get(m, {}).get("state") == "pending":
-                        OPEN_POSITIONS.pop(m, None)
+                _symbol_scan_exception(m, e, _lock_held)
 
             cut_summary()
             if found == 0:
                 req_summary()
             # scan_detect 단계 종료 (detect_leader_stock 루프 + 진입 판정 전체)
             _pipeline_record_stage("scan_detect", (time.time() - _t_detect) * 1000)
+            _detect_pipeline_flush()
             # 사이클 내부 누적 측정 flush (detect_leader, universal_ind 각각)
             _flush_cycle_internal_timing()
+            _PROFILER.add("scan_detect", "cycle", _t_detect, time.time() - _t_detect, {"found": found})
+            _prof_path = _PROFILER.end_cycle((time.time() - _scan_cycle_start) * 1000)
+            if _prof_path:
+                print(f"[PROFILER] 느린 사이클 trace 저장: {_prof_path}")
             # 시간대별 동적 스캔 간격 적용
             _main_err_count = 0
             aligned_sleep(get_scan_interval())
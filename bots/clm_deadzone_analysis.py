@@ -21,6 +21,7 @@ CLM 봇이 10.6 시간 동안 0 진입을 기록한 "데드존" 구간 분석.
 from __future__ import annotations
 
 import argparse
+import os
 import sys
 import time
 from collections import defaultdict
@@ -29,6 +30,14 @@ from typing import Dict, List, Optional, Tuple
 
 import requests
 
+# 공용 캔들 저장소 (상위 디렉터리 candle_store.py) — 이미 받은 구간은 재다운로드하지 않음
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from candle_store import CandleStore, candle_start_ms
+    _STORE = CandleStore() if os.getenv("CANDLE_STORE_ENABLED", "1") == "1" else None
+except Exception:
+    _STORE = None
+
 # -------------------------------------------------------------------------
 # clm_detector 재사용 (있으면) — 없으면 인라인 fallback
 # -------------------------------------------------------------------------
@@ -147,7 +156,18 @@ def fetch_candles_paged(market: str, unit: int, total_needed: int) -> List[dict]
     to_iso: Optional[str] = None
     remaining = total_needed
     while remaining > 0:
-        batch = fetch_candles(market, unit, min(remaining, 200), to_iso=to_iso)
+        n = min(remaining, 200)
+        to_ms = candle_start_ms({"candle_date_time_utc": to_iso}) if (_STORE is not None and to_iso) else None
+        stored = _STORE.page(market, unit, n, to_ms) if to_ms else None
+        if stored:
+            batch = stored[::-1]
+        else:
+            batch = fetch_candles(market, unit, n, to_iso=to_iso)
+            if batch and _STORE is not None:
+                try:
+                    _STORE.write(market, unit, batch, to_ms=to_ms, history_start=len(batch) < n)
+                except Exception as e:
+                    print(f"  [warn] candle store write fail {market} u={unit}: {e}", file=sys.stderr)
         if not batch:
             break
         collected = batch + collected
@@ -156,7 +176,8 @@ def fetch_candles_paged(market: str, unit: int, total_needed: int) -> List[dict]
             break
         oldest = batch[0]
         to_iso = oldest["candle_date_time_utc"] + "Z"
-        time.sleep(RATE_SLEEP)
+        if not stored:
+            time.sleep(RATE_SLEEP)
     return collected
 
 
@@ -23,6 +23,9 @@ import os
 import sys
 from statistics import mean
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shadow_sketch import unpack_records  # shadow_stats.json trade_records 열 지향 압축 해제
+
 RESET = "\033[0m"
 BOLD = "\033[1m"
 GREEN = "\033[32m"
@@ -74,7 +77,7 @@ def load_trade_records(path, route="CLM"):
     if key not in data:
         print(f"{RED}[오류] route '{route}' 없음. 사용 가능: {list(data.keys())[:20]}{RESET}")
         sys.exit(1)
-    records = data[key].get("trade_records", [])
+    records = unpack_records(data[key].get("trade_records", []))
     if not records:
         print(f"{RED}[오류] '{key}'에 trade_records 없음{RESET}")
         sys.exit(1)
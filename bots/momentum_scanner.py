@@ -25,6 +25,13 @@ import subprocess
 from datetime import datetime, timezone, timedelta
 from collections import deque, defaultdict
 
+# 시세 허브 클라이언트 (상위 디렉터리 md_hub_client.py) — 없으면 REST만 사용
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from md_hub_client import MdHubReader
+except Exception:
+    MdHubReader = None
+
 KST = timezone(timedelta(hours=9))
 
 def _get_git_info():
@@ -218,6 +225,17 @@ def log(msg):
 # ═══════════════════════════════════════════════
 # 업비트 API
 # ═══════════════════════════════════════════════
+_HUB = None
+
+def _hub():
+    """md_hub.py 공유메모리 리더 (허브 살아 있을 때만). MD_HUB_ENABLED=0 이면 항상 None"""
+    global _HUB
+    if MdHubReader is None or os.getenv("MD_HUB_ENABLED", "1") != "1":
+        return None
+    if _HUB is None:
+        _HUB = MdHubReader(os.getenv("MD_HUB_NAME", "upbit_md_hub"), max_age_sec=2.5)
+    return _HUB if _HUB.alive() else None
+
 def get_all_krw_markets():
     url = "https://api.upbit.com/v1/market/all?is_details=true"
     resp = requests.get(url, timeout=5)
@@ -225,6 +243,12 @@ def get_all_krw_markets():
     return [m["market"] for m in resp.json() if m["market"].startswith("KRW-")]
 
 def get_tickers(markets):
+    # 시세 허브에 전 마켓 신선한 티커가 있으면 REST 생략
+    hub = _hub()
+    if hub is not None:
+        hub_tickers = hub.tickers(markets)
+        if hub_tickers is not None:
+            return hub_tickers
     url = "https://api.upbit.com/v1/ticker"
     results = []
     for i in range(0, len(markets), 100):
@@ -244,10 +268,13 @@ def get_orderbook(market):
     if cached and now - cached["ts"] < OB_CACHE_TTL:
         return cached["data"]
     try:
-        url = "https://api.upbit.com/v1/orderbook"
-        resp = requests.get(url, params={"markets": market}, timeout=3)
-        resp.raise_for_status()
-        data = resp.json()[0]
+        hub = _hub()
+        data = hub.orderbook(market) if hub is not None else None
+        if data is None:
+            url = "https://api.upbit.com/v1/orderbook"
+            resp = requests.get(url, params={"markets": market}, timeout=3)
+            resp.raise_for_status()
+            data = resp.json()[0]
         units = data.get("orderbook_units", [])
         if not units:
             return None
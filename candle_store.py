@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+로컬 캔들 저장소 (마켓·분봉별 append-only 바이너리 + mmap 읽기 + 커버리지 인덱스)
+==================================================================================
+bot.py 재시작마다 _C*_CACHE 가 비어 첫 스캔 사이클이 캔들 엔드포인트를 두드리고,
+collect_1m.py(JSON) / research/data_loader.py(parquet) / bots/clm_deadzone_analysis.py(매번 다운로드)가
+각자 다른 포맷으로 같은 이력을 다시 받던 문제 → 모두 이 저장소를 거쳐 읽고 씀.
+
+- 파일: <CANDLE_STORE_DIR>/<market>/m<unit>.bin — 16B 헤더 + 64B 고정 레코드 (봉 시작ms 오름차순, 중복 없음)
+  마감된 봉만 기록 (진행 중 봉은 항상 REST/스트림). 최신 봉 뒤 append 가 기본 경로,
+  과거 구간 백필처럼 중간 삽입이 필요할 때만 임시 파일로 병합 후 os.replace (읽는 쪽은 inode 변경 감지 → 재매핑)
+- 커버리지: m<unit>.cov — 이미 조회한 [시작, 끝] 봉 구간 목록. 구간 안에 없는 봉 = 체결 없던 분 (업비트는 빈 봉 생략)
+  → 구간 밖만 다시 받으면 됨 (gaps / ensure)
+- 읽기: mmap + 봉 시작ms 이분 탐색, REST /v1/candles/minutes 응답과 같은 키의 dict 반환
+- 쓰기: 프로세스 간 m<unit>.lock (fcntl.flock) 직렬화 — bot / 수집기 / 리서치 도구 동시 실행 가능
+
+사용법:
+  python candle_store.py --stats                      # 마켓·분봉별 봉 수 / 구간
+  python candle_store.py --prune-days 45              # 45일 이전 봉 정리 (커버리지도 잘라냄)
+"""
+
+import os, sys, json, time, mmap, struct, bisect, argparse, threading
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+
+try:
+    import fcntl
+except Exception:
+    fcntl = None
+
+STORE_DIR = os.getenv("CANDLE_STORE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "candle_store")
+MAGIC = b"UCS1"
+VERSION = 1
+_HDR = struct.Struct("<4sII4x")                 # magic, version, unit
+_HDR_SIZE = _HDR.size                            # 16
+_REC = struct.Struct("<qqdddddd")                # 봉 시작ms, 마지막 체결ms, 시/고/저/종, 거래량, 거래대금 (64B)
+_REC_SIZE = _REC.size
+_TS = struct.Struct("<q")
+CLOSE_GRACE_MS = 3000                            # 봉 마감 후 이 시간 지나야 확정 (마감 직전 체결 반영 지연 대비)
+# └ 유예 뒤에도 REST 가 마지막 체결을 늦게 반영할 수 있음 → 최신 페이지 기록 때 이미 저장된 봉도 값이 다르면 덮어씀
+#   (bot.get_minutes_candles 는 마지막 커버리지 봉을 다음 조회에 다시 포함)
+PAGE_MAX = 200                                   # 업비트 캔들 1회 최대 개수
+
+
+def candle_start_ms(c):
+    """REST 캔들 dict → 봉 시작ms (candle_date_time_utc, 실패 시 -1)"""
+    try:
+        s = c.get("candle_date_time_utc", "")
+        return int(datetime.strptime(s[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp() * 1000)
+    except Exception:
+        return -1
+
+
+def iso_utc(ms):
+    """봉 시작ms → 업비트 'to' 파라미터 (UTC ISO8601)"""
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def last_closed_start(unit, now_ms=None):
+    """마감 확정된 마지막 봉 시작ms"""
+    bar = unit * 60000
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return (now_ms - CLOSE_GRACE_MS) // bar * bar - bar
+
+
+_ISO_CACHE = {}  # 봉 시작ms → (utc, kst) 문자열 — 같은 봉 반복 조회 시 포맷 비용 제거
+
+
+def _iso_pair(s):
+    p = _ISO_CACHE.get(s)
+    if p is None:
+        if len(_ISO_CACHE) > 500_000:
+            _ISO_CACHE.clear()
+        sec = s // 1000
+        p = ("%04d-%02d-%02dT%02d:%02d:%02d" % time.gmtime(sec)[:6],
+             "%04d-%02d-%02dT%02d:%02d:%02d" % time.gmtime(sec + 9 * 3600)[:6])
+        _ISO_CACHE[s] = p
+    return p
+
+
+def _to_dict(market, unit, rec):
+    s, last, o, h, l, c, vol, acc = rec
+    utc, kst = _iso_pair(s)
+    return {
+        "market": market,
+        "candle_date_time_utc": utc,
+        "candle_date_time_kst": kst,
+        "opening_price": o,
+        "high_price": h,
+        "low_price": l,
+        "trade_price": c,
+        "timestamp": last,
+        "candle_acc_trade_price": acc,
+        "candle_acc_trade_volume": vol,
+        "unit": unit,
+    }
+
+
+def _pack(s, c):
+    return _REC.pack(s, int(c.get("timestamp") or 0), float(c["opening_price"]), float(c["high_price"]),
+                     float(c["low_price"]), float(c["trade_price"]),
+                     float(c.get("candle_acc_trade_volume") or 0.0), float(c.get("candle_acc_trade_price") or 0.0))
+
+
+def _merge_intervals(iv, bar):
+    iv = sorted(iv)
+    out = []
+    for a, b in iv:
+        if out and a <= out[-1][1] + bar:
+            out[-1][1] = max(out[-1][1], b)
+        else:
+            out.append([a, b])
+    return out
+
+
+class _TsView:
+    """mmap 레코드의 봉 시작ms 시퀀스 (bisect 용)"""
+
+    def __init__(self, mm, n):
+        self.mm, self.n = mm, n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return _TS.unpack_from(self.mm, _HDR_SIZE + i * _REC_SIZE)[0]
+
+
+class _Series:
+    """열린 (market, unit) 파일 1개 — 크기/inode 바뀌면 재매핑"""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = None
+        self.mm = None
+        self.key = None
+        self.n = 0
+
+    def refresh(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.close()
+            return False
+        key = (st.st_ino, st.st_size)
+        if key == self.key and self.mm is not None:
+            return True
+        self.close()
+        if st.st_size < _HDR_SIZE:
+            return False
+        self.f = open(self.path, "rb")
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:4] != MAGIC:
+            self.close()
+            return False
+        self.key = key
+        self.n = (len(self.mm) - _HDR_SIZE) // _REC_SIZE
+        return True
+
+    def close(self):
+        try:
+            if self.mm is not None:
+                self.mm.close()
+            if self.f is not None:
+                self.f.close()
+        except Exception:
+            pass
+        self.f = self.mm = self.key = None
+        self.n = 0
+
+
+class CandleStore:
+    """마켓·분봉별 캔들 저장소 (스레드 안전, 프로세스 간 쓰기 직렬화)"""
+
+    def __init__(self, root=STORE_DIR, max_open=256):
+        self.root = root
+        self.max_open = max_open
+        self._lock = threading.RLock()
+        self._open = OrderedDict()     # (market, unit) → _Series (LRU)
+        self._cov = {}                 # (market, unit) → (mtime_ns, intervals)
+        self.stats = {"reads": 0, "read_bars": 0, "appends": 0, "rewrites": 0, "written_bars": 0, "restated": 0,
+                      "pages": 0}
+
+    # ---- 경로/파일 ----
+    def _paths(self, market, unit):
+        d = os.path.join(self.root, market)
+        return (os.path.join(d, f"m{unit}.bin"), os.path.join(d, f"m{unit}.cov"), os.path.join(d, f"m{unit}.lock"))
+
+    def _series(self, market, unit):
+        k = (market, unit)
+        s = self._open.get(k)
+        if s is None:
+            s = _Series(self._paths(market, unit)[0])
+            self._open[k] = s
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)[1].close()
+        else:
+            self._open.move_to_end(k)
+        return s if s.refresh() else None
+
+    def _flock(self, market, unit):
+        lp = self._paths(market, unit)[2]
+        os.makedirs(os.path.dirname(lp), exist_ok=True)
+        fh = open(lp, "a+")
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        return fh
+
+    # ---- 커버리지 ----
+    def coverage(self, market, unit):
+        """조회 완료 구간 [[시작ms, 끝ms], ...] (봉 시작 기준, 양끝 포함)"""
+        cp = self._paths(market, unit)[1]
+        with self._lock:
+            try:
+                mt = os.stat(cp).st_mtime_ns
+            except FileNotFoundError:
+                self._cov.pop((market, unit), None)
+                return []
+            hit = self._cov.get((market, unit))
+            if hit and hit[0] == mt:
+                return hit[1]
+            try:
+                with open(cp, encoding="utf-8") as f:
+                    iv = [list(x) for x in json.load(f)]
+            except Exception:
+                iv = []
+            self._cov[(market, unit)] = (mt, iv)
+            return iv
+
+    def covering(self, market, unit, ts_ms):
+        """ts_ms 를 포함하는 커버리지 구간 (없으면 None)"""
+        for a, b in self.coverage(market, unit):
+            if a <= ts_ms <= b:
+                return a, b
+        return None
+
+    def gaps(self, market, unit, start_ms, end_ms):
+        """[start_ms, end_ms] 중 아직 조회 안 한 구간 목록 (오래된 순)"""
+        bar = unit * 60000
+        start_ms = start_ms // bar * bar
+        out, cur = [], start_ms
+        for a, b in self.coverage(market, unit):
+            if b < cur:
+                continue
+            if a > end_ms:
+                break
+            if a > cur:
+                out.append((cur, min(a - bar, end_ms)))
+            cur = max(cur, b + bar)
+            if cur > end_ms:
+                break
+        if cur <= end_ms:
+            out.append((cur, end_ms))
+        return out
+
+    def _save_coverage(self, market, unit, iv):
+        cp = self._paths(market, unit)[1]
+        tmp = cp + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(iv, f)
+        os.replace(tmp, cp)
+        self._cov.pop((market, unit), None)
+
+    # ---- 읽기 ----
+    def read(self, market, unit, start_ms=None, end_ms=None, count=None):
+        """저장된 봉 (오래된 → 최신). count 지정 시 범위 안 최신 count개"""
+        with self._lock:
+            s = self._series(market, unit)
+            if s is None or s.n == 0:
+                return []
+            view = _TsView(s.mm, s.n)
+            lo = bisect.bisect_left(view, start_ms) if start_ms is not None else 0
+            hi = bisect.bisect_right(view, end_ms) if end_ms is not None else s.n
+            if count is not None:
+                lo = max(lo, hi - count)
+            out = [_to_dict(market, unit, _REC.unpack_from(s.mm, _HDR_SIZE + i * _REC_SIZE)) for i in range(lo, hi)]
+            self.stats["reads"] += 1
+            self.stats["read_bars"] += len(out)
+            return out
+
+    def page(self, market, unit, count, to_ms):
+        """REST 페이지 대체 — to_ms(exclusive) 직전 count개 봉 (최신순).
+        커버리지로 빠짐없이 채울 수 있을 때만 (상장 시점까지 도달한 경우 count 미만 허용), 아니면 None"""
+        bar = unit * 60000
+        cov = self.covering(market, unit, to_ms - bar)
+        if not cov:
+            return None
+        rows = self.read(market, unit, start_ms=cov[0], end_ms=to_ms - bar, count=count)
+        if len(rows) < count and cov[0] != 0:
+            return None
+        return rows[::-1]
+
+    def last_start(self, market, unit):
+        with self._lock:
+            s = self._series(market, unit)
+            if s is None or s.n == 0:
+                return None
+            return _TS.unpack_from(s.mm, _HDR_SIZE + (s.n - 1) * _REC_SIZE)[0]
+
+    # ---- 쓰기 ----
+    def write(self, market, unit, candles, to_ms=None, now_ms=None, history_start=False):
+        """REST 캔들 페이지 1개 저장 → 새로 기록한 봉 수.
+        to_ms = 요청 'to' (exclusive, None = 최신 페이지). 페이지 안 최고(最古) 봉 ~ to 직전 봉을 커버리지로 병합.
+        최신 페이지는 이미 저장된 봉도 REST 값과 다르면 덮어씀 (마감 직후 기록분 보정, stats["restated"])
+        history_start = 페이지가 요청 개수보다 적게 옴 (상장 시점까지 도달)"""
+        bar = unit * 60000
+        limit = last_closed_start(unit, now_ms)
+        recs = {}
+        oldest = None
+        for c in candles or []:
+            s = candle_start_ms(c)
+            if s < 0:
+                continue
+            oldest = s if oldest is None else min(oldest, s)
+            if s <= limit:
+                recs[s] = c
+        cov_hi = limit if to_ms is None else min(limit, to_ms - bar)
+        cov_lo = 0 if history_start else oldest
+        if not recs and (cov_lo is None or cov_hi < cov_lo):
+            return 0
+        bp, cp, _ = self._paths(market, unit)
+        with self._lock:
+            lk = self._flock(market, unit)
+            try:
+                s = self._series(market, unit)
+                n = s.n if s is not None else 0
+                last = _TS.unpack_from(s.mm, _HDR_SIZE + (n - 1) * _REC_SIZE)[0] if n else None
+                tail = sorted(k for k in recs if last is None or k > last)
+                mid, restate = [], []
+                if n and len(tail) < len(recs):
+                    view = _TsView(s.mm, n)
+                    for k in recs:
+                        if k <= last:
+                            i = bisect.bisect_left(view, k)
+                            if i >= n or view[i] != k:
+                                mid.append(k)
+                            elif to_ms is None:
+                                off = _HDR_SIZE + i * _REC_SIZE
+                                rec = _pack(k, recs[k])
+                                if s.mm[off:off + _REC_SIZE] != rec:
+                                    restate.append((off, k, rec))
+                if mid:
+                    # 중간 삽입 → 전체 병합 후 교체 (과거 구간 백필 시에만)
+                    merged = {view[i]: bytes(s.mm[_HDR_SIZE + i * _REC_SIZE:_HDR_SIZE + (i + 1) * _REC_SIZE])
+                              for i in range(n)}
+                    for _, k, rec in restate:
+                        merged[k] = rec
+                    for k in mid + tail:
+                        merged[k] = _pack(k, recs[k])
+                    tmp = bp + ".tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(_HDR.pack(MAGIC, VERSION, unit))
+                        f.write(b"".join(merged[k] for k in sorted(merged)))
+                    os.replace(tmp, bp)
+                    self.stats["rewrites"] += 1
+                elif restate:
+                    # 고정 크기 레코드 제자리 덮어쓰기 (크기 불변 → 읽는 쪽 매핑 그대로, 다음 조회부터 새 값)
+                    with open(bp, "r+b") as f:
+                        for off, _, rec in restate:
+                            f.seek(off)
+                            f.write(rec)
+                        if tail:
+                            f.seek(0, os.SEEK_END)
+                            f.write(b"".join(_pack(k, recs[k]) for k in tail))
+                            self.stats["appends"] += 1
+                elif tail and s is None:
+                    # 새 파일 (없거나 헤더 손상) → 헤더 포함 통째로 기록
+                    tmp = bp + ".tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(_HDR.pack(MAGIC, VERSION, unit))
+                        f.write(b"".join(_pack(k, recs[k]) for k in tail))
+                    os.replace(tmp, bp)
+                    self.stats["appends"] += 1
+                elif tail:
+                    with open(bp, "ab") as f:
+                        f.write(b"".join(_pack(k, recs[k]) for k in tail))
+                    self.stats["appends"] += 1
+                written = len(mid) + len(tail)
+                self.stats["written_bars"] += written
+                self.stats["restated"] += len(restate)
+                if cov_lo is not None and cov_hi >= cov_lo:
+                    self._cov.pop((market, unit), None)  # 다른 프로세스 갱신분 반영 (mtime 해상도 무시)
+                    iv = self.coverage(market, unit)
+                    merged_iv = _merge_intervals([list(x) for x in iv] + [[cov_lo, cov_hi]], bar)
+                    if merged_iv != iv:
+                        self._save_coverage(market, unit, merged_iv)
+                return written
+            finally:
+                lk.close()
+
+    def ensure(self, market, unit, start_ms, end_ms=None, fetch_page=None, pause=0.12, max_pages=None):
+        """[start_ms, end_ms] 중 빈 구간만 REST 페이지로 채움 → 조회한 페이지 수.
+        fetch_page(market, unit, count, to_iso) → 최신순 리스트 (빈 리스트 = 더 과거 없음, None = 실패 → 중단)"""
+        bar = unit * 60000
+        end = last_closed_start(unit) if end_ms is None else min(end_ms, last_closed_start(unit))
+        pages = 0
+        for g_lo, g_hi in reversed(self.gaps(market, unit, start_ms, end)):
+            top = to_ms = g_hi + bar
+            buf, done = [], False
+            while to_ms > g_lo and not done:
+                if max_pages is not None and pages >= max_pages:
+                    done = True
+                    break
+                page = fetch_page(market, unit, PAGE_MAX, iso_utc(to_ms))
+                pages += 1
+                self.stats["pages"] += 1
+                if page is None:
+                    done = True
+                    break
+                buf.extend(page)
+                hist = len(page) < PAGE_MAX
+                if hist:
+                    break
+                to_ms = min(candle_start_ms(c) for c in page)
+                # 연속 페이지는 모아서 한 번에 기록 (과거 방향 백필마다 파일 재작성 방지), 메모리 상한마다 중간 기록
+                if len(buf) >= 50 * PAGE_MAX:
+                    self.write(market, unit, buf, to_ms=top)
+                    top, buf = to_ms, []
+                time.sleep(pause)
+            else:
+                hist = False
+            if buf or (not done and hist):
+                self.write(market, unit, buf, to_ms=top, history_start=(not done and hist))
+            if done:
+                return pages
+        return pages
+
+    def prune(self, market, unit, before_ms):
+        """before_ms 이전 봉 삭제 (커버리지도 잘라냄) → 삭제한 봉 수"""
+        bp = self._paths(market, unit)[0]
+        with self._lock:
+            lk = self._flock(market, unit)
+            try:
+                s = self._series(market, unit)
+                if s is None or s.n == 0:
+                    return 0
+                i = bisect.bisect_left(_TsView(s.mm, s.n), before_ms)
+                if i == 0:
+                    return 0
+                tmp = bp + ".tmp"
+                with open(tmp, "wb") as f:
+                    f.write(_HDR.pack(MAGIC, VERSION, unit))
+                    f.write(s.mm[_HDR_SIZE + i * _REC_SIZE:])
+                os.replace(tmp, bp)
+                iv = [[max(a, before_ms), b] for a, b in self.coverage(market, unit) if b >= before_ms]
+                self._save_coverage(market, unit, iv)
+                return i
+            finally:
+                lk.close()
+
+    def series(self):
+        """저장된 (market, unit) 목록"""
+        out = []
+        if not os.path.isdir(self.root):
+            return out
+        for m in sorted(os.listdir(self.root)):
+            d = os.path.join(self.root, m)
+            if not os.path.isdir(d):
+                continue
+            for fn in sorted(os.listdir(d)):
+                if fn.startswith("m") and fn.endswith(".bin"):
+                    try:
+                        out.append((m, int(fn[1:-4])))
+                    except ValueError:
+                        pass
+        return out
+
+    def status_str(self):
+        s = self.stats
+        return (f"candle_store(open={len(self._open)} read={s['reads']}/{s['read_bars']}bars "
+                f"written={s['written_bars']} restated={s['restated']} app={s['appends']} rw={s['rewrites']} "
+                f"pages={s['pages']})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="로컬 캔들 저장소 관리")
+    ap.add_argument("--root", default=STORE_DIR)
+    ap.add_argument("--stats", action="store_true", help="마켓·분봉별 봉 수 / 커버리지 구간")
+    ap.add_argument("--prune-days", type=float, default=0, help="N일 이전 봉 삭제")
+    args = ap.parse_args()
+    st = CandleStore(args.root)
+    if args.prune_days > 0:
+        cutoff = int((time.time() - args.prune_days * 86400) * 1000)
+        total = sum(st.prune(m, u, cutoff) for m, u in st.series())
+        print(f"[CANDLE_STORE] {args.prune_days}일 이전 {total}봉 삭제")
+    if args.stats or not args.prune_days:
+        for m, u in st.series():
+            bars = st.read(m, u)
+            cov = st.coverage(m, u)
+            span = f"{bars[0]['candle_date_time_utc']} ~ {bars[-1]['candle_date_time_utc']}" if bars else "-"
+            print(f"{m:<14} m{u:<3} bars={len(bars):>7} cov_segments={len(cov):>3} {span}")
+
+
+if __name__ == "__main__":
+    main()
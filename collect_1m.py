@@ -29,6 +29,13 @@ try:
 except Exception:
     pass
 
+# 💾 공용 캔들 저장소 (candle_store.py) — 이미 받은 구간은 REST 대신 저장소에서, 새로 받은 페이지는 저장소에도 기록
+try:
+    from candle_store import CandleStore, candle_start_ms
+    _STORE = CandleStore() if os.getenv("CANDLE_STORE_ENABLED", "1") == "1" else None
+except Exception:
+    _STORE = None
+
 # =========================================================
 # 기본 설정
 # =========================================================
@@ -286,7 +293,16 @@ def fetch_and_save_1m(market, coin, total_count, max_time=600, progress_prefix="
         if to:
             params["to"] = to
 
-        data = safe_get(f"{BASE}/candles/minutes/1", params=params, retries=6, timeout=12)
+        to_ms = candle_start_ms({"candle_date_time_utc": to}) if (_STORE is not None and to) else None
+        data = _STORE.page(market, 1, count, to_ms) if to_ms else None
+        from_store = bool(data)
+        if not from_store:
+            data = safe_get(f"{BASE}/candles/minutes/1", params=params, retries=6, timeout=12)
+            if data and _STORE is not None:
+                try:
+                    _STORE.write(market, 1, data, to_ms=to_ms, history_start=len(data) < count)
+                except Exception as e:
+                    print(f"{progress_prefix}[저장소 기록 실패] {e}")
 
         if not data:
             fails += 1
@@ -346,7 +362,8 @@ def fetch_and_save_1m(market, coin, total_count, max_time=600, progress_prefix="
         if got < 200:
             break
 
-        time.sleep(0.35)
+        if not from_store:
+            time.sleep(0.35)
 
     # 나머지 버퍼 저장
     if buffer:
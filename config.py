@@ -387,3 +387,212 @@ SHADOW_MAX_VIRTUAL_POS = 30       # 동시 추적 가상포지션 상한
 SHADOW_DEDUP_CD_SEC = 300         # 같은 루트+코인 중복 진입 방지 (5분)
 SHADOW_BLOCKED_STATS_PATH = os.path.join(os.getcwd(), "shadow_blocked_stats.json")
 SHADOW_MAX_BLOCKED_POS = 50       # 차단 건 가상 추적 동시 상한
+
+# ============================================================
+# 24. 실시간 시세 스트림 (WebSocket — REST 폴링 대체)
+# ============================================================
+# 스트림이 살아있으면 get_recent_ticks / fetch_orderbook_cache / get_minutes_candles(_get_c*_cached)가
+# 네트워크 호출 없이 메모리 상태로 응답. 끊김/stale 시 기존 REST 경로로 자동 폴백.
+MD_STREAM_ENABLED = os.getenv("MD_STREAM_ENABLED", "1") == "1"
+MD_STREAM_URL = os.getenv("MD_STREAM_URL", "wss://api.upbit.com/websocket/v1")
+MD_STREAM_TICK_MAXLEN = 500        # 마켓별 보관 체결 수 (REST /trades/ticks 최대 100 대비 여유)
+MD_STREAM_CANDLE_MAXLEN = 200      # (마켓, 분봉)별 링버퍼 캔들 수
+MD_STREAM_CANDLE_UNITS = (1, 5, 15, 60)  # 체결 증분 캔들 링버퍼 분봉 (_get_c1/5/15/60_cached 대상)
+MD_STREAM_STALE_SEC = 5.0          # 마지막 수신 후 이 시간 초과 → stale (REST 폴백)
+MD_STREAM_RECONNECT_SEC = 3        # 재연결 대기
+MD_STREAM_CAPTURE_PATH = os.getenv("MD_STREAM_CAPTURE_PATH", "")  # 수신 메시지 JSONL 덤프 (ws_replay_server.py 재생용)
+
+# ============================================================
+# 25. 증분 지표 상태 (EMA/RSI/MACD/ADX/ATR — 마켓×분봉별 공유)
+# ============================================================
+# 유니버설 지표 수집 / v4_evaluate_entry 라이브 레지스트리 / 섀도우 route가 같은 캔들 윈도우에 대해
+# 지표를 한 번만 계산하고 공유. 새 봉은 prefix 재구성 1회, 진행중 봉 갱신은 O(1) 1스텝.
+IND_STATE_ENABLED = os.getenv("IND_STATE_ENABLED", "1") == "1"
+IND_STATE_MAX = 2000               # (market, unit, 윈도우 길이) 상태 LRU 상한
+
+# ============================================================
+# 26. 마켓별 탐지 파이프라인 (precheck → data → eval → postcheck 병렬)
+# ============================================================
+# 직렬 구간은 진입 락/OPEN_POSITIONS 커밋뿐. 단계별 동시성 상한으로 레이트리밋/GIL 경합 제한.
+DETECT_PIPE_ENABLED = os.getenv("DETECT_PIPE_ENABLED", "1") == "1"
+DETECT_PIPE_WORKERS = 6            # 마켓 동시 처리 워커 수 (precheck 진입)
+DETECT_PIPE_DATA_CONC = 3          # data 단계 동시 fetch 상한 (과거 4-worker 병렬 시 호출당 지연 2.5배)
+DETECT_PIPE_EVAL_CONC = 2          # eval 단계 동시 상한 (CPU 바운드 — GIL)
+DETECT_PIPE_POST_CONC = 3          # postcheck_6s 동시 상한
+DETECT_PIPE_BUDGET_SEC = 8.0       # 사이클 요청 예산 = 토큰버킷 rate × 이 초 (소진 시 data 단계 skip)
+DETECT_PIPE_TIMEOUT_SEC = 120      # 사이클 결과 대기 상한 (초과분 폐기)
+
+# ============================================================
+# 27. 비동기 HTTP 클라이언트 (공개 API — upbit_get/safe_upbit_get)
+# ============================================================
+# Remaining-Req 헤더 기반 그룹별 페이싱 + keep-alive 풀 + 동일 GET 합치기.
+# aiohttp 미설치 시 requests 세션 풀로 동작. 비활성(0) 시 기존 토큰버킷 + requests 경로.
+AHTTP_ENABLED = os.getenv("AHTTP_ENABLED", "1") == "1"
+AHTTP_POOL_SIZE = 20               # 커넥션 풀 상한 (keep-alive)
+AHTTP_KEEPALIVE_SEC = 30           # 유휴 커넥션 유지 시간
+AHTTP_COALESCE = True              # 동일 URL+params in-flight GET 합치기
+
+# ============================================================
+# 28. 레이트리미터 (엔드포인트 그룹별 예산 + Remaining-Req 헤더 동기화)
+# ============================================================
+# 업비트 한도: 시세 그룹별 초당 10회 / 주문 초당 8회 / 기타 거래소 API 초당 30회 (IP·계정 단위).
+# 같은 IP에서 bots/ 스캐너도 돌기 때문에 한도보다 낮게 잡고, 실제 잔여는 응답 헤더로 맞춤.
+RATE_LIMIT_GROUPS = {              # group: (초당 rate, burst cap)
+    "candles":   (6.0, 6.0),
+    "trades":    (6.0, 6.0),
+    "ticker":    (6.0, 6.0),
+    "orderbook": (6.0, 6.0),
+    "market":    (2.0, 2.0),
+    "order":     (6.0, 6.0),       # POST /v1/orders (우선 레인)
+    "default":   (20.0, 20.0),     # 잔고/주문조회/취소 등 (우선 레인)
+}
+RATE_LIMIT_429_PAUSE_SEC = 1.0     # 429 수신 시 해당 그룹만 정지
+RATE_WAIT_HIST_BOUNDS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)  # 대기시간 히스토그램 구간 (ms)
+
+# ============================================================
+# 29. 봉 경계 정렬 캔들 프리페치 (1/5/15/60분봉 → _C*_CACHE)
+# ============================================================
+# 봉 마감 직후 TOP_N 마켓 캔들을 백그라운드에서 미리 갱신 → detect_leader_stock은 캐시 hit.
+# 스트림(체결 증분 캔들)이 서빙 중인 마켓/TF는 건너뜀. 캔들 그룹 rate의 일부만 사용해 탐지 fetch와 공존.
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+PREFETCH_SETTLE_SEC = 1.5          # 봉 경계 후 대기 (업비트 캔들 마감 반영 지연)
+PREFETCH_RATE_SHARE = 0.5          # 캔들 그룹 초당 rate 중 프리페치 몫 (나머지는 인라인 fetch)
+PREFETCH_COUNTS = {1: 30, 5: 50, 15: 50, 60: 30}  # 분봉별 요청 개수 (_get_cN_cached 최대 사용량 기준)
+# 봉 안에서도 캐시 TTL × 이 비율 간격으로 재프리페치 → 만료 전에 갱신 (c15 TTL 90s 면 72s 간격, 봉 900s 전체 커버)
+PREFETCH_REFRESH_FRAC = 0.8
+
+# ============================================================
+# 30. 이벤트 구동 청산 엔진 (포지션별 폴링 스레드 대체)
+# ============================================================
+# 보유 마켓 체결 스트림 수신 시 해당 포지션 모니터 1스텝 실행 (SL/트레일/타임아웃 판정).
+# 체결이 없으면 RECHECK_SEC 간격 폴백. 비활성(0) 시 호출 스레드에서 기존처럼 RECHECK_SEC 폴링.
+EXIT_ENGINE_ENABLED = os.getenv("EXIT_ENGINE_ENABLED", "1") == "1"
+EXIT_ENGINE_WORKERS = 4            # 스텝 실행 워커 (주문 대기 중인 포지션이 다른 포지션 판정을 막지 않도록)
+EXIT_ENGINE_MIN_STEP_SEC = 0.5     # 같은 포지션 체결 구동 스텝 최소 간격 (틱 폭주 시 합치기)
+
+# ============================================================
+# 31. 스캔 사이클 프로파일러 (마켓 → 단계 → 네트워크/check_fn span 트리)
+# ============================================================
+# 느린 사이클만 Chrome trace JSON으로 덤프 → chrome://tracing 또는 ui.perfetto.dev 에서 열기.
+# 비활성 시 span 훅은 플래그 체크 1회만 (오버헤드 없음).
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+PROFILE_SLOW_CYCLE_MS = float(os.getenv("PROFILE_SLOW_CYCLE_MS", "8000"))  # 이 이상 걸린 사이클만 덤프
+PROFILE_TRACE_DIR = os.getenv("PROFILE_TRACE_DIR", "profiles")  # 덤프 디렉터리
+PROFILE_MAX_FILES = 20             # 최신 N개만 유지 (오래된 덤프 삭제)
+PROFILE_MAX_SPANS = 50000          # 사이클당 span 상한 (초과분은 버리고 개수만 기록)
+
+# ============================================================
+# 32. 지연 postcheck 확인 큐 (후보 확인이 스캔 루프를 막지 않음)
+# ============================================================
+# 탐지 통과 후보는 확인 엔진에 등록만 하고 스캔 계속 → 후보 체결 수신 시 재평가(틱 구동).
+# 확인 통과분은 메인 커밋 루프가 수거해 기존 open_auto_position 경로로 진입. 비활성(0) 시 인라인 postcheck_6s.
+POSTCHECK_QUEUE_ENABLED = os.getenv("POSTCHECK_QUEUE_ENABLED", "1") == "1"
+POSTCHECK_QUEUE_WORKERS = 4        # 확인 스텝 실행 워커 (REST 틱 fetch 가 다른 후보 재평가를 막지 않도록)
+POSTCHECK_MIN_STEP_SEC = 0.4       # 같은 후보 체결 구동 재평가 최소 간격 (기존 고속 루프 간격)
+POSTCHECK_READY_MAX_AGE_SEC = 5.0  # 확인 완료 후 커밋까지 허용 지연 (초과 시 신선도 부족으로 폐기)
+
+# ============================================================
+# 33. 크로스마켓 벡터 스크리너 (markets × bars 행렬로 후보 선별)
+# ============================================================
+# 스캔 전 shard 전체 1분봉(스트림/캐시, 네트워크 0회)을 NumPy 행렬로 모아 detector 필요조건을 한 번에 판정.
+# 어떤 평가 대상 route 도 발화 불가능한 마켓만 detect_leader_stock 에서 제외 (규칙 없는 detector 가 있으면 전원 통과).
+SCREENER_ENABLED = os.getenv("SCREENER_ENABLED", "1") == "1"
+SCREENER_BARS = 30                 # 마켓별 보관 봉 수 (detect_leader c1 요청 개수와 동일해야 판정 일치)
+
+# ============================================================
+# 34. 주문 실행 엔진 (private myOrder/myAsset 스트림 체결 추적)
+# ============================================================
+# 주문 uuid 를 Future 로 등록 → 스트림 done/cancel 수신 즉시 완료 (get_order_result 0.25초 폴링 대체).
+# 잔고는 /v1/accounts 1회 시드 후 myAsset 으로 갱신. 스트림 끊김/유실 시 기존 REST 폴링으로 자동 폴백.
+# 로컬 검증: python mock_exchange.py → UPBIT_REST_URL / ORDER_STREAM_URL 을 mock 주소로 지정.
+ORDER_STREAM_ENABLED = os.getenv("ORDER_STREAM_ENABLED", "1") == "1"
+ORDER_STREAM_URL = os.getenv("ORDER_STREAM_URL", "wss://api.upbit.com/websocket/v1/private")
+UPBIT_REST_URL = os.getenv("UPBIT_REST_URL", "https://api.upbit.com").rstrip("/")  # private REST (주문/잔고) base
+ORDER_STREAM_RECONNECT_SEC = 3     # 재연결 대기
+ORDER_REST_POLL_SEC = 1.0          # 스트림 연결 중 체결 대기 REST 안전 조회 간격 (메시지 유실 대비)
+ORDER_REST_POLL_FAST_SEC = 0.25    # 스트림 끊김 시 REST 조회 간격 (기존 get_order_result 간격)
+ORDER_TRACK_MAX = 500              # 최근 주문 상태 보관 상한 (등록 전 도착한 이벤트 포함)
+ORDER_TRACK_TTL_SEC = 600          # 미완료 Future 보관 상한 (초과 시 취소 — 대기자 없는 주문 누수 방지)
+
+# ============================================================
+# 35. 상태 저널 (append-only 바이너리 WAL + 백그라운드 스냅샷 압축)
+# ============================================================
+# bot_state / shadow_stats 변경분만 레코드로 append → 메인 루프는 전체 JSON 직렬화 안 함.
+# 저널이 커지면 백그라운드 스레드가 기존 포맷 스냅샷(bot_state.json / shadow_stats.json)으로 압축.
+# 시작 시 스냅샷 + 이후 레코드 재생. 비활성(0) 시 기존 주기적 전체 저장.
+STATE_JOURNAL_ENABLED = os.getenv("STATE_JOURNAL_ENABLED", "1") == "1"
+STATE_JOURNAL_PATH = os.path.join(os.getcwd(), "bot_state.journal")
+SHADOW_JOURNAL_PATH = os.path.join(os.getcwd(), "shadow_stats.journal")
+JOURNAL_COMPACT_RECORDS = 2000     # 저널 레코드 수가 이 이상이면 스냅샷 압축
+JOURNAL_COMPACT_BYTES = 8 * 1024 * 1024  # 또는 저널 크기가 이 이상이면 압축
+
+# ============================================================
+# 36. 텔레그램 전송 워커 (비동기 큐 + 우선순위 레인 + 리포트 묶음)
+# ============================================================
+# tg_send 는 큐에 넣고 즉시 반환 → 전용 워커 스레드가 레이트리밋 지키며 전송 (호출자 네트워크 대기 없음).
+# 레인: 매매 체결(trade) > 일반(normal) > 리포트(report, TG_BATCH_WINDOW_SEC 동안 모아 한 메시지로).
+# 최종 실패 메시지는 TG_FAIL_QUEUE_PATH 에 보관 → 재시작 후에도 워커가 재전송. 비활성(0) 시 기존 동기 전송.
+TG_ASYNC_ENABLED = os.getenv("TG_ASYNC_ENABLED", "1") == "1"
+TG_API_URL = os.getenv("TG_API_URL", "https://api.telegram.org").rstrip("/")
+TG_QUEUE_MAX = 500                 # normal/report 레인 상한 (초과 시 가장 오래된 리포트부터 버림, trade 레인은 무제한)
+TG_BATCH_WINDOW_SEC = 3.0          # 리포트 레인 묶음 대기 (첫 리포트 도착 후)
+TG_BATCH_MAX_CHARS = 3800          # 묶음 메시지 최대 길이 (Telegram 4096자 제한 여유)
+TG_CHAT_MIN_INTERVAL_SEC = 1.0     # 같은 채팅 연속 전송 최소 간격 (Telegram 채팅당 ~1msg/s)
+TG_GLOBAL_PER_SEC = 25             # 전체 초당 전송 상한 (Telegram 봇당 ~30msg/s)
+TG_FAIL_QUEUE_PATH = os.path.join(os.getcwd(), "tg_fail_queue.json")
+TG_FAIL_RETRY_SEC = 30             # 실패 큐 재전송 주기
+TG_FAIL_TTL_SEC = 600              # 실패 메시지 보관 시간 (초과 시 버림)
+TG_SHUTDOWN_DRAIN_SEC = 5.0        # 종료 시 큐 비우기 최대 대기
+
+# ============================================================
+# 37. 시세 허브 (md_hub.py 공유메모리 → bot / 모멘텀 스캐너 공용)
+# ============================================================
+# md_hub.py 가 거래소 연결을 단독 보유하고 티커/오더북/체결/1분봉을 공유메모리에 게시.
+# 허브 살아 있고 요청 마켓 전부 신선하면 /v1/ticker, /v1/orderbook REST 호출 생략. 아니면 기존 REST 그대로.
+MD_HUB_ENABLED = os.getenv("MD_HUB_ENABLED", "1") == "1"
+MD_HUB_NAME = os.getenv("MD_HUB_NAME", "upbit_md_hub")
+MD_HUB_MAX_AGE_SEC = 2.5           # 허브 값 최대 나이 (웹소켓 라이브 구독 중엔 변경 없는 마켓도 신선으로 간주)
+
+# ============================================================
+# 38. 로컬 캔들 저장소 (candle_store.py — 재시작/수집기/리서치 공용)
+# ============================================================
+# 마감된 분봉을 마켓·분봉별 append-only 파일에 기록 (mmap 읽기 + 커버리지 인덱스).
+# get_minutes_candles 는 저장소에 이어지는 이력이 있으면 마지막 마감봉 이후 몇 개 봉만 REST 로 받아 이어붙임
+# (재시작 직후에도 count 전체 재다운로드 없음). collect_1m.py / research/data_loader.py /
+# bots/clm_deadzone_analysis.py 도 같은 디렉터리 사용. 비활성(0) 시 기존 REST 전체 조회.
+CANDLE_STORE_ENABLED = os.getenv("CANDLE_STORE_ENABLED", "1") == "1"
+CANDLE_STORE_DIR = os.getenv("CANDLE_STORE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "candle_store")
+CANDLE_STORE_MIN_COUNT = 5         # 이보다 적은 count 요청은 그냥 REST (이어붙일 이득 없음)
+
+# ============================================================
+# 39. 거래 피처 저장소 (SQLite WAL — trade_features.csv 대체)
+# ============================================================
+# 진입 시 1행 INSERT, 청산 시 (market, 미청산) 인덱스로 해당 행만 UPDATE → CSV 전체 읽기/재작성 없음.
+# 리포트/자동학습은 최근 N건 청산만 인덱스 조회. 첫 실행 시 기존 trade_features.csv 1회 임포트 (원본 유지).
+# 비활성(0) 시 기존 CSV 경로.
+TRADE_STORE_ENABLED = os.getenv("TRADE_STORE_ENABLED", "1") == "1"
+TRADE_STORE_PATH = os.path.join(os.getcwd(), "trade_features.db")
+
+# ============================================================
+# 40. 리포트 렌더 워커
+# ============================================================
+# 메인 루프는 카운터/섀도우 통계 스냅샷만 뜨고, 10분 파이프라인 리포트 렌더·전송은 백그라운드 스레드.
+# 비활성(0) 시 기존처럼 메인 루프에서 동기 렌더.
+REPORT_ASYNC_ENABLED = os.getenv("REPORT_ASYNC_ENABLED", "1") == "1"
+
+# ============================================================
+# 41. 섀도우 포지션 북 (shadow_book.py — 구조화 NumPy 배열)
+# ============================================================
+# 가상포지션/차단 건/대기 시그널을 행 단위 배열로 보관 → 가격 1회 갱신에 전 포지션 청산 로직을 벡터 연산 1번.
+# 동시 추적 상한을 SHADOW_MAX_VIRTUAL_POS(30)/SHADOW_MAX_BLOCKED_POS(50) 대신 아래 값으로 확대.
+# 비활성(0) 또는 numpy 미설치 시 기존 dict 리스트 + _shadow_sim_exit 경로.
+SHADOW_BOOK_ENABLED = os.getenv("SHADOW_BOOK_ENABLED", "1") == "1"
+SHADOW_BOOK_MAX_VIRTUAL_POS = 400  # 북 사용 시 동시 추적 가상포지션 상한
+SHADOW_BOOK_MAX_BLOCKED_POS = 600  # 북 사용 시 차단 건 동시 상한
+SHADOW_TICKER_BATCH = 100          # 평가용 /v1/ticker 요청당 마켓 수 (업비트 허용 범위, 기존 10)
+# 체결 경로: 직전 평가 이후 체결을 인프로세스 시세 스트림 체결 콜백 (스트림 미가동 시 시세 허브 체결 링)에서 받아
+# 마켓별 지그재그 피벗(고가/저가 전환점 + 시각)으로 접음 → 북이 구간을 시각순 재생 (구간 중 SL/트레일 히트·MFE/MAE 반영).
+# 체결 없는 마켓은 기존 티커 1점.
+SHADOW_TICK_PATH_ENABLED = os.getenv("SHADOW_TICK_PATH_ENABLED", "1") == "1"
+SHADOW_TICK_PIVOT_PCT = 0.0005     # 이 비율 미만 되돌림은 접음 (최소 트레일폭보다 작게)
+SHADOW_TICK_MAX_PIVOTS = 24        # 마켓·구간당 피벗 상한 (초과 시 최소 스윙 쌍 병합 — 구간 최고/최저가 보존)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+업비트 시세 허브 (단일 거래소 연결 → 공유메모리 게시)
+=====================================================
+bot.py / bots/momentum_scanner.py / bots/momentum_scanner_clm.py 가 각자 get_tickers / get_orderbook /
+fetch_orderbook_cache 로 REST 폴링 → 같은 IP 레이트리밋을 세 프로세스가 나눠 씀.
+허브가 거래소 연결을 단독 보유하고 티커/오더북/체결/1분봉을 공유메모리(md_hub_client 레이아웃)에 게시,
+소비 프로세스는 세그먼트를 매핑해 직접 읽음 (허브 없으면 각자 기존 REST 경로로 자동 폴백).
+
+- 웹소켓(websocket-client 설치 시): 전체 KRW 마켓 ticker + orderbook + trade 구독 (변경 즉시 게시)
+- REST: 티커 전체 MD_HUB_TICKER_POLL_SEC 주기 (마켓 100개/요청), 웹소켓 끊김 시 오더북도 REST 배치 폴링
+- 1분봉: 체결 스트림으로 진행 봉/직전 봉 집계 (이력 캔들은 소비자 기존 REST/링버퍼 경로 유지)
+
+사용법:
+  python md_hub.py                                   # 업비트 연결 (systemd: md-hub.service)
+  python md_hub.py --ws-url ws://127.0.0.1:8765      # ws_replay_server.py --synthetic 로 로컬 검증
+  MD_HUB_ENABLED=0 python bot.py                     # 허브 미사용 (기존 REST 경로)
+"""
+
+import os, sys, json, time, signal, argparse, threading
+import requests
+
+try:
+    import websocket  # websocket-client
+except Exception:
+    websocket = None
+
+from md_hub_client import MdHubWriter, HUB_NAME, OB_LEVELS
+
+REST_BASE = os.getenv("UPBIT_REST_URL", "https://api.upbit.com").rstrip("/")
+WS_URL = os.getenv("MD_HUB_WS_URL", "wss://api.upbit.com/websocket/v1")
+TICKER_POLL_SEC = float(os.getenv("MD_HUB_TICKER_POLL_SEC", "1.0"))
+OB_POLL_SEC = float(os.getenv("MD_HUB_OB_POLL_SEC", "1.0"))      # 웹소켓 끊김 시에만
+MARKETS_REFRESH_SEC = 600
+RECONNECT_SEC = 3
+
+
+def log(msg):
+    print(f"[MD_HUB] {time.strftime('%H:%M:%S')} {msg}", flush=True)
+
+
+class MarketDataHub:
+    """REST 폴러 + 웹소켓 리더 → MdHubWriter (쓰기는 _wlock 직렬화 — writer 는 단일 쓰기 전제)"""
+
+    def __init__(self, ws_url=WS_URL, rest_base=REST_BASE, name=HUB_NAME, use_ws=True):
+        self.ws_url = ws_url
+        self.rest = rest_base
+        self.w = MdHubWriter(name)
+        self._wlock = threading.Lock()
+        self.sess = requests.Session()
+        self.markets = []
+        self._markets_ts = 0.0
+        self.use_ws = use_ws and websocket is not None
+        self.ws = None
+        self.ws_live = False
+        self.ws_last_msg = 0.0
+        self.stop = threading.Event()
+        self.stats = {"rest_req": 0, "rest_err": 0, "ws_msgs": 0, "reconnects": 0}
+
+    # ---- REST ----
+    def _get(self, path, params=None):
+        self.stats["rest_req"] += 1
+        try:
+            r = self.sess.get(self.rest + path, params=params, timeout=5)
+            if r.status_code == 429:
+                self.stats["rest_err"] += 1
+                time.sleep(1.0)
+                return None
+            r.raise_for_status()
+            return r.json()
+        except Exception as e:
+            self.stats["rest_err"] += 1
+            log(f"REST {path} 실패: {e}")
+            return None
+
+    def refresh_markets(self):
+        js = self._get("/v1/market/all")
+        if isinstance(js, list):
+            mk = sorted(d["market"] for d in js if d.get("market", "").startswith("KRW-"))
+            if mk and mk != self.markets:
+                changed = bool(self.markets)
+                self.markets = mk
+                log(f"KRW 마켓 {len(mk)}개")
+                if changed and self.ws is not None:
+                    self.ws.close()  # 구독 목록 갱신 → 재연결
+        self._markets_ts = time.time()
+
+    def _poll_loop(self):
+        next_ob = 0.0
+        while not self.stop.is_set():
+            t0 = time.time()
+            if t0 - self._markets_ts > MARKETS_REFRESH_SEC or not self.markets:
+                self.refresh_markets()
+            mk = list(self.markets)
+            for i in range(0, len(mk), 100):
+                js = self._get("/v1/ticker", {"markets": ",".join(mk[i:i + 100])})
+                if isinstance(js, list):
+                    with self._wlock:
+                        for t in js:
+                            self.w.put_ticker(t)
+            # 웹소켓 없거나 끊김 → 오더북도 REST (15마켓/요청)
+            if not self.ws_live and t0 >= next_ob:
+                next_ob = t0 + OB_POLL_SEC
+                for i in range(0, len(mk), 15):
+                    js = self._get("/v1/orderbook", {"markets": ",".join(mk[i:i + 15])})
+                    if isinstance(js, list):
+                        with self._wlock:
+                            for ob in js:
+                                self.w.put_orderbook(ob)
+            with self._wlock:
+                self.w.heartbeat(ws_live=self.ws_live)
+            self.stop.wait(max(0.05, TICKER_POLL_SEC - (time.time() - t0)))
+
+    # ---- 웹소켓 ----
+    def _on_open(self, ws):
+        codes = list(self.markets)
+        req = [{"ticket": f"md-hub-{os.getpid()}"},
+               {"type": "ticker", "codes": codes},
+               {"type": "orderbook", "codes": [f"{c}.{OB_LEVELS}" for c in codes]},
+               {"type": "trade", "codes": codes},
+               {"format": "DEFAULT"}]
+        ws.send(json.dumps(req))
+        self.ws_live = True
+        self.ws_last_msg = time.time()
+        with self._wlock:
+            self.w.heartbeat(ws_live=True, ws_since=time.time())
+        log(f"웹소켓 구독: {len(codes)}개 마켓")
+
+    def _on_message(self, ws, msg):
+        if isinstance(msg, bytes):
+            msg = msg.decode("utf-8")
+        try:
+            d = json.loads(msg)
+        except Exception:
+            return
+        self.ws_last_msg = time.time()
+        self.stats["ws_msgs"] += 1
+        typ = d.get("type")
+        with self._wlock:
+            if typ == "trade":
+                self.w.put_trade(d)
+            elif typ == "orderbook":
+                self.w.put_orderbook(d)
+            elif typ == "ticker":
+                self.w.put_ticker(d)
+
+    def _on_close(self, ws, *a):
+        self.ws_live = False
+        with self._wlock:
+            self.w.heartbeat(ws_live=False)
+
+    def _ws_loop(self):
+        while not self.stop.is_set():
+            if not self.markets:
+                self.stop.wait(1.0)
+                continue
+            try:
+                self.ws = websocket.WebSocketApp(self.ws_url, on_open=self._on_open,
+                                                 on_message=self._on_message, on_close=self._on_close,
+                                                 on_error=lambda ws, e: log(f"웹소켓 오류: {e}"))
+                self.ws.run_forever(ping_interval=30, ping_timeout=10)
+            except Exception as e:
+                log(f"웹소켓 예외: {e}")
+            self._on_close(None)
+            if self.stop.is_set():
+                break
+            self.stats["reconnects"] += 1
+            self.stop.wait(RECONNECT_SEC)
+
+    def _watch_loop(self):
+        """수신 정지된 연결 감지 (소켓은 살아 있는데 메시지 없음) + 상태 로그"""
+        last_log = 0.0
+        while not self.stop.wait(1.0):
+            if self.ws_live and time.time() - self.ws_last_msg > 10 and self.ws is not None:
+                log("웹소켓 10초 무수신 → 재연결")
+                self.ws.close()
+            if time.time() - last_log >= 60:
+                last_log = time.time()
+                s = self.stats
+                log(f"mkts={len(self.markets)} slots={len(self.w.slots)} ws={'live' if self.ws_live else 'down'} "
+                    f"ws_msgs={s['ws_msgs']} trades={self.w.widx} rest={s['rest_req']}/err{s['rest_err']} "
+                    f"reconn={s['reconnects']}")
+
+    def run(self):
+        self.refresh_markets()
+        ths = [threading.Thread(target=self._poll_loop, daemon=True, name="HubPoll"),
+               threading.Thread(target=self._watch_loop, daemon=True, name="HubWatch")]
+        if self.use_ws:
+            ths.append(threading.Thread(target=self._ws_loop, daemon=True, name="HubWS"))
+        else:
+            log("websocket-client 미설치/비활성 → REST 폴링만")
+        for t in ths:
+            t.start()
+        log(f"게시 시작: shm={self.w.shm.name} ({self.w.shm.size // 1024}KB)")
+        try:
+            while not self.stop.wait(1.0):
+                pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.stop.set()
+        try:
+            if self.ws is not None:
+                self.ws.close()
+        except Exception:
+            pass
+        self.w.close()
+        log("종료 (공유메모리 해제)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="업비트 시세 허브 (공유메모리 게시)")
+    ap.add_argument("--name", default=HUB_NAME, help="공유메모리 이름 (MD_HUB_NAME)")
+    ap.add_argument("--ws-url", default=WS_URL)
+    ap.add_argument("--rest", default=REST_BASE, help="REST base (mock_exchange.py 등)")
+    ap.add_argument("--no-ws", action="store_true", help="웹소켓 미사용 (REST 폴링만)")
+    args = ap.parse_args()
+    hub = MarketDataHub(args.ws_url, args.rest, args.name, use_ws=not args.no_ws)
+    signal.signal(signal.SIGTERM, lambda *a: hub.stop.set())
+    try:
+        hub.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+업비트 시세 허브 공유메모리 레이아웃 + 읽기/쓰기 클라이언트
+=========================================================
+md_hub.py(허브 프로세스)가 거래소 연결을 단독 보유하고 시세를 공유메모리에 게시 →
+bot.py / bots/momentum_scanner*.py 는 같은 세그먼트를 매핑해 직접 읽음 (소켓/직렬화 없음).
+표준 라이브러리만 사용 (multiprocessing.shared_memory).
+
+레이아웃 (little-endian, 고정 크기):
+  [헤더 256B] magic/version/허브 pid/heartbeat/슬롯 수/체결 링 write 커서
+  [마켓 슬롯 × MAX_SLOTS] seqlock seq + 마켓코드 + 티커 + 오더북 15호가 + 1분봉(진행/직전)
+  [체결 링 × TRADE_RING] (슬롯, 매수/매도, ts, 가격, 수량, sequential_id)
+
+동시성: 슬롯은 seqlock (쓰기 전후 seq += 1 → 홀수면 쓰는 중, 읽기 전후 seq 다르면 재시도).
+        체결 링은 단일 writer 단조 커서 — 읽는 쪽이 자기 커서 보관 (덮어쓰기 구간은 버림).
+
+사용법:
+  from md_hub_client import MdHubReader
+  hub = MdHubReader()            # 허브 미기동이면 hub.alive() == False → 기존 REST 경로 사용
+  hub.ticker("KRW-BTC")          # REST /v1/ticker 항목과 같은 키
+  hub.orderbook("KRW-BTC")       # REST /v1/orderbook 항목과 같은 키
+  rows, cur = hub.trades_since(cur)
+"""
+
+import os, time, struct
+from multiprocessing import shared_memory
+
+try:
+    from multiprocessing import resource_tracker
+except Exception:  # pragma: no cover
+    resource_tracker = None
+
+HUB_NAME = os.getenv("MD_HUB_NAME", "upbit_md_hub")
+MAGIC = b"UMDH"
+VERSION = 1
+MAX_SLOTS = 512
+OB_LEVELS = 15
+TRADE_RING = 65536
+
+# 헤더: magic, version, pid, heartbeat(s), n_slots, ring_size, trade_write_idx, ws_live, ws_since(s)
+_HDR = struct.Struct("<4sIIdIIQId")
+_HDR_SIZE = 256
+_HDR_WIDX_OFF = struct.calcsize("<4sIIdII")
+
+# 티커 필드 (REST /v1/ticker 키)
+TICKER_FIELDS = ("trade_price", "opening_price", "high_price", "low_price", "prev_closing_price",
+                 "acc_trade_price_24h", "acc_trade_volume_24h", "acc_trade_price", "signed_change_rate")
+CANDLE_FIELDS = ("opening_price", "high_price", "low_price", "trade_price",
+                 "candle_acc_trade_volume", "candle_acc_trade_price")
+
+# 슬롯: seq | market | ticker_ts + 티커 | ob_ts, n_units, total_ask, total_bid, 호가(ask_p, ask_s, bid_p, bid_s)×15
+#       | 진행 1분봉 start + OHLCV | 직전 1분봉 start + OHLCV
+_SLOT = struct.Struct("<Q16s" + "q%dd" % len(TICKER_FIELDS) + "qI4x2d%dd" % (OB_LEVELS * 4) + "q6d" + "q6d")
+_SLOT_SEQ = struct.Struct("<Q")
+_N_TICKER = len(TICKER_FIELDS)
+
+_TRADE = struct.Struct("<HB5xqddq")  # slot, ask_bid(0=ASK,1=BID), ts_ms, price, volume, sequential_id
+
+SEG_SIZE = _HDR_SIZE + MAX_SLOTS * _SLOT.size + TRADE_RING * _TRADE.size
+_SLOTS_OFF = _HDR_SIZE
+_RING_OFF = _HDR_SIZE + MAX_SLOTS * _SLOT.size
+
+
+def _empty_slot_values(market=b""):
+    return ([0, market, 0] + [0.0] * _N_TICKER + [0, 0, 0.0, 0.0] + [0.0] * (OB_LEVELS * 4)
+            + [0] + [0.0] * 6 + [0] + [0.0] * 6)
+
+
+# 슬롯 값 리스트 인덱스
+_I_SEQ, _I_MKT, _I_TTS = 0, 1, 2
+_I_TICK = 3
+_I_OBTS = _I_TICK + _N_TICKER
+_I_OBN, _I_TASK, _I_TBID = _I_OBTS + 1, _I_OBTS + 2, _I_OBTS + 3
+_I_UNITS = _I_OBTS + 4
+_I_CUR = _I_UNITS + OB_LEVELS * 4
+_I_PREV = _I_CUR + 7
+
+
+class MdHubWriter:
+    """허브 프로세스 전용 — 세그먼트 생성 + 슬롯 seqlock 쓰기 + 체결 링 append"""
+
+    def __init__(self, name=HUB_NAME):
+        try:
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()  # 이전 허브 비정상 종료 잔재
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=SEG_SIZE)
+        self.buf = self.shm.buf
+        self.slots = {}        # market -> slot idx
+        self.vals = {}         # market -> 현재 슬롯 값 리스트 (쓰기 원본)
+        self.widx = 0
+        self.ws_live = 0
+        self.ws_since = 0.0    # 현재 웹소켓 연결 시작 시각 (이후 수신분은 변경 없으면 최신)
+        self.buf[:SEG_SIZE] = bytes(SEG_SIZE)
+        self._write_header()
+
+    def _write_header(self):
+        _HDR.pack_into(self.buf, 0, MAGIC, VERSION, os.getpid(), time.time(), len(self.slots),
+                       TRADE_RING, self.widx, self.ws_live, self.ws_since)
+
+    def heartbeat(self, ws_live=None, ws_since=None):
+        if ws_live is not None:
+            self.ws_live = 1 if ws_live else 0
+        if ws_since is not None:
+            self.ws_since = ws_since
+        self._write_header()
+
+    def slot(self, market):
+        """마켓 슬롯 값 리스트 (없으면 할당). 반환 None = 슬롯 부족"""
+        v = self.vals.get(market)
+        if v is not None:
+            return v
+        if len(self.slots) >= MAX_SLOTS:
+            return None
+        self.slots[market] = len(self.slots)
+        v = self.vals[market] = _empty_slot_values(market.encode()[:16])
+        self._publish(market)
+        self._write_header()
+        return v
+
+    def _publish(self, market):
+        v = self.vals[market]
+        off = _SLOTS_OFF + self.slots[market] * _SLOT.size
+        v[_I_SEQ] += 1                                   # 홀수 = 쓰는 중
+        _SLOT_SEQ.pack_into(self.buf, off, v[_I_SEQ])
+        _SLOT.pack_into(self.buf, off, *v)
+        v[_I_SEQ] += 1
+        _SLOT_SEQ.pack_into(self.buf, off, v[_I_SEQ])
+
+    def put_ticker(self, t):
+        v = self.slot(t.get("market") or t.get("code"))
+        if v is None:
+            return
+        v[_I_TTS] = int(time.time() * 1000)  # 허브 수신 시각 (신선도 판정 기준)
+        for i, k in enumerate(TICKER_FIELDS):
+            x = t.get(k)
+            if x is not None:  # 메시지에 없는 필드는 직전 값 유지
+                v[_I_TICK + i] = float(x)
+        self._publish(t.get("market") or t.get("code"))
+
+    def put_orderbook(self, ob):
+        m = ob.get("market") or ob.get("code")
+        v = self.slot(m)
+        if v is None:
+            return
+        units = (ob.get("orderbook_units") or [])[:OB_LEVELS]
+        v[_I_OBTS] = int(time.time() * 1000)
+        v[_I_OBN] = len(units)
+        v[_I_TASK] = float(ob.get("total_ask_size") or 0.0)
+        v[_I_TBID] = float(ob.get("total_bid_size") or 0.0)
+        j = _I_UNITS
+        for u in units:
+            v[j] = float(u["ask_price"])
+            v[j + 1] = float(u["ask_size"])
+            v[j + 2] = float(u["bid_price"])
+            v[j + 3] = float(u["bid_size"])
+            j += 4
+        self._publish(m)
+
+    def put_trade(self, tr):
+        """체결 1건 → 링 append + 1분봉 갱신"""
+        m = tr.get("market") or tr.get("code")
+        v = self.slot(m)
+        if v is None:
+            return
+        ts = int(tr.get("trade_timestamp") or tr.get("timestamp") or time.time() * 1000)
+        p = float(tr["trade_price"])
+        q = float(tr["trade_volume"])
+        _TRADE.pack_into(self.buf, _RING_OFF + (self.widx % TRADE_RING) * _TRADE.size,
+                         self.slots[m], 1 if tr.get("ask_bid") == "BID" else 0, ts, p, q,
+                         int(tr.get("sequential_id") or 0))
+        self.widx += 1
+        struct.pack_into("<Q", self.buf, _HDR_WIDX_OFF, self.widx)
+        start = ts // 60000 * 60000
+        if v[_I_CUR] != start:
+            if v[_I_CUR] and start < v[_I_CUR]:
+                self._publish(m)
+                return  # 지연 도착 (이전 분) — 진행 봉만 유지
+            v[_I_PREV:_I_PREV + 7] = v[_I_CUR:_I_CUR + 7]
+            v[_I_CUR:_I_CUR + 7] = [start, p, p, p, p, 0.0, 0.0]
+        c = _I_CUR
+        v[c + 2] = max(v[c + 2], p)
+        v[c + 3] = min(v[c + 3], p)
+        v[c + 4] = p
+        v[c + 5] += q
+        v[c + 6] += p * q
+        self._publish(m)
+
+    def close(self):
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except Exception:
+            pass
+
+
+class MdHubReader:
+    """소비 프로세스용 — 허브 세그먼트 매핑 (없으면 주기적으로 재시도), 읽기는 락 없음"""
+
+    RETRY_ATTACH_SEC = 5.0
+
+    def __init__(self, name=HUB_NAME, max_age_sec=3.0):
+        self.name = name
+        self.max_age_sec = max_age_sec
+        self.shm = None
+        self.buf = None
+        self._index = {}
+        self._n_indexed = 0
+        self._next_attach = 0.0
+        self.stats = {"hits": 0, "misses": 0, "retries": 0, "lost_trades": 0}
+
+    # ---- 연결 ----
+    def _attach(self):
+        now = time.time()
+        if self.buf is not None:
+            return True
+        if now < self._next_attach:
+            return False
+        self._next_attach = now + self.RETRY_ATTACH_SEC
+        try:
+            shm = shared_memory.SharedMemory(name=self.name)
+        except (FileNotFoundError, OSError, ValueError):
+            return False
+        # 소비자 종료 시 resource_tracker 가 허브 세그먼트를 unlink 하지 않도록 등록 해제
+        try:
+            if resource_tracker is not None:
+                resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        if shm.size < SEG_SIZE or bytes(shm.buf[:4]) != MAGIC:
+            shm.close()
+            return False
+        self.shm, self.buf = shm, shm.buf
+        self._index, self._n_indexed = {}, 0
+        return True
+
+    def _detach(self):
+        try:
+            if self.shm is not None:
+                self.buf = None
+                self.shm.close()
+        except Exception:
+            pass
+        self.shm = None
+        self.buf = None
+
+    def header(self):
+        if not self._attach():
+            return None
+        magic, ver, pid, hb, n_slots, ring, widx, ws_live, ws_since = _HDR.unpack_from(self.buf, 0)
+        if magic != MAGIC or ver != VERSION:
+            self._detach()
+            return None
+        return {"pid": pid, "heartbeat": hb, "n_slots": n_slots, "ring": ring, "widx": widx,
+                "ws_live": bool(ws_live), "ws_since": ws_since}
+
+    def _fresh(self, ts_ms, max_age_sec):
+        """수신 시각 ts_ms 가 유효한지 — max_age 이내, 또는 허브 웹소켓이 살아 있고 현재 연결 이후 수신분
+        (업비트 스트림은 변경 시에만 푸시 → 한산한 마켓도 연결 이후 값이면 최신)"""
+        if not ts_ms:
+            return False
+        now = time.time()
+        if now * 1000 - ts_ms <= max_age_sec * 1000:
+            return True
+        h = self.header()
+        return bool(h and h["ws_live"] and now - h["heartbeat"] <= max(5.0, max_age_sec * 2)
+                    and ts_ms >= h["ws_since"] * 1000)
+
+    def alive(self):
+        h = self.header()
+        if h is None:
+            return False
+        if time.time() - h["heartbeat"] > max(5.0, self.max_age_sec * 2):
+            # 허브 재시작 시 새 세그먼트 → 재매핑
+            self._detach()
+            self._next_attach = 0.0
+            return False
+        return True
+
+    def _slot_idx(self, market):
+        i = self._index.get(market)
+        if i is not None:
+            return i
+        h = self.header()
+        if h is None or h["n_slots"] == self._n_indexed:
+            return None
+        for k in range(self._n_indexed, h["n_slots"]):
+            raw = bytes(self.buf[_SLOTS_OFF + k * _SLOT.size + 8:_SLOTS_OFF + k * _SLOT.size + 24])
+            self._index[raw.rstrip(b"\0").decode()] = k
+        self._n_indexed = h["n_slots"]
+        return self._index.get(market)
+
+    def _read_slot(self, market):
+        if not self._attach():
+            return None
+        k = self._slot_idx(market)
+        if k is None:
+            return None
+        off = _SLOTS_OFF + k * _SLOT.size
+        for _ in range(8):
+            s1 = _SLOT_SEQ.unpack_from(self.buf, off)[0]
+            if s1 & 1:
+                self.stats["retries"] += 1
+                continue
+            v = _SLOT.unpack_from(self.buf, off)
+            if _SLOT_SEQ.unpack_from(self.buf, off)[0] == s1 and v[_I_SEQ] == s1:
+                return v
+            self.stats["retries"] += 1
+        return None
+
+    # ---- 조회 (REST 응답과 같은 키) ----
+    def ticker(self, market, max_age_sec=None):
+        v = self._read_slot(market)
+        lim = self.max_age_sec if max_age_sec is None else max_age_sec
+        if v is None or not self._fresh(v[_I_TTS], lim):
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        t = {"market": market, "timestamp": v[_I_TTS]}
+        for i, k in enumerate(TICKER_FIELDS):
+            t[k] = v[_I_TICK + i]
+        return t
+
+    def tickers(self, markets=None, max_age_sec=None):
+        """markets 지정 시 하나라도 없거나 오래되면 None (호출자 REST 폴백).
+        markets=None 이면 허브가 보유한 전체 마켓 중 신선한 것만 (상장폐지 등으로 멈춘 슬롯은 제외)"""
+        if markets is None:
+            h = self.header()
+            if h is None:
+                return None
+            self._slot_idx("")  # 인덱스 갱신
+            out = [t for t in (self.ticker(m, max_age_sec) for m in list(self._index)) if t is not None]
+            return out or None
+        out = []
+        for m in markets:
+            t = self.ticker(m, max_age_sec)
+            if t is None:
+                return None
+            out.append(t)
+        return out
+
+    def orderbook(self, market, max_age_sec=None):
+        v = self._read_slot(market)
+        lim = self.max_age_sec if max_age_sec is None else max_age_sec
+        if v is None or not v[_I_OBN] or not self._fresh(v[_I_OBTS], lim):
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        units = []
+        j = _I_UNITS
+        for _ in range(v[_I_OBN]):
+            units.append({"ask_price": v[j], "ask_size": v[j + 1], "bid_price": v[j + 2], "bid_size": v[j + 3]})
+            j += 4
+        return {"market": market, "timestamp": v[_I_OBTS], "total_ask_size": v[_I_TASK],
+                "total_bid_size": v[_I_TBID], "orderbook_units": units}
+
+    def candles_1m(self, market):
+        """(진행 중 1분봉, 직전 1분봉) — REST /v1/candles/minutes/1 항목 키 (없으면 None)"""
+        v = self._read_slot(market)
+        if v is None:
+            return None, None
+        out = []
+        for base in (_I_CUR, _I_PREV):
+            if not v[base]:
+                out.append(None)
+                continue
+            c = {"market": market, "timestamp": v[base],
+                 "candle_date_time_kst": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(v[base] / 1000 + 9 * 3600))}
+            for i, k in enumerate(CANDLE_FIELDS):
+                c[k] = v[base + 1 + i]
+            out.append(c)
+        return out[0], out[1]
+
+    def trades_since(self, cursor=None, limit=TRADE_RING):
+        """체결 링에서 cursor 이후 (rows, new_cursor). cursor=None 이면 현재 위치부터 (rows=[])"""
+        h = self.header()
+        if h is None:
+            return [], cursor
+        widx = h["widx"]
+        if cursor is None or cursor > widx:
+            return [], widx
+        start = max(cursor, widx - TRADE_RING + 1, widx - limit)
+        if start > cursor:
+            self.stats["lost_trades"] += start - cursor
+        names = {k: m for m, k in self._index.items()}
+        rows = []
+        for i in range(start, widx):
+            slot, ab, ts, p, q, sid = _TRADE.unpack_from(self.buf, _RING_OFF + (i % TRADE_RING) * _TRADE.size)
+            m = names.get(slot)
+            if m is None:
+                self._slot_idx("")
+                names = {k: mm for mm, k in self._index.items()}
+                m = names.get(slot, "")
+            rows.append({"market": m, "ask_bid": "BID" if ab else "ASK", "timestamp": ts,
+                         "trade_price": p, "trade_volume": q, "sequential_id": sid})
+        # 읽는 사이 writer 가 링을 한 바퀴 돌아 덮어쓴 앞부분은 버림
+        widx2 = struct.unpack_from("<Q", self.buf, _HDR_WIDX_OFF)[0]
+        overrun = widx2 - TRADE_RING + 1 - start
+        if overrun > 0:
+            rows = rows[overrun:]
+            self.stats["lost_trades"] += overrun
+        return rows, widx
+
+    def status_str(self):
+        h = self.header()
+        if h is None:
+            return "md_hub=off"
+        age = time.time() - h["heartbeat"]
+        s = self.stats
+        return (f"md_hub(pid={h['pid']} ws={'live' if h['ws_live'] else 'rest'} mkts={h['n_slots']} "
+                f"hb={age:.1f}s hit={s['hits']} miss={s['misses']})")
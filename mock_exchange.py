@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""
+업비트 모의 거래소 (주문 실행 엔진 로컬 검증용)
+================================================
+bot.py의 주문 경로(OrderExecutionEngine / hybrid_buy / place_market_sell / sell_all)를
+실계좌 없이 검증하기 위한 로컬 서버. 표준 라이브러리만 사용.
+
+- REST (private): POST /v1/orders, GET /v1/order, DELETE /v1/order, GET /v1/orders, GET /v1/accounts
+  응답은 업비트와 같은 필드명/문자열 숫자. Authorization 헤더 없으면 401 (JWT 검증은 생략)
+- WebSocket (private): myOrder / myAsset 구독 → 주문 접수/체결/완료/취소, 잔고 변동 푸시
+- 체결 모델: 시장가는 --fill-delay 후 전량, 지정가 매수는 --fill-delay 후 --partial 비율만 체결
+  (나머지는 취소 전까지 wait). 가격은 마켓별 랜덤워크 (--price 시작가, 지정가 주문 시 해당 가격으로 맞춤)
+
+사용법:
+  python mock_exchange.py                                      # REST 8766 / WS 8767, KRW 1,000,000
+  python mock_exchange.py --partial 0.5 --fill-delay 0.8 --drop-ws 0.3
+  UPBIT_REST_URL=http://127.0.0.1:8766 ORDER_STREAM_URL=ws://127.0.0.1:8767 python bot.py
+"""
+
+import json, time, uuid, random, argparse, threading, socketserver
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from ws_replay_server import _handshake, _read_frame, _send_frame
+
+FEE_RATE = 0.0005
+
+
+def _iso(ts=None):
+    return datetime.fromtimestamp(ts or time.time(), tz=timezone.utc).isoformat()
+
+
+def _n(v):
+    """업비트처럼 숫자를 문자열로"""
+    return f"{v:.8f}".rstrip("0").rstrip(".") if isinstance(v, float) else str(v)
+
+
+# =========================================================
+# 계좌/주문 상태
+# =========================================================
+class MockExchange:
+    def __init__(self, krw, start_price, fill_delay, partial, drop_ws):
+        self.lock = threading.RLock()
+        self.start_price = start_price
+        self.fill_delay = fill_delay
+        self.partial = partial
+        self.drop_ws = drop_ws            # myOrder/myAsset 푸시 유실 확률 (REST 폴백 검증용)
+        self.assets = {"KRW": {"balance": float(krw), "locked": 0.0, "avg_buy_price": 0.0}}
+        self.orders = {}
+        self.prices = {}
+        self.clients = []                 # (sock, types)
+
+    # ---- 가격 ----
+    def price(self, market):
+        with self.lock:
+            p = self.prices.get(market, self.start_price)
+            p = max(p * (1 + random.gauss(0, 0.0005)), 1e-8)
+            self.prices[market] = p
+            return p
+
+    def _asset(self, cur):
+        return self.assets.setdefault(cur, {"balance": 0.0, "locked": 0.0, "avg_buy_price": 0.0})
+
+    # ---- 주문 ----
+    def create(self, body):
+        market = body.get("market", "")
+        side = body.get("side")
+        ord_type = body.get("ord_type")
+        cur = market.replace("KRW-", "")
+        price = float(body.get("price") or 0)
+        volume = float(body.get("volume") or 0)
+        with self.lock:
+            if side == "bid":
+                need = price if ord_type == "price" else price * volume
+                need *= 1 + FEE_RATE
+                krw = self._asset("KRW")
+                if need <= 0 or krw["balance"] < need:
+                    return None, ("insufficient_funds_bid", "주문가능한 금액(KRW)이 부족합니다.")
+                krw["balance"] -= need
+                krw["locked"] += need
+                locked = need
+                if ord_type == "limit":
+                    self.prices[market] = price
+            else:
+                a = self._asset(cur)
+                if volume <= 0 or a["balance"] + 1e-12 < volume:
+                    return None, ("insufficient_funds_ask", "주문가능한 금액(" + cur + ")이 부족합니다.")
+                a["balance"] -= volume
+                a["locked"] += volume
+                locked = volume
+            od = {
+                "uuid": str(uuid.uuid4()), "side": side, "ord_type": ord_type,
+                "price": price, "state": "wait", "market": market, "created_at": _iso(),
+                "volume": volume, "remaining_volume": volume, "reserved_fee": 0.0,
+                "remaining_fee": 0.0, "paid_fee": 0.0, "locked": locked,
+                "executed_volume": 0.0, "executed_funds": 0.0, "trades_count": 0, "trades": [],
+            }
+            self.orders[od["uuid"]] = od
+        self.push_order(od, "wait")
+        threading.Timer(self.fill_delay, self._fill, args=(od["uuid"],)).start()
+        return self.rest_order(od), None
+
+    def _fill(self, u):
+        with self.lock:
+            od = self.orders.get(u)
+            if od is None or od["state"] != "wait":
+                return
+            market, cur = od["market"], od["market"].replace("KRW-", "")
+            if od["ord_type"] == "limit":
+                vol = od["volume"] * self.partial
+                px = od["price"]
+            elif od["ord_type"] == "price":
+                px = self.price(market)
+                vol = od["price"] / px
+            else:
+                px = self.price(market)
+                vol = od["volume"]
+            if vol <= 0:
+                return
+            funds = px * vol
+            fee = funds * FEE_RATE
+            krw, coin = self._asset("KRW"), self._asset(cur)
+            if od["side"] == "bid":
+                cost = funds + fee
+                krw["locked"] -= cost
+                od["locked"] -= cost
+                held = coin["balance"] + coin["locked"]
+                coin["avg_buy_price"] = (coin["avg_buy_price"] * held + funds) / (held + vol)
+                coin["balance"] += vol
+            else:
+                coin["locked"] -= vol
+                od["locked"] -= vol
+                krw["balance"] += funds - fee
+            od["executed_volume"] += vol
+            od["executed_funds"] += funds
+            od["paid_fee"] += fee
+            od["remaining_volume"] = max(od["volume"] - od["executed_volume"], 0.0)
+            od["trades_count"] += 1
+            tr = {"market": market, "uuid": str(uuid.uuid4()), "price": px, "volume": vol,
+                  "funds": funds, "side": od["side"], "created_at": _iso()}
+            od["trades"].append(tr)
+            full = od["ord_type"] != "limit" or od["remaining_volume"] <= 1e-12
+            if full:
+                self._release(od)
+                od["state"] = "done"
+        self.push_order(od, "trade", tr)
+        if full:
+            self.push_order(od, "done")
+        self.push_assets(["KRW", cur])
+
+    def _release(self, od):
+        """잔여 locked 반환 (완료/취소)"""
+        cur = od["market"].replace("KRW-", "")
+        left = max(od["locked"], 0.0)
+        if left > 0:
+            a = self._asset("KRW" if od["side"] == "bid" else cur)
+            a["locked"] -= left
+            a["balance"] += left
+            od["locked"] = 0.0
+
+    def cancel(self, u):
+        with self.lock:
+            od = self.orders.get(u)
+            if od is None:
+                return None
+            if od["state"] != "wait":
+                return "done"
+            self._release(od)
+            od["state"] = "cancel"
+        self.push_order(od, "cancel")
+        self.push_assets(["KRW", od["market"].replace("KRW-", "")])
+        return self.rest_order(od)
+
+    # ---- REST 응답 형태 ----
+    def rest_order(self, od, with_trades=False):
+        out = {k: (_n(v) if isinstance(v, float) else v) for k, v in od.items() if k != "trades"}
+        if od["executed_volume"] > 0:
+            out["avg_price"] = _n(od["executed_funds"] / od["executed_volume"])
+        if with_trades:
+            out["trades"] = [{k: (_n(v) if isinstance(v, float) else v) for k, v in t.items()} for t in od["trades"]]
+        return out
+
+    def accounts(self):
+        with self.lock:
+            return [{"currency": c, "balance": _n(a["balance"]), "locked": _n(a["locked"]),
+                     "avg_buy_price": _n(a["avg_buy_price"]), "avg_buy_price_modified": False,
+                     "unit_currency": "KRW"}
+                    for c, a in self.assets.items() if c == "KRW" or a["balance"] + a["locked"] > 0]
+
+    # ---- WebSocket 푸시 ----
+    def push_order(self, od, state, tr=None):
+        now_ms = int(time.time() * 1000)
+        msg = {
+            "type": "myOrder", "code": od["market"], "uuid": od["uuid"],
+            "ask_bid": "BID" if od["side"] == "bid" else "ASK", "order_type": od["ord_type"],
+            "state": state, "trade_uuid": tr["uuid"] if tr else None,
+            "price": tr["price"] if tr else od["price"],
+            "avg_price": (od["executed_funds"] / od["executed_volume"]) if od["executed_volume"] else 0,
+            "volume": tr["volume"] if tr else od["volume"],
+            "remaining_volume": od["remaining_volume"], "executed_volume": od["executed_volume"],
+            "trades_count": od["trades_count"], "paid_fee": od["paid_fee"], "locked": od["locked"],
+            "executed_funds": od["executed_funds"],
+            "trade_timestamp": now_ms if tr else None, "order_timestamp": now_ms,
+            "timestamp": now_ms, "stream_type": "REALTIME",
+        }
+        self._broadcast("myOrder", msg)
+
+    def push_assets(self, currencies):
+        with self.lock:
+            assets = [{"currency": c, "balance": self._asset(c)["balance"], "locked": self._asset(c)["locked"]}
+                      for c in currencies]
+        now_ms = int(time.time() * 1000)
+        self._broadcast("myAsset", {"type": "myAsset", "asset_uuid": str(uuid.uuid4()), "assets": assets,
+                                    "asset_timestamp": now_ms, "timestamp": now_ms, "stream_type": "REALTIME"})
+
+    def _broadcast(self, typ, msg):
+        if self.drop_ws and random.random() < self.drop_ws:
+            print(f"[MOCK] {typ} 푸시 유실 (--drop-ws)")
+            return
+        payload = json.dumps(msg).encode("utf-8")
+        with self.lock:
+            clients = list(self.clients)
+        for sock, types in clients:
+            if typ in types:
+                try:
+                    _send_frame(sock, payload)
+                except OSError:
+                    pass
+
+
+EX = None
+
+
+# =========================================================
+# REST 서버
+# =========================================================
+class RestHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def _reply(self, code, obj):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Remaining-Req", "group=default; min=1800; sec=29")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, code, name, message):
+        self._reply(code, {"error": {"name": name, "message": message}})
+
+    def _authorized(self):
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            self._error(401, "jwt_verification", "Jwt 토큰 검증에 실패했습니다.")
+            return False
+        return True
+
+    def _query(self):
+        u = urlparse(self.path)
+        return u.path, {k: v[0] for k, v in parse_qs(u.query).items()}
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        path, q = self._query()
+        if path == "/v1/accounts":
+            return self._reply(200, EX.accounts())
+        if path == "/v1/order":
+            with EX.lock:
+                od = EX.orders.get(q.get("uuid", ""))
+                out = EX.rest_order(od, with_trades=True) if od else None
+            if out is None:
+                return self._error(404, "order_not_found", "주문을 찾지 못했습니다.")
+            return self._reply(200, out)
+        if path == "/v1/orders":
+            with EX.lock:
+                rows = [EX.rest_order(od) for od in EX.orders.values()
+                        if (not q.get("market") or od["market"] == q["market"])
+                        and (not q.get("state") or od["state"] == q["state"])]
+            return self._reply(200, rows[-int(q.get("limit", 100)):])
+        self._error(404, "not_found", path)
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        path, _ = self._query()
+        if path != "/v1/orders":
+            return self._error(404, "not_found", path)
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            return self._error(400, "invalid_body", "JSON 파싱 실패")
+        res, err = EX.create(body)
+        if err:
+            return self._error(400, *err)
+        print(f"[MOCK] 주문 {body.get('market')} {body.get('side')}/{body.get('ord_type')} → {res['uuid'][:8]}")
+        self._reply(201, res)
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        path, q = self._query()
+        if path != "/v1/order":
+            return self._error(404, "not_found", path)
+        res = EX.cancel(q.get("uuid", ""))
+        if res is None:
+            return self._error(404, "order_not_found", "주문을 찾지 못했습니다.")
+        if res == "done":
+            return self._error(400, "order_not_found", "이미 체결/취소된 주문입니다.")
+        self._reply(200, res)
+
+
+# =========================================================
+# private WebSocket 서버
+# =========================================================
+class PrivateWsHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        try:
+            _handshake(sock)
+            _, payload = _read_frame(sock)
+            req = json.loads(payload.decode("utf-8"))
+        except Exception as e:
+            print(f"[MOCK] 핸드셰이크/구독 실패: {e}")
+            return
+        types = {item["type"] for item in req if isinstance(item, dict) and "type" in item}
+        ent = (sock, types)
+        with EX.lock:
+            EX.clients.append(ent)
+        print(f"[MOCK] private 구독: {self.client_address} types={sorted(types)}")
+        try:
+            while True:
+                op, data = _read_frame(sock)
+                if op == 0x9:
+                    _send_frame(sock, data, opcode=0xA)
+                elif op == 0x8:
+                    break
+        except (ConnectionError, OSError):
+            pass
+        with EX.lock:
+            if ent in EX.clients:
+                EX.clients.remove(ent)
+        print(f"[MOCK] private 종료: {self.client_address}")
+
+
+class _WsServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    global EX
+    ap = argparse.ArgumentParser(description="업비트 모의 거래소 (주문 실행 엔진 로컬 검증용)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766, help="REST 포트")
+    ap.add_argument("--ws-port", type=int, default=8767, help="private WebSocket 포트")
+    ap.add_argument("--krw", type=float, default=1_000_000, help="초기 KRW 잔고")
+    ap.add_argument("--price", type=float, default=1000.0, help="마켓 시작가 (랜덤워크)")
+    ap.add_argument("--fill-delay", type=float, default=0.2, help="주문 접수 → 체결 지연(초)")
+    ap.add_argument("--partial", type=float, default=1.0, help="지정가 매수 체결 비율 (0~1, 나머지 wait)")
+    ap.add_argument("--drop-ws", type=float, default=0.0, help="WebSocket 푸시 유실 확률 (REST 폴백 검증)")
+    args = ap.parse_args()
+    EX = MockExchange(args.krw, args.price, args.fill_delay, min(max(args.partial, 0.0), 1.0), args.drop_ws)
+    ws = _WsServer((args.host, args.ws_port), PrivateWsHandler)
+    threading.Thread(target=ws.serve_forever, daemon=True).start()
+    rest = ThreadingHTTPServer((args.host, args.port), RestHandler)
+    print(f"[MOCK] REST http://{args.host}:{args.port} | private ws://{args.host}:{args.ws_port} "
+          f"| KRW {args.krw:,.0f} fill_delay={args.fill_delay}s partial={args.partial}")
+    try:
+        rest.serve_forever()
+    except KeyboardInterrupt:
+        print("[MOCK] 종료")
+
+
+if __name__ == "__main__":
+    main()
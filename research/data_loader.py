@@ -6,10 +6,18 @@ API: https://api.upbit.com/v1/candles/minutes/{unit}
 - 200개/요청, 10 req/s 제한
 - 1분봉 히스토리 무제한
 """
-import os, time, json
+import os, sys, time, json
 import requests
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+# 공용 캔들 저장소 (상위 디렉터리 candle_store.py) — bot / collect_1m 이 받은 이력 재사용
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from candle_store import CandleStore
+    _STORE = CandleStore() if os.getenv("CANDLE_STORE_ENABLED", "1") == "1" else None
+except Exception:
+    _STORE = None
 
 UPBIT_BASE = "https://api.upbit.com/v1"
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
@@ -33,9 +41,27 @@ def _fetch_page(market, unit=1, count=200, to=None):
     return r.json()  # newest-first
 
 
+def _store_fetch_page(market, unit, count, to):
+    """candle_store.ensure 용 페이지 조회 (3회 재시도, 실패 시 None)"""
+    for _ in range(4):
+        try:
+            return _fetch_page(market, unit, count, to)
+        except requests.exceptions.RequestException:
+            time.sleep(1)
+    return None
+
+
+def _download_via_store(market, unit, cutoff):
+    """저장소 빈 구간만 다운로드 후 cutoff 이후 봉 반환 (오래된 순)"""
+    cutoff_ms = int(cutoff.replace(tzinfo=timezone.utc).timestamp() * 1000)
+    _STORE.ensure(market, unit, cutoff_ms, fetch_page=_store_fetch_page, pause=REQ_DELAY)
+    return _STORE.read(market, unit, start_ms=cutoff_ms)
+
+
 def download_candles(market, days_back=90, unit=1, force=False):
     """
     market의 unit분봉을 days_back일치 다운로드 → parquet 캐시.
+    공용 캔들 저장소가 있으면 이미 받은 구간은 재다운로드하지 않음 (마감된 봉만).
     Returns: parquet 파일 경로 (데이터 없으면 None)
     """
     os.makedirs(DATA_DIR, exist_ok=True)
@@ -44,6 +70,15 @@ def download_candles(market, days_back=90, unit=1, force=False):
         return fpath
 
     cutoff = datetime.utcnow() - timedelta(days=days_back)
+    if _STORE is not None:
+        all_candles = _download_via_store(market, unit, cutoff)
+        if not all_candles:
+            return None
+        df = pd.DataFrame(all_candles)
+        df["dt_utc"] = pd.to_datetime(df["candle_date_time_utc"])
+        df.to_parquet(fpath, index=False)
+        return fpath
+
     all_candles = []
     to_param = None
     retries = 0
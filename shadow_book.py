@@ -0,0 +1,546 @@
+# -*- coding: utf-8 -*-
+"""
+섀도우 가상포지션 북 (구조화 NumPy 배열)
+=======================================
+bot.py _shadow_evaluate_positions 가 _SHADOW_VIRTUAL_POSITIONS / _SHADOW_BLOCKED_POSITIONS / _SHADOW_PENDING_SIGNALS
+(dict 리스트)를 _SHADOW_LOCK 안에서 한 건씩 _shadow_sim_exit → 동시 추적 상한 30건.
+북은 포지션 상태(진입/최고/최저가, 트레일·AT 스톱, 생존 게이트, 스냅샷, PnL 곡선)와 청산 파라미터(SL 티어,
+activation/trail, AT 티어, PP, EC, 타임아웃)를 행 단위 구조화 배열로 보관하고, 가격 갱신 1회에 전 행의
+SL / 생존 게이트 / 조기 DD / peak DD / EC / 트레일 / 본절 / PP / AT / 타임아웃 / 게이트 지연을 벡터 연산 한 번으로 적용.
+
+- 청산 판정 순서·조건은 bot.py _shadow_sim_exit 와 동일 (행별 첫 번째 해당 사유로 청산).
+  exit_params 는 add 시점에 숫자 열로 컴파일 (AT 티어 · 생존 adaptive dd 는 진입 지표로 미리 확정).
+- 문자열/지표 등 비수치 정보는 행과 나란한 meta(dict — 기존 가상포지션 dict 그대로).
+  청산 행은 상태를 meta 에 되써서 반환 → bot.py 결과 기록 경로는 기존 dict 형식 그대로.
+- 체결 스트림 경로(TickPath — 직전 평가 이후 지그재그 피벗)가 주어지면 구간을 시각순으로 재생 (step 참고).
+- pullback 지연 진입(_pullback_delay_sec)은 미지원 (현재 모든 생성 경로 0).
+"""
+
+import math
+import numpy as np
+
+KIND_VP, KIND_BLOCKED, KIND_PENDING = 0, 1, 2
+REASONS = ("", "손절SL", "생존탈락", "DD즉시탈출", "초반DD탈출", "peak_dd", "EC조기절단",
+           "트레일익절", "트레일본절", "본절SL", "PP익절", "PP본절", "AT익절", "AT본절", "AT타임아웃",
+           "타임아웃", "가격없음")
+_R = {r: i for i, r in enumerate(REASONS)}
+SNAP_SECS = (30, 60, 120, 180, 240)   # mfe_XXs / dd_peak_XXs 스냅샷 (일반 가상포지션만)
+MAX_TIERS = 6                         # sl_tiers / adaptive_peak_exit peak_zones 최대 길이
+NO_PRICE_GRACE_SEC = 300              # 가격 조회 실패 지속 시 강제 청산 (타임아웃 + N초)
+
+_INF = math.inf
+_NAN = math.nan
+
+
+def _dtype(n_curve):
+    return np.dtype([
+        ("kind", "u1"), ("mi", "i4"), ("bars", "i4"),
+        ("entry", "f8"), ("best", "f8"), ("worst", "f8"), ("entry_ts", "f8"), ("mfe_sec", "f8"),
+        ("last", "f8"),   # 직전 평가점 가격 (구간 경로 재생 시 레벨 체결가 상한)
+        # SL (티어: hold < tier_sec 인 첫 티어, 패딩 -inf)
+        ("sl", "f8"), ("tier_sec", "f8", (MAX_TIERS,)), ("tier_pct", "f8", (MAX_TIERS,)),
+        # 트레일 / 본절
+        ("checkpoint", "f8"), ("trail_pct", "f8"), ("trail_on", "?"), ("min_hold", "f8"), ("be_on", "?"),
+        ("trail_armed", "?"), ("trail_stop", "f8"),
+        ("timeout", "f8"),
+        # 생존 게이트 (NaN = 조건 없음)
+        ("surv_sec", "f8"), ("surv_passed", "?"), ("surv_min_pnl", "f8"), ("surv_max_mfe", "f8"),
+        ("surv_min_mae", "f8"), ("surv_max_dd", "f8"),
+        ("early_dd", "?"),
+        # adaptive peak exit (zone: hold < zone_end 인 첫 구간, 패딩 -inf)
+        ("ape_after", "f8"), ("ape_min_peak", "f8"), ("ape_min_hold", "f8"),
+        ("zone_end", "f8", (MAX_TIERS,)), ("zone_ratio", "f8", (MAX_TIERS,)),
+        # early cut
+        ("ec_on", "?"), ("ec_checked", "?"), ("ec_mfe", "f8"), ("ec_dd", "f8"),
+        # profit protect
+        ("pp_act", "f8"), ("pp_ret", "f8"),
+        # adaptive trail (티어는 진입 지표로 확정)
+        ("at_after", "f8"), ("at_trail", "f8"), ("at_max_hold", "f8"), ("at_relax_after", "f8"),
+        ("at_relax_mult", "f8"), ("at_armed", "?"), ("at_stop", "f8"), ("at_arm_trail", "f8"),
+        # 스냅샷 (NaN = 미기록)
+        ("snap_on", "?"), ("mfe_snap", "f8", (len(SNAP_SECS),)), ("dd_snap", "f8", (len(SNAP_SECS),)),
+        ("mae_60", "f8"), ("curve", "f8", (n_curve,)),
+        # 대기열 (게이트 지연)
+        ("gate_sec", "f8"), ("gate_max", "f8"),
+    ])
+
+
+def _opt(v):
+    return _NAN if v is None else float(v)
+
+
+class TickPath:
+    """마켓별 직전 평가 이후 체결 경로 — 지그재그 피벗 [(가격, 시각)] (반전 rev_pct 미만 흔들림은 접음).
+    마지막 원소는 진행 중 구간의 현재 극값. 피벗이 max_pts 초과 시 스윙이 가장 작은 인접 쌍을 이웃 극값에 흡수
+    (구간 최고/최저가는 보존)."""
+    __slots__ = ("dir", "pts", "rev", "cap")
+
+    def __init__(self, p, ts, rev_pct, max_pts):
+        self.dir = 0
+        self.pts = [[p, ts]]
+        self.rev = rev_pct
+        self.cap = max(4, max_pts)
+
+    def add(self, p, ts):
+        last = self.pts[-1]
+        d = self.dir
+        if d == 0:
+            if p != last[0]:
+                self.pts.append([p, ts])
+                self.dir = 1 if p > last[0] else -1
+            return
+        if (p > last[0]) if d > 0 else (p < last[0]):
+            last[0], last[1] = p, ts          # 같은 방향 → 현재 극값 연장
+        elif (p <= last[0] * (1 - self.rev)) if d > 0 else (p >= last[0] * (1 + self.rev)):
+            self.pts.append([p, ts])          # 반전 확정 → 새 구간
+            self.dir = -d
+            if len(self.pts) > self.cap:
+                self._merge()
+
+    def _merge(self):
+        pts = self.pts
+        # 양 끝(시작점 · 진행 중 극값) 제외 인접 쌍 중 스윙 최소
+        i = min(range(1, len(pts) - 3), key=lambda k: abs(pts[k][0] - pts[k + 1][0]))
+        a, b = pts[i], pts[i + 1]
+        prv, nxt = pts[i - 1], pts[i + 2]
+        # prv 와 b, a 와 nxt 가 같은 종류 (고점/저점) → 더 극단 가격을 남김 (시각은 유지 — 순서 보존)
+        hi_b = b[0] > a[0]
+        if (b[0] > prv[0]) if hi_b else (b[0] < prv[0]):
+            prv[0] = b[0]
+        if (a[0] > nxt[0]) if not hi_b else (a[0] < nxt[0]):
+            nxt[0] = a[0]
+        del pts[i:i + 2]
+
+
+class ShadowBook:
+    """가상포지션 / 차단 건 / 대기 시그널 북. 호출 측(_SHADOW_LOCK)이 직렬화 — 내부 락 없음."""
+
+    def __init__(self, curve_secs, recheck_sec, cost_floor, cap=64):
+        self.curve_secs = tuple(curve_secs)
+        self.recheck_sec = float(recheck_sec)
+        self.cost_floor = float(cost_floor)
+        self.dtype = _dtype(len(self.curve_secs))
+        self.a = np.zeros(cap, dtype=self.dtype)
+        self.meta = []
+        self.n = 0
+        self._mkt = {}        # market → 가격 테이블 인덱스
+        self._mkt_names = []
+        self.stats = {"steps": 0, "rows_max": 0, "closed": 0, "promoted": 0, "path_pts": 0, "last_ms": 0.0, "max_ms": 0.0}
+
+    # ---- 등록 ----
+    def __len__(self):
+        return self.n
+
+    def count(self, kind):
+        return int(np.count_nonzero(self.a["kind"][:self.n] == kind))
+
+    def markets(self):
+        return {m["market"] for m in self.meta}
+
+    def _row(self):
+        if self.n >= len(self.a):
+            grown = np.zeros(len(self.a) * 2, dtype=self.dtype)
+            grown[:self.n] = self.a[:self.n]
+            self.a = grown
+        i = self.n
+        self.n += 1
+        r = self.a[i]
+        r.fill(0)
+        for f in ("mfe_sec", "surv_min_pnl", "surv_max_mfe", "surv_min_mae", "surv_max_dd",
+                  "mfe_snap", "dd_snap", "mae_60", "curve"):
+            r[f] = _NAN
+        for f in ("tier_sec", "zone_end"):
+            r[f] = -_INF
+        for f in ("surv_sec", "ape_after", "pp_act", "at_after", "at_relax_after"):
+            r[f] = _INF
+        r["at_relax_mult"] = 1.0
+        return i, r
+
+    def _market_idx(self, market):
+        mi = self._mkt.get(market)
+        if mi is None:
+            mi = self._mkt[market] = len(self._mkt_names)
+            self._mkt_names.append(market)
+        return mi
+
+    def _put(self, f):
+        """컴파일된 열 값 {필드: 값} → 새 행. 행 할당은 파라미터 해석이 모두 끝난 뒤 (예외 시 n/meta 정렬 유지)"""
+        i, r = self._row()
+        for k, v in f.items():
+            r[k] = v
+        return i
+
+    def add_pending(self, ps):
+        """대기열 시그널 (기존 _SHADOW_PENDING_SIGNALS 원소 dict)"""
+        f = {
+            "kind": KIND_PENDING, "entry": ps["signal_price"], "entry_ts": ps["signal_ts"],
+            "best": ps["best_price"], "worst": ps["worst_price"],
+            "gate_sec": ps["gate_delay_sec"], "gate_max": ps["gate_dd_peak_max"],
+        }
+        f["mi"] = self._market_idx(ps["market"])
+        i = self._put(f)
+        self.meta.append(ps)
+        self._note_rows()
+        return i
+
+    def add_position(self, kind, vp):
+        """가상포지션 / 차단 건 (기존 dict) → 행 + exit_params 컴파일. 지원 범위 밖 파라미터는 ValueError.
+        모든 열 값을 먼저 f 에 컴파일한 뒤 행 할당 → 중간 예외(KeyError/ValueError) 시 북 변경 없음"""
+        ep = vp["exit_params"]
+        ind = vp.get("indicators") or {}
+        route = vp.get("route", "")
+        tiers = ep.get("sl_tiers") or ()
+        ape = ep.get("adaptive_peak_exit")
+        if len(tiers) > MAX_TIERS or (ape and len(ape["peak_zones"]) > MAX_TIERS):
+            raise ValueError(f"sl_tiers/peak_zones > {MAX_TIERS}")
+        f = {
+            "kind": kind,
+            "entry": vp["entry_price"],
+            "last": vp["entry_price"],
+            "best": vp.get("best_price", vp["entry_price"]),
+            "worst": vp.get("worst_price", vp["entry_price"]),
+            "entry_ts": vp["entry_ts"],
+            "snap_on": kind == KIND_VP,
+            "sl": ep.get("sl_pct", 0.007),
+        }
+        if tiers:
+            tier_sec = np.full(MAX_TIERS, -_INF)
+            tier_pct = np.zeros(MAX_TIERS)
+            for j, (t_sec, t_pct) in enumerate(tiers):
+                tier_sec[j] = t_sec
+                tier_pct[j] = t_pct
+            f["tier_sec"], f["tier_pct"] = tier_sec, tier_pct
+        f["checkpoint"] = max(self.cost_floor, ep.get("activation_pct", 0.003))
+        f["trail_pct"] = ep.get("trail_pct", 0.002)
+        f["trail_on"] = not ep.get("disable_trail", False)
+        f["min_hold"] = 120 if route.startswith("G") else 0   # G-variants 트레일/본절 최소보유
+        f["be_on"] = not ep.get("disable_breakeven", False)
+        f["timeout"] = ep.get("max_bars", 60) * self.recheck_sec
+        # 생존 게이트
+        if ep.get("survival_gate_sec"):
+            f["surv_sec"] = ep["survival_gate_sec"]
+            if "survival_min_pnl" in ep:
+                f["surv_min_pnl"] = ep["survival_min_pnl"]
+                f["surv_max_mfe"] = _opt(ep.get("survival_max_mfe"))
+                f["surv_min_mae"] = _opt(ep.get("survival_min_mae"))
+            max_dd = ep.get("survival_max_dd_peak")
+            sda = ep.get("survival_dd_adaptive")
+            if sda:
+                iv = ind.get(sda["ind_key"], 0)
+                for t_max, t_dd in sda["tiers"]:
+                    if iv < t_max:
+                        max_dd = t_dd
+                        break
+            f["surv_max_dd"] = _opt(max_dd)
+        f["early_dd"] = route in ("GT", "SVE1")
+        if ape:
+            f["ape_after"] = ape["hold_until_sec"]
+            f["ape_min_peak"] = ape["min_peak_pct"]
+            f["ape_min_hold"] = ape.get("min_peak_hold_sec", 10)
+            zone_end = np.full(MAX_TIERS, -_INF)
+            zone_ratio = np.zeros(MAX_TIERS)
+            for j, (z_end, z_ratio) in enumerate(ape["peak_zones"]):
+                zone_end[j] = z_end
+                zone_ratio[j] = z_ratio
+            f["zone_end"], f["zone_ratio"] = zone_end, zone_ratio
+        ec = ep.get("early_cut_60s")
+        if ec:
+            f["ec_on"] = True
+            f["ec_mfe"] = ec.get("mfe_thr", 0.001)
+            f["ec_dd"] = ec.get("dd_thr", 0.002)
+        pp = ep.get("profit_protect")
+        if pp:
+            f["pp_act"] = pp["activation_mfe"]
+            f["pp_ret"] = pp["retrace_pct"]
+        at = ep.get("adaptive_trail")
+        at_info = None
+        if at:
+            feat = ind.get(at["feature"])
+            trail, max_hold, label = at["tiers"][-1][1], at["tiers"][-1][2], "default"
+            if feat is not None:
+                for slip_max, t, mh in at["tiers"]:
+                    if feat <= slip_max:
+                        trail, max_hold, label = t, mh, f"slip<={slip_max}"
+                        break
+            f["at_after"] = at["arm_after_sec"]
+            f["at_trail"] = trail
+            f["at_max_hold"] = max_hold
+            f["at_relax_after"] = at.get("relax_after_sec", 9999)
+            f["at_relax_mult"] = at.get("relax_mult", 1.0)
+            at_info = {"ob_slip": feat, "tier": label, "max_hold": max_hold}
+        f["mi"] = self._market_idx(vp["market"])
+        i = self._put(f)
+        if at_info is not None:
+            vp["_at_info"] = at_info
+        self.meta.append(vp)
+        self._note_rows()
+        return i
+
+    def _note_rows(self):
+        if self.n > self.stats["rows_max"]:
+            self.stats["rows_max"] = self.n
+
+    # ---- 평가 ----
+    def _prices(self, price_map):
+        tbl = np.fromiter((price_map.get(m, 0) or 0 for m in self._mkt_names), dtype=np.float64,
+                          count=len(self._mkt_names))
+        return tbl[self.a["mi"][:self.n]]
+
+    def _paths(self, path_map, now):
+        """market → TickPath 맵 → 행별 피벗 (가격, 시각) 배열 [n, K] (없거나 진입 전/평가 시각 이후면 NaN)"""
+        names = self._mkt_names
+        k = max((len(tp.pts) for tp in path_map.values()), default=0)
+        tbl = np.full((len(names) + 1, k, 2), _NAN)   # 마지막 행 = 경로 없음
+        for j, m in enumerate(names):
+            tp = path_map.get(m)
+            if tp is not None:
+                tbl[j, :len(tp.pts)] = tp.pts
+        row = tbl[self.a["mi"][:self.n]]
+        p, t = row[:, :, 0], row[:, :, 1]
+        ok = (t >= self.a["entry_ts"][:self.n, None]) & (t < now)
+        return np.where(ok, p, _NAN), np.where(ok, t, _NAN)
+
+    def step(self, now, price_map, path_map=None):
+        """가격 1회 갱신 → 전 행 상태 전이.
+        path_map: market → TickPath (직전 평가 이후 체결 경로, 체결 스트림). 있으면 피벗을 시각순으로 재생한 뒤
+          현재가 적용 → 구간 중 SL/트레일 히트, MFE/MAE 누락 없음 (진입 이전/평가 시각 이후 피벗은 제외).
+          피벗 점에서는 직전 점→피벗 사이에 걸린 가격 레벨(SL/트레일/본절/PP/AT 스톱) 중 가장 먼저 닿는 최고 레벨로
+          청산 (체결가 = 레벨, 직전 점 가격 상한 — 최저가도 레벨까지만), 레벨 히트 없으면 시간 기반 규칙 순서대로.
+        Returns: (closed, promoted)
+          closed   [(meta, kind, reason, price, ts)] — meta 에 최종 상태 기록됨 (가격없음 청산은 price=0).
+                   ts = 청산 시각 (피벗 청산은 피벗 시각, 그 외 now) → 보유시간은 ts - entry_ts
+          promoted [(meta, price, dd_peak, elapsed)] — 게이트 통과 대기 시그널 (북에서 제거됨, 호출 측이 VP 등록)"""
+        n = self.n
+        if n == 0:
+            return [], []
+        px = self._prices(price_map)
+        reason = np.zeros(n, dtype=np.int8)
+        exit_px = px.copy()
+        exit_ts = np.full(n, float(now))
+        drop = np.zeros(n, dtype=bool)
+        promoted = []
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if path_map:
+                pp, pt = self._paths(path_map, now)
+                for k in range(pp.shape[1]):
+                    has = ~np.isnan(pp[:, k])
+                    if has.any():
+                        self.stats["path_pts"] += int(np.count_nonzero(has))
+                        self._advance(pt[:, k], pp[:, k], has, reason, exit_px, exit_ts, drop, promoted,
+                                      final=False)
+            self._advance(np.full(n, float(now)), px, px > 0, reason, exit_px, exit_ts, drop, promoted, final=True)
+
+        closed = []
+        kind = self.a["kind"][:n]
+        for i in np.flatnonzero(reason):
+            closed.append((self._export(i), int(kind[i]), REASONS[reason[i]], float(exit_px[i]), float(exit_ts[i])))
+        drop |= reason != 0
+        if drop.any():
+            self._compact(~drop)
+        self.stats["closed"] += len(closed)
+        self.stats["promoted"] += len(promoted)
+        self.stats["steps"] += 1
+        return closed, promoted
+
+    def _advance(self, t, px, have, reason, exit_px, exit_ts, drop, promoted, final):
+        """행별 시각 t / 가격 px (have=False 행은 가격 없음) 1점 전이. 이미 청산/폐기된 행은 건너뜀.
+        final=True  (평가 시점 현재가): 기존 _shadow_sim_exit 순서 그대로 첫 해당 사유로 청산
+        final=False (구간 중 피벗): 레벨 히트 중 최고 레벨 우선 (최저가/mae_60s 는 레벨까지만 — 피벗까지 가기 전 청산),
+          청산 시각 = 피벗 시각, 대기열은 최고/최저가만, 가격없음·bars 갱신 없음"""
+        n = self.n
+        a = self.a[:n]
+        hold = t - a["entry_ts"]
+        kind = a["kind"]
+        gone = drop | (reason != 0)
+        pend = (kind == KIND_PENDING) & ~gone
+        entry = a["entry"]
+        best = a["best"]
+        worst = a["worst"]
+        # --- 대기열: gate_delay 경과 후 dd_peak 기반 승격/폐기 (gate×3 초과는 무조건 폐기) ---
+        if pend.any():
+            expire = pend & (hold > a["gate_sec"] * 3) if final else np.zeros(n, dtype=bool)
+            p_live = pend & ~expire & have
+            np.maximum(best, np.where(p_live, px, best), out=best)
+            np.minimum(worst, np.where(p_live, px, worst), out=worst)
+            if final:
+                ready = p_live & (hold >= a["gate_sec"])
+                dd = np.where(entry > 0, (best - px) / entry, 1.0)
+                promote = ready & (dd <= a["gate_max"])
+                for i in np.flatnonzero(promote):
+                    promoted.append((self.meta[i], float(px[i]), float(dd[i]), float(hold[i])))
+                drop |= expire | ready
+        pos = (kind != KIND_PENDING) & ~gone
+        # --- 가격 없음: 일반 포지션만 타임아웃+유예 초과 시 청산 ---
+        if final:
+            reason[pos & ~have & (kind == KIND_VP) & (hold >= a["timeout"] + NO_PRICE_GRACE_SEC)] = _R["가격없음"]
+        live = pos & have
+        if not final:
+            worst0 = worst.copy()                     # 레벨 청산 시 최저가 복원용
+            mae0 = a["mae_60"].copy()
+        np.minimum(worst, np.where(live, px, worst), out=worst)
+        pnl = (px - entry) / entry
+        # PnL 곡선 / 상태 스냅샷 / mae_60s (최고가 갱신 전 — 기존 순서)
+        curve = a["curve"]
+        for j, s in enumerate(self.curve_secs):
+            c = live & np.isnan(curve[:, j]) & (hold >= s)
+            curve[c, j] = np.round(pnl[c], 6)
+        mfe_snap, dd_snap = a["mfe_snap"], a["dd_snap"]
+        snap = live & a["snap_on"]
+        for j, s in enumerate(SNAP_SECS):
+            c = snap & np.isnan(mfe_snap[:, j]) & (hold >= s)
+            mfe_snap[c, j] = np.round((best[c] - entry[c]) / entry[c], 6)
+            dd_snap[c, j] = np.round((best[c] - px[c]) / entry[c], 6)
+        mae60 = a["mae_60"]
+        c = live & (hold <= 60) & (pnl < np.where(np.isnan(mae60), 0.0, mae60))
+        mae60[c] = np.round(pnl[c], 6)
+        # 최고가 갱신 + MFE 도달 시점
+        up = live & (px > best)
+        best[up] = px[up]
+        a["mfe_sec"][up] = hold[up]
+        mfe = (best - entry) / entry
+        dd_now = (best - px) / entry
+        open_ = live.copy()
+        if not final:
+            cand_lv = np.full(n, -_INF)               # 레벨 히트 체결가 (최고 레벨 우선)
+            cand_code = np.zeros(n, dtype=np.int8)
+            time_code = np.zeros(n, dtype=np.int8)    # 레벨 히트 없을 때 첫 시간 기반 사유
+            cap = np.maximum(a["last"], px)
+
+        def _close(mask, code, level=None):
+            hit = open_ & mask
+            code = np.full(n, code, dtype=np.int8) if np.isscalar(code) else code
+            if final:
+                reason[hit] = code[hit]
+                exit_px[hit] = px[hit]
+                open_[hit] = False
+            elif level is None:
+                first = hit & (time_code == 0)
+                time_code[first] = code[first]
+            else:
+                lv = np.minimum(np.maximum(px, level), cap)
+                better = hit & (lv > cand_lv)
+                cand_lv[better] = lv[better]
+                cand_code[better] = code[better]
+            return hit
+
+        # 1) 손절 (티어 SL)
+        in_tier = hold[:, None] < a["tier_sec"]
+        eff_sl = np.where(in_tier.any(axis=1),
+                          a["tier_pct"][np.arange(n), in_tier.argmax(axis=1)], a["sl"])
+        _close(pnl <= -eff_sl, _R["손절SL"], entry * (1 - eff_sl))
+        # 1.5) 생존 게이트
+        g = open_ & ~a["surv_passed"] & (hold >= a["surv_sec"])
+        if g.any():
+            mae_now = (worst - entry) / entry
+            smp, smm, sma, smd = a["surv_min_pnl"], a["surv_max_mfe"], a["surv_min_mae"], a["surv_max_dd"]
+            pnl_fail = (~np.isnan(smp) & (pnl < smp)
+                        & (np.isnan(smm) | (mfe < smm)) & (np.isnan(sma) | (mae_now < sma)))
+            dd_fail = ~np.isnan(smd) & (dd_now > smd)
+            fail = _close(g & (pnl_fail | dd_fail), _R["생존탈락"])
+            a["surv_passed"][g & ~fail] = True
+        # 1.6) GT/SVE1 조기 DD
+        e = a["early_dd"]
+        _close(e & (hold >= 30) & (dd_now > 0.005), _R["DD즉시탈출"])
+        _close(e & (hold >= 60) & (dd_snap[:, 1] > 0.003), _R["초반DD탈출"])
+        # 1.7) adaptive peak exit
+        z = open_ & (hold >= a["ape_after"]) & (mfe >= a["ape_min_peak"])
+        if z.any():
+            stable = hold - np.where(np.isnan(a["mfe_sec"]), hold, a["mfe_sec"])
+            in_zone = hold[:, None] < a["zone_end"]
+            ratio = a["zone_ratio"][np.arange(n), in_zone.argmax(axis=1)]
+            _close(z & (stable >= a["ape_min_hold"]) & in_zone.any(axis=1) & (dd_now > mfe * ratio),
+                   _R["peak_dd"])
+        # 1.8) early cut (60s 1회 판정)
+        c = open_ & a["ec_on"] & (hold >= 60) & ~a["ec_checked"]
+        if c.any():
+            a["ec_checked"][c] = True
+            _close(c & (mfe_snap[:, 1] < a["ec_mfe"]) & (dd_snap[:, 1] > a["ec_dd"]), _R["EC조기절단"])
+        # 2) 트레일 (arm / 스톱 올림 / 히트) + 3) 본절
+        allowed = a["trail_on"] & (hold >= a["min_hold"])
+        armable = open_ & allowed & (mfe >= a["checkpoint"])
+        new_stop = best * (1 - a["trail_pct"])
+        armed, stop = a["trail_armed"], a["trail_stop"]
+        raise_ = armable & (~armed | (new_stop > stop))
+        stop[raise_] = new_stop[raise_]
+        armed |= armable
+        _close(allowed & armed & (px <= stop),
+               np.where(stop > entry, _R["트레일익절"], _R["트레일본절"]).astype(np.int8), stop)
+        _close(allowed & (mfe >= a["checkpoint"]) & (pnl <= 0) & a["be_on"], _R["본절SL"], entry)
+        # 3.4) profit protect
+        retr = (best - px) / (best - entry)
+        _close((mfe >= a["pp_act"]) & (best > entry) & (retr >= a["pp_ret"]),
+               np.where(pnl > 0, _R["PP익절"], _R["PP본절"]).astype(np.int8),
+               best - a["pp_ret"] * (best - entry))
+        # 3.5) adaptive trail
+        t_on = open_ & (hold >= a["at_after"])
+        if t_on.any():
+            trail = a["at_trail"] * np.where(hold >= a["at_relax_after"], a["at_relax_mult"], 1.0)
+            at_new = best * (1 - trail)
+            at_armed, at_stop = a["at_armed"], a["at_stop"]
+            first = t_on & ~at_armed
+            a["at_arm_trail"][first] = trail[first]
+            raise_ = t_on & (~at_armed | (at_new > at_stop))
+            at_stop[raise_] = at_new[raise_]
+            at_armed |= t_on
+            _close(t_on & (px <= at_stop), np.where(at_stop > entry, _R["AT익절"], _R["AT본절"]).astype(np.int8),
+                   at_stop)
+            _close(t_on & (hold >= a["at_max_hold"]), _R["AT타임아웃"])
+        # 4) 타임아웃
+        _close(hold >= a["timeout"], _R["타임아웃"])
+        if final:
+            a["bars"][open_] += 1
+        else:
+            lvl = cand_code != 0
+            reason[lvl] = cand_code[lvl]
+            exit_px[lvl] = cand_lv[lvl]
+            exit_ts[lvl] = t[lvl]
+            # 레벨 체결 → 피벗 극값까지 보유하지 않음: 최저가/mae_60s 를 이 점 이전 값 ∧ 레벨로
+            worst[lvl] = np.minimum(worst0[lvl], cand_lv[lvl])
+            mae60[lvl] = mae0[lvl]
+            lv_pnl = (cand_lv - entry) / entry
+            c = lvl & (hold <= 60) & (lv_pnl < np.where(np.isnan(mae0), 0.0, mae0))
+            mae60[c] = np.round(lv_pnl[c], 6)
+            tm = ~lvl & (time_code != 0)
+            reason[tm] = time_code[tm]
+            exit_px[tm] = px[tm]
+            exit_ts[tm] = t[tm]
+        a["last"][live] = px[live]
+
+    def _export(self, i):
+        """행 상태 → meta dict (기존 가상포지션 dict 키)"""
+        r = self.a[i]
+        vp = self.meta[i]
+        vp["entry_price"] = float(r["entry"])
+        vp["best_price"] = float(r["best"])
+        vp["worst_price"] = float(r["worst"])
+        vp["trail_armed"] = bool(r["trail_armed"])
+        vp["trail_stop"] = float(r["trail_stop"])
+        vp["bars"] = int(r["bars"])
+        if not math.isnan(r["mfe_sec"]):
+            vp["_mfe_sec"] = float(r["mfe_sec"])
+        for j, s in enumerate(SNAP_SECS):
+            if not math.isnan(r["mfe_snap"][j]):
+                vp[f"mfe_{s}s"] = float(r["mfe_snap"][j])
+                vp[f"dd_peak_{s}s"] = float(r["dd_snap"][j])
+        if not math.isnan(r["mae_60"]):
+            vp["mae_60s"] = float(r["mae_60"])
+        vp["pnl_curve"] = {str(s): float(v) for s, v in zip(self.curve_secs, r["curve"]) if not math.isnan(v)}
+        if r["at_armed"]:
+            info = vp.get("_at_info") or {}
+            vp["_at_meta"] = {"ob_slip": info.get("ob_slip"), "tier": info.get("tier", "default"),
+                              "base_trail_pct": round(float(r["at_arm_trail"]) * 100, 3),
+                              "max_hold": info.get("max_hold")}
+        return vp
+
+    def _compact(self, keep):
+        idx = np.flatnonzero(keep)
+        k = len(idx)
+        self.a[:k] = self.a[:self.n][idx]
+        self.meta = [self.meta[i] for i in idx]
+        self.n = k
+
+    def status_str(self):
+        s = self.stats
+        return (f"rows={self.n} (vp={self.count(KIND_VP)} blk={self.count(KIND_BLOCKED)} "
+                f"pend={self.count(KIND_PENDING)}) max={s['rows_max']} steps={s['steps']} "
+                f"closed={s['closed']} promoted={s['promoted']} path_pts={s['path_pts']} last={s['last_ms']:.1f}ms max={s['max_ms']:.1f}ms")
@@ -0,0 +1,477 @@
+# -*- coding: utf-8 -*-
+"""
+섀도우 route 통계 스케치 (고정 메모리)
+=====================================
+bot.py 섀도우 리듀서(_shadow_apply_result / _shadow_apply_blocked)와 리포트가 쓰는 자료구조.
+표준 라이브러리만 사용.
+
+- RingBuffer      최근 N개 float (array 고정 용량) — pnls / mfes / hold_secs / sl_hit_secs
+                  (기존 list.append + [-200:] 슬라이스 재할당 대체, len/iter/sum 은 list 와 동일하게 동작)
+- QuantileSketch  상대오차 로그 버킷 분위수 스케치 (누적, 버킷 수 상한) — PnL/MFE/보유시간 전체 분포
+- FeatureHist     지표값 로그 bin 별 [승, 패, pnl합] + 승/패 모멘트 — 윈도우 증분 (add/remove)
+                  → 임계치 sweep / 통과 건수 / 분위수 / d-score 를 레코드 재순회 없이 O(bins)
+- pack_records / unpack_records
+                  trade_records / fail_values (dict 리스트) ↔ 열 지향 압축 (숫자열 = float32/float64/int64 base64)
+                  → shadow_stats.json 에서 키 문자열·소수 텍스트 반복 제거
+
+bin 경계: (γ^(k-1), γ^k] — 지표 γ=1.02 (대표값 상대오차 ≤1%), 분위수 γ=1.05 (≤2.5%), 음수는 부호 반전 인덱스.
+"""
+
+import math, base64, itertools
+from array import array
+
+SKETCH_VERSION = 1
+
+
+class LogBins:
+    """부호 로그 bin: (γ^(k-1), γ^k] — |v| < min_abs 는 0 bin, 음수는 부호 반전 인덱스"""
+    __slots__ = ("gamma", "lg", "off")
+
+    def __init__(self, gamma, min_abs=1e-9):
+        self.gamma = gamma
+        self.lg = math.log(gamma)
+        self.off = 1 - math.floor(math.log(min_abs) / self.lg)   # |v| ≥ min_abs → 인덱스 ≥ 1
+
+    def index(self, v):
+        a = abs(v)
+        k = math.ceil(math.log(a) / self.lg) + self.off if a > 0 else 0
+        if k <= 0:
+            return 0
+        return k if v > 0 else -k
+
+    def value(self, i):
+        """bin 대표값 (구간 내 상대오차 최소 지점)"""
+        if i == 0:
+            return 0.0
+        v = 2.0 * self.gamma ** (abs(i) - self.off) / (self.gamma + 1.0)
+        return v if i > 0 else -v
+
+
+FEATURE_BINS = LogBins(1.02)            # 지표값 — sweep 스텝(±5%) 보다 촘촘하게 (상대오차 ≤1%)
+QUANTILE_BINS = LogBins(1.05, 1e-6)     # 분위수 — 상대오차 ≤2.5%, 수익률 0.0001% 미만은 0
+bin_index = FEATURE_BINS.index
+bin_value = FEATURE_BINS.value
+
+
+def passes(v, th, direction):
+    """필터 통과 판정 (bot.py _threshold_sweep 의 _passes 와 동일 의미)"""
+    if direction == "gte":
+        return v >= th
+    if direction == "gt":
+        return v > th
+    if direction == "lte":
+        return v <= th
+    if direction == "lt":
+        return v < th
+    return False
+
+
+def _b64(a):
+    return base64.b64encode(a.tobytes()).decode("ascii")
+
+
+def _unb64(code, s):
+    a = array(code)
+    a.frombytes(base64.b64decode(s))
+    return a
+
+
+# =========================================================
+# 링버퍼
+# =========================================================
+class RingBuffer:
+    """고정 용량 float 링 (오래된 → 최신 순회). list 대신 넣어도 len / iter / sum / bool 동작 동일"""
+    __slots__ = ("cap", "_a", "_i")
+
+    def __init__(self, cap, data=()):
+        self.cap = int(cap)
+        self._a = array("d")
+        self._i = 0
+        for x in list(data)[-self.cap:]:
+            self._a.append(float(x))
+
+    def append(self, x):
+        if len(self._a) < self.cap:
+            self._a.append(x)
+        else:
+            self._a[self._i] = x
+            self._i = (self._i + 1) % self.cap
+
+    def __len__(self):
+        return len(self._a)
+
+    def __iter__(self):
+        return itertools.chain(self._a[self._i:], self._a[:self._i])
+
+    def to_list(self):
+        return list(self)
+
+    def mean(self):
+        return sum(self._a) / len(self._a) if self._a else 0.0
+
+    def copy(self):
+        r = RingBuffer.__new__(RingBuffer)
+        r.cap, r._a, r._i = self.cap, array("d", self._a), self._i
+        return r
+
+    def to_json(self):
+        return {"_rb": self.cap, "f4": _b64(array("f", self))}
+
+    @classmethod
+    def from_json(cls, d, cap=None):
+        """{"_rb"} 압축형 또는 기존 list → RingBuffer (float32 저장값은 소수 5자리로 환원)"""
+        if isinstance(d, RingBuffer):
+            return d
+        if isinstance(d, dict) and "_rb" in d:
+            return cls(cap or d["_rb"], (round(x, 5) for x in _unb64("f", d["f4"])))
+        return cls(cap or 200, d or ())
+
+    def __repr__(self):
+        return f"RingBuffer(cap={self.cap}, n={len(self._a)})"
+
+
+# =========================================================
+# 분위수 스케치
+# =========================================================
+class QuantileSketch:
+    """로그 버킷 분위수 스케치 — 상대오차 ≈2.5%, 버킷 수 max_bins 초과 시 0 에 가장 가까운 버킷부터 0 bin 으로 병합
+    (작은 |값| 쪽 정밀도만 잃음: 수익률/보유시간 꼬리는 유지)"""
+    __slots__ = ("bins", "n", "total", "max_bins")
+
+    def __init__(self, max_bins=256):
+        self.bins = {}
+        self.n = 0
+        self.total = 0.0
+        self.max_bins = max_bins
+
+    def add(self, v):
+        i = QUANTILE_BINS.index(v)
+        self.bins[i] = self.bins.get(i, 0) + 1
+        self.n += 1
+        self.total += v
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        while len(self.bins) > self.max_bins:
+            k = min((i for i in self.bins if i != 0), key=abs)
+            self.bins[0] = self.bins.get(0, 0) + self.bins.pop(k)
+
+    def mean(self):
+        return self.total / self.n if self.n else 0.0
+
+    def quantile(self, q):
+        if not self.n:
+            return None
+        rank = q * (self.n - 1)
+        seen = 0
+        for i in sorted(self.bins, key=QUANTILE_BINS.value):
+            seen += self.bins[i]
+            if seen > rank:
+                return QUANTILE_BINS.value(i)
+        return QUANTILE_BINS.value(max(self.bins, key=QUANTILE_BINS.value))
+
+    def quantiles(self, qs=(0.1, 0.5, 0.9)):
+        if not self.n:
+            return [None] * len(qs)
+        order = sorted(self.bins, key=QUANTILE_BINS.value)
+        out = []
+        for q in qs:
+            rank = q * (self.n - 1)
+            seen = 0
+            val = QUANTILE_BINS.value(order[-1])
+            for i in order:
+                seen += self.bins[i]
+                if seen > rank:
+                    val = QUANTILE_BINS.value(i)
+                    break
+            out.append(val)
+        return out
+
+    def copy(self):
+        s = QuantileSketch(self.max_bins)
+        s.bins, s.n, s.total = dict(self.bins), self.n, self.total
+        return s
+
+    def to_json(self):
+        keys = sorted(self.bins)
+        return {"_qs": SKETCH_VERSION, "n": self.n, "t": round(self.total, 6), "m": self.max_bins,
+                "k": _b64(array("i", keys)), "c": _b64(array("I", (self.bins[k] for k in keys)))}
+
+    @classmethod
+    def from_json(cls, d):
+        if isinstance(d, QuantileSketch):
+            return d
+        s = cls(d.get("m", 256))
+        s.n, s.total = d.get("n", 0), d.get("t", 0.0)
+        s.bins = dict(zip(_unb64("i", d["k"]), _unb64("I", d["c"])))
+        return s
+
+    def __repr__(self):
+        return f"QuantileSketch(n={self.n}, bins={len(self.bins)})"
+
+
+# =========================================================
+# 지표 히스토그램 (윈도우 증분)
+# =========================================================
+class FeatureHist:
+    """지표값 bin → [승, 패, pnl합] + 결과별 모멘트 [n, Σ(x-k), Σ(x-k)²] (승=pnl>0, k=첫 값 이동 — 큰 값 지표 분산 상쇄 오차 방지).
+    add(v, pnl) / remove(v, pnl) 로 레코드 윈도우와 동기화 — 질의는 모두 bin 단위 O(bins). 비유한 값은 무시."""
+    __slots__ = ("bins", "mw", "ml", "k")
+
+    def __init__(self):
+        self.bins = {}
+        self.mw = [0, 0.0, 0.0]
+        self.ml = [0, 0.0, 0.0]
+        self.k = None
+
+    def add(self, v, pnl, sign=1):
+        if not math.isfinite(v):
+            return
+        i = bin_index(v)
+        b = self.bins.get(i)
+        if b is None:
+            b = self.bins[i] = [0, 0, 0.0]
+        win = pnl > 0
+        b[0 if win else 1] += sign
+        b[2] += sign * pnl
+        if self.k is None:
+            self.k = v
+        x = v - self.k
+        m = self.mw if win else self.ml
+        m[0] += sign
+        m[1] += sign * x
+        m[2] += sign * x * x
+        if sign < 0 and b[0] <= 0 and b[1] <= 0:
+            del self.bins[i]
+
+    def remove(self, v, pnl):
+        self.add(v, pnl, -1)
+
+    def copy(self):
+        h = FeatureHist.__new__(FeatureHist)
+        h.bins = {i: b[:] for i, b in self.bins.items()}
+        h.mw, h.ml, h.k = self.mw[:], self.ml[:], self.k
+        return h
+
+    @property
+    def n(self):
+        return self.mw[0] + self.ml[0]
+
+    # ---- 모멘트 / d-score ----
+    def _mv(self, m):
+        n = m[0]
+        if n <= 0:
+            return 0, 0.0, 0.0
+        mean = m[1] / n
+        return n, mean + self.k, max(m[2] / n - mean * mean, 0.0)
+
+    def moments(self, outcome=None):
+        """(n, mean, 모분산) — outcome: "W" / "L" / None(전체)"""
+        if outcome == "W":
+            return self._mv(self.mw)
+        if outcome == "L":
+            return self._mv(self.ml)
+        return self._mv([self.mw[0] + self.ml[0], self.mw[1] + self.ml[1], self.mw[2] + self.ml[2]])
+
+    def d_score(self, min_n=5, floor_std=0.0001):
+        """승/패 평균 차이 / pooled std (bot.py d-score 와 같은 (var_w+var_l)/2 풀링) → (d, w_mean, l_mean) 또는 None"""
+        nw, mw, vw = self.moments("W")
+        nl, ml, vl = self.moments("L")
+        if nw < min_n or nl < min_n:
+            return None
+        return abs(mw - ml) / max(((vw + vl) / 2) ** 0.5, floor_std), mw, ml
+
+    # ---- 임계치 질의 ----
+    def sweep(self, th, direction):
+        """임계치 th 통과 bin 합계 → (n, wins, pnl_sum).
+        th 는 자기 bin 대표값으로 맞춰 비교 — th 와 같은 값(소수 반올림된 기록값이 경계에 몰림)은 gte/lte 에 포함, gt/lt 에서 제외"""
+        th = bin_value(bin_index(th))
+        n = w = 0
+        p = 0.0
+        for i, b in self.bins.items():
+            if passes(bin_value(i), th, direction):
+                n += b[0] + b[1]
+                w += b[0]
+                p += b[2]
+        return n, w, p
+
+    def cumulative(self, direction):
+        """통과 범위를 넓혀 가는 순서의 (대표값, 누적 n, 누적 wins, 누적 pnl) — 후보 임계치 전체를 한 번에"""
+        rev = direction in ("gte", "gt")
+        out = []
+        n = w = 0
+        p = 0.0
+        for i in sorted(self.bins, key=bin_value, reverse=rev):
+            b = self.bins[i]
+            n += b[0] + b[1]
+            w += b[0]
+            p += b[2]
+            out.append((bin_value(i), n, w, p))
+        return out
+
+    def count_ge(self, th):
+        """값 ≥ th 건수 (sweep 과 같은 th bin 정렬)"""
+        th = bin_value(bin_index(th))
+        return sum(b[0] + b[1] for i, b in self.bins.items() if bin_value(i) >= th)
+
+    def quantile(self, q):
+        tot = self.n
+        if tot <= 0:
+            return None
+        rank = q * (tot - 1)
+        seen = 0
+        order = sorted(self.bins, key=bin_value)
+        for i in order:
+            seen += self.bins[i][0] + self.bins[i][1]
+            if seen > rank:
+                return bin_value(i)
+        return bin_value(order[-1])
+
+    def at_rank(self, r):
+        """오름차순 r번째(0부터) 값의 bin 대표값 — sorted(values)[r] 근사"""
+        seen = 0
+        for i in sorted(self.bins, key=bin_value):
+            seen += self.bins[i][0] + self.bins[i][1]
+            if seen > r:
+                return bin_value(i)
+        return None
+
+    def min_value(self):
+        return bin_value(min(self.bins, key=bin_value)) if self.bins else None
+
+    def __repr__(self):
+        return f"FeatureHist(n={self.n}, bins={len(self.bins)})"
+
+
+# =========================================================
+# 레코드 열 지향 압축
+# =========================================================
+def _num_col(vals):
+    """숫자 열 → (typecode, base64). 결측 = NaN (float) / 정수열은 int64 (결측 없을 때만)"""
+    present = [v for v in vals if v is not None]
+    if present and len(present) == len(vals) and all(type(v) is int for v in present):
+        return "q", _b64(array("q", vals))
+    fvals = [float("nan") if v is None else float(v) for v in vals]
+    f4 = array("f", fvals)
+    # float32 왕복 후 기존 반올림(소수 5자리)으로 복원 가능한 열만 float32
+    if all(v is None or round(y, 5) == v for v, y in zip(vals, f4)):
+        return "f", _b64(f4)
+    return "d", _b64(array("d", fvals))
+
+
+def pack_records(records):
+    """dict 리스트 → 열 지향 dict. 1단 중첩 dict(inds / curve)는 "inds.rsi_5m" 처럼 펼침.
+    숫자(int/float, bool 제외)는 packed 열, 그 외(str/None/list)는 JSON 리스트 열."""
+    n = len(records)
+    cols = {}       # name → [values] (결측 None)
+    kinds = {}      # name → "num" / "obj"
+    nested = {}     # 상위 키 → 하위 dict 존재 여부 (빈 dict 포함)
+    for r_i, r in enumerate(records):
+        for k, v in r.items():
+            if isinstance(v, dict):
+                nested.setdefault(k, [False] * n)[r_i] = True
+                for sk, sv in v.items():
+                    name = f"{k}.{sk}"
+                    _put(cols, kinds, name, n, r_i, sv)
+            else:
+                _put(cols, kinds, k, n, r_i, v)
+    num, obj, missing = {}, {}, {}
+    for name, vals in cols.items():
+        if kinds[name] == "num":
+            num[name] = list(_num_col(vals))
+        else:
+            obj[name] = [None if v is _MISSING else v for v in vals]
+            miss = [i for i, v in enumerate(vals) if v is _MISSING]
+            if miss:
+                missing[name] = miss
+    out = {"_cols": SKETCH_VERSION, "n": n, "num": num, "obj": obj}
+    if missing:
+        out["miss"] = missing
+    if nested:
+        out["nest"] = {k: [i for i, f in enumerate(flags) if f] for k, flags in nested.items()}
+    return out
+
+
+_MISSING = object()
+
+
+def _put(cols, kinds, name, n, r_i, v):
+    is_num = isinstance(v, (int, float)) and not isinstance(v, bool)
+    col = cols.get(name)
+    if col is None:
+        kinds[name] = "num" if is_num else "obj"
+        col = cols[name] = [None if is_num else _MISSING] * n
+    elif kinds[name] == "num" and not is_num:
+        # 숫자열에 비숫자 값 등장 → obj 열로 전환 (결측 표시 보존)
+        kinds[name] = "obj"
+        cols[name] = col = [_MISSING if x is None else x for x in col]
+    col[r_i] = v
+
+
+def unpack_records(packed):
+    """pack_records 역변환. 기존 list 형식은 그대로 반환 (하위 호환)"""
+    if not isinstance(packed, dict) or "_cols" not in packed:
+        return packed if isinstance(packed, list) else []
+    n = packed["n"]
+    recs = [{} for _ in range(n)]
+    for k, idx in packed.get("nest", {}).items():
+        for i in idx:
+            recs[i][k] = {}
+    for name, (code, data) in packed.get("num", {}).items():
+        top, _, sub = name.partition(".")
+        vals = _unb64(code, data)
+        for i, v in enumerate(vals):
+            if code != "q":
+                if v != v:  # NaN = 결측
+                    continue
+                v = round(v, 5) if code == "f" else v
+            if sub:
+                recs[i].setdefault(top, {})[sub] = v
+            else:
+                recs[i][name] = v
+    for name, vals in packed.get("obj", {}).items():
+        top, _, sub = name.partition(".")
+        miss = set(packed.get("miss", {}).get(name, ()))
+        for i, v in enumerate(vals):
+            if i in miss:
+                continue
+            if sub:
+                recs[i].setdefault(top, {})[sub] = v
+            else:
+                recs[i][name] = v
+    return recs
+
+
+# =========================================================
+# route 통계 dict 인코딩 (JSON 저장용)
+# =========================================================
+_PACKED_LIST_FIELDS = ("trade_records", "fail_values")
+
+
+def encode_stats(stats):
+    """{key: route통계} → JSON 직렬화 가능한 dict (링/스케치 → 압축형, 레코드 리스트 → 열 지향).
+    입력은 변경하지 않음 (호출 측이 락 안에서 구조 복사 후 넘기는 전제)"""
+    out = {}
+    for key, s in stats.items():
+        d = {}
+        for f, v in s.items():
+            if isinstance(v, (RingBuffer, QuantileSketch)):
+                v = v.to_json()
+            elif f in _PACKED_LIST_FIELDS and isinstance(v, list) and v:
+                v = pack_records(v)
+            d[f] = v
+        out[key] = d
+    return out
+
+
+def decode_stats(stats):
+    """encode_stats 역변환 (제자리) — 레코드 열 → dict 리스트. 링/스케치 압축형은 그대로 둠 (리듀서가 수화)"""
+    for s in stats.values():
+        if not isinstance(s, dict):
+            continue
+        for f in _PACKED_LIST_FIELDS:
+            v = s.get(f)
+            if isinstance(v, dict) and "_cols" in v:
+                s[f] = unpack_records(v)
+    return stats
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""테스트 공통: 저장소 루트 모듈(bot, mock_exchange, shadow_book ...) 임포트 경로"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
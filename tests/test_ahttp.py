@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""AsyncUpbitClient 동일 GET 합치기 — 요청 1회, 대기자마다 독립 객체"""
+import asyncio
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import bot
+
+
+class _SlowJson(BaseHTTPRequestHandler):
+    hits = 0
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        type(self).hits += 1
+        time.sleep(0.2)   # 요청이 in-flight 인 동안 나머지 대기자가 합류하도록
+        body = json.dumps([{"market": "KRW-A", "trade_price": 100.0, "units": [1, 2]}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    _SlowJson.hits = 0
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _SlowJson)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}/v1/ticker"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_coalesced_waiters_get_independent_copies(server):
+    cli = bot.AsyncUpbitClient(pool_size=4, coalesce=True)
+    cli.start()
+
+    async def _all():
+        return await asyncio.gather(*(cli.get_json(server, {"markets": "KRW-A"}) for _ in range(4)))
+
+    try:
+        res = asyncio.run_coroutine_threadsafe(_all(), cli.loop).result(timeout=10)
+    finally:
+        cli.close()
+        cli.loop.call_soon_threadsafe(cli.loop.stop)
+    assert _SlowJson.hits == 1
+    assert cli.stats["coalesced"] == 3
+    assert all(r == res[0] for r in res)
+    assert len({id(r) for r in res}) == 4
+    assert len({id(r[0]["units"]) for r in res}) == 4
+    res[0][0]["trade_price"] = 0.0       # 한 호출부의 제자리 수정이 다른 대기자에게 보이지 않음
+    res[1][0]["units"].append(3)
+    assert [r[0]["trade_price"] for r in res[1:]] == [100.0] * 3
+    assert res[2][0]["units"] == [1, 2]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""🚫 필터검증 이상치 → 차단값/통과값 히스토그램 임계치 탐색 (레코드 재순회 결과와 같은 건수·합계)"""
+import random
+import threading
+
+import pytest
+
+import bot
+from shadow_sketch import bin_index, bin_value
+
+PKEY = "SVE1:s1"
+BKEY = "SVE1:vol_burst_vr5_fail"
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    rng = random.Random(3)
+    trs = [{"pnl": rng.gauss(0.001, 0.01), "inds": {"vr5": round(rng.uniform(2.0, 6.0), 4)}} for _ in range(80)]
+    # 차단값 1.2~2.0 (vr5 ≥ 2.0 하한 필터) — 1.6 이상은 수익, 미만은 손실
+    fvs = []
+    for _ in range(60):
+        v = round(rng.uniform(1.2, 1.999), 4)
+        fvs.append({"v": v, "pnl": round(0.01 if v >= 1.6 else -0.01, 5)})
+    perf = {PKEY: {"route": "SVE1", "strat": "s1", "trade_records": trs}}
+    blocked = {BKEY: {"route": "SVE1", "strat": "s1", "filter": "vol_burst_vr5_fail", "signals": 60,
+                      "wins": sum(1 for f in fvs if f["pnl"] > 0), "fail_values": fvs,
+                      "fail_threshold": 2.0, "fail_direction": "gte"}}
+    monkeypatch.setattr(bot, "_SHADOW_PERF_STATS", perf)
+    monkeypatch.setattr(bot, "_SHADOW_BLOCKED_STATS", blocked)
+    monkeypatch.setattr(bot, "_SHADOW_ROUTE_AGG", {})
+    monkeypatch.setattr(bot, "_SHADOW_BLOCKED_AGG", {})
+    return trs, fvs
+
+
+def test_sweep_lines_match_record_scan(stats):
+    trs, fvs = stats
+    with bot._SHADOW_PERF_LOCK:
+        lines = bot._blocked_sweep_lines(BKEY, bot._SHADOW_BLOCKED_STATS[BKEY])
+        best = bot._threshold_sweep(bot._shadow_blocked_agg(BKEY), 2.0, "gte",
+                                    bot._shadow_route_agg(PKEY).ind.get("vr5"))
+    assert len(lines) == 2 and "임계치 2.0→" in lines[0] and lines[1].startswith("    ↳ ±5%: 풀기")
+    # 최적 대안 = 수익 구간(≥1.6) 안 (평균 pnl 최대), 신규 통과 건수/전체 건수 = 레코드 직접 집계 (bin 대표값 기준)
+    assert 1.55 <= best["new_th"] < 2.0
+    assert best["fail_avg_pnl"] == 1.0
+    fail_n = sum(1 for f in fvs if round(bin_value(bin_index(f["v"])), 4) >= best["new_th"])
+    assert best["fail_n"] == fail_n
+    assert best["total_n"] == len(trs) + fail_n
+    assert best["fail_wr"] == 100.0
+
+
+def test_report_render_uses_snapshot_without_lock(stats):
+    with bot._SHADOW_PERF_LOCK:
+        want = bot._blocked_sweep_lines(BKEY, bot._SHADOW_BLOCKED_STATS[BKEY])
+    snap = bot._report_snapshot()
+    out = {}
+
+    def _run():
+        bot._REPORT_VIEW.snap = snap
+        try:
+            out["r"] = bot._blocked_sweep_lines(BKEY, snap["blocked"][BKEY])
+        finally:
+            bot._REPORT_VIEW.snap = None
+
+    with bot._SHADOW_PERF_LOCK:
+        t = threading.Thread(target=_run, daemon=True)
+        t.start()
+        t.join(5)
+    assert not t.is_alive()
+    assert out["r"] == want
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""캔들 저장소 — 마감 유예 직후 기록한 봉은 다음 최신 페이지 값으로 덮어씀 (과거 백필 페이지는 기존 값 유지)"""
+from candle_store import CandleStore, CLOSE_GRACE_MS, iso_utc
+
+BAR = 60000
+T0 = 1_700_000_040_000 // BAR * BAR
+
+
+def _c(start, close, vol=1.0, last=None):
+    return {"candle_date_time_utc": iso_utc(start)[:-1], "opening_price": 100.0, "high_price": max(100.0, close),
+            "low_price": min(100.0, close), "trade_price": close, "candle_acc_trade_volume": vol,
+            "candle_acc_trade_price": vol * close, "timestamp": last or start + BAR - 500}
+
+
+def _closes(st):
+    return [(r["trade_price"], r["candle_acc_trade_volume"]) for r in st.read("KRW-A", 1)]
+
+
+def test_latest_page_restates_last_bar(tmp_path):
+    st = CandleStore(str(tmp_path))
+    # T0+2분 봉 마감 + 유예 직후: REST 가 마지막 체결(101.5, +0.5)을 아직 반영 못 한 값
+    now = T0 + 3 * BAR + CLOSE_GRACE_MS
+    page = [_c(T0 + 2 * BAR, 101.0), _c(T0 + BAR, 100.5), _c(T0, 100.0)]
+    assert st.write("KRW-A", 1, page, now_ms=now) == 3
+    assert _closes(st)[-1] == (101.0, 1.0)
+
+    # 다음 조회: 마지막 저장 봉 + 새 봉 → 저장 봉은 제자리 덮어쓰기, 새 봉은 append
+    now += BAR
+    page = [_c(T0 + 3 * BAR, 102.0), _c(T0 + 2 * BAR, 101.5, vol=1.5)]
+    assert st.write("KRW-A", 1, page, now_ms=now) == 1
+    assert _closes(st) == [(100.0, 1.0), (100.5, 1.0), (101.5, 1.5), (102.0, 1.0)]
+    assert st.stats["restated"] == 1
+    assert st.stats["rewrites"] == 0
+
+    # 같은 값 재조회는 쓰기 없음
+    assert st.write("KRW-A", 1, page, now_ms=now) == 0
+    assert st.stats["restated"] == 1
+
+
+def test_history_page_does_not_restate(tmp_path):
+    st = CandleStore(str(tmp_path))
+    now = T0 + 5 * BAR + CLOSE_GRACE_MS
+    st.write("KRW-A", 1, [_c(T0 + i * BAR, 100.0 + i) for i in range(5)][::-1], now_ms=now)
+    # 과거 방향 백필 페이지 (to 지정): 겹치는 봉 값이 달라도 기존 기록 유지, 빈 구간만 채움
+    hist = [_c(T0 + BAR, 999.0), _c(T0 - BAR, 99.0)]
+    assert st.write("KRW-A", 1, hist, to_ms=T0 + 2 * BAR, now_ms=now) == 1
+    assert [p for p, _ in _closes(st)] == [99.0, 100.0, 101.0, 102.0, 103.0, 104.0]
+    assert st.stats["restated"] == 0
+
+
+def test_restate_with_mid_insert_rewrites_once(tmp_path):
+    st = CandleStore(str(tmp_path))
+    now = T0 + 4 * BAR + CLOSE_GRACE_MS
+    st.write("KRW-A", 1, [_c(T0 + 3 * BAR, 103.0), _c(T0, 100.0)], now_ms=now)
+    # 최신 페이지가 빠져 있던 중간 봉(T0+1,2분) + 보정된 마지막 봉을 함께 가져옴
+    page = [_c(T0 + 3 * BAR, 103.5), _c(T0 + 2 * BAR, 102.0), _c(T0 + BAR, 101.0)]
+    assert st.write("KRW-A", 1, page, now_ms=now) == 2
+    assert [p for p, _ in _closes(st)] == [100.0, 101.0, 102.0, 103.5]
+    assert st.stats["restated"] == 1
+    assert st.stats["rewrites"] == 1
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""청산 매도 미체결 — 지연 체결 재확인은 타이머 yield 제너레이터로 넘기고 즉시 반환 (청산 락 유지)"""
+import pytest
+
+import bot
+
+M = "KRW-UNF"
+
+
+class _FakeEngine:
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, m, gen, fallback_sec, on_done=None):
+        self.jobs.append((m, gen, fallback_sec))
+
+
+@pytest.fixture
+def env(monkeypatch):
+    sent, trades, bal = [], [], {"v": 1.0}
+    eng = _FakeEngine()
+    monkeypatch.setattr(bot, "AUTO_TRADE", True)
+    monkeypatch.setattr(bot, "_EXIT_ENGINE", eng)
+    monkeypatch.setattr(bot, "OPEN_POSITIONS", {M: {"entry_price": 100.0, "volume": 1.0, "entry_ts": 0}})
+    monkeypatch.setattr(bot, "_CLOSING_MARKETS", set())
+    monkeypatch.setattr(bot, "get_actual_balance", lambda m: 1.0)
+    monkeypatch.setattr(bot, "get_balance_with_locked", lambda m, retries=2: bal["v"])
+    monkeypatch.setattr(bot, "safe_upbit_get", lambda *a, **k: [{"trade_price": 101.0}])
+    monkeypatch.setattr(bot, "place_market_sell", lambda *a, **k: {"uuid": "u1"})
+    monkeypatch.setattr(bot, "get_order_result", lambda u, timeout_sec=10.0: {"trades": [], "avg_price": "102"})
+    monkeypatch.setattr(bot, "tg_send", lambda t, *a, **k: sent.append(t))
+    monkeypatch.setattr(bot, "tg_send_mid", lambda t: sent.append(t))
+    monkeypatch.setattr(bot, "record_trade", lambda m, pnl, *a, **k: trades.append(pnl))
+    monkeypatch.setattr(bot, "update_trade_result", lambda *a, **k: None)
+    return eng, bal, sent, trades
+
+
+def test_unfilled_sell_hands_off_timer_generator(env):
+    eng, bal, sent, trades = env
+    bot.close_auto_position(M, "test")
+
+    # 블로킹 재확인 없이 반환, 청산 락은 제너레이터가 보유
+    assert len(eng.jobs) == 1
+    m, gen, _ = eng.jobs[0]
+    assert m == M and M in bot._CLOSING_MARKETS and M in bot.OPEN_POSITIONS
+
+    assert next(gen) == 2.0
+    assert next(gen) == 2.0                     # 잔고 남음 → 계속 대기
+    bal["v"] = 0.0
+    with pytest.raises(StopIteration) as e:
+        next(gen)
+    assert e.value.value is True
+    assert M not in bot.OPEN_POSITIONS and M not in bot._CLOSING_MARKETS
+    assert trades and trades[0] == pytest.approx(0.02 - bot.FEE_RATE_ROUNDTRIP)
+    assert any("지연확인" in t for t in sent)
+
+
+def test_unfilled_sell_releases_lock_after_recheck_window(env):
+    eng, bal, sent, trades = env
+    bot.close_auto_position(M, "test")
+    gen = eng.jobs[0][1]
+    for _ in range(16):                         # 30초 재확인 15회 + 후속 감시 첫 대기
+        assert next(gen) == 2.0
+    assert M not in bot._CLOSING_MARKETS        # 후속 감시는 락 없이 (기존과 같음)
+    assert any("미체결" in t for t in sent)
+    gen.close()
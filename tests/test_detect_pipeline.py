@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""탐지 파이프라인 사이클 토큰 — 타임아웃/조기 종료 후 남은 워커는 마킹·후보 게시 없이 종료"""
+import threading
+import time
+
+import pytest
+
+import bot
+
+
+@pytest.fixture
+def pipe(monkeypatch):
+    """detect_leader_stock 을 느린 통과로 대체 — 마켓별 precheck 통과 시각 기록"""
+    done = {}
+    release = threading.Event()
+
+    def _slow_detect(m, obc, c1=None, tight_mode=False):
+        release.wait(float(m.rsplit("-", 1)[1]) * 0.2)
+        done[m] = time.time()
+        return {"market": m, "signal_tag": "T", "entry_mode": "confirm"}
+
+    monkeypatch.setattr(bot, "detect_leader_stock", _slow_detect)
+    monkeypatch.setattr(bot, "_get_c1_cached", lambda m, n: [{"trade_price": 1.0}])
+    monkeypatch.setattr(bot, "postcheck_6s", lambda m, pre: (True, ""))
+    monkeypatch.setattr(bot, "_POSTCHECK_ENGINE", None)
+    monkeypatch.setattr(bot, "CIRCLE_ENTRY_ENABLED", False)
+    monkeypatch.setattr(bot, "DETECT_PIPE_ENABLED", True)
+    monkeypatch.setattr(bot, "recent_alerts", {})
+    return done
+
+
+def _wait_idle(done, n, timeout=5.0):
+    deadline = time.time() + timeout
+    while len(done) < n and time.time() < deadline:
+        time.sleep(0.02)
+    time.sleep(0.1)   # 마지막 워커의 precheck 이후 단계까지
+
+
+def test_timeout_cancels_remaining_workers(monkeypatch, pipe):
+    monkeypatch.setattr(bot, "DETECT_PIPE_TIMEOUT_SEC", 0.5)
+    shard = [f"KRW-{i}" for i in range(1, 5)]           # precheck 0.2/0.4/0.6/0.8초
+    c0 = bot._METRICS.value("pipe_cancelled")
+    items = list(bot._detect_pipeline_run(shard, {}, False))
+    assert [it[0] for it in items] == ["KRW-1", "KRW-2"]
+    _wait_idle(pipe, len(shard))
+    # 타임아웃 이후 precheck 를 마친 워커는 recent_alerts 마킹 없이 종료
+    assert set(bot.recent_alerts) == {"KRW-1", "KRW-2"}
+    assert bot._METRICS.value("pipe_cancelled") - c0 == 2
+
+
+def test_consumer_close_cancels_workers(pipe):
+    shard = [f"KRW-{i}" for i in range(1, 4)]
+    gen = bot._detect_pipeline_run(shard, {}, False)
+    first = next(gen)
+    gen.close()                                        # 소비 측 조기 종료 (GeneratorExit)
+    _wait_idle(pipe, len(shard))
+    assert first[0] == "KRW-1"
+    assert set(bot.recent_alerts) == {"KRW-1"}
+
+
+def test_stale_postcheck_moves_pass_to_stale(monkeypatch):
+    import queue
+    monkeypatch.setattr(bot, "_POSTCHECK_READY", queue.Queue())
+    monkeypatch.setattr(bot, "_POSTCHECK_STATS", {"submitted": 2, "passed": 2, "failed": 0, "stale": 0,
+                                                 "errors": 0, "ms_sum": 0.0})
+    monkeypatch.setattr(bot, "_POSTCHECK_ENGINE", object())
+    monkeypatch.setattr(bot, "_shadow_log_write", lambda *a, **k: None)
+    monkeypatch.setattr(bot, "recent_alerts", {"KRW-OLD": 1})
+    now = time.time()
+    bot._POSTCHECK_READY.put(("KRW-OLD", {"signal_tag": "T"}, [], None, now - bot.POSTCHECK_READY_MAX_AGE_SEC - 1))
+    bot._POSTCHECK_READY.put(("KRW-NEW", {"signal_tag": "T"}, [], None, now))
+    b0 = bot._METRICS.value("postcheck_block")
+
+    out = bot._postcheck_collect()
+
+    assert [it[0] for it in out] == ["KRW-NEW"]
+    s = bot._POSTCHECK_STATS
+    assert (s["passed"], s["stale"]) == (1, 1)          # 통과 1 + 폐기 1 = 완료 2 (이중 계수 없음)
+    assert bot._METRICS.value("postcheck_block") - b0 == 1
+    assert "KRW-OLD" not in bot.recent_alerts
+    assert "pass=1 fail=0 stale=1" in bot._postcheck_status_str()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+OrderExecutionEngine ↔ mock_exchange 통합 테스트
+- 지정가 부분체결 → 취소 → 잔여 시장가 (hybrid_buy)
+- 체결 확인 경로: private 스트림(myOrder) vs REST /v1/order 폴링 (푸시 전량 유실)
+- 최종 잔고: 주문 엔진 캐시/REST 와 거래소 원장 일치
+"""
+import random
+import threading
+import time
+
+import pytest
+
+import bot
+import mock_exchange as mx
+
+MARKET = "KRW-TEST"
+KRW0 = 1_000_000.0
+ASK1 = 1000.0
+BUY_KRW = 100_000
+PARTIAL = 0.4
+
+
+def _wait_until(cond, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def exchange(request, monkeypatch):
+    """모의 거래소(REST + private WS) 임시 포트 기동 + bot 주문 경로를 mock 으로 연결"""
+    drop_ws = getattr(request, "param", 0.0)
+    random.seed(7)
+    ex = mx.MockExchange(KRW0, ASK1, fill_delay=0.1, partial=PARTIAL, drop_ws=drop_ws)
+    monkeypatch.setattr(mx, "EX", ex)
+    ws_srv = mx._WsServer(("127.0.0.1", 0), mx.PrivateWsHandler)
+    rest_srv = mx.ThreadingHTTPServer(("127.0.0.1", 0), mx.RestHandler)
+    for srv in (ws_srv, rest_srv):
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    eng = bot.OrderExecutionEngine(f"ws://127.0.0.1:{ws_srv.server_address[1]}")
+    monkeypatch.setattr(bot, "UPBIT_REST_URL", f"http://127.0.0.1:{rest_srv.server_address[1]}")
+    monkeypatch.setattr(bot, "UPBIT_ACCESS_KEY", "test-access-key")
+    monkeypatch.setattr(bot, "UPBIT_SECRET_KEY", "test-secret-key-0123456789abcdef")
+    monkeypatch.setattr(bot, "_ORDER_ENGINE", eng)
+    monkeypatch.setattr(bot, "ORDER_REST_POLL_SEC", 0.2)
+    # 슬리피지 가드/매도 최소금액용 현재가 → 모의 거래소 가격 (공개 API 호출 차단)
+    monkeypatch.setattr(bot, "safe_upbit_get",
+                        lambda url, params=None, **kw: [{"trade_price": ex.prices.get(MARKET, ASK1)}])
+    monkeypatch.setattr(bot, "_live_trade_log_entry", lambda **kw: None)
+
+    eng.start()
+    assert _wait_until(lambda: eng.is_live() and ex.clients), "private 스트림 연결 실패"
+    yield ex, eng
+    eng.stop()
+    for srv in (ws_srv, rest_srv):
+        srv.shutdown()
+        srv.server_close()
+
+
+def _ob(ask=ASK1, bid=ASK1 - 1):
+    return {"raw": {"orderbook_units": [{"ask_price": ask, "bid_price": bid}]}}
+
+
+def _orders(ex, ord_type):
+    with ex.lock:
+        return [od for od in ex.orders.values() if od["market"] == MARKET and od["ord_type"] == ord_type]
+
+
+def _buy_partial_then_market(ex):
+    """hybrid_buy → (지정가 40% 체결 + 취소) → 잔여 시장가 완료까지 대기, (limit, market) 주문 반환"""
+    res = bot.hybrid_buy(MARKET, BUY_KRW, ob_data=_ob(), timeout_sec=0.6)
+    assert res and res.get("uuid")
+    (limit,) = _orders(ex, "limit")
+    (market,) = _orders(ex, "price")
+    assert limit["uuid"] == res["uuid"]
+    od = bot.get_order_result(market["uuid"], timeout_sec=3.0)
+    assert od and od["state"] == "done"
+    return limit, market
+
+
+def _expected_krw(ex):
+    with ex.lock:
+        spent = sum(od["executed_funds"] + od["paid_fee"] for od in ex.orders.values() if od["side"] == "bid")
+        got = sum(od["executed_funds"] - od["paid_fee"] for od in ex.orders.values() if od["side"] == "ask")
+    return KRW0 - spent + got
+
+
+def _account(cur):
+    for a in bot.get_account_info():
+        if a["currency"] == cur:
+            return float(a["balance"]), float(a["locked"])
+    return 0.0, 0.0
+
+
+def test_partial_fill_then_market_remainder_via_stream(exchange):
+    ex, eng = exchange
+    limit, market = _buy_partial_then_market(ex)
+
+    # 지정가: 100개 중 40% 체결 후 취소 → 잔여 60개분 시장가
+    assert limit["state"] == "cancel"
+    assert limit["executed_volume"] == pytest.approx(BUY_KRW / ASK1 * PARTIAL)
+    assert market["price"] == pytest.approx(BUY_KRW * (1 - PARTIAL))
+    # 완료/취소는 모두 스트림으로 확인 (REST 안전 조회는 미완료 상태만 봄)
+    assert eng.stats["stream_fills"] >= 2
+    assert eng.stats["rest_fills"] == 0
+
+    # 최종 잔고: myAsset 캐시 == REST 계좌 == 원장
+    coin = limit["executed_volume"] + market["executed_volume"]
+    assert _wait_until(lambda: bot.get_balance_with_locked(MARKET) == pytest.approx(coin))
+    assert eng.stats["bal_hits"] >= 1
+    assert bot.get_actual_balance(MARKET) == pytest.approx(coin)
+    assert _account("TEST") == (pytest.approx(coin), pytest.approx(0.0))
+    krw_bal, krw_locked = _account("KRW")
+    assert krw_locked == pytest.approx(0.0, abs=1e-6)
+    assert krw_bal == pytest.approx(_expected_krw(ex))
+    assert krw_bal == pytest.approx(KRW0 - BUY_KRW * (1 + mx.FEE_RATE))
+
+
+@pytest.mark.parametrize("exchange", [1.0], indirect=True)
+def test_partial_fill_then_market_remainder_via_rest_polling(exchange):
+    ex, eng = exchange
+    limit, market = _buy_partial_then_market(ex)
+
+    assert limit["state"] == "cancel"
+    assert limit["executed_volume"] == pytest.approx(BUY_KRW / ASK1 * PARTIAL)
+    assert market["price"] == pytest.approx(BUY_KRW * (1 - PARTIAL))
+    # 푸시 전량 유실 → 완료는 REST /v1/order 폴링으로만 확인
+    assert eng.stats["stream_fills"] == 0
+    assert eng.stats["rest_fills"] >= 2
+    assert eng.stats["orders"] == 0
+
+    coin = limit["executed_volume"] + market["executed_volume"]
+    assert bot.get_balance_with_locked(MARKET) == pytest.approx(coin)
+    krw_bal, krw_locked = _account("KRW")
+    assert krw_locked == pytest.approx(0.0, abs=1e-6)
+    assert krw_bal == pytest.approx(_expected_krw(ex))
+
+
+def test_sell_all_returns_to_krw(exchange):
+    ex, eng = exchange
+    _buy_partial_then_market(ex)
+    coin = _account("TEST")[0]
+    assert _wait_until(lambda: bot.get_actual_balance(MARKET) == pytest.approx(coin))
+
+    res = bot.sell_all(MARKET)
+    assert res and res.get("uuid")
+    od = bot.get_order_result(res["uuid"], timeout_sec=3.0)
+    assert od and od["state"] == "done"
+    assert float(od["executed_volume"]) == pytest.approx(coin)
+
+    # 수량 8자리 반올림 찌꺼기(<1e-8)만 남음
+    assert _wait_until(lambda: bot.get_balance_with_locked(MARKET) == pytest.approx(0.0, abs=1e-7))
+    assert _account("TEST") == (pytest.approx(0.0, abs=1e-7), pytest.approx(0.0, abs=1e-7))
+    assert _account("KRW")[0] == pytest.approx(_expected_krw(ex))
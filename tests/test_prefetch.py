@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""캔들 프리페처 — 봉 안에서도 캐시 TTL 전에 재프리페치 (경계 1회 fetch 후 TTL 만료 구간 없음)"""
+import bot
+
+T0 = 1_700_000_100 // 900 * 900
+
+
+def _pf(monkeypatch):
+    monkeypatch.setattr(bot, "_md_stream_candles", lambda m, unit, count: None)
+    pf = bot.CandlePrefetcher((15,), {15: 50}, 1.5, 0.5, {15: 90.0}, 0.8)
+    pf._markets = ["KRW-A", "KRW-B"]
+    return pf
+
+
+def test_refresh_rounds_cover_whole_bar(monkeypatch):
+    pf = _pf(monkeypatch)
+    pf._next_due[15] = T0
+    pf._enqueue_due(T0 + 2)                       # 경계 라운드
+    assert {k: v[2] for k, v in pf._jobs.items()} == {(15, "KRW-A"): True, (15, "KRW-B"): True}
+    pf._jobs.clear()
+
+    fired = []
+    t = T0 + 2
+    while t < T0 + 900:
+        pf._enqueue_due(t)
+        if pf._jobs:
+            fired.append(t)
+            assert all(not v[2] for v in pf._jobs.values())
+            pf._jobs.clear()
+        t += 1
+    # 72s 간격 — 마지막 갱신 + TTL 90s 가 다음 경계를 넘음
+    gaps = [b - a for a, b in zip([T0 + 2] + fired, fired)]
+    assert gaps and max(gaps) <= 72
+    assert fired[-1] + 90 >= T0 + 900
+    assert pf._next_refresh[15] >= pf._next_due[15]    # 다음 갱신은 경계 라운드가 대신함
+
+
+def test_refresh_does_not_supersede_pending_edge_jobs(monkeypatch):
+    pf = _pf(monkeypatch)
+    pf._next_due[15] = T0
+    pf._enqueue_due(T0 + 2)
+    pf._jobs.pop((15, "KRW-A"))
+    pf._enqueue_due(T0 + 2 + 72)
+    assert pf._jobs[(15, "KRW-B")][2] is True     # 밀린 경계 작업 유지
+    assert pf._jobs[(15, "KRW-A")][2] is False
+    assert pf.stats["superseded"] == 0
+
+
+def test_refresh_job_skips_entry_valid_past_next_refresh(monkeypatch):
+    pf = _pf(monkeypatch)
+    calls = []
+    monkeypatch.setattr(bot, "get_minutes_candles", lambda unit, m, count: calls.append(m) or [{"x": 1}])
+    monkeypatch.setattr(bot, "_C15_CACHE", bot.LRUCache(8))
+    due = T0 + 74.0
+    # 다음 재프리페치(due+72) 시점에도 TTL 90s 안 → skip
+    bot._C15_CACHE.set("KRW-A", {"ts": int((due - 10) * 1000), "c": [], "count": 50, "pf": True})
+    # 경계 fetch 후 72s 지남 → 다음 재프리페치 전에 만료되므로 갱신
+    bot._C15_CACHE.set("KRW-B", {"ts": int((due - 72) * 1000), "c": [], "count": 50, "pf": True})
+    assert pf._run_job(15, "KRW-A", due, False) is False
+    assert pf._run_job(15, "KRW-B", due, False) is True
+    assert calls == ["KRW-B"]
+    assert pf.stats["refresh"] == 1 and pf.stats["skip_fresh"] == 1
+    assert bot._C15_CACHE.get("KRW-B")["pf"] is True
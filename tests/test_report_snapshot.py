@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""리포트 스냅샷 — 렌더 스레드는 윈도우 집계도 스냅샷 복사본에서 읽고 _SHADOW_PERF_LOCK 을 잡지 않음"""
+import random
+import threading
+
+import pytest
+
+import bot
+
+KEY = "SVE1:test"
+
+
+def _records(n, seed=5):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        dd = rng.choice([0.001, 0.004, 0.008])
+        out.append({"pnl": rng.gauss(0.001, 0.01), "market": "KRW-A",
+                    "inds": {"dd_peak_60s": dd, "vr5": rng.random() * 5, "rsi_5m": rng.uniform(30, 80),
+                             "mae_60s": -rng.random() * 0.01},
+                    "curve": {"60": rng.gauss(0, 0.005)}})
+    return out
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    perf = {KEY: {"route": "SVE1", "trade_records": _records(60), "coin_wl": {"KRW-A": [3, 1]}}}
+    monkeypatch.setattr(bot, "_SHADOW_PERF_STATS", perf)
+    monkeypatch.setattr(bot, "_SHADOW_BLOCKED_STATS", {"B:test": {"fail_values": [{"v": 1.0, "pnl": 0.01}]}})
+    monkeypatch.setattr(bot, "_SHADOW_ROUTE_AGG", {})
+    monkeypatch.setattr(bot, "_SHADOW_BLOCKED_AGG", {})
+    return perf
+
+
+def _render(snap, fn):
+    """렌더 스레드 흉내 — 스냅샷 뷰로 fn 실행 (락 대기 시 타임아웃)"""
+    out = {}
+
+    def _run():
+        bot._REPORT_VIEW.snap = snap
+        try:
+            out["r"] = fn()
+        finally:
+            bot._REPORT_VIEW.snap = None
+
+    t = threading.Thread(target=_run, daemon=True)
+    t.start()
+    t.join(5)
+    assert not t.is_alive(), "렌더가 _SHADOW_PERF_LOCK 대기"
+    return out["r"]
+
+
+def test_snapshot_aggs_are_independent(stats):
+    snap = bot._report_snapshot()
+    want = bot._shadow_route_agg(KEY).survival_groups()
+    with bot._SHADOW_PERF_LOCK:
+        live = bot._shadow_route_agg(KEY)
+        for tr in _records(20, seed=9):
+            live.add(tr)
+        bot._shadow_blocked_agg("B:test").add(2.0, -0.01)
+    assert snap["route_agg"][KEY].survival_groups() == want
+    assert snap["route_agg"][KEY].n == 60
+    assert snap["blocked_agg"]["B:test"].n == 1
+
+
+def test_survival_analysis_on_snapshot_does_not_take_lock(stats):
+    live = bot._survival_analysis(routes={"SVE1"})
+    snap = bot._report_snapshot()
+    with bot._SHADOW_PERF_LOCK:           # 메인 루프가 락을 쥐고 있어도 렌더는 진행
+        got = _render(snap, lambda: bot._survival_analysis(routes={"SVE1"}))
+    assert got["SVE1"]["groups"] == live["SVE1"]["groups"]
+    assert got["SVE1"]["d_scores"] == live["SVE1"]["d_scores"]
+
+
+def test_coin_bias_replaced_not_mutated(monkeypatch, stats):
+    old = {"KRW-Z": (1, 1, 0.0)}
+    monkeypatch.setattr(bot, "_COIN_BIAS", old)
+    snap = bot._report_snapshot()
+    with bot._SHADOW_PERF_LOCK:
+        _render(snap, bot._update_coin_bias)
+    assert old == {"KRW-Z": (1, 1, 0.0)}                # 스캔 스레드가 들고 있던 dict 는 불변
+    assert bot._COIN_BIAS["KRW-Z"] == (1, 1, 0.0)
+    w, l, avg = bot._COIN_BIAS["KRW-A"]
+    assert (w, l) == (3, 1)
+    assert avg == pytest.approx(sum(t["pnl"] for t in stats[KEY]["trade_records"]) / 60)
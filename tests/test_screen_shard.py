@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""벡터 스크리너 — 제외 마켓은 퍼널에서 detect 진입 + pre-cut(scr) 탈락으로 계수"""
+import pytest
+
+pytest.importorskip("numpy")
+
+import bot
+
+
+def _bars(bull, n=10):
+    o, c = (100.0, 101.0) if bull else (101.0, 100.0)
+    return [{"opening_price": o, "high_price": 101.5, "low_price": 99.5, "trade_price": c,
+             "candle_acc_trade_price": 1e6} for _ in range(n)]
+
+
+def test_pruned_markets_count_as_pre_cut(monkeypatch):
+    plan = {"n_shadow": 0, "routes": [], "live": [("BB", {"check_fn": bot._v0_check_broad_bullish})]}
+    c1s = {"KRW-A": _bars(True), "KRW-B": _bars(False), "KRW-C": None, "KRW-D": _bars(False)}
+    monkeypatch.setattr(bot, "SCREENER_ENABLED", True)
+    monkeypatch.setattr(bot, "_strategy_plan", lambda: plan)
+    monkeypatch.setattr(bot, "_screen_c1_nofetch", lambda m, count: c1s[m])
+    det0, cut0 = bot._METRICS.value("detect_called"), bot._METRICS.value("pre_cut_screen")
+
+    out = bot.screen_shard(list(c1s))
+
+    assert out == ["KRW-A", "KRW-C"]                         # 판정 불가(C)는 통과, 음봉(B/D) 제외
+    assert bot._METRICS.value("pre_cut_screen") - cut0 == 2
+    assert bot._METRICS.value("detect_called") - det0 == 2   # 통과분은 _detect_pipe_market 에서 계수
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+ShadowBook (벡터 북) ↔ _shadow_step_legacy (dict 리스트 순차 _shadow_sim_exit) 동치성
+- 같은 랜덤 가격 경로(가격 조회 실패 포함)를 양쪽에 넣고 청산 사유 / PnL / MFE / MAE / 보유시간 /
+  스냅샷(mfe_XXs, dd_peak_XXs, mae_60s, pnl_curve) / AT 티어가 같은지
+- 체결 경로(TickPath) 피벗 청산: 청산 시각 = 피벗 시각, 레벨 청산 최저가 = 레벨
+- add_position 파라미터 해석 실패 시 북 불변
+"""
+import copy
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import bot
+from shadow_book import ShadowBook, TickPath, KIND_VP, KIND_BLOCKED, KIND_PENDING
+
+T0 = 1_700_000_000.0
+N_POS = 300
+N_PENDING = 30
+N_STEPS = 200
+MARKETS = [f"KRW-C{i}" for i in range(40)]
+SNAP_KEYS = ("mfe_peak_sec", "mfe_30s", "mfe_60s", "dd_peak_60s", "mfe_240s", "dd_peak_240s",
+             "mae_60s", "at_trail_pct", "at_tier")
+
+
+def _scenario(seed):
+    """레지스트리 전략 exit_params 로 가상포지션/차단 건/대기 시그널 + 마켓별 랜덤워크 가격 경로"""
+    rng = random.Random(seed)
+    strats = list(bot._STRATEGY_REGISTRY.items())
+    positions = []
+    for j in range(N_POS):
+        name, st = rng.choice(strats)
+        ep = dict(st.get("exit_params", bot._V4_DEFAULT_EXIT))
+        ind = {"ob_slip_sell_300k": rng.choice([None, 0.05, 0.2, 0.6]), "vr5": rng.random() * 5}
+        at = ep.get("adaptive_trail")
+        if at:
+            ind[at["feature"]] = rng.choice([None, 0.05, 0.2, 0.6, 2.0])
+        sda = ep.get("survival_dd_adaptive")
+        if sda:
+            ind[sda["ind_key"]] = rng.random() * 3
+        kind = KIND_VP if j % 3 else KIND_BLOCKED
+        positions.append((kind, {
+            "id": j, "route": st.get("route", "?"), "strat": name, "market": rng.choice(MARKETS),
+            "entry_price": 100.0, "entry_ts": T0 - rng.uniform(0, 5), "best_price": 100.0,
+            "worst_price": 100.0, "trail_armed": False, "trail_stop": 0.0, "exit_params": ep,
+            "bars": 0, "indicators": ind, "pnl_curve": {}, "_pullback_delay_sec": 0,
+        }))
+    for j in range(N_PENDING):
+        positions.append((KIND_PENDING, {
+            "id": 1000 + j, "route": "GATE", "strat": "gate", "market": rng.choice(MARKETS),
+            "signal_price": 100.0, "signal_ts": T0, "best_price": 100.0, "worst_price": 100.0,
+            "gate_delay_sec": 30, "gate_dd_peak_max": 0.003,
+            "exit_params": dict(bot._V4_DEFAULT_EXIT), "indicators": {},
+        }))
+    px = {m: 100.0 for m in MARKETS}
+    steps = []
+    for _ in range(N_STEPS):
+        for m in MARKETS:
+            px[m] *= 1 + rng.gauss(0, 0.0025)
+        steps.append({m: (0 if rng.random() < 0.01 else round(px[m], 3)) for m in MARKETS})
+    return positions, steps
+
+
+def _run(monkeypatch, positions, steps, book_on):
+    clock = [T0]
+    monkeypatch.setattr(bot.time, "time", lambda: clock[0])
+    lists = {bot._SHADOW_VP: [], bot._SHADOW_BLK: [], bot._SHADOW_PEND: []}
+    monkeypatch.setattr(bot, "_SHADOW_POS_LISTS", lists)
+    monkeypatch.setattr(bot, "_SHADOW_VIRTUAL_POSITIONS", lists[bot._SHADOW_VP])
+    monkeypatch.setattr(bot, "_SHADOW_BLOCKED_POSITIONS", lists[bot._SHADOW_BLK])
+    monkeypatch.setattr(bot, "_SHADOW_PENDING_SIGNALS", lists[bot._SHADOW_PEND])
+    monkeypatch.setattr(bot, "_SHADOW_TICK_MKTS", frozenset())
+    monkeypatch.setattr(bot, "_SHADOW_BOOK", ShadowBook(
+        bot._SHADOW_PNL_SNAP_SECS, bot.RECHECK_SEC, bot.FEE_RATE + 0.001 + bot.PROFIT_CHECKPOINT_MIN_ALPHA)
+        if book_on else None)
+    for cap in ("SHADOW_MAX_VIRTUAL_POS", "SHADOW_MAX_BLOCKED_POS",
+                "SHADOW_BOOK_MAX_VIRTUAL_POS", "SHADOW_BOOK_MAX_BLOCKED_POS"):
+        monkeypatch.setattr(bot, cap, 10 ** 6)
+    with bot._SHADOW_LOCK:
+        for kind, pos in positions:
+            bot._shadow_add_position(kind, copy.deepcopy(pos))
+    step = bot._shadow_step_book if book_on else bot._shadow_step_legacy
+    out = {}
+    for k, price_map in enumerate(steps):
+        clock[0] = T0 + bot.RECHECK_SEC * (k + 1)
+        closed, blocked = step(clock[0], price_map)
+        for vp, pnl, mfe, mae, reason, hold, ind, curve in closed:
+            key = ("vp", vp.get("id") or vp["signal_id"], vp["market"], vp["indicators"].get("gate_elapsed"))
+            snaps = {f: vp.get(f, ind.get(f)) for f in SNAP_KEYS}
+            out[key] = (k, reason, pnl, mfe, mae, hold, snaps, dict(curve))
+        for vp, pnl, mfe, mae, reason, hold in blocked:
+            out[("blocked", vp["id"])] = (k, reason, pnl, mfe, mae, hold)
+    return out
+
+
+@pytest.mark.parametrize("seed", [7, 11, 23])
+def test_book_matches_legacy_on_random_paths(monkeypatch, seed):
+    positions, steps = _scenario(seed)
+    legacy = _run(monkeypatch, positions, steps, book_on=False)
+    book = _run(monkeypatch, positions, steps, book_on=True)
+
+    assert len(legacy) > N_POS // 2          # 대부분 경로에서 청산 발생 (비교 대상이 비지 않게)
+    assert book.keys() == legacy.keys()
+    for key, want in legacy.items():
+        got = book[key]
+        k, reason = want[:2]
+        assert got[:2] == (k, reason), key
+        assert got[2:6] == pytest.approx(want[2:6], rel=1e-9, abs=1e-12), (key, reason)
+        if key[0] == "vp":
+            assert got[6] == want[6], (key, reason)   # 스냅샷 / AT 티어
+            assert got[7] == want[7], (key, reason)   # pnl_curve
+
+
+def test_add_position_failure_leaves_book_unchanged():
+    book = ShadowBook((30, 60), 3, 0.002)
+    good = {"market": "KRW-A", "entry_price": 100.0, "entry_ts": T0, "exit_params": {}}
+    book.add_position(KIND_VP, good)
+    bad = [
+        {"market": "KRW-B", "entry_price": 100.0, "entry_ts": T0,
+         "exit_params": {"profit_protect": {"activation_mfe": 0.01}}},          # retrace_pct 누락
+        {"market": "KRW-B", "entry_price": 100.0, "entry_ts": T0,
+         "exit_params": {"sl_tiers": [(i, 0.01) for i in range(10)]}},          # 티어 상한 초과
+        {"market": "KRW-B", "entry_ts": T0, "exit_params": {}},                 # entry_price 누락
+    ]
+    for vp in bad:
+        with pytest.raises((KeyError, ValueError)):
+            book.add_position(KIND_VP, vp)
+    with pytest.raises(KeyError):
+        book.add_pending({"market": "KRW-B", "signal_price": 100.0})
+    assert book.n == len(book.meta) == 1
+    assert book.meta[0] is good
+
+    closed, _ = book.step(T0 + 3, {"KRW-A": 90.0})
+    assert [(m is good, reason, ts) for m, _, reason, _, ts in closed] == [(True, "손절SL", T0 + 3)]
+
+
+def _path(points):
+    tp = TickPath(points[0][0], points[0][1], 0.0005, 24)
+    for p, ts in points[1:]:
+        tp.add(p, ts)
+    return tp
+
+
+def test_path_level_exit_uses_pivot_time_and_level_mae():
+    book = ShadowBook((30, 60), 3, 0.002)
+    vp = {"market": "KRW-A", "entry_price": 100.0, "entry_ts": T0,
+          "exit_params": {"sl_pct": 0.01, "disable_trail": True, "disable_breakeven": True}}
+    book.add_position(KIND_VP, vp)
+    # 100 → 98 (T0+4, SL 99 관통) → 99.5 (평가 시각 T0+10 현재가)
+    tp = _path([(100.0, T0 + 1), (98.0, T0 + 4), (99.5, T0 + 7)])
+    closed, _ = book.step(T0 + 10, {"KRW-A": 99.5}, {"KRW-A": tp})
+    assert len(closed) == 1
+    meta, kind, reason, price, ts = closed[0]
+    assert (meta is vp, kind, reason) == (True, KIND_VP, "손절SL")
+    assert price == pytest.approx(99.0)                 # 체결가 = SL 레벨
+    assert ts == T0 + 4                                 # 피벗 시각 (평가 시각 T0+10 아님)
+    assert meta["worst_price"] == pytest.approx(99.0)   # MAE -1% (피벗 98 의 -2% 아님)
+    assert meta["mae_60s"] == pytest.approx(-0.01)
+
+
+def test_path_time_exit_uses_pivot_time():
+    book = ShadowBook((30, 60), 3, 0.002)
+    vp = {"market": "KRW-A", "entry_price": 100.0, "entry_ts": T0,
+          "exit_params": {"max_bars": 1, "disable_trail": True, "disable_breakeven": True}}
+    book.add_position(KIND_VP, vp)
+    # 타임아웃 3초 → T0+5 피벗(99.8)에서 청산
+    tp = _path([(100.1, T0 + 1), (99.8, T0 + 5), (100.2, T0 + 8)])
+    closed, _ = book.step(T0 + 10, {"KRW-A": 100.2}, {"KRW-A": tp})
+    assert [(r, p, ts) for _, _, r, p, ts in closed] == [("타임아웃", 99.8, T0 + 5)]
+    assert closed[0][0]["worst_price"] == pytest.approx(99.8)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""shadow_sketch: RingBuffer / QuantileSketch to_json↔from_json, pack_records↔unpack_records, encode/decode_stats,
+FeatureHist 윈도우 동기(add/remove) · sweep · 모멘트"""
+import json
+import random
+
+import pytest
+
+from shadow_sketch import (RingBuffer, QuantileSketch, FeatureHist, pack_records, unpack_records,
+                           encode_stats, decode_stats, bin_index, bin_value, passes)
+
+
+def _json_rt(obj):
+    """실제 저장 경로와 같게 JSON 텍스트를 거침"""
+    return json.loads(json.dumps(obj))
+
+
+# ---- RingBuffer ----
+def test_ring_buffer_keeps_last_cap_in_order():
+    rb = RingBuffer(5)
+    for x in range(12):
+        rb.append(float(x))
+    assert len(rb) == 5
+    assert rb.to_list() == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert sum(rb) == sum(range(7, 12))
+    assert rb.mean() == pytest.approx(9.0)
+    assert RingBuffer(3, [1, 2, 3, 4]).to_list() == [2.0, 3.0, 4.0]
+
+
+def test_ring_buffer_json_round_trip():
+    rng = random.Random(1)
+    rb = RingBuffer(200)
+    vals = [round(rng.gauss(0, 0.02), 5) for _ in range(450)]   # 저장값 = 소수 5자리 (리듀서와 동일)
+    for v in vals:
+        rb.append(v)
+    back = RingBuffer.from_json(_json_rt(rb.to_json()))
+    assert back.cap == 200
+    assert back.to_list() == vals[-200:]
+    back.append(1.0)                        # 복원 후에도 순서·용량 유지
+    assert back.to_list() == vals[-199:] + [1.0]
+    # 기존 list 형식(하위 호환) / 용량 재지정
+    assert RingBuffer.from_json([0.1, 0.2, 0.3], cap=2).to_list() == [0.2, 0.3]
+
+
+def test_ring_buffer_copy_is_independent():
+    rb = RingBuffer(3, [1, 2, 3])
+    cp = rb.copy()
+    rb.append(4)
+    assert cp.to_list() == [1.0, 2.0, 3.0]
+    assert rb.to_list() == [2.0, 3.0, 4.0]
+
+
+# ---- QuantileSketch ----
+def test_quantile_sketch_json_round_trip():
+    rng = random.Random(2)
+    qs = QuantileSketch()
+    for _ in range(5000):
+        qs.add(rng.gauss(0.001, 0.01))
+    back = QuantileSketch.from_json(_json_rt(qs.to_json()))
+    assert back.bins == qs.bins
+    assert back.n == qs.n
+    assert back.max_bins == qs.max_bins
+    assert back.total == pytest.approx(qs.total, abs=1e-6)
+    assert back.quantiles((0.1, 0.5, 0.9)) == qs.quantiles((0.1, 0.5, 0.9))
+
+
+def test_quantile_sketch_relative_error():
+    rng = random.Random(3)
+    vals = [rng.lognormvariate(3, 1) for _ in range(4000)]     # 보유시간 같은 양수 꼬리 분포
+    qs = QuantileSketch()
+    for v in vals:
+        qs.add(v)
+    exact = sorted(vals)
+    for q in (0.1, 0.5, 0.9, 0.99):
+        assert qs.quantile(q) == pytest.approx(exact[int(q * (len(vals) - 1))], rel=0.03)
+    assert qs.mean() == pytest.approx(sum(vals) / len(vals))
+
+
+def test_quantile_sketch_collapse_keeps_count_and_tails():
+    qs = QuantileSketch(max_bins=16)
+    vals = [(-1) ** i * 10 ** (i % 8 - 6) for i in range(400)]
+    for v in vals:
+        qs.add(v)
+    assert len(qs.bins) <= 16
+    assert qs.n == len(vals)
+    assert sum(qs.bins.values()) == len(vals)
+    assert qs.quantile(1.0) == pytest.approx(max(vals), rel=0.03)
+    assert qs.quantile(0.0) == pytest.approx(min(vals), rel=0.03)
+
+
+# ---- FeatureHist ----
+def _fh_pairs(seed, n=300):
+    rng = random.Random(seed)
+    return [(round(rng.uniform(0.5, 8.0), 4), round(rng.gauss(0.001, 0.01), 5)) for _ in range(n)]
+
+
+def test_feature_hist_sweep_matches_record_scan():
+    pairs = _fh_pairs(6)
+    h = FeatureHist()
+    for v, p in pairs:
+        h.add(v, p)
+    for direction in ("gte", "gt", "lte", "lt"):
+        for th in (1.0, 2.5, 4.0, 7.5):
+            thb = bin_value(bin_index(th))
+            sel = [(v, p) for v, p in pairs if passes(bin_value(bin_index(v)), thb, direction)]
+            n, w, pnl = h.sweep(th, direction)
+            assert (n, w) == (len(sel), sum(1 for _, p in sel if p > 0)), (direction, th)
+            assert pnl == pytest.approx(sum(p for _, p in sel), abs=1e-9)
+    cum = h.cumulative("gte")
+    assert cum[-1][1] == len(pairs) and [c[0] for c in cum] == sorted((c[0] for c in cum), reverse=True)
+
+
+def test_feature_hist_window_remove_and_moments():
+    pairs = _fh_pairs(7)
+    h = FeatureHist()
+    for v, p in pairs:
+        h.add(v, p)
+    for v, p in pairs[:200]:                  # 윈도우 퇴출
+        h.remove(v, p)
+    ref = FeatureHist()
+    for v, p in pairs[200:]:
+        ref.add(v, p)
+    assert h.n == ref.n == 100
+    assert h.bins.keys() == ref.bins.keys()
+    for outcome in ("W", "L", None):
+        got, want = h.moments(outcome), ref.moments(outcome)
+        assert got[0] == want[0]
+        assert got[1:] == pytest.approx(want[1:], rel=1e-6, abs=1e-9)
+    vals = [v for v, _ in pairs[200:]]
+    mean = sum(vals) / len(vals)
+    assert h.moments()[1] == pytest.approx(mean)
+    assert h.moments()[2] == pytest.approx(sum((v - mean) ** 2 for v in vals) / len(vals))
+
+
+def test_feature_hist_copy_is_independent():
+    h = FeatureHist()
+    for v, p in _fh_pairs(8, 50):
+        h.add(v, p)
+    cp = h.copy()
+    h.add(3.0, 0.02)
+    assert cp.n == 50 and h.n == 51
+    assert cp.sweep(0.0, "gte")[0] == 50
+
+
+# ---- pack_records / unpack_records ----
+def _records():
+    rng = random.Random(4)
+    recs = []
+    for i in range(60):
+        r = {
+            "ts": 1_700_000_000 + i,                          # int 열 → int64
+            "pnl": round(rng.gauss(0, 0.01), 5),              # float32 로 복원 가능한 열
+            "price": rng.uniform(1, 1e6),                     # float64 열
+            "reason": rng.choice(["손절SL", "AT익절", "타임아웃"]),
+            "ok": rng.random() < 0.5,                         # bool → obj 열 (숫자 취급 안 함)
+            "inds": {"rsi": round(rng.uniform(0, 100), 5), "tag": rng.choice(["a", None])},
+        }
+        if i % 4 == 0:
+            del r["price"]                                    # 결측
+        if i % 5 == 0:
+            r["note"] = None if i % 10 else ["x", i]          # 드문 obj 열 (None / list)
+        if i % 7 == 0:
+            r["inds"] = {}                                    # 빈 중첩 dict
+        if i % 9 == 0:
+            r["mixed"] = "n/a" if i % 18 else 1.5             # 숫자열에 문자열 섞임 → obj 전환
+        recs.append(r)
+    return recs
+
+
+def test_pack_unpack_round_trip():
+    recs = _records()
+    packed = _json_rt(pack_records(recs))
+    assert unpack_records(packed) == recs
+
+
+def test_pack_uses_compact_numeric_columns():
+    packed = pack_records(_records())
+    assert packed["num"]["ts"][0] == "q"
+    assert packed["num"]["pnl"][0] == "f"
+    assert packed["num"]["price"][0] == "d"
+    assert "mixed" in packed["obj"] and "reason" in packed["obj"]
+
+
+def test_unpack_passes_legacy_lists_through():
+    legacy = [{"pnl": 0.01}, {"pnl": -0.02}]
+    assert unpack_records(legacy) is legacy
+    assert unpack_records(None) == []
+    assert unpack_records(pack_records([])) == []
+
+
+def test_encode_decode_stats_round_trip():
+    rb = RingBuffer(50, [0.01, -0.02, 0.03])
+    qs = QuantileSketch()
+    for v in (0.01, 0.02, -0.005):
+        qs.add(v)
+    recs = _records()
+    stats = {"R1": {"count": 3, "pnls": rb, "pnl_q": qs, "trade_records": recs, "fail_values": []}}
+    enc = _json_rt(encode_stats(stats))
+    assert stats["R1"]["pnls"] is rb and stats["R1"]["trade_records"] is recs   # 입력 불변
+    dec = decode_stats(enc)["R1"]
+    assert dec["count"] == 3
+    assert dec["trade_records"] == recs
+    assert dec["fail_values"] == []
+    assert RingBuffer.from_json(dec["pnls"]).to_list() == rb.to_list()
+    assert QuantileSketch.from_json(dec["pnl_q"]).bins == qs.bins
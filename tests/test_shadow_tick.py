@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""섀도우 체결 경로 수집: 인프로세스 스트림이 구독하지 않는 마켓은 시세 허브 체결 링에서 접음 (마켓별 폴백)"""
+import time
+import uuid
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import bot
+from md_hub_client import MdHubWriter, MdHubReader
+
+
+class _Stream:
+    """구독 마켓 목록만 가진 live 스트림 대역"""
+    def __init__(self, codes):
+        self.codes = sorted(codes)
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    if bot._SHADOW_BOOK is None:
+        pytest.skip("shadow book 비활성")
+    name = f"shadow_t_{uuid.uuid4().hex[:8]}"
+    w = MdHubWriter(name)
+    r = MdHubReader(name, 5.0)
+    monkeypatch.setattr(bot, "_md_hub_live", lambda: r)
+    monkeypatch.setattr(bot, "_SHADOW_TICK_PATHS", {})
+    monkeypatch.setattr(bot, "_SHADOW_TICK_MKTS", frozenset())
+    monkeypatch.setattr(bot, "_SHADOW_TICK_STATE",
+                        {"cursor": None, "last_drain": 0.0, "stream": 0, "hub": 0, "drains": 0})
+    for m in ("KRW-A", "KRW-B"):   # 슬롯 선등록 (허브는 티커 수신 시 마켓 슬롯 생성)
+        w.put_ticker({"market": m, "trade_price": 1.0, "timestamp": int(time.time() * 1000)})
+    w.heartbeat(ws_live=True)
+    yield w
+    w.close()
+
+
+def _put(w, market, prices, t0, seq0):
+    for i, p in enumerate(prices):
+        w.put_trade({"code": market, "ask_bid": "BID", "trade_timestamp": int((t0 + i * 0.1) * 1000),
+                     "trade_price": p, "trade_volume": 1.0, "sequential_id": seq0 + i})
+
+
+def test_unsubscribed_markets_fall_back_to_hub(monkeypatch, hub):
+    stream = _Stream(["KRW-A", "KRW-BTC"])
+    monkeypatch.setattr(bot, "_md_stream_live", lambda: stream)
+    for m in ("KRW-A", "KRW-B"):
+        bot._shadow_tick_track(m)
+    bot._shadow_tick_drain(["KRW-A", "KRW-B"], time.time())     # 허브 cursor 초기화
+
+    t = time.time() + 0.01                                      # ms 절사 후에도 직전 평가 이후
+    _put(hub, "KRW-A", [100, 101, 99], t, 1)
+    _put(hub, "KRW-B", [50, 51, 52, 50.5], t, 10)
+    bot._shadow_on_trade("KRW-A", {"trade_price": 100.5, "trade_timestamp": int(t * 1000)})
+    time.sleep(0.5)
+    paths = bot._shadow_tick_drain(["KRW-A", "KRW-B"], time.time())
+
+    # KRW-A: 스트림 구독 → 스트림 체결만 (허브 중복 반영 없음), KRW-B: 허브 체결 링
+    assert [p for p, _ in paths["KRW-A"].pts] == [100.5]
+    assert [p for p, _ in paths["KRW-B"].pts] == [50, 52, 50.5]
+    assert bot._SHADOW_TICK_STATE["hub"] == 4
+    assert bot._SHADOW_TICK_STATE["stream"] == 1
+
+
+def test_stream_down_uses_hub_for_all(monkeypatch, hub):
+    monkeypatch.setattr(bot, "_md_stream_live", lambda: None)
+    bot._shadow_tick_drain(["KRW-A"], time.time())
+    _put(hub, "KRW-A", [100, 101, 99], time.time() + 0.01, 1)
+    time.sleep(0.5)
+    paths = bot._shadow_tick_drain(["KRW-A"], time.time())
+    assert [p for p, _ in paths["KRW-A"].pts] == [100, 101, 99]
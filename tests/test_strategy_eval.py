@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""_StrategyEval 봉 메모 — 재사용 시 detector 는 건너뛰어도 퍼널 카운터는 실행 때와 같게 증가"""
+import bot
+
+
+def _bars(n=30, last=100.0):
+    return [{"candle_date_time_kst": f"2026-01-01T00:{i:02d}:00", "trade_price": last,
+             "high_price": last, "low_price": last, "candle_acc_trade_volume": 1.0} for i in range(n)]
+
+
+def test_memo_hit_replays_funnel_counters():
+    calls = []
+
+    def _det(c1, c5, c15, c30, c60, gate_info=None):
+        calls.append(1)
+        bot._pipeline_inc("t_memo_enter")
+        bot._pipeline_inc("t_memo_enter")
+        if bot._pipeline_inc("t_memo_rsi_fail", value=40, threshold=50): return None
+
+    c1 = _bars()
+    before = (bot._METRICS.value("t_memo_enter"), bot._METRICS.value("t_memo_rsi_fail"))
+    for i in range(3):
+        ev = bot._StrategyEval("KRW-MEMO", c1, None, None, None, None, {})
+        sig, fails = ev.node(_det)
+        ev.node(_det, live=True)        # 같은 평가 안 재사용은 재생하지 않음 (이중 계수 없음)
+        ev.flush()
+        assert sig is None
+        assert [f["filter"] for f in fails] == ["t_memo_rsi_fail"]
+        assert (bot._METRICS.value("t_memo_enter") - before[0],
+                bot._METRICS.value("t_memo_rsi_fail") - before[1]) == (2 * (i + 1), i + 1)
+    assert len(calls) == 2              # 1회차 실행 + eval_all 재실행, 이후는 메모
+    assert ev.memo_hits == 1
+
+    # 봉이 바뀌면 재실행
+    ev = bot._StrategyEval("KRW-MEMO", _bars(last=101.0), None, None, None, None, {})
+    ev.node(_det)
+    assert len(calls) == 4
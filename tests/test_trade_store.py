@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""거래 피처 저장소 — CSV 1회 임포트, 진입 INSERT / 청산 UPDATE, 최근 N건 순서, DataFrame dtype = read_csv"""
+import csv
+
+import pytest
+
+import bot
+
+FIELDS = bot.FEATURE_FIELDS
+
+
+def _row(i, market, result="", **kw):
+    r = {f: "" for f in FIELDS}
+    r.update({"ts": f"2026-01-01 00:{i:02d}:00", "market": market, "entry_price": f"{100 + i}",
+              "score": f"{0.5 + i / 10:.2f}", "added": "False", "signal_tag": "t", "hold_sec": str(30 * i)})
+    if result:
+        r.update({"exit_price": f"{101 + i}", "pnl_pct": f"{0.01 * (i - 2):.4f}", "result": result,
+                  "mfe_pct": "0.5", "exit_reason": "tp"})
+    r.update(kw)
+    return r
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        w.writerows(rows)
+
+
+@pytest.fixture
+def rows():
+    return [_row(0, "KRW-A", "win"), _row(1, "KRW-B", "lose"), _row(2, "KRW-A"),
+            _row(3, "KRW-C", "win"), _row(4, "KRW-B", "lose", mfe_pct="")]
+
+
+def test_import_csv_once(tmp_path, rows):
+    csv_path = tmp_path / "trade_features.csv"
+    _write_csv(csv_path, rows)
+    st = bot.TradeStore(str(tmp_path / "t.db"), FIELDS)
+    assert st.import_csv(str(csv_path)) == 5
+    assert st.count_closed() == 4
+    # 두 번째 임포트 (재시작) → 아무것도 안 함
+    _write_csv(csv_path, rows + [_row(5, "KRW-D", "win")])
+    assert st.import_csv(str(csv_path)) == 0
+    assert st.count_closed() == 4
+    # 재오픈해도 meta 표식 유지
+    st2 = bot.TradeStore(str(tmp_path / "t.db"), FIELDS)
+    assert st2.import_csv(str(csv_path)) == 0
+    assert [r["market"] for r in st2.closed_rows()] == ["KRW-A", "KRW-B", "KRW-C", "KRW-B"]
+
+
+def test_open_row_update_latest_open(tmp_path):
+    st = bot.TradeStore(str(tmp_path / "t.db"), FIELDS)
+    st.insert(_row(0, "KRW-A"))
+    rid_new = st.insert(_row(1, "KRW-A"))
+    st.insert(_row(2, "KRW-B"))
+    rid, row = st.open_row("KRW-A")
+    assert rid == rid_new and row["ts"] == "2026-01-01 00:01:00"
+    st.update(rid, {"exit_price": 105.5, "pnl_pct": 0.012, "result": "win", "not_a_field": 1})
+    assert st.count_closed() == 1
+    assert st.closed_rows()[0]["exit_price"] == "105.5"
+    # 청산된 행은 제외 → 남은 미청산 행(먼저 진입)이 대상
+    rid2, row2 = st.open_row("KRW-A")
+    assert rid2 != rid_new and row2["ts"] == "2026-01-01 00:00:00"
+    assert st.open_row("KRW-C") is None
+
+
+def test_closed_rows_last_n_order(tmp_path, rows):
+    st = bot.TradeStore(str(tmp_path / "t.db"), FIELDS)
+    for r in rows:
+        st.insert(r)
+    closed_ts = [r["ts"] for r in rows if r["result"]]
+    assert [r["ts"] for r in st.closed_rows()] == closed_ts
+    # 최근 N건 = 기록 순서 유지 (오래된 → 최신)
+    assert [r["ts"] for r in st.closed_rows(2)] == closed_ts[-2:]
+    assert [r["ts"] for r in st.closed_rows(10)] == closed_ts
+
+
+def test_read_trade_log_df_dtype_parity(tmp_path, monkeypatch, rows):
+    pd = pytest.importorskip("pandas")
+    closed = [r for r in rows if r["result"]]
+    csv_path = tmp_path / "closed.csv"
+    _write_csv(csv_path, closed)
+    st = bot.TradeStore(str(tmp_path / "t.db"), FIELDS)
+    for r in rows:
+        st.insert(r)
+    monkeypatch.setattr(bot, "_TRADE_STORE", st)
+
+    got = bot._read_trade_log_df()
+    want = pd.read_csv(csv_path)
+    assert list(got.columns) == list(want.columns)
+    assert got.dtypes.to_dict() == want.dtypes.to_dict()
+    pd.testing.assert_frame_equal(got, want)
+    pd.testing.assert_frame_equal(bot._read_trade_log_df(last_n=2),
+                                  want.tail(2).reset_index(drop=True))
+
+
+@pytest.mark.parametrize("batch_rows, want_csv", [(None, 4), ([], 0), ([{"ts": "2026-01-01 00:01:00"}], 2)])
+def test_restore_batch_count_matches_csv_path(tmp_path, monkeypatch, rows, batch_rows, want_csv):
+    csv_path = tmp_path / "trade_features.csv"
+    _write_csv(csv_path, rows)
+    batch_path = tmp_path / "batch_reports.csv"
+    if batch_rows is not None:
+        with open(batch_path, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=["ts", "n"])
+            w.writeheader()
+            w.writerows(batch_rows)
+    monkeypatch.setattr(bot, "TRADE_LOG_PATH", str(csv_path))
+    monkeypatch.setattr(bot, "BATCH_LOG_PATH", str(batch_path))
+    monkeypatch.setattr(bot, "_TRADE_STORE", None)
+    assert bot._restore_batch_count() == want_csv
+    st = bot.TradeStore(str(tmp_path / "t.db"), FIELDS)
+    st.import_csv(str(csv_path))
+    monkeypatch.setattr(bot, "_TRADE_STORE", st)
+    assert bot._restore_batch_count() == want_csv
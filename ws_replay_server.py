@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+업비트 WebSocket 리플레이 서버 (로컬 테스트용)
+==============================================
+bot.py의 실시간 시세 스트림(MarketDataStream)을 거래소 없이 검증하기 위한
+로컬 WebSocket 서버. 표준 라이브러리만 사용.
+
+- 업비트와 동일한 구독 요청 포맷 수신 ([{"ticket"}, {"type","codes"}, ..., {"format"}])
+- --capture: bot.py가 MD_STREAM_CAPTURE_PATH로 덤프한 JSONL을 원래 간격대로 재생
+  (타임스탬프는 현재 시각 기준으로 이동 → 봇의 신선도 체크 통과)
+- --synthetic: 구독 마켓별 랜덤워크 trade/orderbook/ticker 생성
+- 구독한 type/code만 전송, 메시지는 업비트처럼 binary 프레임
+
+사용법:
+  python ws_replay_server.py --synthetic                        # 합성 시세 (기본 8765 포트)
+  python ws_replay_server.py --capture md_capture.jsonl --speed 5 --loop
+  MD_STREAM_URL=ws://127.0.0.1:8765 python bot.py               # 봇을 리플레이 서버에 연결
+"""
+
+import os, json, time, random, base64, hashlib, struct, argparse, threading, socketserver
+from datetime import datetime, timezone
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+# =========================================================
+# WebSocket 프레임 (RFC 6455 최소 구현)
+# =========================================================
+def _recv_exact(sock, n):
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("client closed")
+        buf += chunk
+    return buf
+
+
+def _read_frame(sock):
+    """클라이언트 프레임 1개 읽기 → (opcode, payload)"""
+    b1, b2 = _recv_exact(sock, 2)
+    opcode = b1 & 0x0F
+    masked = b2 & 0x80
+    n = b2 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", _recv_exact(sock, 2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", _recv_exact(sock, 8))[0]
+    mask = _recv_exact(sock, 4) if masked else b"\x00\x00\x00\x00"
+    data = bytearray(_recv_exact(sock, n))
+    for i in range(n):
+        data[i] ^= mask[i % 4]
+    return opcode, bytes(data)
+
+
+def _send_frame(sock, payload, opcode=0x2):
+    """서버 → 클라이언트 프레임 (마스킹 없음)"""
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    sock.sendall(header + payload)
+
+
+def _handshake(sock):
+    req = b""
+    while b"\r\n\r\n" not in req:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise ConnectionError("handshake closed")
+        req += chunk
+    key = ""
+    for line in req.decode("latin-1").split("\r\n"):
+        if line.lower().startswith("sec-websocket-key:"):
+            key = line.split(":", 1)[1].strip()
+    accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+    sock.sendall(("HTTP/1.1 101 Switching Protocols\r\n"
+                  "Upgrade: websocket\r\n"
+                  "Connection: Upgrade\r\n"
+                  f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+
+
+# =========================================================
+# 메시지 소스
+# =========================================================
+_TS_KEYS = ("timestamp", "trade_timestamp")
+
+
+def _shift_ts(msg, shift_ms):
+    """캡처 메시지 타임스탬프를 현재 시각 기준으로 이동"""
+    for k in _TS_KEYS:
+        if isinstance(msg.get(k), (int, float)):
+            msg[k] = int(msg[k] + shift_ms)
+    if "trade_timestamp" in msg:
+        dt = datetime.fromtimestamp(msg["trade_timestamp"] / 1000, tz=timezone.utc)
+        msg["trade_date"] = dt.strftime("%Y-%m-%d")
+        msg["trade_time"] = dt.strftime("%H:%M:%S")
+    return msg
+
+
+def iter_capture(path, speed=1.0, loop=False):
+    """캡처 JSONL({"t": 수신시각, "msg": {...}}) → 원래 간격(÷speed)으로 메시지 yield"""
+    while True:
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        if not rows:
+            return
+        t0 = rows[0]["t"]
+        wall0 = time.time()
+        for row in rows:
+            due = wall0 + (row["t"] - t0) / speed
+            wait = due - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            shift_ms = (time.time() - row["t"]) * 1000
+            yield _shift_ts(dict(row["msg"]), shift_ms)
+        if not loop:
+            return
+
+
+def iter_synthetic(codes, rate=20.0):
+    """구독 마켓별 랜덤워크 시세 생성 (초당 rate건 trade + 주기적 orderbook/ticker)"""
+    prices = {c: random.choice([120.0, 1500.0, 42000.0, 95_000_000.0]) for c in codes}
+    seq = int(time.time() * 1000)
+    n = 0
+    while True:
+        time.sleep(1.0 / rate)
+        code = random.choice(codes)
+        p = prices[code]
+        p = max(p * (1 + random.gauss(0, 0.0008)), 1e-8)
+        prices[code] = p
+        now_ms = int(time.time() * 1000)
+        dt = datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc)
+        seq += 1
+        n += 1
+        yield {
+            "type": "trade", "code": code, "timestamp": now_ms,
+            "trade_date": dt.strftime("%Y-%m-%d"), "trade_time": dt.strftime("%H:%M:%S"),
+            "trade_timestamp": now_ms, "trade_price": round(p, 8),
+            "trade_volume": round(random.expovariate(1.0) * 100_000 / p, 8),
+            "ask_bid": random.choice(("ASK", "BID")), "prev_closing_price": p,
+            "change": "EVEN", "change_price": 0, "sequential_id": seq, "stream_type": "REALTIME",
+        }
+        if n % 3 == 0:
+            tick = p * 0.001
+            yield {
+                "type": "orderbook", "code": code, "timestamp": now_ms,
+                "total_ask_size": 0, "total_bid_size": 0, "stream_type": "REALTIME",
+                "orderbook_units": [
+                    {"ask_price": round(p + tick * (i + 1), 8), "bid_price": round(p - tick * (i + 1), 8),
+                     "ask_size": round(random.uniform(0.5, 5) * 200_000 / p, 8),
+                     "bid_size": round(random.uniform(0.5, 5) * 200_000 / p, 8)}
+                    for i in range(15)
+                ],
+            }
+        if n % 10 == 0:
+            yield {
+                "type": "ticker", "code": code, "timestamp": now_ms, "trade_price": round(p, 8),
+                "acc_trade_price_24h": 10_000_000_000, "stream_type": "REALTIME",
+            }
+
+
+# =========================================================
+# 서버
+# =========================================================
+class ReplayHandler(socketserver.BaseRequestHandler):
+    args = None
+
+    def handle(self):
+        sock = self.request
+        try:
+            _handshake(sock)
+            opcode, payload = _read_frame(sock)
+            req = json.loads(payload.decode("utf-8"))
+        except Exception as e:
+            print(f"[REPLAY] 핸드셰이크/구독 실패: {e}")
+            return
+        subs = {}
+        for item in req:
+            if isinstance(item, dict) and "type" in item:
+                subs[item["type"]] = set(c.split(".")[0] for c in item.get("codes", []))
+        codes = sorted(set().union(*subs.values())) if subs else []
+        print(f"[REPLAY] 구독: {self.client_address} types={list(subs)} codes={len(codes)}")
+
+        closed = threading.Event()
+
+        def reader():
+            # ping/close 처리 (websocket-client ping_interval 대응)
+            try:
+                while not closed.is_set():
+                    op, data = _read_frame(sock)
+                    if op == 0x9:
+                        _send_frame(sock, data, opcode=0xA)
+                    elif op == 0x8:
+                        break
+            except Exception:
+                pass
+            closed.set()
+
+        threading.Thread(target=reader, daemon=True).start()
+        a = self.args
+        src = iter_capture(a.capture, a.speed, a.loop) if a.capture else iter_synthetic(codes or ["KRW-BTC"], a.rate)
+        sent = 0
+        try:
+            for msg in src:
+                if closed.is_set():
+                    break
+                typ = msg.get("type")
+                if typ not in subs or msg.get("code") not in subs[typ]:
+                    continue
+                _send_frame(sock, json.dumps(msg).encode("utf-8"))
+                sent += 1
+        except (ConnectionError, OSError, BrokenPipeError):
+            pass
+        closed.set()
+        print(f"[REPLAY] 종료: {self.client_address} sent={sent}")
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    ap = argparse.ArgumentParser(description="업비트 WebSocket 리플레이 서버 (로컬 테스트용)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--capture", default="", help="MD_STREAM_CAPTURE_PATH로 덤프한 JSONL")
+    ap.add_argument("--speed", type=float, default=1.0, help="캡처 재생 배속")
+    ap.add_argument("--loop", action="store_true", help="캡처 끝나면 처음부터 반복")
+    ap.add_argument("--synthetic", action="store_true", help="랜덤워크 합성 시세")
+    ap.add_argument("--rate", type=float, default=20.0, help="합성 trade 초당 건수")
+    args = ap.parse_args()
+    if not args.capture and not args.synthetic:
+        ap.error("--capture 또는 --synthetic 중 하나 필요")
+    if args.capture and not os.path.exists(args.capture):
+        ap.error(f"캡처 파일 없음: {args.capture}")
+    ReplayHandler.args = args
+    with _Server((args.host, args.port), ReplayHandler) as srv:
+        print(f"[REPLAY] ws://{args.host}:{args.port} ({'capture=' + args.capture if args.capture else 'synthetic'})")
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            print("[REPLAY] 종료")
+
+
+if __name__ == "__main__":
+    main()